@@ -0,0 +1,3 @@
+# Shared helpers for the Briefings pages (weather, data, route engine).
+# Pages under pages/ import from here; the repo root is on sys.path when
+# running `streamlit run app.py`.
@@ -0,0 +1,246 @@
+# ---------------------------------------------------------------
+# Airway graph — shortest routes over the IFR airway network
+# ---------------------------------------------------------------
+# Built once per IFR_AIRWAYS.csv version from the page's airways frame
+# (airway, seq, point, lat, lon, route_type, lower, upper, mea):
+#   nodes  fixes, by code (first coordinates seen for a code win);
+#   edges  consecutive points of an airway, both directions, with
+#          great-circle distance, route type and level band
+#          (lower / upper / MEA in ft; blank = no limit).
+# Adjacency is CSR (NumPy), so a query is an A* over arrays: the
+# heuristic is the great-circle distance to the destination, which never
+# overestimates because every edge costs its great-circle length.
+# Routes come back as fixes + airways and as a token string that
+# parse_route_text reads ("A UZ218 B UN870 C").
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from briefings import geo
+
+
+def parse_level_ft(value: Any) -> float:
+    """'FL095' / 'F095' -> 9500, '5000' / '5000FT' -> 5000, GND/SFC -> 0, UNL -> inf; blank -> NaN."""
+    s = str(value if value is not None else "").strip().upper().replace(" ", "")
+    if not s or s in ("NAN", "NONE"):
+        return math.nan
+    if s in ("GND", "SFC"):
+        return 0.0
+    if s in ("UNL", "UNLTD", "UNLIMITED"):
+        return math.inf
+    m = re.match(r"^F(?:L)?(\d+(?:\.\d+)?)$", s)
+    if m:
+        return float(m.group(1)) * 100.0
+    m = re.match(r"^(\d+(?:\.\d+)?)(?:FT)?$", s)
+    if m:
+        return float(m.group(1))
+    return math.nan
+
+
+def _code(x: Any) -> str:
+    # Same normalisation as the pages' clean_code.
+    return re.sub(r"[^A-Z0-9]", "", str(x or "").upper().strip())
+
+
+def _pick(fn, a: float, b: float) -> float:
+    vals = [v for v in (a, b) if not math.isnan(v)]
+    return fn(vals) if vals else math.nan
+
+
+@dataclass
+class AirwayRoute:
+    codes: List[str]       # fixes, start to end
+    airways: List[str]     # airway of each leg (len(codes) - 1)
+    dist_nm: float
+
+    def tokens(self) -> str:
+        """Route string for parse_route_text, one token pair per airway change."""
+        if not self.codes:
+            return ""
+        out = [self.codes[0]]
+        for i, awy in enumerate(self.airways):
+            if i + 1 < len(self.airways) and self.airways[i + 1] == awy:
+                continue
+            out += [awy, self.codes[i + 1]]
+        return " ".join(out)
+
+
+class AirwayGraph:
+    def __init__(self, frame, version: Any = None):
+        self.version = version
+        cols = set(frame.columns)
+
+        def col(name: str) -> List[Any]:
+            return frame[name].tolist() if name in cols else [None] * len(frame)
+
+        awy = [str(a).upper().strip() for a in col("airway")]
+        pts = [_code(p) for p in col("point")]
+        seq = col("seq")
+        lat, lon = col("lat"), col("lon")
+        rtype = [str(t or "").upper().strip() if t == t else "" for t in col("route_type")]
+        lower = [parse_level_ft(v) for v in col("lower")]
+        upper = [parse_level_ft(v) for v in col("upper")]
+        mea = [parse_level_ft(v) for v in col("mea")]
+
+        self.node_of: Dict[str, int] = {}
+        codes: List[str] = []
+        node_lat: List[float] = []
+        node_lon: List[float] = []
+        for code, la, lo in zip(pts, lat, lon):
+            if code not in self.node_of:
+                self.node_of[code] = len(codes)
+                codes.append(code)
+                node_lat.append(float(la))
+                node_lon.append(float(lo))
+        self.codes = codes
+        self.lat = np.array(node_lat, dtype=np.float64)
+        self.lon = np.array(node_lon, dtype=np.float64)
+
+        # airway -> its fixes in sequence order
+        rows_of: Dict[str, List[int]] = {}
+        for r in sorted(range(len(awy)), key=lambda r: (awy[r], float(seq[r]))):
+            rows_of.setdefault(awy[r], []).append(r)
+        self.sequence: Dict[str, List[Tuple[str, float, float]]] = {
+            a: [(pts[r], float(lat[r]), float(lon[r])) for r in rows] for a, rows in rows_of.items()
+        }
+
+        src, dst, name, kind, lo_, hi_, mea_ = [], [], [], [], [], [], []
+        for a, rows in rows_of.items():
+            for r1, r2 in zip(rows, rows[1:]):
+                n1, n2 = self.node_of[pts[r1]], self.node_of[pts[r2]]
+                if n1 == n2:
+                    continue
+                # A segment's band is the tighter of its two ends' rows.
+                band = (_pick(max, lower[r1], lower[r2]), _pick(min, upper[r1], upper[r2]), _pick(max, mea[r1], mea[r2]))
+                for u, v in ((n1, n2), (n2, n1)):
+                    src.append(u)
+                    dst.append(v)
+                    name.append(a)
+                    kind.append(rtype[r1] or rtype[r2])
+                    lo_.append(band[0])
+                    hi_.append(band[1])
+                    mea_.append(band[2])
+
+        order = np.argsort(np.array(src, dtype=np.int64), kind="stable")
+        self.edge_src = np.array(src, dtype=np.int64)[order]
+        self.edge_dst = np.array(dst, dtype=np.int64)[order]
+        self.edge_airway = np.array(name, dtype=object)[order] if name else np.zeros(0, dtype=object)
+        self.edge_type = np.array(kind, dtype=object)[order] if kind else np.zeros(0, dtype=object)
+        self.edge_lower = np.array(lo_, dtype=np.float64)[order]
+        self.edge_upper = np.array(hi_, dtype=np.float64)[order]
+        self.edge_mea = np.array(mea_, dtype=np.float64)[order]
+        self.edge_dist = geo.gc_dist_nm(self.lat[self.edge_src], self.lon[self.edge_src], self.lat[self.edge_dst], self.lon[self.edge_dst]) if len(order) else np.zeros(0)
+        self.offsets = np.searchsorted(self.edge_src, np.arange(len(codes) + 1)).astype(np.int64)
+        self.route_types = sorted({t for t in kind if t})
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return _code(code) in self.node_of
+
+    # -----------------------------
+    # Single airway
+    # -----------------------------
+    def segment(self, airway: str, start: str, end: str) -> Optional[List[Tuple[str, float, float]]]:
+        """(code, lat, lon) of `airway` from start to end (either direction), or None."""
+        seq = self.sequence.get(str(airway).upper().strip())
+        if seq is None:
+            return None
+        codes = [c for c, _, _ in seq]
+        start, end = _code(start), _code(end)
+        if start not in codes or end not in codes:
+            return None
+        i1, i2 = codes.index(start), codes.index(end)
+        return seq[i1:i2 + 1] if i1 <= i2 else seq[i2:i1 + 1][::-1]
+
+    # -----------------------------
+    # Routing
+    # -----------------------------
+    def allowed(self, level_ft: Optional[float] = None, route_types: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Edge mask for a cruise level (inside lower/upper, at or above MEA) and route types."""
+        ok = np.ones(len(self.edge_src), dtype=bool)
+        if level_ft is not None:
+            lvl = float(level_ft)
+            ok &= ~(self.edge_lower > lvl) & ~(self.edge_upper < lvl) & ~(self.edge_mea > lvl)
+        if route_types:
+            kinds = {str(t).upper().strip() for t in route_types}
+            ok &= np.array([t in kinds for t in self.edge_type.tolist()], dtype=bool)
+        return ok
+
+    def route(
+        self,
+        start: str,
+        end: str,
+        level_ft: Optional[float] = None,
+        route_types: Optional[Sequence[str]] = None,
+    ) -> Tuple[Optional[AirwayRoute], str]:
+        """Shortest airway route between two fixes (A*); (None, reason) when there is none."""
+        s, t = self.node_of.get(_code(start)), self.node_of.get(_code(end))
+        if s is None or t is None:
+            missing = start if s is None else end
+            return None, f"{missing} não está em nenhuma airway."
+        if s == t:
+            return AirwayRoute([self.codes[s]], [], 0.0), ""
+
+        ok = self.allowed(level_ft, route_types)
+        h = geo.gc_dist_nm(self.lat, self.lon, self.lat[t], self.lon[t]).tolist()
+        offsets, dst, dist = self.offsets.tolist(), self.edge_dst.tolist(), self.edge_dist.tolist()
+        ok = ok.tolist()
+        best = {s: 0.0}
+        via: Dict[int, int] = {}  # node -> edge used to reach it
+        heap = [(h[s], 0.0, s)]
+        done = set()
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if u == t:
+                break
+            done.add(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                if not ok[e]:
+                    continue
+                v = dst[e]
+                g2 = g + dist[e]
+                if g2 < best.get(v, math.inf):
+                    best[v] = g2
+                    via[v] = e
+                    heapq.heappush(heap, (g2 + h[v], g2, v))
+        if t not in best:
+            return None, f"Sem rota por airways entre {self.codes[s]} e {self.codes[t]}."
+
+        edges = []
+        node = t
+        while node != s:
+            e = via[node]
+            edges.append(e)
+            node = int(self.edge_src[e])
+        edges.reverse()
+        codes = [self.codes[s]] + [self.codes[int(self.edge_dst[e])] for e in edges]
+        return AirwayRoute(codes, [str(self.edge_airway[e]) for e in edges], float(best[t])), ""
+
+
+# -----------------------------
+# Process cache
+# -----------------------------
+_CACHE: Dict[str, AirwayGraph] = {}
+_LOCK = threading.Lock()
+
+
+def get(version: Any, frame) -> AirwayGraph:
+    """AirwayGraph for this airways version, built on first use per process."""
+    with _LOCK:
+        graph = _CACHE.get("graph")
+        if graph is None or graph.version != version:
+            graph = _CACHE["graph"] = AirwayGraph(frame, version)
+        return graph
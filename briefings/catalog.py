@@ -0,0 +1,140 @@
+# ---------------------------------------------------------------
+# Catalog — the route builder's points, built once per data version
+# ---------------------------------------------------------------
+# The route builder's catalog (AD, Localidades, VOR, IFR points and
+# SID/STAR points) used to be concatenated and de-duplicated on every
+# lookup, several times per rerun. PointCatalog is built once per data
+# version (the caller passes e.g. the sources' mtimes) and kept per
+# process. It carries hash indexes, so code lookups don't scan the table:
+#   by_code   code               -> rows, best source first
+#   by_upper  code upper/stripped -> rows, best source first
+#   by_src    src                -> slice of rows (rows are grouped by src)
+# plus the search index (briefings.point_search) and a spatial index
+# (briefings.spatial), each built on first use.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from briefings import point_search, spatial
+
+# Which source wins when several points share a code
+SRC_PRIORITY = ("VOR", "IFR", "PROC", "AD", "VFR")
+
+
+def _rank(src: Sequence[str], priority: Sequence[str]) -> List[int]:
+    order = {s: i for i, s in enumerate(priority)}
+    return [order.get(s, len(priority)) for s in src]
+
+
+def _index(keys: List[str], rank: List[int]) -> Dict[str, np.ndarray]:
+    """key -> row positions, ordered by (rank, row)."""
+    out: Dict[str, List[int]] = {}
+    for row in sorted(range(len(keys)), key=lambda r: (rank[r], r)):
+        out.setdefault(keys[row], []).append(row)
+    return {k: np.array(v, dtype=np.int64) for k, v in out.items()}
+
+
+class PointCatalog:
+    """One catalog version. `frame` is shared: treat it as read-only."""
+
+    def __init__(self, frame, version: Any = None, priority: Sequence[str] = SRC_PRIORITY):
+        src = frame["src"].astype(str).tolist() if "src" in frame.columns else [""] * len(frame)
+        # Group rows by source, keeping first-seen order of sources and rows.
+        groups = list(dict.fromkeys(src))
+        order = np.argsort(np.array([groups.index(s) for s in src], dtype=np.int64), kind="stable") if src else np.zeros(0, dtype=np.int64)
+        self.frame = frame.iloc[order].reset_index(drop=True)
+        self.version = version
+        self.priority = tuple(priority)
+
+        src = self.src_of = [src[i] for i in order.tolist()]
+        codes = self.frame["code"].tolist() if "code" in self.frame.columns else [""] * len(src)
+        rank = _rank(src, self.priority)
+        self.by_code = _index([str(c) for c in codes], rank)
+        self.by_upper = _index([str(c).upper().strip() for c in codes], rank)
+        self.by_src: Dict[str, slice] = {}
+        for i, s in enumerate(src):
+            sl = self.by_src.get(s)
+            self.by_src[s] = slice(i, i + 1) if sl is None else slice(sl.start, i + 1)
+        self._search: Optional[point_search.SearchIndex] = None
+        self._spatial: Optional[spatial.SpatialIndex] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def rows(self, code: str) -> np.ndarray:
+        """Rows with this code (upper/stripped), best source first."""
+        return self.by_upper.get(str(code).upper().strip(), np.zeros(0, dtype=np.int64))
+
+    def first(self, code: str, priority: Optional[Sequence[str]] = SRC_PRIORITY) -> Optional[int]:
+        """Best row for a code: by source priority, or first in catalog order when priority is None."""
+        rows = self.rows(code)
+        if not len(rows):
+            return None
+        if priority is None:
+            return int(rows.min())
+        if tuple(priority) == self.priority:
+            return int(rows[0])
+        rank = {s: i for i, s in enumerate(priority)}
+        return min(rows.tolist(), key=lambda r: (rank.get(self.src_of[r], len(rank)), r))
+
+    def src(self, *sources: str):
+        """Rows of the given sources (frame slices, in catalog order)."""
+        slices = [sl for s, sl in self.by_src.items() if s in sources]
+        if not slices:
+            return self.frame.head(0)
+        if len(slices) == 1:
+            return self.frame.iloc[slices[0]]
+        return self.frame.iloc[np.r_[tuple(slices)]]
+
+    def count(self, src: str) -> int:
+        sl = self.by_src.get(src)
+        return 0 if sl is None else sl.stop - sl.start
+
+    @property
+    def search_index(self) -> point_search.SearchIndex:
+        with self._lock:
+            if self._search is None:
+                self._search = point_search.SearchIndex(self.frame, self.version)
+            return self._search
+
+    @property
+    def spatial(self) -> spatial.SpatialIndex:
+        with self._lock:
+            if self._spatial is None:
+                self._spatial = spatial.SpatialIndex(self.frame["lat"], self.frame["lon"])
+            return self._spatial
+
+    def nearby(self, lat: float, lon: float, radius_nm: float, limit: Optional[int] = None):
+        """Rows within radius_nm, nearest first, with a dist_nm column."""
+        rows, dist = self.spatial.within_radius(lat, lon, radius_nm)
+        if limit is not None:
+            rows, dist = rows[:limit], dist[:limit]
+        return self.frame.iloc[rows].assign(dist_nm=dist)
+
+
+# -----------------------------
+# Process cache
+# -----------------------------
+_CACHE: Dict[Any, PointCatalog] = {}
+_LOCK = threading.Lock()
+
+
+def get(version: Any, build_frame: Callable[[], Any]) -> PointCatalog:
+    """PointCatalog for a data version; build_frame() runs only when the version changes."""
+    with _LOCK:
+        catalog = _CACHE.get(version)
+        if catalog is None:
+            catalog = PointCatalog(build_frame(), version)
+            _CACHE.clear()
+            _CACHE[version] = catalog
+        return catalog
@@ -0,0 +1,153 @@
+# ---------------------------------------------------------------
+# Hourly forecast — columnar (NumPy) representation
+# ---------------------------------------------------------------
+# One Open-Meteo hourly answer as arrays instead of per-hour Python
+# lists: datetime64 times, float32 u/v/gust (m/s), temperature (°C) and
+# QNH (hPa), NaN where the model has no value. Built with whole-array
+# conversions, shared by the PA-28 and Tecnam pages, and scanned with
+# slicing (nearest hour, window means) instead of Python loops.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+KT_TO_MS = 0.514444
+
+# Open-Meteo gives direction in whole degrees and speed to 0.1 kt; derived
+# values are rounded to this many decimals to drop float32 noise.
+_DERIVED_DECIMALS = 3
+
+
+def _col(h: Dict[str, Any], key: str, n: int) -> np.ndarray:
+    """Hourly list -> float64 array of length n (None / short list -> NaN)."""
+    a = np.array(h.get(key) or [], dtype=float)  # None -> NaN
+    if len(a) >= n:
+        return a[:n]
+    return np.concatenate([a, np.full(n - len(a), np.nan)])
+
+
+def _dir_from(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    u, v = np.asarray(u, dtype=float), np.asarray(v, dtype=float)
+    return np.round((np.degrees(np.arctan2(u, v)) + 180.0) % 360.0, _DERIVED_DECIMALS)
+
+
+def _kt_from(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    u, v = np.asarray(u, dtype=float), np.asarray(v, dtype=float)
+    return np.round(np.hypot(u, v) / KT_TO_MS, _DERIVED_DECIMALS)
+
+
+def _empty() -> np.ndarray:
+    return np.zeros(0, dtype=np.float32)
+
+
+@dataclass(frozen=True, eq=False)
+class HourlyForecast:
+    time: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype="datetime64[s]"))  # UTC
+    u: np.ndarray = field(default_factory=_empty)     # m/s, wind vector (towards)
+    v: np.ndarray = field(default_factory=_empty)     # m/s
+    gust: np.ndarray = field(default_factory=_empty)  # m/s
+    temp: np.ndarray = field(default_factory=_empty)  # °C
+    qnh: np.ndarray = field(default_factory=_empty)   # hPa (pressure_msl)
+    source: Optional[str] = None
+    request: Optional[int] = None
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+    detail: str = ""
+
+    @classmethod
+    def failed(cls, error: str, detail: str = "", **meta: Any) -> "HourlyForecast":
+        return cls(error=str(error), detail=str(detail or ""), **meta)
+
+    @classmethod
+    def from_openmeteo(cls, data: Dict[str, Any]) -> "HourlyForecast":
+        """Forecast-store / Open-Meteo result ({"hourly": {...}} or {"error", "detail"})."""
+        meta = {k: data.get(k) for k in ("source", "request", "elapsed_ms")}
+        if "error" in data:
+            return cls.failed(data["error"], data.get("detail", ""), **meta)
+        h = data.get("hourly") or {}
+        time = np.array(h.get("time") or [], dtype="datetime64[s]")
+        n = len(time)
+
+        spd = _col(h, "wind_speed_10m", n) * KT_TO_MS
+        th = np.radians(_col(h, "wind_direction_10m", n))
+        return cls(
+            time=time,
+            u=(-spd * np.sin(th)).astype(np.float32),
+            v=(-spd * np.cos(th)).astype(np.float32),
+            gust=(_col(h, "wind_gusts_10m", n) * KT_TO_MS).astype(np.float32),
+            temp=_col(h, "temperature_2m", n).astype(np.float32),
+            qnh=_col(h, "pressure_msl", n).astype(np.float32),
+            **meta,
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    # -----------------------------
+    # Derived columns
+    # -----------------------------
+    @property
+    def ts_ms(self) -> np.ndarray:
+        return self.time.astype("datetime64[ms]").astype(np.int64)
+
+    @property
+    def wind_dir(self) -> np.ndarray:
+        """Direction the wind blows FROM, degrees [0, 360)."""
+        return _dir_from(self.u, self.v)
+
+    @property
+    def wind_kt(self) -> np.ndarray:
+        return _kt_from(self.u, self.v)
+
+    @property
+    def gust_kt(self) -> np.ndarray:
+        return np.round(self.gust.astype(float) / KT_TO_MS, _DERIVED_DECIMALS)
+
+    # -----------------------------
+    # Hour lookup
+    # -----------------------------
+    def hours(self) -> List[Tuple[int, dt.datetime]]:
+        return [(i, t.replace(tzinfo=dt.timezone.utc)) for i, t in enumerate(self.time.astype("datetime64[s]").tolist())]
+
+    def nearest(self, target: dt.datetime) -> Optional[int]:
+        if not len(self):
+            return None
+        if target.tzinfo is not None:
+            target = target.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        return int(np.argmin(np.abs(self.time - np.datetime64(target, "s"))))
+
+    def mean_wind(self, idx: int, window: int = 1) -> Optional[Tuple[float, float]]:
+        """Vector-mean wind (dir FROM, kt) over hours idx-window..idx+window with data."""
+        sl = slice(max(0, idx - window), idx + window + 1)
+        u, v = self.u[sl].astype(float), self.v[sl].astype(float)
+        ok = np.isfinite(u) & np.isfinite(v)
+        if not ok.any():
+            return None
+        um, vm = u[ok].mean(), v[ok].mean()
+        return float(_dir_from(um, vm)), float(_kt_from(um, vm))
+
+    def at(self, idx: int) -> Dict[str, Optional[float]]:
+        """Values at one hour (NaN -> None)."""
+        if not 0 <= idx < len(self):
+            return {k: None for k in ("wind_dir", "wind_kt", "gust_kt", "temp", "qnh")}
+        sl = slice(idx, idx + 1)
+
+        def val(a):
+            x = float(a[0])
+            return None if x != x else x
+
+        return {
+            "wind_dir": val(_dir_from(self.u[sl], self.v[sl])),
+            "wind_kt": val(_kt_from(self.u[sl], self.v[sl])),
+            "gust_kt": val(np.round(self.gust[sl].astype(float) / KT_TO_MS, _DERIVED_DECIMALS)),
+            "temp": val(self.temp[sl]),
+            "qnh": val(self.qnh[sl]),
+        }
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.time, self.u, self.v, self.gust, self.temp, self.qnh))
@@ -0,0 +1,225 @@
+# ---------------------------------------------------------------
+# Forecast store — batched Open-Meteo requests + SQLite cache
+# ---------------------------------------------------------------
+# Open-Meteo accepts comma-separated latitude/longitude lists, so every
+# aerodrome of a page goes in ONE request. Results are kept per point in
+# a small SQLite file shared by all pages and all sessions/processes, and
+# expire when the next model run becomes available (not after a fixed
+# 15 min). Cold starts and concurrent users read the store instead of
+# hitting the API again.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from briefings import openmeteo
+
+# Same variable set for every page so PA-28 / Tecnam share the rows
+HOURLY = [
+    "temperature_2m",
+    "wind_speed_10m",
+    "wind_direction_10m",
+    "wind_gusts_10m",
+    "pressure_msl",
+]
+COORD_DIGITS = 4
+BATCH_MAX_POINTS = 50  # keeps the URL short; bigger lists are split and fetched concurrently
+
+# Global models (ICON/GFS/ECMWF) run at 00/06/12/18Z and reach Open-Meteo
+# roughly 4 h later. Between two availabilities the answer does not change.
+MODEL_RUN_HOURS = (0, 6, 12, 18)
+MODEL_AVAILABILITY_DELAY_H = 4
+MIN_TTL_S = 300
+PURGE_AFTER_S = 2 * 86400
+
+CACHE_DIR = Path(os.environ.get("BRIEFINGS_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+DB_PATH = CACHE_DIR / "forecast.sqlite"
+
+_FETCH_LOCK = threading.Lock()
+
+
+# -----------------------------
+# Model run TTL
+# -----------------------------
+def next_model_update(now: Optional[dt.datetime] = None) -> dt.datetime:
+    now = now or dt.datetime.now(dt.timezone.utc)
+    day = dt.datetime(now.year, now.month, now.day, tzinfo=dt.timezone.utc)
+    for d in (0, 1):
+        for h in MODEL_RUN_HOURS:
+            t = day + dt.timedelta(days=d, hours=h + MODEL_AVAILABILITY_DELAY_H)
+            if t > now:
+                return t
+    return now + dt.timedelta(hours=6)
+
+
+def expiry_ts(now: Optional[dt.datetime] = None) -> float:
+    now = now or dt.datetime.now(dt.timezone.utc)
+    return max(next_model_update(now).timestamp(), now.timestamp() + MIN_TTL_S)
+
+
+# -----------------------------
+# SQLite
+# -----------------------------
+def _connect() -> sqlite3.Connection:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(DB_PATH, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS forecast ("
+        " key TEXT PRIMARY KEY,"
+        " fetched_at REAL NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " payload TEXT NOT NULL)"
+    )
+    return con
+
+
+def point_key(lat: float, lon: float, start_iso: str, end_iso: str, hourly: Sequence[str] = HOURLY) -> str:
+    return f"{round(float(lat), COORD_DIGITS):.{COORD_DIGITS}f},{round(float(lon), COORD_DIGITS):.{COORD_DIGITS}f}|{start_iso}|{end_iso}|{','.join(hourly)}"
+
+
+def store_get(keys: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    keys = list(keys)
+    if not keys:
+        return {}
+    now = time.time() if now is None else now
+    out: Dict[str, Dict[str, Any]] = {}
+    try:
+        con = _connect()
+        try:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                q = f"SELECT key, payload FROM forecast WHERE expires_at > ? AND key IN ({','.join('?' * len(chunk))})"
+                for k, payload in con.execute(q, [now] + chunk):
+                    out[k] = json.loads(payload)
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError, ValueError):
+        return {}
+    return out
+
+
+def store_put(items: Dict[str, Dict[str, Any]], expires_at: float) -> None:
+    if not items:
+        return
+    now = time.time()
+    try:
+        con = _connect()
+        try:
+            with con:
+                con.executemany(
+                    "INSERT OR REPLACE INTO forecast (key, fetched_at, expires_at, payload) VALUES (?, ?, ?, ?)",
+                    [(k, now, expires_at, json.dumps(v)) for k, v in items.items()],
+                )
+                con.execute("DELETE FROM forecast WHERE expires_at < ?", (now - PURGE_AFTER_S,))
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError):
+        pass  # the store is only a cache; a read-only disk must not break the page
+
+
+# -----------------------------
+# Batched fetch
+# -----------------------------
+def _batch_params(points: Sequence[Tuple[float, float]], start_iso: str, end_iso: str, hourly: Sequence[str]) -> Dict[str, Any]:
+    params = openmeteo.hourly_params(0.0, 0.0, hourly, start_iso, end_iso)
+    params["latitude"] = ",".join(f"{round(float(lat), COORD_DIGITS)}" for lat, _ in points)
+    params["longitude"] = ",".join(f"{round(float(lon), COORD_DIGITS)}" for _, lon in points)
+    return params
+
+
+def _split_batch(resp: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+    if "error" in resp:
+        return [{"error": resp["error"], "detail": resp.get("detail", "")}] * n
+    locs = resp.get("locations", [resp])
+    if len(locs) != n:
+        return [{"error": "Bad batch response", "detail": f"expected {n} locations, got {len(locs)}"}] * n
+    return [{"hourly": (r or {}).get("hourly", {}) or {}} for r in locs]
+
+
+def get_hourly(
+    points: Sequence[Tuple[float, float]],
+    start_iso: str,
+    end_iso: str,
+    hourly: Sequence[str] = HOURLY,
+) -> List[Dict[str, Any]]:
+    """Hourly forecast for each (lat, lon); result i matches points[i].
+
+    Each result is {"hourly": {...}, "source": "store"|"api", "elapsed_ms"}
+    or an {"error", "detail"} dict. Missing points are fetched in batched
+    requests (one per BATCH_MAX_POINTS) and written to the store.
+    """
+    keys = [point_key(lat, lon, start_iso, end_iso, hourly) for lat, lon in points]
+    found = store_get(keys)
+    results: Dict[str, Dict[str, Any]] = {k: dict(v, source="store") for k, v in found.items()}
+
+    missing = list(dict.fromkeys(k for k in keys if k not in results))
+    if missing:
+        # One fetch at a time per process: a second session waiting here
+        # finds the rows already stored by the first one.
+        with _FETCH_LOCK:
+            found = store_get(missing)
+            results.update({k: dict(v, source="store") for k, v in found.items()})
+            missing = [k for k in missing if k not in results]
+
+            if missing:
+                by_key = {k: p for k, p in zip(keys, points)}
+                chunks = [missing[i:i + BATCH_MAX_POINTS] for i in range(0, len(missing), BATCH_MAX_POINTS)]
+                params = [_batch_params([by_key[k] for k in c], start_iso, end_iso, hourly) for c in chunks]
+                responses = openmeteo.fetch_many(params)
+
+                fresh: Dict[str, Dict[str, Any]] = {}
+                for n, (chunk, resp) in enumerate(zip(chunks, responses)):
+                    for k, item in zip(chunk, _split_batch(resp, len(chunk))):
+                        if "error" not in item:
+                            fresh[k] = item
+                        results[k] = dict(item, source="api", request=n, elapsed_ms=resp.get("elapsed_ms"))
+                store_put(fresh, expiry_ts())
+
+    return [results[k] for k in keys]
+
+
+def _meta(r: Any, key: str) -> Any:
+    # get_hourly dicts or forecast.HourlyForecast (source / request / elapsed_ms attributes)
+    return r.get(key) if isinstance(r, dict) else getattr(r, key, None)
+
+
+def summary(results: Sequence[Any]) -> str:
+    api = [r for r in results if _meta(r, "source") == "api"]
+    stored = sum(1 for r in results if _meta(r, "source") == "store")
+    if not api:
+        return f"Forecast: {stored} point(s) from local store (no API call)"
+    reqs = {_meta(r, "request"): _meta(r, "elapsed_ms") or 0.0 for r in api}
+    return (
+        f"Forecast: {len(api)} point(s) in {len(reqs)} batched request(s), "
+        f"slowest {max(reqs.values()):.0f} ms; {stored} from local store"
+    )
+
+
+def get_many(
+    queries: Sequence[Tuple[float, float, str, str]],
+    prefetch_points: Sequence[Tuple[float, float]] = (),
+) -> List[Dict[str, Any]]:
+    """queries: (lat, lon, start_iso, end_iso) per leg; result i matches queries[i].
+
+    prefetch_points (e.g. every aerodrome of the page) ride along in the
+    same batched request, so changing a leg later is served from the store.
+    """
+    out: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for n, (_, _, s, e) in enumerate(queries):
+        groups.setdefault((s, e), []).append(n)
+    for (s, e), idxs in groups.items():
+        pts = [(queries[n][0], queries[n][1]) for n in idxs]
+        res = get_hourly(pts + list(prefetch_points), s, e)
+        for n, r in zip(idxs, res):
+            out[n] = r
+    return out
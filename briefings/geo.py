@@ -0,0 +1,103 @@
+# ---------------------------------------------------------------
+# Great-circle geometry — NumPy versions of the route engine helpers
+# ---------------------------------------------------------------
+# Same spherical formulas as the scalar gc_dist_nm / gc_course_tc /
+# dest_point / point_along_gc / wind_triangle in the pages (sphere of
+# EARTH_NM), but taking arrays and broadcasting, so a whole route, a
+# radial fan or a distance matrix is one call instead of a Python loop
+# of math calls.
+# Results agree with the scalar versions to floating-point rounding.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_NM = 3440.065
+
+
+def _f(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def wrap360(x) -> np.ndarray:
+    return (_f(x) % 360.0 + 360.0) % 360.0
+
+
+def gc_dist_nm(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine distance (NM), broadcasting over the inputs."""
+    phi1, lam1, phi2, lam2 = np.radians(_f(lat1)), np.radians(_f(lon1)), np.radians(_f(lat2)), np.radians(_f(lon2))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    return EARTH_NM * 2 * np.arctan2(np.sqrt(a), np.sqrt(np.maximum(0.0, 1 - a)))
+
+
+def gc_course_tc(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Initial true course (deg, [0, 360)) from point 1 to point 2."""
+    phi1, lam1, phi2, lam2 = np.radians(_f(lat1)), np.radians(_f(lon1)), np.radians(_f(lat2)), np.radians(_f(lon2))
+    dlam = lam2 - lam1
+    y = np.sin(dlam) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlam)
+    return wrap360(np.degrees(np.arctan2(y, x)))
+
+
+def dest_point(lat, lon, bearing_deg, dist_nm) -> Tuple[np.ndarray, np.ndarray]:
+    """(lat, lon) reached from lat/lon along bearing_deg for dist_nm; lon in [-180, 180)."""
+    theta = np.radians(_f(bearing_deg))
+    delta = _f(dist_nm) / EARTH_NM
+    phi1, lam1 = np.radians(_f(lat)), np.radians(_f(lon))
+    sin_phi2 = np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta)
+    phi2 = np.arcsin(np.clip(sin_phi2, -1.0, 1.0))
+    y = np.sin(theta) * np.sin(delta) * np.cos(phi1)
+    x = np.cos(delta) - np.sin(phi1) * sin_phi2
+    lam2 = lam1 + np.arctan2(y, x)
+    return np.degrees(phi2), ((np.degrees(lam2) + 540) % 360) - 180
+
+
+def point_along_gc(lat1, lon1, lat2, lon2, dist_from_start_nm) -> Tuple[np.ndarray, np.ndarray]:
+    """Point dist_from_start_nm along each great circle (clamped to [0, total]); the start when total is 0."""
+    lat1, lon1, lat2, lon2, d = np.broadcast_arrays(_f(lat1), _f(lon1), _f(lat2), _f(lon2), _f(dist_from_start_nm))
+    total = gc_dist_nm(lat1, lon1, lat2, lon2)
+    lat, lon = dest_point(lat1, lon1, gc_course_tc(lat1, lon1, lat2, lon2), np.minimum(total, np.maximum(0.0, d)))
+    same = total <= 0
+    return np.where(same, lat1, lat), np.where(same, lon1, lon)
+
+
+def leg_geometry(lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance (NM) and initial true course of each consecutive leg of a route."""
+    lats, lons = _f(lats), _f(lons)
+    return gc_dist_nm(lats[:-1], lons[:-1], lats[1:], lons[1:]), gc_course_tc(lats[:-1], lons[:-1], lats[1:], lons[1:])
+
+
+def wind_triangle(tc, tas, wind_from, wind_kt) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(wca, true heading, ground speed), broadcasting; same formula as the pages (all zero wca / GS at TAS <= 0)."""
+    tc, tas, wind_from, wind_kt = np.broadcast_arrays(_f(tc), _f(tas), _f(wind_from), _f(wind_kt))
+    d = np.radians((wind_from - tc + 180) % 360 - 180)
+    s = np.clip(wind_kt * np.sin(d) / np.maximum(tas, 1e-9), -1.0, 1.0)
+    fly = tas > 0
+    wca = np.where(fly, np.degrees(np.arcsin(s)), 0.0)
+    gs = np.where(fly, np.maximum(0.0, tas * np.cos(np.radians(wca)) - wind_kt * np.cos(d)), 0.0)
+    return wca, wrap360(tc + wca), gs
+
+
+def distance_matrix(lat_a, lon_a, lat_b: Optional[np.ndarray] = None, lon_b: Optional[np.ndarray] = None) -> np.ndarray:
+    """(len(a), len(b)) great-circle distances in NM; b defaults to a."""
+    lat_a, lon_a = _f(lat_a), _f(lon_a)
+    if lat_b is None or lon_b is None:
+        lat_b, lon_b = lat_a, lon_a
+    return gc_dist_nm(lat_a[:, None], lon_a[:, None], _f(lat_b)[None, :], _f(lon_b)[None, :])
+
+
+def bearing_matrix(lat_a, lon_a, lat_b: Optional[np.ndarray] = None, lon_b: Optional[np.ndarray] = None) -> np.ndarray:
+    """(len(a), len(b)) initial true courses from each a to each b."""
+    lat_a, lon_a = _f(lat_a), _f(lon_a)
+    if lat_b is None or lon_b is None:
+        lat_b, lon_b = lat_a, lon_a
+    return gc_course_tc(lat_a[:, None], lon_a[:, None], _f(lat_b)[None, :], _f(lon_b)[None, :])
+
+
+def radial_points(lat: float, lon: float, radials, dist_nm) -> np.ndarray:
+    """(n, 2) lat/lon points on the given radials from a station (DME arcs, turn arcs)."""
+    rlat, rlon = dest_point(lat, lon, radials, dist_nm)
+    return np.stack(np.broadcast_arrays(rlat, rlon), axis=-1).reshape(-1, 2)
@@ -0,0 +1,298 @@
+# ---------------------------------------------------------------
+# Gist store — GitHub Gist files behind a local mirror
+# ---------------------------------------------------------------
+# Fleet (PA-28 / Tecnam) and NavLog routes live in GitHub Gists. Every
+# gist read here goes through a small SQLite mirror shared by all pages,
+# sessions and processes:
+#   - a fresh mirror row (< FRESH_S) is served without touching GitHub;
+#   - a stale row is served at once and revalidated in the background
+#     with a conditional GET (If-None-Match). A 304 does not count
+#     against the GitHub rate limit;
+#   - with no row (cold start) the page waits for one GET.
+# Writes to the same gist are coalesced: while one PATCH is in flight,
+# the files queued by other sessions go in the next PATCH together.
+# GitHub failures fall back to the mirror (the error is still returned).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+DEFAULT_TIMEOUT = 15
+FRESH_S = 60  # mirror rows younger than this are served without a request
+
+CACHE_DIR = Path(os.environ.get("BRIEFINGS_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+DB_PATH = CACHE_DIR / "gists.sqlite"
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+_REFRESHING: set = set()  # gist ids with a background revalidation running
+_REFRESH_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = requests.Session()
+        return _SESSION
+
+
+def headers(token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github+json",
+        "Content-Type": "application/json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+
+
+# -----------------------------
+# SQLite mirror
+# -----------------------------
+def _connect() -> sqlite3.Connection:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(DB_PATH, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS gist ("
+        " gist_id TEXT PRIMARY KEY,"
+        " etag TEXT,"
+        " checked_at REAL NOT NULL,"
+        " files TEXT NOT NULL)"
+    )
+    return con
+
+
+def mirror_get(gist_id: str) -> Optional[Dict[str, Any]]:
+    """{"etag", "checked_at", "files": {name: content}} or None."""
+    try:
+        con = _connect()
+        try:
+            row = con.execute("SELECT etag, checked_at, files FROM gist WHERE gist_id = ?", (gist_id,)).fetchone()
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError):
+        return None
+    if row is None:
+        return None
+    try:
+        files = json.loads(row[2])
+    except ValueError:
+        return None
+    return {"etag": row[0], "checked_at": row[1], "files": files}
+
+
+def mirror_put(gist_id: str, files: Dict[str, str], etag: Optional[str], merge: bool = False) -> None:
+    try:
+        con = _connect()
+        try:
+            with con:
+                if merge:
+                    row = con.execute("SELECT files FROM gist WHERE gist_id = ?", (gist_id,)).fetchone()
+                    if row is not None:
+                        files = dict(json.loads(row[0]), **files)
+                con.execute(
+                    "INSERT OR REPLACE INTO gist (gist_id, etag, checked_at, files) VALUES (?, ?, ?, ?)",
+                    (gist_id, etag, time.time(), json.dumps(files)),
+                )
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError, ValueError):
+        pass  # the mirror is only a cache; a read-only disk must not break the page
+
+
+def _mirror_touch(gist_id: str) -> None:
+    try:
+        con = _connect()
+        try:
+            with con:
+                con.execute("UPDATE gist SET checked_at = ? WHERE gist_id = ?", (time.time(), gist_id))
+        finally:
+            con.close()
+    except (sqlite3.Error, OSError):
+        pass
+
+
+# -----------------------------
+# GitHub API
+# -----------------------------
+def _files_from(payload: Dict[str, Any], token: str, timeout: float) -> Dict[str, str]:
+    """name -> content; files over 1 MB come truncated and are read from raw_url."""
+    out: Dict[str, str] = {}
+    for name, f in (payload.get("files") or {}).items():
+        content = f.get("content")
+        if f.get("truncated") and f.get("raw_url"):
+            r = get_session().get(f["raw_url"], headers={"Authorization": f"token {token}"}, timeout=timeout)
+            if r.status_code == 200:
+                content = r.text
+        if content is not None:
+            out[name] = content
+    return out
+
+
+def revalidate(token: str, gist_id: str, api_url: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Conditional GET against the mirror's ETag. Returns (files, error).
+
+    On any failure files is the mirror copy (None when there is none).
+    """
+    api_url = api_url or API_URL
+    cached = mirror_get(gist_id)
+    h = headers(token)
+    if cached and cached.get("etag"):
+        h["If-None-Match"] = cached["etag"]
+    try:
+        r = get_session().get(f"{api_url}/gists/{gist_id}", headers=h, timeout=timeout)
+        if r.status_code == 304 and cached:
+            _mirror_touch(gist_id)
+            return cached["files"], None
+        if r.status_code != 200:
+            return (cached or {}).get("files"), f"GitHub error {r.status_code}: {r.text}"
+        files = _files_from(r.json(), token, timeout)
+    except Exception as e:
+        return (cached or {}).get("files"), str(e)
+    mirror_put(gist_id, files, r.headers.get("ETag"))
+    return files, None
+
+
+def _revalidate_in_background(token: str, gist_id: str, api_url: Optional[str]) -> None:
+    with _REFRESH_LOCK:
+        if gist_id in _REFRESHING:
+            return
+        _REFRESHING.add(gist_id)
+
+    def run():
+        try:
+            revalidate(token, gist_id, api_url)
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESHING.discard(gist_id)
+
+    threading.Thread(target=run, name=f"gist-revalidate-{gist_id[:8]}", daemon=True).start()
+
+
+def load_files(
+    token: str,
+    gist_id: str,
+    max_age_s: float = FRESH_S,
+    background: bool = True,
+    api_url: Optional[str] = None,
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """All files of a gist as {name: content}; returns (files, error).
+
+    max_age_s=0 with background=False forces a (conditional) request, e.g.
+    for a "Load from Gist" button. With background=True a stale mirror is
+    returned immediately and refreshed for the next run.
+    """
+    cached = mirror_get(gist_id)
+    if cached is not None:
+        if time.time() - cached["checked_at"] <= max_age_s:
+            return cached["files"], None
+        if background:
+            _revalidate_in_background(token, gist_id, api_url)
+            return cached["files"], None
+    return revalidate(token, gist_id, api_url)
+
+
+# -----------------------------
+# Coalesced writes
+# -----------------------------
+class _Outbox:
+    """Pending files of one gist. Each save_files() call gets a sequence number; the
+    caller holding the lock PATCHes everything queued so far, and later
+    callers whose files went in that PATCH just return its result."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = threading.Lock()
+        self.pending: Dict[str, str] = {}
+        self.seq = 0
+        self.sent_seq = 0
+        self.last_error: Optional[str] = None
+
+
+_OUTBOXES: Dict[str, _Outbox] = {}
+_OUTBOX_LOCK = threading.Lock()
+
+
+def _outbox(gist_id: str) -> _Outbox:
+    with _OUTBOX_LOCK:
+        box = _OUTBOXES.get(gist_id)
+        if box is None:
+            box = _OUTBOXES[gist_id] = _Outbox()
+        return box
+
+
+def _patch(token: str, gist_id: str, files: Dict[str, str], api_url: str, timeout: float) -> Optional[str]:
+    payload = {"files": {name: {"content": content} for name, content in files.items()}}
+    try:
+        r = get_session().patch(f"{api_url}/gists/{gist_id}", headers=headers(token), data=json.dumps(payload), timeout=timeout)
+        if r.status_code not in (200, 201):
+            return f"GitHub error {r.status_code}: {r.text}"
+        try:
+            mirror_put(gist_id, _files_from(r.json(), token, timeout), r.headers.get("ETag"))
+        except ValueError:
+            mirror_put(gist_id, files, None, merge=True)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def save_files(
+    token: str,
+    gist_id: str,
+    files: Dict[str, str],
+    api_url: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Optional[str]:
+    """Write {name: content} to the gist; returns an error string or None.
+
+    Concurrent saves to the same gist are merged into one PATCH (the
+    newest content per file wins).
+    """
+    api_url = api_url or API_URL
+    box = _outbox(gist_id)
+    with box.state:
+        box.pending.update(files)
+        box.seq += 1
+        my_seq = box.seq
+
+    with box.lock:
+        with box.state:
+            if box.sent_seq >= my_seq:
+                return box.last_error
+            batch, box.pending = box.pending, {}
+            batch_seq = box.seq
+        err = _patch(token, gist_id, batch, api_url, timeout)
+        with box.state:
+            box.sent_seq = batch_seq
+            box.last_error = err
+        return err
+
+
+# -----------------------------
+# JSON helpers
+# -----------------------------
+def load_json(token: str, gist_id: str, filename: str, **kw) -> Tuple[Optional[Any], Optional[str]]:
+    """(decoded file, error); (None, None) when the gist has no such file."""
+    files, err = load_files(token, gist_id, **kw)
+    if files is None or filename not in files:
+        return None, err
+    try:
+        return json.loads(files[filename] or "null"), err
+    except ValueError as e:
+        return None, f"Gist file '{filename}' is not valid JSON: {e}"
+
+
+def save_json(token: str, gist_id: str, filename: str, data: Any, indent: int = 2, sort_keys: bool = False, **kw) -> Optional[str]:
+    return save_files(token, gist_id, {filename: json.dumps(data, indent=indent, sort_keys=sort_keys)}, **kw)
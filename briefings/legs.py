@@ -0,0 +1,68 @@
+# ---------------------------------------------------------------
+# Navlog legs — compact typed records for the route page
+# ---------------------------------------------------------------
+# One Leg per pair of consecutive route nodes. A leg points at its two
+# nodes by index (a, b) into the page's route_nodes list instead of
+# embedding the node dicts, and keeps its values in __slots__, so a long
+# route in st.session_state is a list of small fixed-layout objects
+# instead of 30-key dicts. Pickles as the constructor call with its
+# values, without the field names.
+#
+# The class lives here rather than in the page so it is the same class
+# on every rerun (pickle and isinstance keep working across reruns).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields, replace
+from operator import attrgetter
+from typing import Any, Dict, Sequence, Tuple
+
+
+@dataclass(slots=True)
+class Leg:
+    # What depends only on the two nodes and the setup (leg_core).
+    profile: str            # CLIMB / LEVEL / DESCENT
+    TC: float
+    TH: float
+    MH: float
+    TAS: float
+    GS: float
+    Dist: float
+    time_sec: int
+    burn: float
+    hold_sec: int = 0
+    hold_dist: float = 0.0
+    hold_burn: float = 0.0
+    hold_min: float = 0.0
+    wind_from: float = 0.0
+    wind_kt: float = 0.0
+    tracking: str = ""
+    is_dme_arc: bool = False
+    is_turn: bool = False
+    # Position in the route and what is carried over from the legs before it.
+    i: int = 0              # leg number, from 1
+    a: int = -1             # route_nodes index of the from / to node
+    b: int = -1
+    efob_start: float = 0.0
+    efob_after_leg: float = 0.0
+    efob_end: float = 0.0
+    clock_start: str = ""
+    clock_arrive: str = ""
+    clock_end: str = ""
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # Leg(*values): no field names in the pickle, one call to load.
+        return Leg, _values(self)
+
+    def placed(self, i: int, a: int, b: int, **carried: Any) -> "Leg":
+        """Copy of this leg at position i (nodes a -> b) with EFOB / clock values."""
+        return replace(self, i=i, a=a, b=b, **carried)
+
+    def nodes(self, route_nodes: Sequence[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        return route_nodes[self.a], route_nodes[self.b]
+
+
+FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(Leg))
+_values = attrgetter(*FIELDS)
+
@@ -0,0 +1,125 @@
+# ---------------------------------------------------------------
+# Open-Meteo client shared by the M&B pages
+# ---------------------------------------------------------------
+# One pooled requests.Session (keep-alive) and a small thread pool so
+# "fetch all legs" costs one round-trip instead of one per aerodrome.
+# Identical requests (same coordinates / dates / variables) are merged
+# and only sent once. Every result carries "elapsed_ms".
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENMETEO_URL = "https://api.open-meteo.com/v1/forecast"
+DEFAULT_TIMEOUT = 20
+MAX_WORKERS = 8
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+        return _SESSION
+
+
+def hourly_params(
+    lat: float,
+    lon: float,
+    hourly: Sequence[str],
+    start_date_iso: str,
+    end_date_iso: str,
+    ndigits: int = 4,
+) -> Dict[str, Any]:
+    return {
+        "latitude": round(float(lat), ndigits),
+        "longitude": round(float(lon), ndigits),
+        "hourly": ",".join(hourly),
+        "timezone": "UTC",
+        "windspeed_unit": "kn",
+        "temperature_unit": "celsius",
+        "pressure_unit": "hPa",
+        "start_date": start_date_iso,
+        "end_date": end_date_iso,
+    }
+
+
+def _request_key(url: str, params: Dict[str, Any]) -> Tuple:
+    return (url,) + tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+def fetch_json(
+    params: Dict[str, Any],
+    url: str = OPENMETEO_URL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Dict[str, Any]:
+    """GET one Open-Meteo request. Returns the decoded JSON or {"error", "detail"}."""
+    t0 = time.perf_counter()
+    try:
+        r = get_session().get(url, params=params, timeout=timeout)
+        if r.status_code != 200:
+            out = {"error": f"HTTP {r.status_code}", "detail": r.text, "params": params}
+        else:
+            out = r.json()
+            if isinstance(out, list):
+                # several comma-separated coordinates -> one object per location
+                out = {"locations": out}
+            elif not isinstance(out, dict):
+                out = {"error": "Bad response", "detail": str(out)[:200], "params": params}
+    except Exception as e:
+        out = {"error": str(e), "detail": "", "params": params}
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    out["elapsed_ms"] = round(elapsed_ms, 1)
+    return out
+
+
+def fetch_many(
+    param_list: Sequence[Dict[str, Any]],
+    url: str = OPENMETEO_URL,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_workers: int = MAX_WORKERS,
+) -> List[Dict[str, Any]]:
+    """Fetch several requests concurrently; result i matches param_list[i].
+
+    Duplicated requests are sent once and share the same result dict.
+    """
+    keys = [_request_key(url, p) for p in param_list]
+    unique: Dict[Tuple, Dict[str, Any]] = {}
+    for k, p in zip(keys, param_list):
+        unique.setdefault(k, p)
+    if not unique:
+        return []
+
+    results: Dict[Tuple, Dict[str, Any]] = {}
+    if len(unique) == 1:
+        k, p = next(iter(unique.items()))
+        results[k] = fetch_json(p, url=url, timeout=timeout)
+    else:
+        workers = max(1, min(max_workers, len(unique)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futs = {k: pool.submit(fetch_json, p, url, timeout) for k, p in unique.items()}
+            for k, f in futs.items():
+                results[k] = f.result()
+    return [results[k] for k in keys]
+
+
+def timing_summary(results: Sequence[Dict[str, Any]]) -> str:
+    seen = {id(r): r for r in results if isinstance(r, dict)}
+    ms = [r.get("elapsed_ms") for r in seen.values() if r.get("elapsed_ms") is not None]
+    if not ms:
+        return ""
+    return f"Open-Meteo: {len(ms)} request(s), slowest {max(ms):.0f} ms, total {sum(ms):.0f} ms"
@@ -0,0 +1,151 @@
+# ---------------------------------------------------------------
+# OurAirports snapshot (Iberia) — build / refresh / load
+# ---------------------------------------------------------------
+# The worldwide airports.csv + runways.csv are tens of MB. This module
+# keeps a pre-filtered, columnar JSON snapshot in the repo root that
+# loads in a few ms. Rows come back with the same keys as the CSVs, so
+# code written for csv.DictReader keeps working.
+#
+# The pages call ensure_snapshot(): the first run on a fresh checkout
+# downloads the CSVs once and writes the snapshot; every later run (and
+# every other session on the same deploy) only reads it.
+#
+# Refresh (needs network):
+#   python -m briefings.ourairports            # PT + ES -> ourairports_iberia.json
+#   python -m briefings.ourairports --countries PT,ES,GI --out other.json
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+AIRPORTS_CSV_URL = "https://ourairports.com/data/airports.csv"
+RUNWAYS_CSV_URL = "https://ourairports.com/data/runways.csv"
+
+ROOT = Path(__file__).resolve().parent.parent
+SNAPSHOT_PATH = ROOT / "ourairports_iberia.json"
+SNAPSHOT_VERSION = 1
+
+COUNTRIES = ("PT", "ES")
+SKIP_AIRPORT_TYPES = {"closed", "heliport", "balloonport"}
+
+AIRPORT_COLUMNS = ["ident", "name", "type", "iso_country", "latitude_deg", "longitude_deg", "elevation_ft"]
+RUNWAY_COLUMNS = ["airport_ident", "length_ft", "width_ft", "surface", "closed",
+                  "le_ident", "le_heading_degT", "he_ident", "he_heading_degT"]
+
+
+def download_csvs(timeout: float = 60) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    import requests
+
+    def fetch_csv(url):
+        r = requests.get(url, timeout=timeout)
+        r.raise_for_status()
+        txt = r.content.decode("utf-8", errors="replace")
+        return list(csv.DictReader(io.StringIO(txt)))
+
+    return fetch_csv(AIRPORTS_CSV_URL), fetch_csv(RUNWAYS_CSV_URL)
+
+
+def build_snapshot(
+    airports_rows: Sequence[Dict[str, str]],
+    runways_rows: Sequence[Dict[str, str]],
+    countries: Sequence[str] = COUNTRIES,
+) -> Dict[str, Any]:
+    keep = set(c.upper() for c in countries)
+    airports = [
+        a for a in airports_rows
+        if a.get("ident") and (a.get("iso_country") or "").upper() in keep
+        and (a.get("type") or "") not in SKIP_AIRPORT_TYPES
+    ]
+    idents = {a["ident"] for a in airports}
+    runways = [r for r in runways_rows if r.get("airport_ident") in idents]
+
+    # Columnar: one list per column, strings kept as in the CSV
+    return {
+        "version": SNAPSHOT_VERSION,
+        "built_utc": dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%MZ"),
+        "countries": sorted(keep),
+        "airports": {c: [a.get(c, "") for a in airports] for c in AIRPORT_COLUMNS},
+        "runways": {c: [r.get(c, "") for r in runways] for c in RUNWAY_COLUMNS},
+    }
+
+
+def write_snapshot(snap: Dict[str, Any], path: Path = SNAPSHOT_PATH) -> Path:
+    path = Path(path)
+    path.write_text(json.dumps(snap, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    return path
+
+
+def _rows(cols: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(cols.keys())
+    return [dict(zip(names, vals)) for vals in zip(*(cols[n] for n in names))]
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """(airports_rows, runways_rows) from the snapshot, or None if missing/unreadable."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        snap = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if snap.get("version") != SNAPSHOT_VERSION:
+        return None
+    return _rows(snap.get("airports", {})), _rows(snap.get("runways", {}))
+
+
+def ensure_snapshot(
+    path: Path = SNAPSHOT_PATH,
+    countries: Sequence[str] = COUNTRIES,
+    timeout: float = 60,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(airports_rows, runways_rows) from the snapshot, building it first if it is missing or stale."""
+    rows = load_snapshot(path)
+    if rows is not None:
+        return rows
+    snap = build_snapshot(*download_csvs(timeout=timeout), countries=countries)
+    try:
+        write_snapshot(snap, path)
+    except OSError:
+        pass  # read-only checkout: the rows are still good for this process
+    return _rows(snap["airports"]), _rows(snap["runways"])
+
+
+def snapshot_info(path: Path = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        snap = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return {
+        "built_utc": snap.get("built_utc"),
+        "countries": snap.get("countries"),
+        "airports": len(snap.get("airports", {}).get("ident", [])),
+        "runways": len(snap.get("runways", {}).get("airport_ident", [])),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Build the OurAirports snapshot used by the M&B pages.")
+    ap.add_argument("--countries", default=",".join(COUNTRIES), help="ISO country codes, comma-separated")
+    ap.add_argument("--out", default=str(SNAPSHOT_PATH))
+    args = ap.parse_args(argv)
+
+    airports_rows, runways_rows = download_csvs()
+    snap = build_snapshot(airports_rows, runways_rows, [c.strip() for c in args.countries.split(",") if c.strip()])
+    out = write_snapshot(snap, Path(args.out))
+    print(f"{out}: {len(snap['airports']['ident'])} airports, "
+          f"{len(snap['runways']['airport_ident'])} runways ({out.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
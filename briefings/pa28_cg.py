@@ -0,0 +1,209 @@
+# ---------------------------------------------------------------
+# PA-28 CG envelope — compiled chart transform + batch overlay
+# ---------------------------------------------------------------
+# CG_ANCHORS (page) gives, for each CG line 82..93 in, the chart pixel
+# position at two weights. Compiled once into arrays, any number of
+# (cg, weight) points map to chart x/y in one call (same numbers as
+# CgChart.xy_one). The top of each line (w1) is the envelope's upper
+# boundary, so the same arrays validate loadings.
+#
+# The overlay side draws many point sets (e.g. every registration x fuel
+# state) in one reportlab pass, one page per set, and stamps them on the
+# parsed template page, which is kept between calls.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import io
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+
+from briefings import pdf_form
+
+
+class CgChart:
+    def __init__(self, anchors: Dict[int, Dict[str, float]]):
+        cgs = sorted(int(k) for k in anchors)
+        self.cg = np.array(cgs, dtype=float)
+        self.cg_min = float(cgs[0])
+        self.cg_max = float(cgs[-1])
+        cols = {k: np.array([float(anchors[c][k]) for c in cgs], dtype=float) for k in ("w0", "x0", "y0", "w1", "x1", "y1")}
+        self.w0, self.x0, self.y0 = cols["w0"], cols["x0"], cols["y0"]
+        self.w1, self.x1, self.y1 = cols["w1"], cols["x1"], cols["y1"]
+        self.w_lo = np.minimum(self.w0, self.w1)
+        self.w_hi = np.maximum(self.w0, self.w1)
+
+    def _line_xy(self, i: np.ndarray, w: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        w0, w1 = self.w0[i], self.w1[i]
+        w = np.clip(w, self.w_lo[i], self.w_hi[i])
+        flat = w1 == w0
+        t = (w - w0) / np.where(flat, 1.0, w1 - w0)
+        x = np.where(flat, self.x0[i], self.x0[i] + t * (self.x1[i] - self.x0[i]))
+        y = np.where(flat, self.y0[i], self.y0[i] + t * (self.y1[i] - self.y0[i]))
+        return x, y
+
+    def _brackets(self, cg: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        cg = np.clip(cg, self.cg_min, self.cg_max)
+        lo = np.clip(np.floor(cg), self.cg_min, self.cg_max)
+        hi = np.clip(lo + 1, self.cg_min, self.cg_max)
+        ilo = (lo - self.cg_min).astype(int)
+        ihi = (hi - self.cg_min).astype(int)
+        return cg, lo, ilo, ihi
+
+    def xy(self, cg, weight_lb) -> Tuple[np.ndarray, np.ndarray]:
+        """Chart pixel coords for arrays of CG (in) and weight (lb)."""
+        cg, w = np.broadcast_arrays(np.asarray(cg, dtype=float), np.asarray(weight_lb, dtype=float))
+        cg, lo, ilo, ihi = self._brackets(cg)
+        xa, ya = self._line_xy(ilo, w)
+        xb, yb = self._line_xy(ihi, w)
+        same = ihi == ilo
+        frac = np.where(same, 0.0, cg - lo)
+        x = np.where(same, xa, xa + frac * (xb - xa))
+        y = np.where(same, ya, ya + frac * (yb - ya))
+        return x, y
+
+    def xy_one(self, cg: float, weight_lb: float) -> Tuple[float, float]:
+        x, y = self.xy(cg, weight_lb)
+        return float(x), float(y)
+
+    def max_weight(self, cg) -> np.ndarray:
+        """Envelope upper boundary at each CG (NaN outside the CG range)."""
+        cg = np.asarray(cg, dtype=float)
+        out = np.interp(cg, self.cg, self.w1)
+        return np.where((cg < self.cg_min) | (cg > self.cg_max), np.nan, out)
+
+    def inside(self, cg, weight_lb) -> np.ndarray:
+        cg, w = np.broadcast_arrays(np.asarray(cg, dtype=float), np.asarray(weight_lb, dtype=float))
+        wmax = self.max_weight(cg)
+        return (cg >= self.cg_min) & (cg <= self.cg_max) & (w >= self.w_lo.min()) & (w <= np.nan_to_num(wmax, nan=-1.0))
+
+
+# -----------------------------
+# Batch loading scenarios
+# -----------------------------
+def wb_scenarios(
+    ew_lb: Sequence[float],
+    ew_mom: Sequence[float],
+    fuel_l: Sequence[float],
+    front_lb: float,
+    rear_lb: float,
+    bag_lb: float,
+    trip_l: float,
+    k: Dict[str, float],
+) -> Dict[str, np.ndarray]:
+    """Every aircraft (ew_lb[i], ew_mom[i]) x every fuel load fuel_l[j] -> (n_ac, n_fuel) arrays.
+
+    Same arithmetic as the Weight & Fuel tab; k holds the page constants
+    (ARM_*, FUEL_*, TAXI_*, L_TO_USG).
+    """
+    ew = np.asarray(ew_lb, dtype=float)[:, None]
+    em = np.asarray(ew_mom, dtype=float)[:, None]
+    fl = np.asarray(fuel_l, dtype=float)[None, :]
+
+    fuel_usg = np.where(np.abs(fl - k["FUEL_USABLE_L"]) < 0.5, k["FUEL_USABLE_USG"], fl * k["L_TO_USG"])
+    fuel_lb = fuel_usg * k["FUEL_LB_PER_USG"]
+
+    ramp_w = ew + front_lb + rear_lb + fuel_lb + bag_lb
+    ramp_m = em + front_lb * k["ARM_FRONT"] + rear_lb * k["ARM_REAR"] + fuel_lb * k["ARM_FUEL"] + bag_lb * k["ARM_BAGGAGE"]
+
+    takeoff_w = ramp_w - k["TAXI_ALLOW_LB"]
+    takeoff_m = ramp_m - k["TAXI_ALLOW_LB"] * k["TAXI_ARM"]
+    burn_lb = float(trip_l) * k["L_TO_USG"] * k["FUEL_LB_PER_USG"]
+    landing_w = np.maximum(0.0, takeoff_w - burn_lb)
+    landing_m = takeoff_m - burn_lb * k["ARM_FUEL"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ew_cg = np.broadcast_to(np.where(ew > 0, em / ew, 0.0), takeoff_w.shape)
+        takeoff_cg = np.where(takeoff_w > 0, takeoff_m / takeoff_w, 0.0)
+        landing_cg = np.where(landing_w > 0, landing_m / landing_w, 0.0)
+
+    return {
+        "ew_lb": np.broadcast_to(ew, takeoff_w.shape), "ew_cg": ew_cg,
+        "takeoff_w": takeoff_w, "takeoff_cg": takeoff_cg,
+        "landing_w": landing_w, "landing_cg": landing_cg,
+    }
+
+
+# -----------------------------
+# Overlay (reportlab + pypdf)
+# -----------------------------
+DOT_R = 5.5
+BASE_W_LB = 1200.0
+
+_TEMPLATE_CACHE: Dict[str, Any] = {}
+
+
+def _template(template_bytes: bytes):
+    """Parsed blank template (read-only) + page-0 size, kept per template hash."""
+    from pypdf import PdfReader
+
+    key = pdf_form.template_digest(template_bytes)
+    hit = _TEMPLATE_CACHE.get(key)
+    if hit is None:
+        reader = PdfReader(io.BytesIO(template_bytes))
+        page0 = reader.pages[0]
+        hit = {"reader": reader, "size": (float(page0.mediabox.width), float(page0.mediabox.height))}
+        _TEMPLATE_CACHE.clear()  # one template in use at a time
+        _TEMPLATE_CACHE[key] = hit
+    return hit
+
+
+def overlay_pages(chart: CgChart, page_size: Tuple[float, float], point_sets: Sequence[Sequence[Dict[str, Any]]]) -> bytes:
+    """One overlay page per point set; all points mapped in a single batch.
+
+    Each point: {"cg", "w", "rgb"}; drawn as on the M&B sheet (line from
+    the 1200 lb base + dot).
+    """
+    from reportlab.pdfgen import canvas
+
+    flat = [p for ps in point_sets for p in ps]
+    cg = np.array([float(p["cg"]) for p in flat], dtype=float)
+    w = np.array([float(p["w"]) for p in flat], dtype=float)
+    xd, yd = chart.xy(cg, w)
+    xb, yb = chart.xy(cg, np.full_like(cg, BASE_W_LB))
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=page_size)
+    k = 0
+    for ps in point_sets:
+        for p in ps:
+            r, g, b = p["rgb"]
+            c.setStrokeColorRGB(r, g, b)
+            c.setLineWidth(1.5)
+            c.line(float(xb[k]), float(yb[k]), float(xd[k]), float(yd[k]))
+            c.setFillColorRGB(r, g, b)
+            c.circle(float(xd[k]), float(yd[k]), DOT_R, fill=1, stroke=0)
+            k += 1
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def fleet_book(
+    template_bytes: bytes,
+    chart: CgChart,
+    point_sets: Sequence[Sequence[Dict[str, Any]]],
+    titles: Sequence[str] = (),
+) -> bytes:
+    """One CG chart page per point set (e.g. per registration), flat (no form).
+
+    The blank template is parsed once and merged *under* each overlay page,
+    so the cached page is never modified.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    info = _template(template_bytes)
+    base = info["reader"].pages[0]
+    overlay = PdfReader(io.BytesIO(overlay_pages(chart, info["size"], point_sets)))
+
+    writer = PdfWriter()
+    for n, ov in enumerate(overlay.pages):
+        ov.merge_page(base, over=False)
+        writer.add_page(ov)
+        if n < len(titles) and titles[n]:
+            writer.add_outline_item(str(titles[n]), n)
+
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
@@ -0,0 +1,261 @@
+# ---------------------------------------------------------------
+# PA-28 M&B PDF — single in-memory pipeline (PyMuPDF only)
+# ---------------------------------------------------------------
+# open template -> fill fields -> stamp CG overlay -> rasterise the two
+# M&B pages side by side -> output page -> performance pages -> ONE
+# final serialisation. No intermediate PDF bytes are written and parsed
+# back between stages. Every stage is timed (StageTimer).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import io
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageFilter
+
+from briefings import pdf_form
+
+DOT_R = 5.5
+BASE_W_LB = 1200.0
+PERF_ORDER = ["DEPARTURE", "ARRIVAL", "ALTERNATE_1", "ALTERNATE_2"]
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - t0) * 1000.0))
+
+    @property
+    def total_ms(self) -> float:
+        return sum(ms for _, ms in self.stages)
+
+    def summary(self) -> str:
+        return " · ".join(f"{n} {ms:.0f} ms" for n, ms in self.stages) + f" — total {self.total_ms:.0f} ms"
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def fill_fields(doc: fitz.Document, fields: Dict[str, Any], pages: Optional[Sequence[int]] = None) -> int:
+    """Set widget values in place; only the given pages (default: all) are visited."""
+    n = 0
+    for pno in (range(doc.page_count) if pages is None else pages):
+        for w in doc[pno].widgets() or []:
+            if w.field_name not in fields:
+                continue
+            w.field_value = "" if fields[w.field_name] is None else str(fields[w.field_name])
+            try:
+                w.update()
+            except Exception:
+                pass
+            n += 1
+    return n
+
+
+def stamp_cg_overlay(page: fitz.Page, chart, points: Sequence[Dict[str, Any]]) -> None:
+    """Dots + base lines on the CG chart (chart coords are PDF user space)."""
+    if not points:
+        return
+    cg = np.array([float(p["cg"]) for p in points], dtype=float)
+    w = np.array([float(p["w"]) for p in points], dtype=float)
+    xd, yd = chart.xy(cg, w)
+    xb, yb = chart.xy(cg, np.full_like(cg, BASE_W_LB))
+    m = page.transformation_matrix  # PDF space -> MuPDF (top-left) space
+    for k, p in enumerate(points):
+        rgb = tuple(float(c) for c in p["rgb"])
+        dot = fitz.Point(float(xd[k]), float(yd[k])) * m
+        base = fitz.Point(float(xb[k]), float(yb[k])) * m
+        page.draw_line(base, dot, color=rgb, width=1.5)
+        page.draw_circle(dot, DOT_R, color=None, fill=rgb)
+
+
+def _pixmap_to_pil(pix: fitz.Pixmap, bg=(255, 255, 255)) -> Image.Image:
+    if pix.alpha:
+        img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
+        bg_img = Image.new("RGB", img.size, bg)
+        bg_img.paste(img, mask=img.split()[3])
+        return bg_img
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+
+def render_page(page: fitz.Page, dpi: int, bg=(255, 255, 255)) -> Image.Image:
+    zoom = dpi / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False, annots=True, colorspace=fitz.csRGB)
+    return _pixmap_to_pil(pix, bg=bg)
+
+
+def merge_side_by_side(img_left: Image.Image, img_right: Image.Image, align_by="height", gap_px=0, bg=(255, 255, 255)) -> Image.Image:
+    if align_by == "width":
+        target = max(img_left.width, img_right.width)
+        if img_left.width != target:
+            h = int(round(img_left.height * (target / img_left.width)))
+            img_left = img_left.resize((target, h), Image.LANCZOS)
+        if img_right.width != target:
+            h = int(round(img_right.height * (target / img_right.width)))
+            img_right = img_right.resize((target, h), Image.LANCZOS)
+        H = max(img_left.height, img_right.height)
+        W = target * 2 + gap_px
+        canvas_img = Image.new("RGB", (W, H), bg)
+        canvas_img.paste(img_left, (0, (H - img_left.height) // 2))
+        canvas_img.paste(img_right, (target + gap_px, (H - img_right.height) // 2))
+        return canvas_img
+
+    target = max(img_left.height, img_right.height)
+    if img_left.height != target:
+        w = int(round(img_left.width * (target / img_left.height)))
+        img_left = img_left.resize((w, target), Image.LANCZOS)
+    if img_right.height != target:
+        w = int(round(img_right.width * (target / img_right.height)))
+        img_right = img_right.resize((w, target), Image.LANCZOS)
+
+    W = img_left.width + img_right.width + gap_px
+    canvas_img = Image.new("RGB", (W, target), bg)
+    canvas_img.paste(img_left, (0, 0))
+    canvas_img.paste(img_right, (img_left.width + gap_px, 0))
+    return canvas_img
+
+
+def side_by_side_image(doc: fitz.Document, dpi: int, align_by="height", gap_px=0, bg=(255, 255, 255), sharpen=True) -> Image.Image:
+    if doc.page_count < 1:
+        raise ValueError("PDF invalid (no pages).")
+    i1 = render_page(doc[0], dpi, bg)
+    i2 = render_page(doc[1], dpi, bg) if doc.page_count >= 2 else Image.new("RGB", i1.size, bg)
+    merged = merge_side_by_side(i1, i2, align_by=align_by, gap_px=gap_px, bg=bg)
+    if sharpen:
+        merged = merged.filter(ImageFilter.UnsharpMask(radius=0.8, percent=120, threshold=3))
+    return merged
+
+
+def _jpeg_bytes(img: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def add_image_page(out: fitz.Document, img: Image.Image, dpi: int, jpeg_quality: int = 82) -> None:
+    w_pt = (img.width / dpi) * 72.0
+    h_pt = (img.height / dpi) * 72.0
+    page = out.new_page(width=w_pt, height=h_pt)
+    page.insert_image(page.rect, stream=_jpeg_bytes(img, jpeg_quality), keep_proportion=True)
+
+
+def add_perf_page(out: fitz.Document, pairs: List[Tuple[str, dict]]) -> None:
+    """Landscape A4, one row per aerodrome: Takeoff · Climb · Landing."""
+    rect = fitz.paper_rect("a4-l")
+    W, H = rect.width, rect.height
+    page = out.new_page(width=W, height=H)
+
+    MARGIN   = 22
+    GAP_COL  = 10
+    GAP_ROW  = 18
+    ROW_LBL  = 14
+    N_COLS   = 3
+    COL_KEYS = ["takeoff_img", "climb_img", "landing_img"]
+
+    n_rows = len(pairs)
+    usable_w = W - 2 * MARGIN
+    usable_h = H - 2 * MARGIN
+    cell_w = (usable_w - GAP_COL * (N_COLS - 1)) / N_COLS
+    row_h  = (usable_h - GAP_ROW * (n_rows - 1)) / n_rows
+    img_h  = row_h - ROW_LBL
+
+    for ri, (label, info) in enumerate(pairs):
+        # y grows downwards here (MuPDF); row_top is the top edge of the row
+        row_top = MARGIN + ri * (row_h + GAP_ROW)
+        lbl_line = row_top + ROW_LBL
+
+        page.insert_text((MARGIN, lbl_line - 3), label, fontname="hebo", fontsize=10, color=(0.15, 0.15, 0.15))
+        page.draw_line((MARGIN, lbl_line), (MARGIN + usable_w, lbl_line), color=(0.65, 0.65, 0.65), width=0.4)
+
+        for ci, col_key in enumerate(COL_KEYS):
+            cell = fitz.Rect(MARGIN + ci * (cell_w + GAP_COL), lbl_line, MARGIN + ci * (cell_w + GAP_COL) + cell_w, lbl_line + img_h)
+            page.draw_rect(cell, color=(0.80, 0.80, 0.80), width=0.3)
+
+            img = info.get(col_key)
+            if img is not None:
+                iw, ih = img.size
+                scale = min((cell_w - 2) / iw, (img_h - 2) / ih)
+                dw, dh = iw * scale, ih * scale
+                dx = cell.x0 + (cell_w - dw) / 2
+                dy = cell.y0 + (img_h - dh) / 2
+                page.insert_image(fitz.Rect(dx, dy, dx + dw, dy + dh), stream=_jpeg_bytes(img, 78), keep_proportion=True)
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+def build_mb_pdf(
+    template_bytes: bytes,
+    fields: Dict[str, Any],
+    chart,
+    cg_points: Sequence[Dict[str, Any]],
+    perf_by_role: Optional[Dict[str, dict]] = None,
+    dpi: int = 200,
+    align_by: str = "height",
+    gap_px: int = 0,
+    bg=(255, 255, 255),
+    sharpen: bool = True,
+    jpeg_quality: int = 82,
+    timer: Optional[StageTimer] = None,
+    progress=None,
+) -> bytes:
+    """Filled + stamped M&B sheet (side-by-side image page) + perf pages, serialised once.
+
+    Unknown field names raise ValueError (see pdf_form.check_fields).
+    progress(fraction, text) is called between stages if given.
+    """
+    timer = timer or StageTimer()
+    n_steps = 6 if perf_by_role else 5
+
+    def step(n, text):
+        if progress:
+            progress(n / n_steps, text)
+
+    with timer.stage("open"):
+        index = pdf_form.field_index(template_bytes)
+        pdf_form.check_fields(index, fields)
+        doc = fitz.open(stream=template_bytes, filetype="pdf")
+    try:
+        with timer.stage("fill"):
+            fill_fields(doc, fields, pdf_form.pages_for(index, fields))
+        step(1, "Form fields filled. Applying CG overlay…")
+
+        with timer.stage("overlay"):
+            stamp_cg_overlay(doc[0], chart, cg_points)
+        step(2, "CG overlay done. Rendering pages…")
+
+        with timer.stage("render"):
+            img = side_by_side_image(doc, dpi, align_by=align_by, gap_px=gap_px, bg=bg, sharpen=sharpen)
+        step(3, "Pages rendered. Building PDF…")
+    finally:
+        doc.close()
+
+    out = fitz.open()
+    with timer.stage("mb_page"):
+        add_image_page(out, img, dpi, jpeg_quality=jpeg_quality)
+    step(4, "M&B page done. Adding performance pages…")
+
+    if perf_by_role:
+        with timer.stage("perf_pages"):
+            available = [(r, perf_by_role[r]) for r in PERF_ORDER if r in perf_by_role]
+            for i in range(0, len(available), 2):
+                pairs = [(info.get("label", role.replace("_", " ").title()), info) for role, info in available[i:i + 2]]
+                add_perf_page(out, pairs)
+        step(5, "Performance pages added. Finalising…")
+
+    with timer.stage("save"):
+        data = out.tobytes(deflate=True, garbage=3)
+    out.close()
+    return data
@@ -0,0 +1,339 @@
+# ---------------------------------------------------------------
+# PA-28 performance charts — compiled, vectorized solver + sweep
+# ---------------------------------------------------------------
+# The page solves the digitised charts (to_perf / ldg_perf / climb_perf
+# JSON) one point at a time and also draws the path. For dispatch we
+# need thousands of points (aerodromes x runways x forecast hours), so the
+# chart geometry is compiled once into NumPy arrays and solved for whole
+# arrays. Results match solve_ground_roll / solve_climb in the page.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+FT_TO_M = 0.3048
+
+# Dispatch colouring: share of TODA/LDA used
+MARGINAL_PCT = 80.0
+NOGO_PCT = 100.0
+
+
+# -----------------------------
+# Chart geometry
+# -----------------------------
+def _axis_fit(ticks: List[Dict[str, float]], coord: str, axis_name: str) -> Tuple[float, float]:
+    if len(ticks) < 2:
+        raise ValueError(f"O eixo '{axis_name}' precisa de pelo menos 2 ticks, mas só tem {len(ticks)}.")
+    xs = np.array([float(t[coord]) for t in ticks], dtype=float)
+    vs = np.array([float(t["value"]) for t in ticks], dtype=float)
+    A = np.vstack([xs, np.ones_like(xs)]).T
+    a, b = np.linalg.lstsq(A, vs, rcond=None)[0]
+    if abs(a) < 1e-12:
+        raise ValueError("Axis fit degenerate (a ~ 0).")
+    return float(a), float(b)
+
+
+def _seg_arrays(segs: Sequence[Dict[str, float]]) -> np.ndarray:
+    return np.array([[float(s["x1"]), float(s["y1"]), float(s["x2"]), float(s["y2"])] for s in segs], dtype=float)
+
+
+def _line_y_at_x(seg: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """seg: (..., 4) x1,y1,x2,y2 broadcast against x."""
+    x1, y1, x2, y2 = seg[..., 0], seg[..., 1], seg[..., 2], seg[..., 3]
+    dx = x2 - x1
+    vertical = np.abs(dx) < 1e-12
+    t = (x - x1) / np.where(vertical, 1.0, dx)
+    return np.where(vertical, y1, y1 + t * (y2 - y1))
+
+
+def _pa_levels(lines: Dict[str, List[Dict[str, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    out = []
+    for k, segs in lines.items():
+        if not k.startswith("pa_") or not segs:
+            continue
+        if k == "pa_sea_level":
+            out.append((0.0, segs[0]))
+            continue
+        try:
+            out.append((float(k.replace("pa_", "")), segs[0]))
+        except Exception:
+            pass
+    if not out:
+        raise ValueError("No PA levels available (all pa_* lines empty?).")
+    out.sort(key=lambda t: t[0])
+    return np.array([v for v, _ in out], dtype=float), _seg_arrays([s for _, s in out])
+
+
+def _pa_entry_y(levels: np.ndarray, segs: np.ndarray, pa_ft: np.ndarray, x: np.ndarray) -> np.ndarray:
+    n = len(levels)
+    if n == 1:
+        return _line_y_at_x(segs[0], x)
+    hi = np.clip(np.searchsorted(levels, pa_ft, side="left"), 1, n - 1)
+    lo = hi - 1
+    below = pa_ft <= levels[0]
+    above = pa_ft >= levels[-1]
+    lo = np.where(below, 0, np.where(above, n - 1, lo))
+    hi = np.where(below, 0, np.where(above, n - 1, hi))
+    span = levels[hi] - levels[lo]
+    alpha = np.where(span != 0, (pa_ft - levels[lo]) / np.where(span != 0, span, 1.0), 0.0)
+    return (1 - alpha) * _line_y_at_x(segs[lo], x) + alpha * _line_y_at_x(segs[hi], x)
+
+
+class _GuideFan:
+    """Family of guide polylines: transfers y_ref at x_ref to x_target."""
+
+    def __init__(self, groups: List[List[Dict[str, float]]], x_ref: float):
+        self.empty = not groups
+        if self.empty:
+            return
+        nseg = max(len(g) for g in groups)
+        # pad short polylines by repeating the last segment (same answer)
+        self.segs = np.array([
+            [[float(s["x1"]), float(s["y1"]), float(s["x2"]), float(s["y2"])] for s in (g + [g[-1]] * (nseg - len(g)))]
+            for g in groups
+        ], dtype=float)  # (G, S, 4)
+        self.multi = np.array([len(g) > 1 for g in groups])
+        yr = self._poly_y(np.array([x_ref], dtype=float))[:, 0]
+        self.order = np.argsort(yr, kind="stable")
+        self.yr = yr[self.order]
+        self.segs = self.segs[self.order]
+        self.multi = self.multi[self.order]
+
+    def _poly_y(self, x: np.ndarray) -> np.ndarray:
+        # (G, N): y of each polyline at each x (nearest segment in x, first wins)
+        segs = self.segs[:, :, None, :]  # (G, S, 1, 4)
+        xmin = np.minimum(segs[..., 0], segs[..., 2])
+        xmax = np.maximum(segs[..., 0], segs[..., 2])
+        xx = x[None, None, :]
+        in_range = (xmin - 1e-9 <= xx) & (xx <= xmax + 1e-9)
+        dist = np.where(in_range, 0.0, np.minimum(np.abs(xx - xmin), np.abs(xx - xmax)))
+        best = np.argmin(dist, axis=1)  # (G, N)
+        ys = _line_y_at_x(segs, xx)  # (G, S, N)
+        y_multi = np.take_along_axis(ys, best[:, None, :], axis=1)[:, 0, :]
+        return np.where(self.multi[:, None], y_multi, ys[:, 0, :])
+
+    def transfer(self, y_ref: np.ndarray, x_target: np.ndarray) -> np.ndarray:
+        if self.empty:
+            return y_ref
+        yt = self._poly_y(x_target)  # (G, N)
+        G = len(self.yr)
+        cols = np.arange(y_ref.shape[0])
+        if G == 1:
+            return yt[0]
+        j = np.clip(np.searchsorted(self.yr, y_ref, side="left"), 1, G - 1)
+        i = j - 1
+        y0, y1 = self.yr[i], self.yr[j]
+        denom = y1 - y0
+        a = np.where(np.abs(denom) < 1e-12, 0.0, (y_ref - y0) / np.where(np.abs(denom) < 1e-12, 1.0, denom))
+        out = (1 - a) * yt[i, cols] + a * yt[j, cols]
+        out = np.where(y_ref <= self.yr[0], yt[0], out)
+        out = np.where(y_ref >= self.yr[-1], yt[-1], out)
+        return out
+
+
+def _group_pairs(segments: List[Dict[str, float]]) -> List[List[Dict[str, float]]]:
+    groups, i = [], 0
+    while i < len(segments):
+        if i + 1 < len(segments):
+            s1, s2 = segments[i], segments[i + 1]
+            if abs(float(s1["x2"]) - float(s2["x1"])) <= 1.5 and abs(float(s1["y2"]) - float(s2["y1"])) <= 1.5:
+                groups.append([s1, s2])
+                i += 2
+                continue
+        groups.append([segments[i]])
+        i += 1
+    return groups
+
+
+class GroundRollChart:
+    """Takeoff / landing distance over 50 ft chart (OAT+PA -> weight -> wind)."""
+
+    def __init__(self, cap: Dict[str, Any], mode: str, out_axis_key: str):
+        ticks = cap["axis_ticks"]
+        lines = cap["lines"]
+        if not lines.get("weight_ref_line") or not lines.get("wind_ref_zero"):
+            raise ValueError("Missing weight_ref_line or wind_ref_zero in JSON lines.")
+        self.oat = _axis_fit(ticks["oat_c"], "x", "oat_c")
+        self.wt = _axis_fit(ticks["weight_x100_lb"], "x", "weight_x100_lb")
+        self.wind = _axis_fit(ticks["wind_kt"], "x", "wind_kt")
+        self.out = _axis_fit(ticks[out_axis_key], "y", out_axis_key)
+        self.levels, self.level_segs = _pa_levels(lines)
+
+        def x_ref(seg):
+            return 0.5 * (float(seg["x1"]) + float(seg["x2"]))
+
+        g = cap.get("guides", {}) or {}
+        mid_raw = g.get("middle", []) or []
+        right_raw = g.get("right", []) or []
+        mid = _group_pairs(mid_raw) if mode == "takeoff" else [[s] for s in mid_raw]
+        self.mid = _GuideFan(mid, x_ref(lines["weight_ref_line"][0]))
+        self.right = _GuideFan([[s] for s in right_raw], x_ref(lines["wind_ref_zero"][0]))
+
+    def solve(self, oat_c, pa_ft, weight_lb, wind_kt) -> np.ndarray:
+        oat_c, pa_ft, weight_lb, wind_kt = np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (oat_c, pa_ft, weight_lb, wind_kt)))
+        shape = oat_c.shape
+        oat_c, pa_ft, weight_lb, wind_kt = (v.ravel() for v in (oat_c, pa_ft, weight_lb, wind_kt))
+        x_oat = (oat_c - self.oat[1]) / self.oat[0]
+        y_entry = _pa_entry_y(self.levels, self.level_segs, pa_ft, x_oat)
+        x_wt = (weight_lb / 100.0 - self.wt[1]) / self.wt[0]
+        y_mid = self.mid.transfer(y_entry, x_wt)
+        x_wind = (wind_kt - self.wind[1]) / self.wind[0]
+        y_out = self.right.transfer(y_mid, x_wind)
+        return (self.out[0] * y_out + self.out[1]).reshape(shape)
+
+
+class ClimbChart:
+    def __init__(self, cap: Dict[str, Any]):
+        ticks = cap["axis_ticks"]
+        self.oat = _axis_fit(ticks["oat_c"], "x", "oat_c")
+        self.roc = _axis_fit(ticks["roc_fpm"], "y", "roc_fpm")
+        self.levels, self.level_segs = _pa_levels(cap["lines"])
+
+    def solve(self, oat_c, pa_ft) -> np.ndarray:
+        oat_c, pa_ft = np.broadcast_arrays(np.asarray(oat_c, dtype=float), np.asarray(pa_ft, dtype=float))
+        shape = oat_c.shape
+        x_oat = (oat_c.ravel() - self.oat[1]) / self.oat[0]
+        y = _pa_entry_y(self.levels, self.level_segs, pa_ft.ravel(), x_oat)
+        return (self.roc[0] * y + self.roc[1]).reshape(shape)
+
+
+def round_to_step(x, step: float):
+    return step * np.round(np.asarray(x, dtype=float) / step)
+
+
+# -----------------------------
+# Sweep
+# -----------------------------
+def pa_da(elev_ft, qnh_hpa, oat_c):
+    elev_ft = np.asarray(elev_ft, dtype=float)
+    pa_ft = elev_ft + (1013.0 - np.asarray(qnh_hpa, dtype=float)) * 30.0
+    isa = 15.0 - 2.0 * (elev_ft / 1000.0)
+    da_ft = pa_ft + 120.0 * (np.asarray(oat_c, dtype=float) - isa)
+    return pa_ft, da_ft
+
+
+def wind_components(qfu_deg, wind_dir_deg, wind_speed_kt):
+    diff = np.radians(((np.asarray(wind_dir_deg, dtype=float) - qfu_deg + 180) % 360) - 180)
+    hw = wind_speed_kt * np.cos(diff)
+    cw = wind_speed_kt * np.sin(diff)
+    return hw, cw
+
+
+def conditions_from_hourly(fc) -> Dict[str, np.ndarray]:
+    """HourlyForecast -> sweep conditions {label, wdir, wspd, temp, qnh} (missing -> NaN)."""
+    labels = np.datetime_as_string(fc.time, unit="h")
+    return {
+        "label": np.array([f"{t.replace('T', ' ')}Z" for t in labels], dtype=object),
+        "wdir": fc.wind_dir,
+        "wspd": fc.wind_kt,
+        "temp": fc.temp.astype(float),
+        "qnh": fc.qnh.astype(float),
+    }
+
+
+def conditions_grid(oats: Iterable[float], qnhs: Iterable[float], wind_dirs: Iterable[float], wind_kts: Iterable[float]) -> Dict[str, np.ndarray]:
+    """Climatological range instead of a forecast: cartesian product of OAT/QNH/wind."""
+    T, Q, D, W = np.meshgrid(list(oats), list(qnhs), list(wind_dirs), list(wind_kts), indexing="ij")
+    T, Q, D, W = (v.ravel().astype(float) for v in (T, Q, D, W))
+    labels = np.array([f"{t:+.0f}°C {q:.0f} hPa {d:03.0f}/{w:.0f}" for t, q, d, w in zip(T, Q, D, W)], dtype=object)
+    return {"label": labels, "wdir": D, "wspd": W, "temp": T, "qnh": Q}
+
+
+def sweep(
+    aerodromes: Dict[str, Dict[str, Any]],
+    conditions: Dict[str, Dict[str, np.ndarray]],
+    to_chart: GroundRollChart,
+    ldg_chart: GroundRollChart,
+    climb_chart: ClimbChart,
+    takeoff_w: float,
+    landing_w: float,
+    round_to: Tuple[float, float, float] = (5, 10, 5),
+) -> List[Dict[str, Any]]:
+    """Every runway x every condition row -> TODR/LDR margins + ROC.
+
+    conditions: {icao: {label, wdir, wspd, temp, qnh}} (see conditions_from_hourly
+    / conditions_grid). Tailwind is treated as 0 kt like the page. One solver
+    call per chart for the whole sweep.
+    """
+    icao_l, rw_l, label_l = [], [], []
+    elev, qfu, toda, lda, wdir, wspd, temp, qnh = ([] for _ in range(8))
+    for icao, cond in conditions.items():
+        ad = aerodromes.get(icao)
+        if not ad:
+            continue
+        n = len(cond["label"])
+        for rw in ad.get("runways", []):
+            icao_l += [icao] * n
+            rw_l += [rw["id"]] * n
+            label_l += list(cond["label"])
+            elev.append(np.full(n, float(ad.get("elev_ft", 0.0))))
+            qfu.append(np.full(n, float(rw["qfu"])))
+            toda.append(np.full(n, float(rw.get("toda", 0.0))))
+            lda.append(np.full(n, float(rw.get("lda", 0.0))))
+            wdir.append(cond["wdir"])
+            wspd.append(cond["wspd"])
+            temp.append(cond["temp"])
+            qnh.append(cond["qnh"])
+    if not icao_l:
+        return []
+
+    elev, qfu, toda, lda, wdir, wspd, temp, qnh = (np.concatenate(v) for v in (elev, qfu, toda, lda, wdir, wspd, temp, qnh))
+    valid = ~(np.isnan(wdir) | np.isnan(wspd) | np.isnan(temp) | np.isnan(qnh))
+    wdir, wspd, temp, qnh = (np.where(valid, v, d) for v, d in ((wdir, 0.0), (wspd, 0.0), (temp, 15.0), (qnh, 1013.0)))
+
+    pa_ft, da_ft = pa_da(elev, qnh, temp)
+    hw, cw = wind_components(qfu, wdir, wspd)
+    headwind = np.maximum(0.0, hw)
+
+    to_ft = round_to_step(to_chart.solve(temp, pa_ft, takeoff_w, headwind), round_to[0])
+    ldg_ft = round_to_step(ldg_chart.solve(temp, pa_ft, landing_w, headwind), round_to[2])
+    roc = round_to_step(climb_chart.solve(temp, pa_ft), round_to[1])
+
+    to_m = np.maximum(0.0, to_ft * FT_TO_M)
+    ldg_m = np.maximum(0.0, ldg_ft * FT_TO_M)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        to_pct = np.where(toda > 0, to_m / toda * 100.0, np.nan)
+        ldg_pct = np.where(lda > 0, ldg_m / lda * 100.0, np.nan)
+    worst = np.fmax(to_pct, ldg_pct)
+    status = np.where(~valid, "NO DATA",
+                      np.where(worst >= NOGO_PCT, "NO-GO",
+                               np.where(worst >= MARGINAL_PCT, "MARGINAL", "OK")))
+
+    nan = np.where(valid, 1.0, np.nan)
+    to_m, ldg_m, roc, to_pct, ldg_pct = (v * nan for v in (to_m, ldg_m, roc, to_pct, ldg_pct))
+
+    def num(x, nd=None):
+        x = float(x)
+        if np.isnan(x):
+            return None
+        return round(x, nd) if nd else int(round(x))
+
+    rows = []
+    for k in range(len(icao_l)):
+        rows.append({
+            "icao": icao_l[k],
+            "rwy": rw_l[k],
+            "time": label_l[k],
+            "wind": f"{wdir[k]:03.0f}/{wspd[k]:.0f}" if valid[k] else "",
+            "hw_kt": num(hw[k] * nan[k], 1),
+            "xw_kt": num(abs(cw[k]) * nan[k], 1),
+            "oat_c": num(temp[k] * nan[k], 1),
+            "qnh_hpa": num(qnh[k] * nan[k], 1),
+            "pa_ft": num(pa_ft[k] * nan[k]),
+            "da_ft": num(da_ft[k] * nan[k]),
+            "todr_m": num(to_m[k]),
+            "toda_m": num(toda[k]),
+            "to_margin_m": num(toda[k] - to_m[k]),
+            "to_pct": num(to_pct[k], 1),
+            "ldr_m": num(ldg_m[k]),
+            "lda_m": num(lda[k]),
+            "ldg_margin_m": num(lda[k] - ldg_m[k]),
+            "ldg_pct": num(ldg_pct[k], 1),
+            "roc_fpm": num(roc[k]),
+            "status": str(status[k]),
+        })
+    return rows
@@ -0,0 +1,141 @@
+# ---------------------------------------------------------------
+# PDF form templates — field index (cached per template hash)
+# ---------------------------------------------------------------
+# The M&B templates never change while the app runs, so their fields are
+# indexed once: name -> [{"page", "rect", "type"}] (a name can have more
+# than one widget). Payloads are checked against the index before
+# filling, and only the pages holding the given fields are touched.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import io
+from typing import Any, Dict, Iterable, List, Set
+
+_INDEX_CACHE: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+
+def template_digest(template_bytes: bytes) -> str:
+    return hashlib.sha1(template_bytes).hexdigest()
+
+
+def _build_index(template_bytes: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(template_bytes))
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for pno, page in enumerate(reader.pages):
+        for a in page.get("/Annots") or []:
+            obj = a.get_object()
+            if obj.get("/Subtype") != "/Widget":
+                continue
+            parent = obj.get("/Parent")
+            parent = parent.get_object() if parent is not None else {}
+            name = obj.get("/T", parent.get("/T"))
+            if name is None:
+                continue
+            rect = obj.get("/Rect")
+            index.setdefault(str(name), []).append({
+                "page": pno,
+                "rect": tuple(float(v) for v in rect) if rect else None,
+                "type": str(obj.get("/FT", parent.get("/FT", ""))),
+            })
+
+    # Fields declared in the AcroForm without a widget on any page
+    try:
+        for name, fd in (reader.get_fields() or {}).items():
+            if name not in index:
+                index[name] = [{"page": None, "rect": None, "type": str(fd.get("/FT", ""))}]
+    except Exception:
+        pass
+    return index
+
+
+def field_index(template_bytes: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    key = template_digest(template_bytes)
+    hit = _INDEX_CACHE.get(key)
+    if hit is None:
+        hit = _build_index(template_bytes)
+        _INDEX_CACHE[key] = hit
+    return hit
+
+
+def field_names(template_bytes: bytes) -> Set[str]:
+    return set(field_index(template_bytes))
+
+
+def unknown_fields(index: Dict[str, List[Dict[str, Any]]], fields: Iterable[str]) -> List[str]:
+    return sorted(k for k in fields if k not in index)
+
+
+def pages_for(index: Dict[str, List[Dict[str, Any]]], fields: Iterable[str]) -> List[int]:
+    pages = {loc["page"] for k in fields for loc in index.get(k, []) if loc["page"] is not None}
+    return sorted(pages)
+
+
+def check_fields(index: Dict[str, List[Dict[str, Any]]], fields: Iterable[str]) -> None:
+    bad = unknown_fields(index, fields)
+    if bad:
+        raise ValueError(f"Template has no field(s): {', '.join(bad)}")
+
+
+def fill_pdf(template_bytes: bytes, fields: Dict[str, Any]) -> bytes:
+    """Fill an AcroForm template with pypdf; unknown keys raise ValueError."""
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import BooleanObject, NameObject
+
+    index = field_index(template_bytes)
+    check_fields(index, fields)
+
+    reader = PdfReader(io.BytesIO(template_bytes))
+    root = reader.trailer["/Root"]
+    if "/AcroForm" not in root:
+        raise RuntimeError("Template PDF has no AcroForm/fields.")
+
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    writer._root_object.update({NameObject("/AcroForm"): root["/AcroForm"]})
+    try:
+        writer._root_object["/AcroForm"].update({NameObject("/NeedAppearances"): BooleanObject(True)})
+    except Exception:
+        pass
+
+    for pno in pages_for(index, fields):
+        page_fields = {k: v for k, v in fields.items() if any(loc["page"] == pno for loc in index[k])}
+        writer.update_page_form_field_values(writer.pages[pno], page_fields)
+
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class FieldCollector:
+    """Collects a fill payload for one template.
+
+    put(names, value) sets every listed name that exists in the
+    template; when none does, the names are remembered in .missing so the
+    page can report them instead of dropping them silently.
+    """
+
+    def __init__(self, template_bytes: bytes):
+        self.index = field_index(template_bytes)
+        self.values: Dict[str, Any] = {}
+        self.missing: List[str] = []
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def put(self, names, value) -> bool:
+        if isinstance(names, str):
+            names = [names]
+        hit = [n for n in names if n in self.index]
+        for n in hit:
+            self.values[n] = value
+        if not hit:
+            self.missing.append(" / ".join(names))
+        return bool(hit)
+
+    def pages(self) -> List[int]:
+        return pages_for(self.index, self.values)
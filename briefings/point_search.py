@@ -0,0 +1,201 @@
+# ---------------------------------------------------------------
+# Point search — prebuilt index for the route builder's search box
+# ---------------------------------------------------------------
+# The search used to test `q in " ".join(row values)` on every catalog
+# row and score every hit with difflib, on each keystroke rerun. Here
+# the lowercased row text is indexed once per catalog version:
+#   - a character-trigram inverted index (NumPy CSR postings). Queries
+#     of three or more characters intersect the postings of their
+#     trigrams; one- and two-character queries read a contiguous key
+#     range (every trigram starting with them), so no query walks the
+#     table;
+#   - per-row lowercase code / name / "code name" strings and source
+#     bonuses, so scoring only touches candidates.
+# Built by briefings.catalog, one per catalog version.
+# Ranking is the same score as before (exact code, prefix, difflib
+# ratio, source bonus, proximity to the last waypoint). Top-k is exact:
+# candidates are visited by an upper bound of their score and difflib
+# stops running once no remaining candidate can enter the top k.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import difflib
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from briefings import geo
+
+SRC_BONUS = {"IFR": 0.35, "VOR": 0.30, "PROC": 0.28, "AD": 0.20, "VFR": 0.0}
+EXACT_BONUS = 3.0
+PREFIX_BONUS = 1.5
+NEAR_WEIGHT = 0.25
+
+
+def _sorted_unique(a: np.ndarray) -> np.ndarray:
+    a = np.sort(a)
+    if len(a) < 2:
+        return a
+    return a[np.r_[True, a[1:] != a[:-1]]]
+
+
+class SearchIndex:
+    """Substring index + scorer over one catalog frame (code, name, src, lat, lon, ...)."""
+
+    def __init__(self, frame, version: Any = None):
+        self.frame = frame
+        self.version = version
+        n = len(frame)
+        cols = list(frame.columns)
+
+        def text(col: str) -> List[str]:
+            return [str(v or "").lower() for v in frame[col].tolist()] if col in cols else [""] * n
+
+        # What the old row filter matched against: all values, in column order.
+        per_col = [[str(v).lower() for v in frame[c].tolist()] for c in cols]
+        self.hay: List[str] = [" ".join(vals) for vals in zip(*per_col)] if cols else [""] * n
+        self.code = np.array(text("code"), dtype=str) if n else np.zeros(0, dtype="U1")
+        self.name = np.array(text("name"), dtype=str) if n else np.zeros(0, dtype="U1")
+        self.label = [f"{c} {m}" for c, m in zip(self.code.tolist(), self.name.tolist())]
+        self.label_len = np.fromiter(map(len, self.label), dtype=np.float64, count=n)
+        src = frame["src"].tolist() if "src" in cols else [None] * n
+        self.bonus = np.array([SRC_BONUS.get(str(s), 0.0) for s in src], dtype=np.float64)
+        self.lat = frame["lat"].to_numpy(dtype=np.float64) if "lat" in cols else np.full(n, np.nan)
+        self.lon = frame["lon"].to_numpy(dtype=np.float64) if "lon" in cols else np.full(n, np.nan)
+        self._build_trigrams()
+
+    def __len__(self) -> int:
+        return len(self.hay)
+
+    # -----------------------------
+    # Trigram postings
+    # -----------------------------
+    def _build_trigrams(self) -> None:
+        n = len(self.hay)
+        lens = np.fromiter(map(len, self.hay), dtype=np.int64, count=n)
+        chars = np.frombuffer("".join(self.hay).encode("utf-32-le"), dtype=np.uint32)
+        present = np.bincount(chars, minlength=1) > 0
+        code_of = np.cumsum(present).astype(np.uint64)  # code point -> 1..len(alphabet); 0 = end of row
+        alphabet = np.flatnonzero(present)
+        self.alphabet: Dict[str, int] = {chr(c): i + 1 for i, c in enumerate(alphabet.tolist())}
+        self.bits = max(1, int(len(alphabet) + 1).bit_length())
+
+        # Each row's characters followed by two end markers, so every
+        # character starts a trigram (the last ones end in markers).
+        row_of = np.repeat(np.arange(n, dtype=np.int64), lens)
+        at = np.arange(len(chars), dtype=np.int64) + 2 * row_of
+        seq = np.zeros(len(chars) + 2 * n, dtype=np.uint64)
+        seq[at] = code_of[chars]
+        b = np.uint64(self.bits)
+        keys = (seq[at] << (b + b)) | (seq[at + 1] << b) | seq[at + 2]
+
+        # (trigram, row) pairs, deduplicated and sorted by trigram then row
+        row_bits = max(1, int(n).bit_length())
+        if 3 * self.bits + row_bits <= 63:
+            packed = _sorted_unique((keys << np.uint64(row_bits)) | row_of.astype(np.uint64))
+            gram_of, rows = packed >> np.uint64(row_bits), packed & np.uint64((1 << row_bits) - 1)
+        else:
+            order = np.lexsort((row_of, keys))
+            keys, row_of = keys[order], row_of[order]
+            keep = np.ones(len(keys), dtype=bool)
+            keep[1:] = (keys[1:] != keys[:-1]) | (row_of[1:] != row_of[:-1])
+            gram_of, rows = keys[keep], row_of[keep]
+        starts = np.flatnonzero(np.r_[True, gram_of[1:] != gram_of[:-1]]) if len(gram_of) else np.zeros(0, dtype=np.int64)
+        self.gram_keys = gram_of[starts]
+        self.gram_offsets = np.append(starts, len(rows)).astype(np.int64)
+        self.gram_rows = rows.astype(np.int64)
+
+    def _key(self, chars: str) -> Optional[int]:
+        key = 0
+        for ch in chars:
+            c = self.alphabet.get(ch)
+            if c is None:
+                return None
+            key = (key << self.bits) | c
+        return key << (self.bits * (3 - len(chars)))
+
+    def _range(self, lo: int, hi: int) -> np.ndarray:
+        i, j = np.searchsorted(self.gram_keys, [lo, hi])
+        return self.gram_rows[self.gram_offsets[i]:self.gram_offsets[j]]
+
+    def match(self, q: str) -> np.ndarray:
+        """Rows whose text contains q (already lowercased), ascending."""
+        if not q or not len(self):
+            return np.zeros(0, dtype=np.int64)
+        if len(q) < 3:
+            lo = self._key(q)
+            if lo is None:
+                return np.zeros(0, dtype=np.int64)
+            return np.unique(self._range(lo, lo + (1 << (self.bits * (3 - len(q))))))
+
+        postings = []
+        for gram in {q[i:i + 3] for i in range(len(q) - 2)}:
+            key = self._key(gram)
+            if key is None:
+                return np.zeros(0, dtype=np.int64)
+            postings.append(self._range(key, key + 1))
+        postings.sort(key=len)
+        rows = postings[0]
+        for p in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, p, assume_unique=True)
+        if len(q) > 3:
+            hay = self.hay
+            rows = np.array([r for r in rows.tolist() if q in hay[r]], dtype=np.int64)
+        return rows
+
+    # -----------------------------
+    # Ranking
+    # -----------------------------
+    def search(self, query: str, limit: int = 30, near: Optional[Tuple[float, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top `limit` rows for query as (rows, scores), best first."""
+        q = query.strip().lower()
+        rows = self.match(q)
+        if not len(rows) or limit <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        code, name = self.code[rows], self.name[rows]
+        fixed = (
+            np.where(code == q, EXACT_BONUS, 0.0)
+            + np.where(np.char.startswith(code, q) | np.char.startswith(name, q), PREFIX_BONUS, 0.0)
+            + self.bonus[rows]
+        )
+        close = np.zeros(len(rows))
+        if near is not None:
+            close = 1.0 / (1.0 + geo.gc_dist_nm(near[0], near[1], self.lat[rows], self.lon[rows]))
+            fixed = fixed + close * NEAR_WEIGHT
+        lq = float(len(q))
+        # difflib ratio <= 2 * min(len) / total; the slack covers float rounding.
+        upper = fixed + 2.0 * np.minimum(lq, self.label_len[rows]) / (lq + self.label_len[rows]) + 1e-9
+
+        order = np.argsort(-upper, kind="stable")
+        best: List[Tuple[float, int]] = []  # min-heap of (score, -row)
+        for i in order.tolist():
+            if len(best) >= limit and upper[i] < best[0][0]:
+                break
+            r = int(rows[i])
+            score = self._score(q, r, float(close[i]), best[0][0] if len(best) >= limit else None)
+            if score is None:
+                continue
+            item = (score, -r)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+        best.sort(reverse=True)
+        return np.array([-r for _, r in best], dtype=np.int64), np.array([s for s, _ in best], dtype=np.float64)
+
+    def _score(self, q: str, r: int, close: float, floor: Optional[float]) -> Optional[float]:
+        # close: 1 / (1 + distance to the last waypoint), 0 without one
+        code, name = str(self.code[r]), str(self.name[r])
+        exact = EXACT_BONUS if code == q else 0.0
+        starts = PREFIX_BONUS if code.startswith(q) or name.startswith(q) else 0.0
+        src_bonus = float(self.bonus[r])
+        sm = difflib.SequenceMatcher(None, q, self.label[r])
+        if floor is not None and exact + starts + sm.quick_ratio() + src_bonus + close * NEAR_WEIGHT < floor:
+            return None
+        return exact + starts + sm.ratio() + src_bonus + close * NEAR_WEIGHT
+
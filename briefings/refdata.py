@@ -0,0 +1,490 @@
+# ---------------------------------------------------------------
+# Reference data — AD/HEL/ULM, Localidades and VOR tables, parsed once
+# ---------------------------------------------------------------
+# NavLog, VFRMap and teste read the same eAIP-style CSVs (one quoted
+# text line per row, coordinates as DMS tokens). They are parsed here
+# once per process into typed, read-only column tables and saved as a
+# NumPy snapshot (.npz, no pickle) keyed by each source's mtime/size, so
+# a new process loads arrays instead of running the regex parser again
+# and page switches reuse the in-memory tables.
+#
+# The tables are canonical (raw first token, name, city/sector, lat,
+# lon); each page builds its own frame layout from them.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import csv
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # column-wise ingestion needs Arrow; the line parsers are used without it
+    pa = pc = None
+
+PARSER_VERSION = 3
+
+DATA_DIR = Path(os.environ.get("BRIEFINGS_DATA_DIR", Path(__file__).resolve().parent.parent / "pages"))
+CACHE_DIR = Path(os.environ.get("BRIEFINGS_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+SNAPSHOT_PATH = CACHE_DIR / "refdata.npz"
+
+AD_CSV = "AD-HEL-ULM.csv"
+LOC_CSV = "Localidades-Nova-versao-230223.csv"
+VOR_CSV = "NAVAIDS_VOR.csv"
+
+AD_IDENT_RE = r"^[A-Z0-9]{4,}$"
+
+# Used when NAVAIDS_VOR.csv is missing or unreadable
+FALLBACK_VORS = [
+    ("CAS", "Cascais DVOR/DME", 114.30, 38.7483, -9.3619),
+    ("ESP", "Espichel DVOR/DME", 112.50, 38.4242, -9.1856),
+    ("VFA", "Faro DVOR/DME",     112.80, 37.0136, -7.9750),
+    ("FTM", "Fátima DVOR/DME",   113.50, 39.6656, -8.4928),
+    ("LIS", "Lisboa DVOR/DME",   114.80, 38.8878, -9.1628),
+    ("NSA", "Nisa DVOR/DME",     115.50, 39.5647, -7.9147),
+    ("PRT", "Porto DVOR/DME",    114.10, 41.2731, -8.6878),
+    ("SGR", "Sagres VOR/DME",    113.90, 37.0839, -8.94639),
+    ("SRA", "Sintra VORTAC",     112.10, 38.829201, -9.34),
+    ("VBZ", "Badajoz VOR/DME",   116.8,  38.889900, -6.815750),
+]
+
+AD_COLUMNS = ("first", "name", "city", "lat", "lon")
+LOC_COLUMNS = ("name", "code", "sector", "lat", "lon")
+VOR_COLUMNS = ("ident", "name", "freq_mhz", "lat", "lon")
+
+_COORD_RE = re.compile(r"^\d+(?:\.\d+)?[NSEW]$", re.I)
+_LOC_COORD_RE = re.compile(r"^\d{6,7}(?:\.\d+)?[NSEW]$", re.I)
+_DMS_RE = re.compile(r"^(\d+(?:\.\d+)?)([NSEW])$", re.I)
+
+
+# -----------------------------
+# Tables
+# -----------------------------
+@dataclass(frozen=True)
+class Table:
+    """Named columns of equal length; arrays are read-only (str 'U' or float64)."""
+
+    name: str
+    columns: Dict[str, np.ndarray]
+
+    def __post_init__(self):
+        for a in self.columns.values():
+            a.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.columns[col]
+
+    def frame(self, optional: Sequence[str] = ()):
+        """New pandas DataFrame (free to modify); "" -> None in the optional columns."""
+        import pandas as pd
+
+        df = pd.DataFrame({k: np.asarray(v) for k, v in self.columns.items()})
+        for col in optional:
+            df[col] = df[col].where(df[col] != "", None)
+        return df
+
+
+def _table(name: str, cols: Sequence[str], rows: List[Tuple], float_cols: Sequence[str] = ("lat", "lon")) -> Table:
+    out: Dict[str, np.ndarray] = {}
+    for i, c in enumerate(cols):
+        vals = [r[i] for r in rows]
+        if c in float_cols or c == "freq_mhz":
+            out[c] = np.array(vals, dtype=np.float64)
+        else:
+            out[c] = np.array(["" if v is None else str(v) for v in vals], dtype=str) if vals else np.zeros(0, dtype="U1")
+    return Table(name, out)
+
+
+@dataclass(frozen=True)
+class RefData:
+    ad: Table
+    loc: Table
+    vor: Table
+    vor_fallback: bool  # True when FALLBACK_VORS is used
+    source: str         # "parsed" | "snapshot"
+    key: Tuple
+
+
+# -----------------------------
+# Parsers
+# -----------------------------
+def dms_to_dd(token: str, is_lon: bool = False) -> Optional[float]:
+    """'404903N' / '0073211W' / '372755.90N' -> decimal degrees (None if not DMS)."""
+    m = _DMS_RE.match(str(token).strip())
+    if not m:
+        return None
+    value, hemi = m.groups()
+    n = 3 if is_lon else 2
+    try:
+        deg, minutes, seconds = int(value[0:n]), int(value[n:n + 2]), float(value[n + 2:] or 0)
+    except ValueError:  # too few digits
+        return None
+    dd = deg + minutes / 60 + seconds / 3600
+    return -dd if hemi.upper() in ("S", "W") else dd
+
+
+def _lines(path: Path) -> List[str]:
+    """First column of every data row (pandas.read_csv semantics: row 1 is the header)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    return [r[0] for r in rows[1:] if r and r[0].strip()]
+
+
+def parse_ad_lines(lines: Sequence[str]) -> List[Tuple]:
+    rows = []
+    for line in lines:
+        s = str(line).strip()
+        if not s or s.startswith(("Ident", "DEP/")):
+            continue
+        tokens = s.split()
+        coord_toks = [t for t in tokens if _COORD_RE.match(t)]
+        if len(coord_toks) < 2:
+            continue
+        lat_tok, lon_tok = coord_toks[-2], coord_toks[-1]
+        lat, lon = dms_to_dd(lat_tok, is_lon=False), dms_to_dd(lon_tok, is_lon=True)
+        if lat is None or lon is None:
+            continue
+        name = " ".join(tokens[1:tokens.index(coord_toks[0])]).strip()
+        city = " ".join(tokens[tokens.index(lon_tok) + 1:])
+        rows.append((tokens[0], name, city, lat, lon))
+    return rows
+
+
+def parse_loc_lines(lines: Sequence[str]) -> List[Tuple]:
+    rows = []
+    for line in lines:
+        s = str(line).strip()
+        if not s or "Total de registos" in s:
+            continue
+        tokens = s.split()
+        coord_toks = [t for t in tokens if _LOC_COORD_RE.match(t)]
+        if len(coord_toks) < 2:
+            continue
+        lat_tok, lon_tok = coord_toks[0], coord_toks[1]
+        lat, lon = dms_to_dd(lat_tok, is_lon=False), dms_to_dd(lon_tok, is_lon=True)
+        if lat is None or lon is None:
+            continue
+        lon_idx = tokens.index(lon_tok)
+        code = tokens[lon_idx + 1] if lon_idx + 1 < len(tokens) else ""
+        sector = " ".join(tokens[lon_idx + 2:])
+        name = " ".join(tokens[:tokens.index(lat_tok)]).strip()
+        rows.append((name, code, sector, lat, lon))
+    return rows
+
+
+# -----------------------------
+# Column-wise ingestion
+# -----------------------------
+# Same output as parse_ad_lines / parse_loc_lines, row for row. All lines
+# go through Arrow at once: one whitespace split gives a flat token
+# column, one regex over it flags the coordinate tokens, and the per-row
+# choices (last two / first two coordinates, where the name ends and the
+# city or code starts) are NumPy arithmetic on the token offsets. Names
+# and cities are re-joined with binary_join, and DMS tokens are read with
+# one str.extract pattern over the coordinate columns.
+# Lines with whitespace or digits outside ASCII, where Python's
+# str.split / \d and Arrow's differ, go through the line parser, and so
+# does everything when pyarrow is not installed.
+_AD_TOKEN = r"^\d+(?:\.\d+)?[NSEWnsew]$"
+_LOC_TOKEN = r"^\d{6,7}(?:\.\d+)?[NSEWnsew]$"
+# deg / min / sec as dms_to_dd slices them (3 degree digits for longitudes)
+_DMS_EXTRACT = {n: rf"^(?P<deg>\d{{{n}}})(?P<min>\d{{1,2}})(?P<sec>\d*(?:\.\d+)?)(?P<hemi>[NSEWnsew])$" for n in (2, 3)}
+# Python-only whitespace, non-ASCII digits, and U+017F (matches "s" under re.I)
+_NONE = np.zeros(0, dtype=np.int64)
+_LINE_PARSER_ONLY = r"[\x{1c}-\x{1f}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}\x{17f}]|[^\P{Nd}0-9]"
+
+
+class _Tokens:
+    """Lines as one flat Arrow token column: row r owns tokens start[r]:stop[r]; cpos are the coordinate tokens."""
+
+    def __init__(self, lines: List[str], coord_token: str):
+        self.lines = pa.array(lines, type=pa.string())
+        self.line_parser = pc.match_substring_regex(self.lines, _LINE_PARSER_ONLY).to_numpy(zero_copy_only=False)
+        split = pc.ascii_split_whitespace(pc.ascii_trim_whitespace(self.lines))
+        n = len(lines)
+        row_of = np.repeat(np.arange(n), np.diff(split.offsets.to_numpy()))
+        keep = pc.greater(pc.binary_length(split.flatten()), 0)  # a blank line splits into one ""
+        self.flat = split.flatten().filter(keep)
+        row_of = row_of[keep.to_numpy(zero_copy_only=False)]
+        lens = np.bincount(row_of, minlength=n)[:n]
+        self.stop = np.cumsum(lens)
+        self.start = self.stop - lens
+
+        self.cpos = np.flatnonzero(pc.match_substring_regex(self.flat, coord_token).to_numpy(zero_copy_only=False))
+        crow = row_of[self.cpos]
+        self.count = np.bincount(crow, minlength=n)[:n]
+        self.cfirst = np.searchsorted(crow, np.arange(n))  # each row's first coordinate, as an index into cpos
+
+    def take(self, pos: np.ndarray):
+        return self.flat.take(pa.array(pos, type=pa.int64()))
+
+    def join(self, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+        """" ".join(tokens[start:stop]) for each pair of flat positions."""
+        lens = np.maximum(stop - start, 0)
+        offs = np.zeros(len(lens) + 1, dtype=np.int64)
+        np.cumsum(lens, out=offs[1:])
+        idx = np.repeat(start - offs[:-1], lens) + np.arange(offs[-1])
+        lists = pa.ListArray.from_arrays(pa.array(offs, type=pa.int32()), self.take(idx))
+        return pc.binary_join(lists, " ").to_numpy(zero_copy_only=False)
+
+    def first_equal(self, sel: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """For rows sel, the first coordinate (index into cpos) with the same text as coordinate k (list.index)."""
+        cnt = self.count[sel]
+        offs = np.cumsum(cnt) - cnt
+        ks = np.repeat(self.cfirst[sel] - offs, cnt) + np.arange(int(cnt.sum()))
+        group = np.repeat(np.arange(len(sel)), cnt)
+        same = pc.equal(self.take(self.cpos[ks]), self.take(self.cpos[k]).take(pa.array(group))).to_numpy(zero_copy_only=False)
+        hit = np.flatnonzero(same)
+        _, first = np.unique(group[hit], return_index=True)  # every row matches at least k itself
+        return ks[hit[first]]
+
+
+def dms_columns(tokens, is_lon: bool = False) -> np.ndarray:
+    """dms_to_dd over a column of coordinate tokens (NaN where dms_to_dd gives None)."""
+    import pandas as pd
+
+    parts = pd.Series(tokens, dtype=pd.ArrowDtype(pa.string())).str.extract(_DMS_EXTRACT[3 if is_lon else 2])
+
+    def num(s) -> np.ndarray:
+        return s.astype(pd.ArrowDtype(pa.float64())).to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def length(s) -> np.ndarray:
+        return s.str.len().to_numpy(dtype=np.int64, na_value=0)
+
+    deg, minutes, seconds = num(parts["deg"]), num(parts["min"]), num(parts["sec"].replace("", "0"))
+    # value[n:n + 2] are the minutes: a single digit only when nothing follows it
+    ok = ~np.isnan(deg) & ((length(parts["min"]) == 2) | (length(parts["sec"]) == 0))
+    dd = deg + minutes / 60 + seconds / 3600
+    south_west = parts["hemi"].isin(["S", "W", "s", "w"]).to_numpy(dtype=bool, na_value=False)
+    return np.where(ok, np.where(south_west, -dd, dd), np.nan)
+
+
+def _columns(cols: Sequence[str], data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {}
+    for c in cols:
+        if c in ("lat", "lon"):
+            out[c] = np.asarray(data[c], dtype=np.float64)
+        else:
+            out[c] = np.array(data[c], dtype=str) if len(data[c]) else np.zeros(0, dtype="U1")
+    return out
+
+
+def _with_line_parser(cols: Sequence[str], lines: List[str], rows: np.ndarray, data: Dict[str, Any], other: np.ndarray, parse) -> Dict[str, np.ndarray]:
+    """data (parsed column-wise from lines[rows]) plus the line parser's rows for lines[other], in line order."""
+    extra = [(i, r) for i in other.tolist() for r in parse([lines[i]])]
+    if not extra:
+        return _columns(cols, data)
+    order = np.argsort(np.concatenate([rows, [i for i, _ in extra]]), kind="stable").tolist()
+    merged = {}
+    for j, c in enumerate(cols):
+        vals = list(data[c]) + [r[j] for _, r in extra]
+        merged[c] = [vals[i] for i in order]
+    return _columns(cols, merged)
+
+
+def parse_ad_vectorized(lines: Sequence[str]) -> Dict[str, np.ndarray]:
+    """parse_ad_lines as columns {first, name, city, lat, lon}."""
+    lines = [str(line) for line in lines]
+    if pa is None or not lines:
+        return _with_line_parser(AD_COLUMNS, lines, _NONE, {c: [] for c in AD_COLUMNS}, np.arange(len(lines)), parse_ad_lines)
+    tk = _Tokens(lines, _AD_TOKEN)
+    sel = np.flatnonzero((tk.count >= 2) & ~tk.line_parser)
+    first = tk.take(tk.start[sel])
+    header = pc.or_(pc.starts_with(first, "Ident"), pc.starts_with(first, "DEP/")).to_numpy(zero_copy_only=False)
+    sel = sel[~header]
+
+    lon_k = tk.cfirst[sel] + tk.count[sel] - 1
+    lat = dms_columns(tk.take(tk.cpos[lon_k - 1]), is_lon=False)
+    lon = dms_columns(tk.take(tk.cpos[lon_k]), is_lon=True)
+    good = ~(np.isnan(lat) | np.isnan(lon))
+    sel, lat, lon, lon_k = sel[good], lat[good], lon[good], lon_k[good]
+
+    # Name: tokens[1:first coordinate]; city: after the first token equal to the longitude one.
+    city_k = tk.first_equal(sel, lon_k)
+    data = {
+        "first": tk.take(tk.start[sel]).to_numpy(zero_copy_only=False),
+        "name": tk.join(tk.start[sel] + 1, tk.cpos[tk.cfirst[sel]]),
+        "city": tk.join(tk.cpos[city_k] + 1, tk.stop[sel]),
+        "lat": lat,
+        "lon": lon,
+    }
+    return _with_line_parser(AD_COLUMNS, lines, sel, data, np.flatnonzero(tk.line_parser), parse_ad_lines)
+
+
+def parse_loc_vectorized(lines: Sequence[str]) -> Dict[str, np.ndarray]:
+    """parse_loc_lines as columns {name, code, sector, lat, lon}."""
+    lines = [str(line) for line in lines]
+    if pa is None or not lines:
+        return _with_line_parser(LOC_COLUMNS, lines, _NONE, {c: [] for c in LOC_COLUMNS}, np.arange(len(lines)), parse_loc_lines)
+    tk = _Tokens(lines, _LOC_TOKEN)
+    total = pc.match_substring(tk.lines, "Total de registos").to_numpy(zero_copy_only=False)
+    sel = np.flatnonzero((tk.count >= 2) & ~tk.line_parser & ~total)
+
+    lat_k = tk.cfirst[sel]
+    lat_tok, lon_tok = tk.take(tk.cpos[lat_k]), tk.take(tk.cpos[lat_k + 1])
+    lat, lon = dms_columns(lat_tok, is_lon=False), dms_columns(lon_tok, is_lon=True)
+    same = pc.equal(lat_tok, lon_tok).to_numpy(zero_copy_only=False)
+    good = ~(np.isnan(lat) | np.isnan(lon))
+    sel, lat, lon, lat_k, same = sel[good], lat[good], lon[good], lat_k[good], same[good]
+
+    # Code / sector follow the first token equal to the longitude one.
+    lon_at = np.where(same, tk.cpos[lat_k], tk.cpos[lat_k + 1])
+    has_code = lon_at + 1 < tk.stop[sel]
+    code = tk.take(np.where(has_code, lon_at + 1, 0)).to_numpy(zero_copy_only=False)
+    data = {
+        "name": tk.join(tk.start[sel], tk.cpos[lat_k]),
+        "code": np.where(has_code, code, ""),
+        "sector": tk.join(lon_at + 2, tk.stop[sel]),
+        "lat": lat,
+        "lon": lon,
+    }
+    return _with_line_parser(LOC_COLUMNS, lines, sel, data, np.flatnonzero(tk.line_parser), parse_loc_lines)
+
+
+def parse_vor_csv(path: Path) -> List[Tuple]:
+    """ident/name/freq_mhz/lat/lon rows (frequency/freq/latitude/longitude accepted)."""
+    alias = {"frequency": "freq_mhz", "freq": "freq_mhz", "latitude": "lat", "longitude": "lon"}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for r in reader:
+            r = {alias.get(k.lower().strip(), k.lower().strip()): v for k, v in r.items() if k}
+            if not {"ident", "freq_mhz", "lat", "lon"}.issubset(r):
+                raise ValueError(f"{path.name} needs columns ident, freq_mhz, lat, lon")
+            ident = str(r.get("ident") or "").upper().strip()
+            try:
+                freq, lat, lon = float(r["freq_mhz"]), float(r["lat"]), float(r["lon"])
+            except (TypeError, ValueError):
+                continue
+            if not ident or freq != freq or lat != lat or lon != lon:
+                continue
+            rows.append((ident, (r.get("name") or ident).strip(), freq, lat, lon))
+    return rows
+
+
+# -----------------------------
+# Snapshot + process cache
+# -----------------------------
+_CACHE: Dict[str, RefData] = {}
+_LOCK = threading.Lock()
+
+
+def source_key(data_dir: Path) -> Tuple:
+    key: List[Any] = [PARSER_VERSION]
+    for name in (AD_CSV, LOC_CSV, VOR_CSV):
+        try:
+            st = (data_dir / name).stat()
+            key.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append((name, None, None))
+    return tuple(key)
+
+
+def _key_str(key: Tuple) -> str:
+    return repr(key)
+
+
+def _save_snapshot(path: Path, data: RefData) -> None:
+    arrays = {"key": np.array(_key_str(data.key)), "vor_fallback": np.array(data.vor_fallback)}
+    for t in (data.ad, data.loc, data.vor):
+        for col, a in t.columns.items():
+            arrays[f"{t.name}.{col}"] = a
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # only a cache
+
+
+def _load_snapshot(path: Path, key: Tuple) -> Optional[RefData]:
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["key"]) != _key_str(key):
+                return None
+            tables = {
+                name: Table(name, {c: z[f"{name}.{c}"] for c in cols})
+                for name, cols in (("ad", AD_COLUMNS), ("loc", LOC_COLUMNS), ("vor", VOR_COLUMNS))
+            }
+            return RefData(tables["ad"], tables["loc"], tables["vor"], bool(z["vor_fallback"]), "snapshot", key)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _parse(data_dir: Path, key: Tuple) -> RefData:
+    def lines(name):
+        try:
+            return _lines(data_dir / name)
+        except OSError:
+            return []
+
+    ad = Table("ad", parse_ad_vectorized(lines(AD_CSV)))
+    loc = Table("loc", parse_loc_vectorized(lines(LOC_CSV)))
+    try:
+        vor_rows, fallback = parse_vor_csv(data_dir / VOR_CSV), False
+    except (OSError, ValueError):
+        vor_rows, fallback = [], True
+    if fallback:
+        vor_rows = list(FALLBACK_VORS)
+    vor = _table("vor", VOR_COLUMNS, vor_rows)
+    return RefData(ad, loc, vor, fallback, "parsed", key)
+
+
+def load(data_dir: Optional[Path] = None, snapshot_path: Optional[Path] = None) -> RefData:
+    """Reference tables for data_dir; parsed at most once per source change."""
+    data_dir = Path(data_dir or DATA_DIR)
+    snapshot_path = Path(snapshot_path or SNAPSHOT_PATH)
+    key = source_key(data_dir)
+    cache_key = str(data_dir.resolve())
+    hit = _CACHE.get(cache_key)
+    if hit is not None and hit.key == key:
+        return hit
+    with _LOCK:
+        hit = _CACHE.get(cache_key)
+        if hit is not None and hit.key == key:
+            return hit
+        data = _load_snapshot(snapshot_path, key)
+        if data is None:
+            data = _parse(data_dir, key)
+            _save_snapshot(snapshot_path, data)
+        _CACHE[cache_key] = data
+        return data
+
+
+# -----------------------------
+# Frames (fresh copies; pages add their own columns)
+# -----------------------------
+def ad_frame(ident_re: str = AD_IDENT_RE, data: Optional[RefData] = None):
+    """ident (first token if it matches ident_re, else None), name, city, lat, lon."""
+    data = data or load()
+    df = data.ad.frame(optional=("city",))
+    first = df.pop("first")
+    df.insert(0, "ident", first.where(first.str.match(ident_re), None))
+    return df
+
+
+def loc_frame(data: Optional[RefData] = None):
+    """name, code, sector, lat, lon (code/sector None when absent)."""
+    data = data or load()
+    return data.loc.frame(optional=("code", "sector"))
+
+
+def vor_frame(fallback: bool = True, data: Optional[RefData] = None):
+    """ident, name, freq_mhz, lat, lon; empty instead of FALLBACK_VORS when fallback=False."""
+    data = data or load()
+    df = data.vor.frame()
+    if data.vor_fallback and not fallback:
+        return df.iloc[0:0]
+    return df
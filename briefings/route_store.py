@@ -0,0 +1,235 @@
+# ---------------------------------------------------------------
+# Route store — saved ("padrão") routes with per-route merges
+# ---------------------------------------------------------------
+# Saved routes are a {name: [points]} document. The pages used to PATCH
+# the whole dict they loaded at the start of the session, so two
+# instructors saving at the same time overwrote each other.
+#
+# RouteStore keeps the session's edits as per-route operations (put /
+# delete; repeated edits of one route collapse into one) and commits
+# them against the revision it last read. If the backend moved on in
+# the meantime, the latest document is re-read, the operations are
+# re-applied on top of it (other people's routes are kept) and routes
+# that someone else changed since we read them are reported as
+# conflicts. Pending operations survive a failed commit and go out with
+# the next one.
+#
+# Backends:
+#   GistBackend    routes.json in a GitHub Gist (via gist_store);
+#                  revision = hash of the file content.
+#   SQLiteBackend  one row per route, integer revision; offline use and
+#                  local runs (ROUTES_DB).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+Routes = Dict[str, List[Dict[str, Any]]]
+
+
+class RevisionConflict(Exception):
+    """The backend revision is not the one the commit was based on."""
+
+
+def route_digest(points: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    if points is None:
+        return None
+    return hashlib.sha1(json.dumps(points, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def apply_ops(routes: Routes, ops: Dict[str, Optional[List[Dict[str, Any]]]]) -> Routes:
+    out = dict(routes)
+    for name, points in ops.items():
+        if points is None:
+            out.pop(name, None)
+        else:
+            out[name] = points
+    return out
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class GistBackend:
+    """routes.json in a Gist. The Gist API has no conditional PATCH, so the
+    revision is re-checked (conditional GET) right before writing and
+    commits from this process are serialised; the remaining window is
+    the GET -> PATCH round-trip."""
+
+    _LOCKS: Dict[str, threading.Lock] = {}
+    _LOCKS_GUARD = threading.Lock()
+
+    def __init__(self, token: str, gist_id: str, filename: str = "routes.json"):
+        self.token = token
+        self.gist_id = gist_id
+        self.filename = filename
+        with self._LOCKS_GUARD:
+            self.lock = self._LOCKS.setdefault(gist_id, threading.Lock())
+
+    def _decode(self, files: Optional[Dict[str, str]]) -> Tuple[Routes, str]:
+        content = (files or {}).get(self.filename) or "{}"
+        return json.loads(content), hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def read(self, fresh: bool = False) -> Tuple[Routes, str]:
+        from briefings import gist_store
+
+        if fresh:
+            files, err = gist_store.revalidate(self.token, self.gist_id)
+        else:
+            files, err = gist_store.load_files(self.token, self.gist_id)
+        if files is None:
+            raise IOError(err or "Gist unavailable")
+        return self._decode(files)
+
+    def commit(self, ops: Dict[str, Optional[List[Dict[str, Any]]]], base_rev: Optional[str]) -> str:
+        from briefings import gist_store
+
+        with self.lock:
+            files, err = gist_store.revalidate(self.token, self.gist_id)
+            if err or files is None:
+                raise IOError(err or "Gist unavailable")
+            routes, rev = self._decode(files)
+            if rev != base_rev:
+                raise RevisionConflict(rev)
+            content = json.dumps(apply_ops(routes, ops), indent=2)
+            err = gist_store.save_files(self.token, self.gist_id, {self.filename: content})
+            if err:
+                raise IOError(err)
+            return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class SQLiteBackend:
+    """One row per route; only the routes in a commit are written."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS routes ("
+            " name TEXT PRIMARY KEY,"
+            " points TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        con.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+        con.execute("INSERT OR IGNORE INTO meta (k, v) VALUES ('rev', 0)")
+        return con
+
+    @staticmethod
+    def _rev(con: sqlite3.Connection) -> str:
+        return str(con.execute("SELECT v FROM meta WHERE k = 'rev'").fetchone()[0])
+
+    def read(self, fresh: bool = False) -> Tuple[Routes, str]:
+        con = self._connect()
+        try:
+            con.execute("BEGIN")
+            routes = {name: json.loads(points) for name, points in con.execute("SELECT name, points FROM routes")}
+            rev = self._rev(con)
+            con.execute("COMMIT")
+        finally:
+            con.close()
+        return routes, rev
+
+    def commit(self, ops: Dict[str, Optional[List[Dict[str, Any]]]], base_rev: Optional[str]) -> str:
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                rev = self._rev(con)
+                if rev != base_rev:
+                    raise RevisionConflict(rev)
+                now = time.time()
+                for name, points in ops.items():
+                    if points is None:
+                        con.execute("DELETE FROM routes WHERE name = ?", (name,))
+                    else:
+                        con.execute(
+                            "INSERT OR REPLACE INTO routes (name, points, updated_at) VALUES (?, ?, ?)",
+                            (name, json.dumps(points), now),
+                        )
+                con.execute("UPDATE meta SET v = v + 1 WHERE k = 'rev'")
+                rev = self._rev(con)
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        finally:
+            con.close()
+        return rev
+
+
+# -----------------------------
+# Store
+# -----------------------------
+class RouteStore:
+    def __init__(self, backend, max_retries: int = 3):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.base: Routes = {}
+        self.base_rev: Optional[str] = None
+        self.loaded = False
+        self.pending: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        self.seen: Dict[str, Optional[str]] = {}  # route -> digest when first edited
+
+    @property
+    def routes(self) -> Routes:
+        """Backend view (as last read) with this session's pending edits."""
+        return apply_ops(self.base, self.pending)
+
+    def load(self, fresh: bool = False) -> Routes:
+        self.base, self.base_rev = self.backend.read(fresh=fresh)
+        self.loaded = True
+        return self.routes
+
+    def _edit(self, name: str, points: Optional[List[Dict[str, Any]]]) -> None:
+        self.seen.setdefault(name, route_digest(self.base.get(name)))
+        self.pending[name] = points
+
+    def put(self, name: str, points: List[Dict[str, Any]]) -> None:
+        self._edit(name, list(points))
+
+    def delete(self, name: str) -> None:
+        self._edit(name, None)
+
+    def flush(self) -> Dict[str, Any]:
+        """Commit pending edits: {"ok", "written": [names], "conflicts": [names], "error"}.
+
+        conflicts: routes changed by someone else since this session read
+        them; the session's version is the one written.
+        """
+        written = sorted(self.pending)
+        if not self.pending:
+            return {"ok": True, "written": [], "conflicts": [], "error": None}
+        conflicts: List[str] = []
+        try:
+            if not self.loaded:
+                self.load()
+            for _ in range(self.max_retries + 1):
+                try:
+                    rev = self.backend.commit(self.pending, self.base_rev)
+                    break
+                except RevisionConflict:
+                    remote, remote_rev = self.backend.read(fresh=True)
+                    conflicts = sorted({
+                        name for name in self.pending
+                        if route_digest(remote.get(name)) != self.seen.get(name)
+                    } | set(conflicts))
+                    self.base, self.base_rev = remote, remote_rev
+            else:
+                return {"ok": False, "written": [], "conflicts": conflicts, "error": "Too many concurrent changes, try again."}
+        except Exception as e:
+            return {"ok": False, "written": [], "conflicts": conflicts, "error": str(e)}
+
+        self.base, self.base_rev = apply_ops(self.base, self.pending), rev
+        self.pending, self.seen = {}, {}
+        return {"ok": True, "written": written, "conflicts": conflicts, "error": None}
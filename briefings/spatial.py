@@ -0,0 +1,260 @@
+# ---------------------------------------------------------------
+# Spatial index — nearest / within-radius queries on the sphere
+# ---------------------------------------------------------------
+# Static KD-tree over 3D unit vectors. Chord length between unit vectors
+# grows monotonically with great-circle distance, so the nearest points
+# in 3D are the nearest on the sphere, with no dateline or pole special
+# cases. Built once per point set (NumPy median splits, leaves of
+# LEAF_SIZE points) and queried best-first, so nearest_vor-style
+# lookups don't compute a distance to every row.
+#
+# Rows with NaN coordinates are left out. Results are row positions in
+# the arrays given to the constructor, nearest first (ties: lower row).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from briefings import geo
+
+LEAF_SIZE = 16
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """(n, 3) unit vectors for lat/lon in degrees."""
+    phi, lam = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cphi = np.cos(phi)
+    return np.stack([cphi * np.cos(lam), cphi * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def chord_to_nm(chord2: np.ndarray) -> np.ndarray:
+    """Squared chord length on the unit sphere -> great-circle distance (NM)."""
+    return 2.0 * np.arcsin(np.minimum(1.0, np.sqrt(chord2) / 2.0)) * geo.EARTH_NM
+
+
+def nm_to_chord2(dist_nm: float) -> float:
+    angle = min(max(float(dist_nm), 0.0) / geo.EARTH_NM, math.pi)
+    return (2.0 * math.sin(angle / 2.0)) ** 2
+
+
+def _empty() -> Tuple[np.ndarray, np.ndarray]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+
+class SpatialIndex:
+    def __init__(self, lat, lon, leaf_size: int = LEAF_SIZE):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        xyz = unit_vectors(lat[rows], lon[rows])
+
+        perm = np.arange(len(rows))
+        lo_, hi_, left, right, bmin, bmax = [], [], [], [], [], []
+        stack = [(0, len(rows), -1, 0)] if len(rows) else []
+        while stack:
+            lo, hi, parent, side = stack.pop()
+            node = len(lo_)
+            if parent >= 0:
+                (left if side == 0 else right)[parent] = node
+            pts = xyz[perm[lo:hi]]
+            lo_.append(lo)
+            hi_.append(hi)
+            left.append(-1)
+            right.append(-1)
+            bmin.append(pts.min(axis=0))
+            bmax.append(pts.max(axis=0))
+            if hi - lo <= leaf_size:
+                continue
+            dim = int(np.argmax(bmax[-1] - bmin[-1]))
+            mid = (lo + hi) // 2
+            part = np.argpartition(pts[:, dim], mid - lo)
+            perm[lo:hi] = perm[lo:hi][part]
+            stack.append((mid, hi, node, 1))
+            stack.append((lo, mid, node, 0))
+
+        self.rows = rows[perm]  # leaf order -> original row
+        self.xyz = xyz[perm]
+        self.node_lo = np.array(lo_, dtype=np.int64)
+        self.node_hi = np.array(hi_, dtype=np.int64)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.box_min = np.array(bmin, dtype=np.float64).reshape(-1, 3)
+        self.box_max = np.array(bmax, dtype=np.float64).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _box_d2(self, node: int, q: np.ndarray) -> float:
+        gap = np.maximum(0.0, np.maximum(self.box_min[node] - q, q - self.box_max[node]))
+        return float(gap @ gap)
+
+    def _leaf(self, node: int, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        sl = slice(self.node_lo[node], self.node_hi[node])
+        diff = self.xyz[sl] - q
+        return np.einsum("ij,ij->i", diff, diff), self.rows[sl]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest rows as (rows, dist_nm), nearest first."""
+        if not len(self) or k <= 0 or not (math.isfinite(lat) and math.isfinite(lon)):
+            return _empty()
+        q = unit_vectors(lat, lon)
+        best_d2 = np.zeros(0, dtype=np.float64)
+        best_rows = np.zeros(0, dtype=np.int64)
+        heap: List[Tuple[float, int]] = [(self._box_d2(0, q), 0)]
+        while heap:
+            d2, node = heapq.heappop(heap)
+            if len(best_d2) >= k and d2 > best_d2[-1]:
+                break
+            if self.left[node] < 0:
+                leaf_d2, leaf_rows = self._leaf(node, q)
+                d2s = np.concatenate([best_d2, leaf_d2])
+                rws = np.concatenate([best_rows, leaf_rows])
+                order = np.lexsort((rws, d2s))[:k]
+                best_d2, best_rows = d2s[order], rws[order]
+                continue
+            for child in (self.left[node], self.right[node]):
+                heapq.heappush(heap, (self._box_d2(child, q), int(child)))
+        return best_rows, chord_to_nm(best_d2)
+
+    def within_radius(self, lat: float, lon: float, radius_nm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows within radius_nm as (rows, dist_nm), nearest first."""
+        if not len(self) or not (math.isfinite(lat) and math.isfinite(lon)):
+            return _empty()
+        q = unit_vectors(lat, lon)
+        limit = nm_to_chord2(radius_nm) * (1 + 1e-12)
+        found_d2, found_rows = [], []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_d2(node, q) > limit:
+                continue
+            if self.left[node] < 0:
+                leaf_d2, leaf_rows = self._leaf(node, q)
+                hit = leaf_d2 <= limit
+                found_d2.append(leaf_d2[hit])
+                found_rows.append(leaf_rows[hit])
+                continue
+            stack.extend((int(self.left[node]), int(self.right[node])))
+        if not found_d2:
+            return _empty()
+        d2, rows = np.concatenate(found_d2), np.concatenate(found_rows)
+        dist = chord_to_nm(d2)
+        keep = dist <= radius_nm
+        order = np.lexsort((rows[keep], d2[keep]))
+        return rows[keep][order], dist[keep][order]
+
+
+def _grid_join(xyz: np.ndarray, q: np.ndarray, limit: float, chunk: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(query, other, chord^2) for every other point within chord^2 `limit` of the queries q."""
+    cell = math.sqrt(limit)
+    ijk = np.floor(xyz / cell).astype(np.int64) + (int(2.0 / cell) + 2)
+    side = int(ijk.max()) + 2
+    key = (ijk[:, 0] * side + ijk[:, 1]) * side + ijk[:, 2]
+    perm = np.argsort(key, kind="stable")
+    skey = key[perm]
+    # occupied cells: key, first position in perm, point count
+    cell_start = np.flatnonzero(np.r_[True, skey[1:] != skey[:-1]])
+    cell_key = skey[cell_start]
+    cell_count = np.diff(np.append(cell_start, len(skey)))
+    offsets = [(dx * side + dy) * side + dz for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+    q = q[np.argsort(key[q], kind="stable")]
+    out_a, out_b, out_d2 = [], [], []
+    for c0 in range(0, len(q), chunk):
+        qc = q[c0:c0 + chunk]
+        qa, qb = [], []
+        for off in offsets:
+            want = key[qc] + off
+            pos = np.minimum(np.searchsorted(cell_key, want), len(cell_key) - 1)
+            hit = cell_key[pos] == want
+            lo = cell_start[pos]
+            cnt = np.where(hit, cell_count[pos], 0)
+            total = int(cnt.sum())
+            if not total:
+                continue
+            qa.append(np.repeat(qc, cnt))
+            qb.append(perm[np.arange(total) + np.repeat(lo - (np.cumsum(cnt) - cnt), cnt)])
+        if not qa:
+            continue
+        a, b = np.concatenate(qa), np.concatenate(qb)
+        diff = xyz[a] - xyz[b]
+        d2 = np.einsum("ij,ij->i", diff, diff)
+        keep = (a != b) & (d2 <= limit)
+        out_a.append(a[keep])
+        out_b.append(b[keep])
+        out_d2.append(d2[keep])
+    if not out_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    return np.concatenate(out_a), np.concatenate(out_b), np.concatenate(out_d2)
+
+
+def knn_pairs(lat, lon, k: int, max_nm: float, chunk: int = 4096) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Each point's k nearest other points within max_nm, for all points at once.
+
+    Grid joins instead of one tree query per point: unit vectors are binned
+    into cubes with edge = chord(r), so every neighbour within r is in one
+    of the 27 cubes around a point. r starts at max_nm / 8 and doubles;
+    a point is settled once it has k neighbours within r (or r = max_nm),
+    so dense areas never pair up everything within max_nm. Returns
+    (point, neighbour, dist_nm) rows, by point then distance (ties: lower
+    row), the same neighbours SpatialIndex.nearest finds.
+    """
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    empty = np.zeros(0, dtype=np.int64)
+    if len(rows) < 2 or k <= 0 or max_nm <= 0:
+        return empty, empty, np.zeros(0, dtype=np.float64)
+    xyz = unit_vectors(lat[rows], lon[rows])
+
+    out_a, out_b, out_d2 = [], [], []
+    pending = np.arange(len(rows))
+    radius = max_nm / 8.0
+    while len(pending):
+        radius = min(radius, max_nm)
+        final = radius >= max_nm
+        a, b, d2 = _grid_join(xyz, pending, nm_to_chord2(radius) * (1 + 1e-12), chunk)
+        if not final:
+            settled = np.bincount(a, minlength=len(rows))[pending] >= k
+            done = np.zeros(len(rows), dtype=bool)
+            done[pending[settled]] = True
+            sel = done[a]
+            a, b, d2 = a[sel], b[sel], d2[sel]
+            pending = pending[~settled]
+        else:
+            pending = pending[:0]
+        # by point, then distance, then row (stable passes: lexsort is much slower here)
+        order = np.argsort(rows[b], kind="stable")
+        order = order[np.argsort(d2[order], kind="stable")]
+        order = order[np.argsort(a[order], kind="stable")]
+        a, b, d2 = a[order], b[order], d2[order]
+        top = np.arange(len(a)) - np.searchsorted(a, a, side="left") < k
+        out_a.append(a[top])
+        out_b.append(b[top])
+        out_d2.append(d2[top])
+        radius *= 2.0
+    a, b, d2 = np.concatenate(out_a), np.concatenate(out_b), np.concatenate(out_d2)
+    order = np.argsort(a, kind="stable")
+    a, b, d2 = a[order], b[order], d2[order]
+    dist = chord_to_nm(d2)
+    keep = dist <= max_nm
+    return rows[a[keep]], rows[b[keep]], dist[keep]
+
+
+# -----------------------------
+# Process cache
+# -----------------------------
+_CACHE: Dict[str, Tuple[Any, SpatialIndex]] = {}
+_LOCK = threading.Lock()
+
+
+def cached(name: str, version: Any, lat, lon) -> SpatialIndex:
+    """SpatialIndex for a named point set, rebuilt when its version changes."""
+    with _LOCK:
+        hit = _CACHE.get(name)
+        if hit is None or hit[0] != version:
+            hit = _CACHE[name] = (version, SpatialIndex(lat, lon))
+        return hit[1]
@@ -0,0 +1,449 @@
+# ---------------------------------------------------------------
+# Tecnam P2008 JC performance tables — compiled, vectorized lookup
+# ---------------------------------------------------------------
+# The AFM tables (TAKEOFF / LANDING / ROC / VY dicts in the page) are
+# compiled once into NumPy grids. Lookups use searchsorted to find the
+# brackets and the same interpolation order as the page's scalar
+# bilinear / roc_interp / vy_interp (temperature first, then pressure
+# altitude, then weight), so scalar inputs give identical numbers and
+# whole arrays of conditions are evaluated in one call.
+#
+# On top of that, evaluate_runways scores every runway of every
+# aerodrome (AERODROMES_DB) for a weather state in one pass, with the
+# same rules as choose_best_runway, and ranked_table orders the result
+# for dispatch (e.g. picking alternates). departure_windows runs the
+# same evaluator over every forecast hour of the legs at once.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+TEMPS_C = (-25.0, 0.0, 25.0, 50.0)
+ROC_WEIGHTS_KG = (550.0, 600.0, 650.0)
+
+
+def _interp1(x, x0, x1, y0, y1):
+    """Vectorized interp1 from the page (x1 == x0 -> y0; NaN x -> NaN)."""
+    same = x1 == x0
+    t = (x - x0) / np.where(same, 1.0, x1 - x0)
+    return np.where(same & (x == x), y0, y0 + t * (y1 - y0))
+
+
+def _pa_idx(pas: np.ndarray, pa_c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest grid PA <= pa_c and smallest >= pa_c (NaN stays in range and yields NaN)."""
+    n = len(pas) - 1
+    i0 = np.clip(np.searchsorted(pas, pa_c, side="right") - 1, 0, n)
+    i1 = np.clip(np.searchsorted(pas, pa_c, side="left"), 0, n)
+    return i0, i1
+
+
+def _out(v: np.ndarray):
+    return float(v) if np.ndim(v) == 0 else v
+
+
+class PaTempGrid:
+    """Values on a (pressure altitude x temperature) grid, interpolated as in bilinear()."""
+
+    def __init__(self, pas: Sequence[float], values: np.ndarray, temps: Sequence[float] = TEMPS_C):
+        self.pa = np.asarray(pas, dtype=float)
+        self.temp = np.asarray(temps, dtype=float)
+        self.values = np.asarray(values, dtype=float)  # (n_pa, n_temp)
+
+    @classmethod
+    def from_table(cls, table: Dict[int, Dict[Any, Any]], key: Any = None) -> "PaTempGrid":
+        pas = sorted(table.keys())
+        rows = [table[p][key] if key is not None else table[p] for p in pas]
+        return cls(pas, [[row[int(t)] for t in TEMPS_C] for row in rows])
+
+    def brackets(self, pa) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        pa_c = np.clip(np.asarray(pa, dtype=float), self.pa[0], self.pa[-1])
+        return (pa_c,) + _pa_idx(self.pa, pa_c)
+
+    def at(self, pa, temp):
+        pa, temp = np.broadcast_arrays(np.asarray(pa, dtype=float), np.asarray(temp, dtype=float))
+        pa_c, i0, i1 = self.brackets(pa)
+
+        t = np.clip(temp, self.temp[0], self.temp[-1])
+        # t <= 0 -> (-25, 0); t <= 25 -> (0, 25); else (25, 50)
+        j0 = np.minimum(np.searchsorted(self.temp[1:-1], t, side="left"), len(self.temp) - 2)  # NaN -> last bracket
+        j1 = j0 + 1
+        t0, t1 = self.temp[j0], self.temp[j1]
+
+        v0 = _interp1(t, t0, t1, self.values[i0, j0], self.values[i0, j1])
+        v1 = _interp1(t, t0, t1, self.values[i1, j0], self.values[i1, j1])
+        return _out(_interp1(pa_c, self.pa[i0], self.pa[i1], v0, v1))
+
+
+class PaLine:
+    """Values along pressure altitude only (VY)."""
+
+    def __init__(self, table: Dict[int, float]):
+        pas = sorted(table.keys())
+        self.pa = np.array(pas, dtype=float)
+        self.values = np.array([table[p] for p in pas], dtype=float)
+
+    def at(self, pa):
+        pa_c = np.clip(np.asarray(pa, dtype=float), self.pa[0], self.pa[-1])
+        i0, i1 = _pa_idx(self.pa, pa_c)
+        return _out(_interp1(pa_c, self.pa[i0], self.pa[i1], self.values[i0], self.values[i1]))
+
+
+class TecnamPerf:
+    """TAKEOFF / LANDING (GR, 50ft), ROC and VY compiled from the AFM dicts."""
+
+    def __init__(self, takeoff, landing, roc, vy):
+        self.takeoff = {k: PaTempGrid.from_table(takeoff, k) for k in ("GR", "50ft")}
+        self.landing = {k: PaTempGrid.from_table(landing, k) for k in ("GR", "50ft")}
+        self.roc_w = np.array(ROC_WEIGHTS_KG)
+        self.roc_grids = [PaTempGrid.from_table(roc[int(w)]) for w in ROC_WEIGHTS_KG]
+        self.vy_lines = {int(w): PaLine(vy[int(w)]) for w in ROC_WEIGHTS_KG}
+
+    def takeoff_at(self, pa, temp, key: str):
+        return self.takeoff[key].at(pa, temp)
+
+    def landing_at(self, pa, temp, key: str):
+        return self.landing[key].at(pa, temp)
+
+    def roc_at(self, pa, temp, weight):
+        pa, temp, weight = np.broadcast_arrays(
+            np.asarray(pa, dtype=float), np.asarray(temp, dtype=float), np.asarray(weight, dtype=float)
+        )
+        w = np.clip(weight, self.roc_w[0], self.roc_w[-1])
+        r550, r600, r650 = (np.asarray(g.at(pa, temp), dtype=float) for g in self.roc_grids)
+        lo = w <= 600
+        out = np.where(
+            lo,
+            _interp1(w, 550.0, 600.0, r550, r600),
+            _interp1(w, 600.0, 650.0, r600, r650),
+        )
+        return _out(out)
+
+    def vy_at(self, pa, weight):
+        pa, weight = np.broadcast_arrays(np.asarray(pa, dtype=float), np.asarray(weight, dtype=float))
+        # Nearest weight table, as in the page (<=575 -> 550, <=625 -> 600, else 650)
+        out = np.where(
+            weight <= 575, np.asarray(self.vy_lines[550].at(pa)),
+            np.where(weight <= 625, np.asarray(self.vy_lines[600].at(pa)), np.asarray(self.vy_lines[650].at(pa))),
+        )
+        return _out(out)
+
+
+# -----------------------------
+# Runway feasibility (batch)
+# -----------------------------
+def wind_components(qfu_deg, wind_dir_deg, wind_speed) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized wind_components: (headwind, |crosswind|, side) with side 'R'/'L'/''."""
+    qfu, wdir, spd = np.broadcast_arrays(
+        np.asarray(qfu_deg, dtype=float), np.asarray(wind_dir_deg, dtype=float), np.asarray(wind_speed, dtype=float)
+    )
+    diff = ((wdir - qfu + 180) % 360) - 180
+    hw = spd * np.cos(np.radians(diff))
+    cw = spd * np.sin(np.radians(diff))
+    lim = np.abs(spd)
+    hw = np.maximum(-lim, np.minimum(lim, hw))
+    cw = np.maximum(-lim, np.minimum(lim, cw))
+    side = np.where(cw > 0, "R", np.where(cw < 0, "L", ""))
+    return hw, np.abs(cw), side
+
+
+def to_corrections(ground_roll, headwind_kt, paved, slope_pc):
+    gr = np.asarray(ground_roll, dtype=float)
+    hw = np.asarray(headwind_kt, dtype=float)
+    gr = np.where(hw >= 0, gr - 5.0 * hw, gr + 15.0 * np.abs(hw))
+    gr = np.where(paved, gr * 0.90, gr)
+    gr = gr * (1.0 + 0.07 * np.clip(slope_pc, -5.0, 5.0))
+    return np.maximum(gr, 0.0)
+
+
+def ldg_corrections(ground_roll, headwind_kt, paved, slope_pc):
+    gr = np.asarray(ground_roll, dtype=float)
+    hw = np.asarray(headwind_kt, dtype=float)
+    gr = np.where(hw >= 0, gr - 4.0 * hw, gr + 13.0 * np.abs(hw))
+    gr = np.where(paved, gr * 0.90, gr)
+    gr = gr * (1.0 - 0.03 * np.clip(slope_pc, -5.0, 5.0))
+    return np.maximum(gr, 0.0)
+
+
+class RunwayTable:
+    """Every runway of an aerodrome dict (AERODROMES_DB shape) as flat arrays."""
+
+    def __init__(self, aerodromes: Dict[str, Dict[str, Any]]):
+        self.icaos = list(aerodromes.keys())
+        self.names = [aerodromes[k].get("name", k) for k in self.icaos]
+        self.elev_ft = np.array([float(aerodromes[k]["elev_ft"]) for k in self.icaos], dtype=float)
+
+        ad_idx, rws = [], []
+        for n, k in enumerate(self.icaos):
+            for rw in aerodromes[k]["runways"]:
+                ad_idx.append(n)
+                rws.append(rw)
+        self.ad_idx = np.array(ad_idx, dtype=int)
+        self.rw_id = [str(rw["id"]) for rw in rws]
+        self.qfu = np.array([float(rw["qfu"]) for rw in rws], dtype=float)
+        self.toda = np.array([float(rw["toda"]) for rw in rws], dtype=float)
+        self.lda = np.array([float(rw["lda"]) for rw in rws], dtype=float)
+        self.paved = np.array([bool(rw["paved"]) for rw in rws], dtype=bool)
+        self.slope_pc = np.array([float(rw["slope_pc"]) for rw in rws], dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.rw_id)
+
+
+MET_KEYS = ("temp", "qnh", "wind_dir", "wind_kt")
+
+
+def _met_arrays(table: RunwayTable, met) -> Dict[str, np.ndarray]:
+    """met: {temp, qnh, wind_dir, wind_kt} (scalars or per-aerodrome arrays), or {icao: {...}} (missing -> NaN)."""
+    if all(k in met for k in MET_KEYS):
+        # scalars, or arrays with one value per aerodrome entry
+        return {k: np.broadcast_to(np.asarray(met[k], dtype=float), (len(table.icaos),)).copy() for k in MET_KEYS}
+    out = {}
+    for k in MET_KEYS:
+        vals = []
+        for icao in table.icaos:
+            v = (met.get(icao) or {}).get(k)
+            vals.append(np.nan if v is None else float(v))
+        out[k] = np.array(vals, dtype=float)
+    return out
+
+
+def evaluate_runways(perf: TecnamPerf, table: RunwayTable, met, total_weight: float) -> Dict[str, Any]:
+    """Score every runway in one pass; returns column arrays (one entry per runway).
+
+    PA/DA, table distances, ROC and Vy depend only on the aerodrome and are
+    computed once per aerodrome, then gathered onto its runways.
+    "best" marks each aerodrome's pick with the page's rule: feasible
+    first, then most headwind, then least crosswind (first runway on ties).
+    """
+    m = _met_arrays(table, met)
+    pa_ft = table.elev_ft + (1013.0 - m["qnh"]) * 30.0
+    isa_temp = 15.0 - 2.0 * (table.elev_ft / 1000.0)
+    da_ft = pa_ft + (120.0 * (m["temp"] - isa_temp))
+
+    ad = {
+        "to_gr": perf.takeoff_at(pa_ft, m["temp"], "GR"),
+        "to_50": perf.takeoff_at(pa_ft, m["temp"], "50ft"),
+        "ldg_gr": perf.landing_at(pa_ft, m["temp"], "GR"),
+        "ldg_50": perf.landing_at(pa_ft, m["temp"], "50ft"),
+    }
+    w = float(total_weight or 0.0)
+    zeros = np.zeros(len(table.icaos))
+    ad["roc"] = np.asarray(perf.roc_at(pa_ft, m["temp"], w)) if w > 0 else zeros
+    ad["vy"] = np.asarray(perf.vy_at(pa_ft, w)) if w > 0 else zeros
+
+    i = table.ad_idx
+    hw, xw_abs, side = wind_components(table.qfu, m["wind_dir"][i], m["wind_kt"][i])
+    to_50, ldg_50 = np.asarray(ad["to_50"])[i], np.asarray(ad["ldg_50"])[i]
+    feasible = (to_50 <= table.toda) & (ldg_50 <= table.lda)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_todr = np.where(table.toda > 0, to_50 / table.toda * 100, 0.0)
+        pct_ldr = np.where(table.lda > 0, ldg_50 / table.lda * 100, 0.0)
+
+    # Per-aerodrome pick: sort by aerodrome, then the page's key (desc), then runway order
+    n = len(table)
+    order = np.lexsort((np.arange(n), xw_abs, -np.nan_to_num(hw, nan=-np.inf), ~feasible, i))
+    first = np.ones(n, dtype=bool)
+    first[1:] = i[order][1:] != i[order][:-1]
+    best = np.zeros(n, dtype=bool)
+    best[order[first]] = True
+
+    return {
+        "ad_idx": i,
+        "icao": [table.icaos[k] for k in i],
+        "name": [table.names[k] for k in i],
+        "elev_ft": table.elev_ft[i],
+        "id": table.rw_id,
+        "qfu": table.qfu,
+        "toda_av": table.toda,
+        "lda_av": table.lda,
+        "paved": table.paved,
+        "slope_pc": table.slope_pc,
+        "hw_comp": hw,
+        "xw_abs": xw_abs,
+        "xw_side": side,
+        "to_gr": to_corrections(np.asarray(ad["to_gr"])[i], hw, table.paved, table.slope_pc),
+        "to_50": to_50,
+        "ldg_gr": ldg_corrections(np.asarray(ad["ldg_gr"])[i], hw, table.paved, table.slope_pc),
+        "ldg_50": ldg_50,
+        "feasible": feasible,
+        "pa_ft": pa_ft[i],
+        "da_ft": da_ft[i],
+        "pct_todr": pct_todr,
+        "pct_ldr": pct_ldr,
+        "roc": ad["roc"][i],
+        "vy": ad["vy"][i],
+        "best": best,
+    }
+
+
+def _py(v):
+    if isinstance(v, np.bool_):
+        return bool(v)
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.floating):
+        return float(v)
+    if isinstance(v, np.str_):
+        return str(v)
+    return v
+
+
+def runway_rows(cols: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Column arrays -> list of plain-Python row dicts (runway order)."""
+    keys = [k for k in cols if k != "ad_idx"]
+    n = len(cols["id"])
+    return [{k: _py(cols[k][r]) for k in keys} for r in range(n)]
+
+
+def ranked_table(cols: Dict[str, Any], best_only: bool = True) -> List[Dict[str, Any]]:
+    """Rows ranked for dispatch: feasible first, then lowest worst-case % of TODA/LDA, then most headwind."""
+    rows = runway_rows(cols)
+    if best_only:
+        rows = [r for r in rows if r["best"]]
+
+    def key(r):
+        worst = max(r["pct_todr"], r["pct_ldr"])
+        hw = r["hw_comp"]
+        # NaN (no MET for that aerodrome) sorts last
+        return (not r["feasible"], worst if worst == worst else float("inf"), -hw if hw == hw else float("inf"))
+
+    rows.sort(key=key)
+    for n, r in enumerate(rows, start=1):
+        r["rank"] = n
+    return rows
+
+
+# -----------------------------
+# Departure window (forecast hours)
+# -----------------------------
+HOUR_MS = 3600 * 1000
+
+DEFAULT_LIMITS = {
+    "xw_max": 15.0,   # kt, crosswind (end of the yellow band)
+    "tw_max": 0.0,    # kt, tailwind on the best runway
+    "max_pct": 100.0, # % of TODA / LDA
+}
+
+
+def met_series(fc) -> Dict[str, np.ndarray]:
+    """All hours of a forecast.HourlyForecast as arrays, rounded exactly like
+    om_unpack_at. Missing values are NaN."""
+    return {
+        "ts": fc.ts_ms,
+        "wind_dir": np.round(fc.wind_dir),
+        "wind_kt": np.round(fc.wind_kt),
+        "gust_kt": np.round(fc.gust_kt),
+        "temp": np.round(fc.temp.astype(float)),
+        "qnh": np.round(fc.qnh.astype(float)),
+    }
+
+
+def xw_band(xw_abs, green_max: float, yellow_max: float) -> np.ndarray:
+    """Vectorized xw_class: 'green' / 'yellow' / 'red' ('' without data)."""
+    xw = np.asarray(xw_abs, dtype=float)
+    return np.where(xw != xw, "", np.where(xw <= green_max, "green", np.where(xw <= yellow_max, "yellow", "red")))
+
+
+def fmt_wind(wind_dir: float, wind_kt: float) -> str:
+    """'DDD/KK', or '---' when either value is missing (NaN)."""
+    if wind_dir != wind_dir or wind_kt != wind_kt:
+        return "---"
+    return f"{int(wind_dir):03d}/{int(wind_kt):02d}"
+
+
+def departure_windows(
+    perf: TecnamPerf,
+    legs: Sequence[Tuple[str, Dict[str, Any], Dict[str, Any]]],
+    offsets_h: Sequence[float],
+    total_weight: float,
+    limits: Dict[str, float] = DEFAULT_LIMITS,
+    xw_bands: Tuple[float, float] = (8.0, 15.0),
+) -> Dict[str, Any]:
+    """Every departure hour of legs[0]'s forecast, with each leg checked at its own hour.
+
+    legs: (label, aerodrome dict, HourlyForecast) per leg; leg k is
+    evaluated at departure + offsets_h[k]. All legs x hours x runways go
+    through evaluate_runways in one call, and each leg uses its best
+    runway for that hour. Returns {"rows": one per departure hour,
+    "windows": [(first_ts, last_ts, n_hours)] of consecutive passing hours}.
+    """
+    series = [met_series(resp) for _, _, resp in legs]
+    dep_ts = series[0]["ts"]
+    n_h, n_l = len(dep_ts), len(legs)
+    if n_h == 0:
+        return {"rows": [], "windows": []}
+
+    # Leg met at departure + offset (NaN where the forecast has no such hour)
+    met = {k: np.full((n_l, n_h), np.nan) for k in MET_KEYS}
+    for li, ser in enumerate(series):
+        if not len(ser["ts"]):
+            continue
+        target = dep_ts + int(round(float(offsets_h[li]) * HOUR_MS))
+        pos = np.clip(np.searchsorted(ser["ts"], target), 0, len(ser["ts"]) - 1)
+        hit = ser["ts"][pos] == target
+        for k in MET_KEYS:
+            met[k][li] = np.where(hit, ser[k][pos], np.nan)
+
+    table = RunwayTable({f"{li}|{h}": legs[li][1] for li in range(n_l) for h in range(n_h)})
+    cols = evaluate_runways(perf, table, {k: met[k].ravel() for k in MET_KEYS}, total_weight)
+
+    b = np.flatnonzero(cols["best"])
+    entry = cols["ad_idx"][b]  # = leg * n_h + hour
+    shape = (n_l, n_h)
+
+    def per_leg(key, fill=np.nan, dtype=float):
+        out = np.full(shape, fill, dtype=dtype)
+        out.ravel()[entry] = np.asarray(cols[key])[b]
+        return out
+
+    hw, xw = per_leg("hw_comp"), per_leg("xw_abs")
+    pct_to, pct_ld = per_leg("pct_todr"), per_leg("pct_ldr")
+    rwy = per_leg("id", "", object)
+    side = per_leg("xw_side", "", object)
+
+    with np.errstate(invalid="ignore"):
+        leg_ok = (
+            (xw <= limits["xw_max"])
+            & (hw >= -limits["tw_max"])
+            & (pct_to <= limits["max_pct"])
+            & (pct_ld <= limits["max_pct"])
+        )
+    # An hour without temperature or wind for some leg never passes.
+    no_met = np.isnan(met["temp"]) | np.isnan(met["wind_dir"]) | np.isnan(met["wind_kt"])
+    leg_ok &= ~no_met
+    hour_ok = leg_ok.all(axis=0)
+    band = xw_band(xw, *xw_bands)
+
+    rows = []
+    for h in range(n_h):
+        row = {"ts": int(dep_ts[h]), "ok": bool(hour_ok[h])}
+        for li, (label, _, _) in enumerate(legs):
+            if np.isnan(met["temp"][li, h]):
+                row[label] = None
+                continue
+            row[label] = {
+                "rwy": rwy[li, h],
+                "hw": float(hw[li, h]),
+                "xw": float(xw[li, h]),
+                "xw_side": side[li, h],
+                "xw_band": str(band[li, h]),
+                "pct_todr": float(pct_to[li, h]),
+                "pct_ldr": float(pct_ld[li, h]),
+                "ok": bool(leg_ok[li, h]),
+                "wind": fmt_wind(met["wind_dir"][li, h], met["wind_kt"][li, h]),
+            }
+        rows.append(row)
+
+    windows = []
+    start = None
+    for h in range(n_h + 1):
+        ok = h < n_h and hour_ok[h]
+        if ok and start is None:
+            start = h
+        elif not ok and start is not None:
+            windows.append((int(dep_ts[start]), int(dep_ts[h - 1]), h - start))
+            start = None
+    return {"rows": rows, "windows": windows}
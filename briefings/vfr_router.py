@@ -0,0 +1,224 @@
+# ---------------------------------------------------------------
+# VFR router — shortest / fastest route over reference points
+# ---------------------------------------------------------------
+# Graph: each reference point (AD, Localidades, ...) is joined to its
+# `neighbours` nearest points within `max_leg_nm` (spatial.knn_pairs,
+# one vectorized grid join), both directions. Built once per point set
+# and kept per process; what changes between queries is cheap:
+#   - avoided airspaces -> edge mask. AirspaceIndex tests every edge
+#     against a polygon only when their bounding boxes overlap, then
+#     checks edge/side crossings and "midpoint inside" in lon/lat
+#     (legs are short, so straight lines there are close enough to the
+#     great circle);
+#   - costs -> distance, or time from the same wind triangle as the
+#     NavLog page, vectorized over the directed edges.
+# Search is A* over the CSR adjacency; the heuristic is great-circle
+# distance to the destination (or that distance at TAS + wind speed),
+# never more than the true remaining cost.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from briefings import geo, spatial
+
+MAX_LEG_NM = 30.0
+NEIGHBOURS = 12
+
+
+class AirspaceIndex:
+    """Closed lat/lon polygons with per-polygon bounding boxes for edge tests."""
+
+    def __init__(self, polygons: Sequence[Sequence[Tuple[float, float]]]):
+        self.rings: List[np.ndarray] = []
+        for coords in polygons:
+            ring = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+            if len(ring) < 3:
+                continue
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            self.rings.append(ring)
+        self.box = np.array([[r[:, 0].min(), r[:, 1].min(), r[:, 0].max(), r[:, 1].max()] for r in self.rings]).reshape(-1, 4)
+
+    def __len__(self) -> int:
+        return len(self.rings)
+
+    @staticmethod
+    def _inside(ring: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        # Ray casting along +lon.
+        y1, x1, y2, x2 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+        lat, lon = lat[:, None], lon[:, None]
+        spans = (y1 > lat) != (y2 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+        return np.count_nonzero(spans & (lon < x_cross), axis=1) % 2 == 1
+
+    @staticmethod
+    def _crosses(ring: np.ndarray, lat1, lon1, lat2, lon2) -> np.ndarray:
+        y3, x3, y4, x4 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+        y1, x1, y2, x2 = lat1[:, None], lon1[:, None], lat2[:, None], lon2[:, None]
+
+        def orient(ax, ay, bx, by, cx, cy):
+            return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+        o1, o2 = orient(x1, y1, x2, y2, x3, y3), orient(x1, y1, x2, y2, x4, y4)
+        o3, o4 = orient(x3, y3, x4, y4, x1, y1), orient(x3, y3, x4, y4, x2, y2)
+        return ((o1 * o2 < 0) & (o3 * o4 < 0)).any(axis=1)
+
+    def blocked(self, lat1, lon1, lat2, lon2) -> np.ndarray:
+        """True for each segment that crosses or lies inside any polygon."""
+        lat1, lon1, lat2, lon2 = (np.asarray(a, dtype=np.float64) for a in (lat1, lon1, lat2, lon2))
+        out = np.zeros(len(lat1), dtype=bool)
+        lat_lo, lat_hi = np.minimum(lat1, lat2), np.maximum(lat1, lat2)
+        lon_lo, lon_hi = np.minimum(lon1, lon2), np.maximum(lon1, lon2)
+        for ring, (b_lat0, b_lon0, b_lat1, b_lon1) in zip(self.rings, self.box):
+            cand = np.flatnonzero(~out & (lat_hi >= b_lat0) & (lat_lo <= b_lat1) & (lon_hi >= b_lon0) & (lon_lo <= b_lon1))
+            if not len(cand):
+                continue
+            hit = self._crosses(ring, lat1[cand], lon1[cand], lat2[cand], lon2[cand])
+            rest = cand[~hit]
+            if len(rest):
+                hit[~hit] = self._inside(ring, (lat1[rest] + lat2[rest]) / 2, (lon1[rest] + lon2[rest]) / 2)
+            out[cand[hit]] = True
+        return out
+
+    def contains(self, lat, lon) -> np.ndarray:
+        lat, lon = np.atleast_1d(np.asarray(lat, dtype=np.float64)), np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        out = np.zeros(len(lat), dtype=bool)
+        for ring in self.rings:
+            out |= self._inside(ring, lat, lon)
+        return out
+
+
+@dataclass
+class VfrRoute:
+    rows: List[int]        # point rows, start to end
+    dist_nm: float
+    time_h: float          # NaN when routed without an airspeed
+
+
+class VfrRouter:
+    def __init__(self, lat, lon, max_leg_nm: float = MAX_LEG_NM, neighbours: int = NEIGHBOURS, version: Any = None):
+        self.version = version
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.max_leg_nm = float(max_leg_nm)
+        a, b, _ = spatial.knn_pairs(self.lat, self.lon, neighbours, self.max_leg_nm)
+        pairs = np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1)
+        if len(pairs):
+            pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+            pairs = pairs[np.r_[True, (np.diff(pairs, axis=0) != 0).any(axis=1)]]
+        # directed edges (a -> b and b -> a), grouped by source for CSR
+        src = np.concatenate([pairs[:, 0], pairs[:, 1]]).astype(np.int64)
+        dst = np.concatenate([pairs[:, 1], pairs[:, 0]]).astype(np.int64)
+        order = np.argsort(src, kind="stable")
+        self.edge_src, self.edge_dst = src[order], dst[order]
+        self.edge_pair = np.concatenate([np.arange(len(pairs)), np.arange(len(pairs))])[order]
+        self.edge_dist = geo.gc_dist_nm(self.lat[self.edge_src], self.lon[self.edge_src], self.lat[self.edge_dst], self.lon[self.edge_dst])
+        self.edge_tc = geo.gc_course_tc(self.lat[self.edge_src], self.lon[self.edge_src], self.lat[self.edge_dst], self.lon[self.edge_dst])
+        self.pairs = pairs
+        self.offsets = np.searchsorted(self.edge_src, np.arange(len(self.lat) + 1)).astype(np.int64)
+        self._masks: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def blocked(self, airspaces: AirspaceIndex, key: Any = None) -> np.ndarray:
+        """Directed-edge mask of legs through the airspaces (cached by key when given)."""
+        if key is not None and key in self._masks:
+            return self._masks[key]
+        a, b = self.pairs[:, 0], self.pairs[:, 1]
+        by_pair = airspaces.blocked(self.lat[a], self.lon[a], self.lat[b], self.lon[b]) if len(airspaces) and len(self.pairs) else np.zeros(len(self.pairs), dtype=bool)
+        mask = by_pair[self.edge_pair]
+        if key is not None:
+            if len(self._masks) > 32:
+                self._masks.clear()
+            self._masks[key] = mask
+        return mask
+
+    def route(
+        self,
+        start: int,
+        end: int,
+        airspaces: Optional[AirspaceIndex] = None,
+        airspace_key: Any = None,
+        tas_kt: Optional[float] = None,
+        wind_from: float = 0.0,
+        wind_kt: float = 0.0,
+    ) -> Tuple[Optional[VfrRoute], str]:
+        """Shortest route (or fastest, when tas_kt is given) from row start to row end."""
+        n = len(self)
+        if not (0 <= start < n and 0 <= end < n):
+            return None, "Ponto fora do catálogo."
+        if start == end:
+            return VfrRoute([start], 0.0, 0.0 if tas_kt else math.nan), ""
+
+        ok = ~self.blocked(airspaces, airspace_key) if airspaces is not None else np.ones(len(self.edge_src), dtype=bool)
+        to_end = geo.gc_dist_nm(self.lat, self.lon, self.lat[end], self.lon[end])
+        if tas_kt:
+            _, _, gs = geo.wind_triangle(self.edge_tc, float(tas_kt), float(wind_from), float(wind_kt))
+            ok &= gs > 0
+            with np.errstate(divide="ignore"):
+                cost = self.edge_dist / gs
+            h = to_end / (float(tas_kt) + abs(float(wind_kt)))
+        else:
+            cost = self.edge_dist
+            h = to_end
+
+        offsets, dst, cost, h, ok = self.offsets.tolist(), self.edge_dst.tolist(), cost.tolist(), h.tolist(), ok.tolist()
+        best = {start: 0.0}
+        via: Dict[int, int] = {}
+        heap = [(h[start], 0.0, start)]
+        done = set()
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if u == end:
+                break
+            done.add(u)
+            for e in range(offsets[u], offsets[u + 1]):
+                if not ok[e]:
+                    continue
+                v = dst[e]
+                g2 = g + cost[e]
+                if g2 < best.get(v, math.inf):
+                    best[v] = g2
+                    via[v] = e
+                    heapq.heappush(heap, (g2 + h[v], g2, v))
+        if end not in best:
+            return None, "Sem rota que evite as áreas selecionadas (ou pernas acima do máximo)."
+
+        edges = []
+        node = end
+        while node != start:
+            edges.append(via[node])
+            node = int(self.edge_src[via[node]])
+        edges.reverse()
+        rows = [start] + [int(self.edge_dst[e]) for e in edges]
+        dist = float(self.edge_dist[edges].sum())
+        return VfrRoute(rows, dist, float(best[end]) if tas_kt else math.nan), ""
+
+
+# -----------------------------
+# Process cache
+# -----------------------------
+_CACHE: Dict[str, VfrRouter] = {}
+_LOCK = threading.Lock()
+
+
+def cached(name: str, version: Any, lat, lon, max_leg_nm: float = MAX_LEG_NM, neighbours: int = NEIGHBOURS) -> VfrRouter:
+    """VfrRouter for a named point set, rebuilt when its version or graph parameters change."""
+    key = (version, float(max_leg_nm), int(neighbours))
+    with _LOCK:
+        router = _CACHE.get(name)
+        if router is None or router.version != key:
+            router = _CACHE[name] = VfrRouter(lat, lon, max_leg_nm, neighbours, version=key)
+        return router
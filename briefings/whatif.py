@@ -0,0 +1,178 @@
+# ---------------------------------------------------------------
+# What-if planner — one route under many wind / TAS / fuel scenarios
+# ---------------------------------------------------------------
+# NumPy version of the navlog arithmetic of pages/teste.py
+# (route_segment, leg_core, propagate_legs) that reads nothing from the
+# session: the route comes in as its user legs (RoutePlan) and every
+# scenario parameter is an array over scenarios. TOC / TOD move with
+# the wind the way route_segment places them, and the page's rounding
+# steps are applied at the same points, so the scenario equal to the
+# page setup gives the navlog totals.
+#
+# Winds are given per level; a leg flies the wind of the level nearest
+# to the altitude it starts at (one level = the same wind everywhere).
+# Shapes: S scenarios, K user legs, L wind levels. Leg times and burns
+# are (S, K) arrays; only the EFOB carry (rounded and floored at zero
+# leg by leg, as in the navlog) loops over K, on (S,) vectors.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from briefings import geo
+
+
+def _f(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _round(x, step: float) -> np.ndarray:
+    # round_to_step of the pages (half to even, like Python's round).
+    return np.round(_f(x) / step) * step if step > 0 else _f(x)
+
+
+@dataclass
+class RoutePlan:
+    """User legs A -> B of a route in flight order (arrays of length K)."""
+
+    lat_a: np.ndarray
+    lon_a: np.ndarray
+    lat_b: np.ndarray
+    lon_b: np.ndarray
+    dist_nm: np.ndarray    # leg length (arc / turn length on those legs)
+    tc: np.ndarray         # true course of the leg's wind triangle
+    alt_a: np.ndarray
+    alt_b: np.ndarray
+    vnav: np.ndarray       # TOC / TOD may be placed inside the leg
+    hold_min: np.ndarray   # stop at B
+    roc_fpm: float
+    rod_fpm: float
+
+    def __post_init__(self) -> None:
+        for name in ("lat_a", "lon_a", "lat_b", "lon_b", "dist_nm", "tc", "alt_a", "alt_b", "hold_min"):
+            setattr(self, name, _f(getattr(self, name)).reshape(-1))
+        self.vnav = np.asarray(self.vnav, dtype=bool).reshape(-1)
+
+    def __len__(self) -> int:
+        return len(self.dist_nm)
+
+
+class Scenarios:
+    """S scenarios; per-scenario values broadcast to (S,), winds to (S, L) over levels_ft."""
+
+    def __init__(
+        self,
+        wind_from,
+        wind_kt,
+        climb_tas,
+        cruise_tas,
+        descent_tas,
+        fuel_flow_lh,
+        start_efob,
+        taxi_fuel_l=0.0,
+        levels_ft: Optional[Iterable[float]] = None,
+    ):
+        self.levels_ft = _f([0.0] if levels_ft is None else list(levels_ft)).reshape(-1)
+        # winds: scalar / (S,) = same wind at every level, or (S, L)
+        wf, wk = (np.atleast_1d(_f(w)) for w in (wind_from, wind_kt))
+        wf, wk = (w[:, None] if w.ndim == 1 else w for w in (wf, wk))
+        per_scenario = [_f(v) for v in (climb_tas, cruise_tas, descent_tas, fuel_flow_lh, start_efob, taxi_fuel_l)]
+        shape = np.broadcast_shapes(*(v.shape for v in per_scenario), wf.shape[:1], wk.shape[:1])
+        n = shape[0] if shape else 1
+        (self.climb_tas, self.cruise_tas, self.descent_tas, self.fuel_flow_lh,
+         self.start_efob, self.taxi_fuel_l) = (np.broadcast_to(v, (n,)).astype(np.float64) for v in per_scenario)
+        self.wind_from = np.broadcast_to(wf, (n, len(self.levels_ft))).astype(np.float64)
+        self.wind_kt = np.broadcast_to(wk, (n, len(self.levels_ft))).astype(np.float64)
+
+    def __len__(self) -> int:
+        return len(self.cruise_tas)
+
+    def wind_at(self, alt_ft) -> Tuple[np.ndarray, np.ndarray]:
+        """(wind from, kt) at altitudes of shape (K,) or (S, K), as (S, K)."""
+        alt = _f(alt_ft)
+        lvl = np.abs(alt[..., None] - self.levels_ft).argmin(axis=-1)
+        lvl = np.broadcast_to(lvl, (len(self),) + lvl.shape[-1:])
+        return np.take_along_axis(self.wind_from, lvl, axis=1), np.take_along_axis(self.wind_kt, lvl, axis=1)
+
+
+@dataclass
+class WhatIfResult:
+    ete_sec: np.ndarray     # (S,) flight time, holds included
+    burn_l: np.ndarray      # (S,)
+    efob_end: np.ndarray    # (S,) EFOB at the last waypoint
+    dist_nm: np.ndarray     # (S,) distance, hold distance included
+
+    def __len__(self) -> int:
+        return len(self.ete_sec)
+
+
+def _legs(d_raw, tc, alt_from, alt_to, sc: Scenarios, steps: Tuple[float, float, float]):
+    # leg_core for (S, K) legs: (rounded distance, GS, ETE, burn).
+    step_d, step_t, step_f = steps
+    climb, descent, cruise = sc.climb_tas[:, None], sc.descent_tas[:, None], sc.cruise_tas[:, None]
+    tas = np.where(alt_to > alt_from + 1, climb, np.where(alt_to < alt_from - 1, descent, cruise))
+    wf, wk = sc.wind_at(alt_from)
+    _, _, gs = geo.wind_triangle(tc, tas, wf, wk)
+    dist = _round(d_raw, step_d)
+    fly = (gs > 0) & (dist > 0)
+    ete = np.where(fly, _round(dist / np.where(fly, gs, 1.0) * 3600.0, step_t), 0.0)
+    burn = _round(sc.fuel_flow_lh[:, None] * ete / 3600.0, step_f)
+    return dist, gs, ete, burn
+
+
+def evaluate(plan: RoutePlan, sc: Scenarios, steps: Tuple[float, float, float] = (0.0, 0.0, 0.0)) -> WhatIfResult:
+    """ETE, burn and final EFOB of the route for every scenario.
+
+    steps are the page's rounding steps (distance NM, time s, fuel L);
+    0 leaves a value unrounded.
+    """
+    S, K = len(sc), len(plan)
+    step_d, step_t, step_f = steps
+    efob = np.maximum(0.0, sc.start_efob - sc.taxi_fuel_l)
+    if not K:
+        zero = np.zeros(S)
+        return WhatIfResult(zero.astype(np.int64), zero, efob, zero)
+
+    # TOC / TOD: where route_segment puts them for each scenario's wind.
+    alt_a, alt_b, dist, tc = plan.alt_a, plan.alt_b, plan.dist_nm, plan.tc
+    climbs, descends = alt_b > alt_a, alt_b < alt_a
+    wf, wk = sc.wind_at(alt_a)
+    _, _, gs_climb = geo.wind_triangle(tc, sc.climb_tas[:, None], wf, wk)
+    _, _, gs_desc = geo.wind_triangle(tc, sc.descent_tas[:, None], wf, wk)
+    t_min = np.where(climbs, (alt_b - alt_a) / max(float(plan.roc_fpm), 1.0), (alt_a - alt_b) / max(float(plan.rod_fpm), 1.0))
+    need = np.where(climbs, gs_climb, gs_desc) * t_min / 60.0
+    split = plan.vnav & (climbs | descends) & (need > 0.05) & (need < dist - 0.05)
+    at = np.where(climbs, need, _round(np.maximum(0.0, dist - need), step_d))
+
+    # Split point geometry only where there is a split.
+    si, ki = np.nonzero(split)
+    la, lo, lb, lob = plan.lat_a[ki], plan.lon_a[ki], plan.lat_b[ki], plan.lon_b[ki]
+    p_lat, p_lon = geo.point_along_gc(la, lo, lb, lob, at[si, ki])
+    d1, tc1 = np.zeros((S, K)), np.zeros((S, K))
+    d2, tc2 = np.tile(dist, (S, 1)), np.tile(tc, (S, 1))
+    d1[si, ki], tc1[si, ki] = geo.gc_dist_nm(la, lo, p_lat, p_lon), geo.gc_course_tc(la, lo, p_lat, p_lon)
+    d2[si, ki], tc2[si, ki] = geo.gc_dist_nm(p_lat, p_lon, lb, lob), geo.gc_course_tc(p_lat, p_lon, lb, lob)
+
+    # A -> TOC/TOD (zero length where not split), then TOC/TOD -> B or the whole leg.
+    p_alt = np.where(climbs, alt_b, alt_a)
+    dist1, _, ete1, burn1 = _legs(d1, tc1, alt_a, p_alt, sc, steps)
+    dist2, gs2, ete2, burn2 = _legs(d2, tc2, np.where(split, p_alt, alt_a), alt_b, sc, steps)
+
+    hold_sec = np.where(plan.hold_min > 0, _round(plan.hold_min * 60.0, step_t), 0.0)
+    hold_burn = np.where(hold_sec > 0, _round(sc.fuel_flow_lh[:, None] * hold_sec / 3600.0, step_f), 0.0)
+    hold_dist = np.where((hold_sec > 0) & (gs2 > 0), _round(gs2 * hold_sec / 3600.0, step_d), 0.0)
+
+    # EFOB carried leg by leg like propagate_legs (rounded, never below zero).
+    for k in range(K):
+        carried = np.maximum(0.0, _round(np.maximum(0.0, _round(efob - burn1[:, k], step_f)), step_f))
+        efob = np.where(split[:, k], carried, efob)
+        efob = np.maximum(0.0, _round(np.maximum(0.0, _round(efob - burn2[:, k], step_f)) - hold_burn[:, k], step_f))
+
+    ete = (ete1 + ete2 + hold_sec).sum(axis=1)
+    burn = _round((burn1 + burn2 + hold_burn).sum(axis=1), step_f)
+    total = _round((dist1 + dist2 + hold_dist).sum(axis=1), step_d)
+    return WhatIfResult(np.rint(ete).astype(np.int64), burn, efob, total)
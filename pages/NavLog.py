@@ -11,12 +11,14 @@
 
 import streamlit as st
 import pandas as pd
-import folium, math, re, datetime as dt, difflib, os, json, requests
+import folium, math, re, datetime as dt, difflib, os
 from streamlit_folium import st_folium
 from folium.plugins import Fullscreen, MarkerCluster
 from math import degrees
 from pdfrw import PdfReader, PdfWriter, PdfDict, PdfName
 
+from briefings import refdata, route_store, spatial, vfr_router
+
 # ========= CONSTANTES =========
 TEMPLATE_MAIN = "NAVLOG_FORM.pdf"
 TEMPLATE_CONT = "NAVLOG_FORM_1.pdf"
@@ -543,121 +545,32 @@ with st.form("globals"):
 st.markdown("<div class='sep'></div>", unsafe_allow_html=True)
 
 # ========= CSVs =========
-AD_CSV  = "AD-HEL-ULM.csv"
-LOC_CSV = "Localidades-Nova-versao-230223.csv"
-VOR_CSV = "NAVAIDS_VOR.csv"
-
-def dms_to_dd(token: str, is_lon=False):
-    token = str(token).strip()
-    m = re.match(r"^(\d+(?:\.\d+)?)([NSEW])$", token, re.I)
-    if not m: return None
-    value, hemi = m.groups()
-    if "." in value:
-        if is_lon:
-            deg = int(value[0:3]); minutes = int(value[3:5]); seconds = float(value[5:])
-        else:
-            deg = int(value[0:2]); minutes = int(value[2:4]); seconds = float(value[4:])
-    else:
-        if is_lon:
-            deg = int(value[0:3]); minutes = int(value[3:5]); seconds = int(value[5:])
-        else:
-            deg = int(value[0:2]); minutes = int(value[2:4]); seconds = int(value[4:])
-    dd = deg + minutes/60 + seconds/3600
-    if hemi.upper() in ["S","W"]: dd = -dd
-    return dd
-
-def parse_ad_df(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for line in df.iloc[:,0].dropna().tolist():
-        s = str(line).strip()
-        if not s or s.startswith(("Ident", "DEP/")): continue
-        tokens = s.split()
-        coord_toks = [t for t in tokens if re.match(r"^\d+(?:\.\d+)?[NSEW]$", t)]
-        if len(coord_toks) >= 2:
-            lat_tok = coord_toks[-2]; lon_tok = coord_toks[-1]
-            lat = dms_to_dd(lat_tok, is_lon=False)
-            lon = dms_to_dd(lon_tok, is_lon=True)
-            ident = tokens[0] if re.match(r"^[A-Z0-9]{4,}$", tokens[0]) else None
-            try:
-                name = " ".join(tokens[1:tokens.index(coord_toks[0])]).strip()
-            except:
-                name = " ".join(tokens[1:]).strip()
-            try:
-                lon_idx = tokens.index(lon_tok)
-                city = " ".join(tokens[lon_idx+1:]) or None
-            except:
-                city = None
-            rows.append({
-                "src":"AD","code":ident or name,"name":name,"city":city,
-                "lat":lat,"lon":lon,"alt":0.0
-            })
-    return pd.DataFrame(rows).dropna(subset=["lat","lon"])
-
-def parse_loc_df(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for line in df.iloc[:,0].dropna().tolist():
-        s = str(line).strip()
-        if not s or "Total de registos" in s: continue
-        tokens = s.split()
-        coord_toks = [t for t in tokens if re.match(r"^\d{6,7}(?:\.\d+)?[NSEW]$", t)]
-        if len(coord_toks) >= 2:
-            lat_tok, lon_tok = coord_toks[0], coord_toks[1]
-            lat = dms_to_dd(lat_tok, is_lon=False)
-            lon = dms_to_dd(lon_tok, is_lon=True)
-            try:
-                lon_idx = tokens.index(lon_tok)
-            except ValueError:
-                continue
-            code = tokens[lon_idx+1] if lon_idx+1 < len(tokens) else None
-            sector = " ".join(tokens[lon_idx+2:]) if lon_idx+2 < len(tokens) else None
-            name = " ".join(tokens[:tokens.index(lat_tok)]).strip()
-            rows.append({
-                "src":"LOC","code":code or name,"name":name,"sector":sector,
-                "lat":lat,"lon":lon,"alt":0.0
-            })
-    return pd.DataFrame(rows).dropna(subset=["lat","lon"])
-
+# AD-HEL-ULM / Localidades / VOR: parsed once per process (briefings.refdata)
 try:
-    ad_raw  = pd.read_csv(AD_CSV)
-    ad_df   = parse_ad_df(ad_raw)
-    loc_raw = pd.read_csv(LOC_CSV)
-    loc_df  = parse_loc_df(loc_raw)
+    _ref = refdata.load()
+    _ad = refdata.ad_frame(data=_ref)
+    ad_df = pd.DataFrame({
+        "src": "AD", "code": _ad["ident"].fillna(_ad["name"]), "name": _ad["name"],
+        "city": _ad["city"], "lat": _ad["lat"], "lon": _ad["lon"], "alt": 0.0,
+    })
+    _loc = refdata.loc_frame(data=_ref)
+    loc_df = pd.DataFrame({
+        "src": "LOC", "code": _loc["code"].fillna(_loc["name"]), "name": _loc["name"],
+        "sector": _loc["sector"], "lat": _loc["lat"], "lon": _loc["lon"], "alt": 0.0,
+    })
 except Exception:
     ad_df  = pd.DataFrame(columns=["src","code","name","city","lat","lon","alt"])
     loc_df = pd.DataFrame(columns=["src","code","name","sector","lat","lon","alt"])
     st.warning("Não foi possível ler os CSVs locais.")
 
-def _load_vor_db(path: str) -> pd.DataFrame:
-    if os.path.exists(path):
-        try:
-            df = pd.read_csv(path)
-            df = df.rename(columns={c: c.lower() for c in df.columns})
-            df["ident"] = df["ident"].astype(str).str.upper().str.strip()
-            df["freq_mhz"] = pd.to_numeric(df["freq_mhz"], errors="coerce")
-            df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-            df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-            df["name"] = df.get("name","")
-            df = df.dropna(subset=["ident","freq_mhz","lat","lon"]).reset_index(drop=True)
-            return df[["ident","name","freq_mhz","lat","lon"]]
-        except Exception:
-            pass
+if "vor_db" not in st.session_state:
+    st.session_state.vor_db = refdata.vor_frame()
 
-    fallback = [
-        ("CAS", "Cascais DVOR/DME", 114.30, 38.7483, -9.3619),
-        ("ESP", "Espichel DVOR/DME", 112.50, 38.4242, -9.1856),
-        ("VFA", "Faro DVOR/DME",     112.80, 37.0136, -7.9750),
-        ("FTM", "Fátima DVOR/DME",   113.50, 39.6656, -8.4928),
-        ("LIS", "Lisboa DVOR/DME",   114.80, 38.8878, -9.1628),
-        ("NSA", "Nisa DVOR/DME",     115.50, 39.5647, -7.9147),
-        ("PRT", "Porto DVOR/DME",    114.10, 41.2731, -8.6878),
-        ("SGR", "Sagres VOR/DME",    113.90, 37.0839, -8.94639),
-        ("SRA", "Sintra VORTAC",     112.10, 38.829201, -9.34),
-        ("VBZ", "Badajoz VOR/DME",   116.8,  38.889900, -6.815750)
-    ]
-    return pd.DataFrame(fallback, columns=["ident","name","freq_mhz","lat","lon"])
 
-if "vor_db" not in st.session_state:
-    st.session_state.vor_db = _load_vor_db(VOR_CSV)
+def vor_index() -> spatial.SpatialIndex:
+    # KD-tree dos VOR, um por processo; reconstruído só quando os ficheiros mudam.
+    return spatial.cached("navlog.vor", refdata.source_key(refdata.DATA_DIR), st.session_state.vor_db["lat"], st.session_state.vor_db["lon"])
+
 
 vor_pts = []
 for _, r in st.session_state.vor_db.iterrows():
@@ -685,15 +598,11 @@ db = st.session_state.db_points
 # ========= helpers VOR =========
 def nearest_vor(lat: float, lon: float):
     df = st.session_state.vor_db
-    best = None
-    best_d = 1e9
-    for _, r in df.iterrows():
-        d = gc_dist_nm(lat, lon, float(r["lat"]), float(r["lon"]))
-        if d < best_d:
-            best_d = d
-            best = r
-    if best is None:
+    rows, _ = vor_index().nearest(lat, lon, 1)
+    if not len(rows):
         return None
+    best = df.iloc[int(rows[0])]
+    best_d = gc_dist_nm(lat, lon, float(best["lat"]), float(best["lon"]))
     radial = gc_course_tc(float(best["lat"]), float(best["lon"]), lat, lon)
     return {
         "ident": str(best["ident"]),
@@ -706,21 +615,18 @@ def nearest_vor(lat: float, lon: float):
     }
 
 def nearby_vors(lat: float, lon: float, limit: int = 8):
-    out = []
     df = st.session_state.vor_db
-    for _, r in df.iterrows():
-        d = gc_dist_nm(lat, lon, float(r["lat"]), float(r["lon"]))
-        out.append((d, r))
-    out.sort(key=lambda x: x[0])
+    rows, _ = vor_index().nearest(lat, lon, limit)
     res = []
-    for d, r in out[:limit]:
+    for i in rows.tolist():
+        r = df.iloc[i]
         res.append({
             "ident": str(r["ident"]),
             "name":  str(r.get("name") or ""),
             "freq_mhz": float(r["freq_mhz"]),
             "lat": float(r["lat"]),
             "lon": float(r["lon"]),
-            "dist_nm": d,
+            "dist_nm": gc_dist_nm(lat, lon, float(r["lat"]), float(r["lon"])),
         })
     return res
 
@@ -827,55 +733,52 @@ def _deserialize_wp_for_route(data: dict) -> dict:
     base["vor_ident"] = data.get("vor_ident", "")
     return base
 
-def load_routes_from_gist():
-    token, gist_id = _get_gist_credentials()
-    if not token or not gist_id:
+def _route_store():
+    """RouteStore da sessão: SQLite local se ROUTES_DB estiver definido, senão o Gist."""
+    if "route_store" not in st.session_state:
+        db_path = (
+            getattr(st, "secrets", {}).get("ROUTES_DB")
+            if hasattr(st, "secrets") else None
+        ) or os.getenv("ROUTES_DB")
+        token, gist_id = _get_gist_credentials()
+        if db_path:
+            store = route_store.RouteStore(route_store.SQLiteBackend(db_path))
+        elif token and gist_id:
+            store = route_store.RouteStore(route_store.GistBackend(token, gist_id))
+        else:
+            store = None
+        st.session_state.route_store = store
+    return st.session_state.route_store
+
+def load_saved_routes():
+    store = _route_store()
+    if store is None:
         st.warning("GITHUB_TOKEN ou ROUTES_GIST_ID não configurados. Rotas padrão desativadas.")
         return {}
-
     try:
-        r = requests.get(
-            f"https://api.github.com/gists/{gist_id}",
-            headers={"Authorization": f"token {token}"}
-        )
-        if r.status_code != 200:
-            st.warning(f"Não foi possível ler o Gist ({r.status_code}).")
-            return {}
-        data = r.json()
-        files = data.get("files", {})
-        if "routes.json" not in files:
-            return {}
-        content = files["routes.json"]["content"]
-        return json.loads(content or "{}")
+        return store.load()
     except Exception as e:
         st.warning(f"Erro ao ler Gist: {e}")
         return {}
 
-def save_routes_to_gist(routes_dict: dict):
-    token, gist_id = _get_gist_credentials()
-    if not token or not gist_id:
+def commit_route(name: str, points):
+    """Grava (points) ou apaga (None) UMA rota; as rotas dos outros utilizadores mantêm-se."""
+    store = _route_store()
+    if store is None:
         st.warning("GITHUB_TOKEN ou ROUTES_GIST_ID não configurados. Não foi possível gravar.")
-        return
-
-    try:
-        payload = {
-            "files": {
-                "routes.json": {
-                    "content": json.dumps(routes_dict, indent=2)
-                }
-            }
-        }
-        r = requests.patch(
-            f"https://api.github.com/gists/{gist_id}",
-            headers={"Authorization": f"token {token}"},
-            json=payload
-        )
-        if r.status_code not in (200, 201):
-            st.error(f"Erro ao gravar no Gist ({r.status_code}): {r.text}")
-        else:
-            st.success("Rotas padrão atualizadas no Gist.")
-    except Exception as e:
-        st.error(f"Erro ao gravar Gist: {e}")
+        return False
+    if points is None:
+        store.delete(name)
+    else:
+        store.put(name, points)
+    res = store.flush()
+    st.session_state.saved_routes = store.routes
+    if not res["ok"]:
+        st.error(f"Erro ao gravar no Gist (fica pendente): {res['error']}")
+        return False
+    if res["conflicts"]:
+        st.warning("Alterada(s) entretanto por outro utilizador, ficou a tua versão: " + ", ".join(res["conflicts"]))
+    return True
 
 # ========= ABAS =========
 tab_csv, tab_map, tab_fpl = st.tabs(["🔎 Pesquisar CSV", "🗺️ Adicionar no mapa", "✈️ Flight Plan"])
@@ -1013,12 +916,83 @@ with st.expander("🛡 Espaço aéreo / restrições"):
     )
     st.caption("Nota: áreas novas ad-hoc agora só via código.")
 
+def selected_airspaces():
+    # Áreas selecionadas (catálogo + custom) com o polígono já resolvido (corredores incluídos).
+    combined_asp = []
+    for nm in st.session_state.preset_selected:
+        A = PRESET_AIRSPACES.get(nm)
+        if A:
+            tmp = dict(A)
+            tmp["name"] = nm
+            combined_asp.append(tmp)
+    combined_asp += st.session_state.airspaces
+    out = []
+    for asp in combined_asp:
+        if asp.get("width_nm"):
+            coords = asp.get("coords", [])
+            if len(coords) >= 2:
+                polycoords = corridor_polygon(coords[0], coords[1], asp["width_nm"])
+            else:
+                polycoords = []
+        else:
+            polycoords = asp.get("coords", [])
+        if polycoords:
+            out.append((asp, polycoords))
+    return out
+
+# ========= ROTA VFR AUTOMÁTICA =========
+# Grafo AD + Localidades construído uma vez por processo (briefings.vfr_router);
+# áreas selecionadas acima são evitadas, custo = distância ou tempo com vento global.
+with st.expander("🧭 Rota VFR automática (evita áreas selecionadas)"):
+    ref_pts = db[db["src"].isin(["AD", "LOC"])].reset_index(drop=True)
+    if ref_pts.empty:
+        st.info("Sem pontos de referência (AD / Localidades).")
+    else:
+        ref_labels = [f"{r['code'] or r['name']} — {r['name']}" for _, r in ref_pts.iterrows()]
+        cV1, cV2 = st.columns(2)
+        with cV1:
+            vfr_from = st.selectbox("De", range(len(ref_pts)), format_func=lambda i: ref_labels[i], key="vfr_from")
+        with cV2:
+            vfr_to = st.selectbox("Para", range(len(ref_pts)), format_func=lambda i: ref_labels[i], key="vfr_to")
+        cV3, cV4 = st.columns(2)
+        with cV3:
+            vfr_mode = st.radio("Critério", ["Mais curta", "Mais rápida (vento global)"], horizontal=True, key="vfr_mode")
+        with cV4:
+            vfr_max_leg = st.number_input("Perna máx. (NM)", 5.0, 100.0, vfr_router.MAX_LEG_NM, step=5.0, key="vfr_max_leg")
+        avoid = selected_airspaces()
+        st.caption("Evita: " + (", ".join(a["name"] for a, _ in avoid) if avoid else "— (seleciona áreas acima)"))
+        if st.button("➕ Calcular e acrescentar aos WPs", use_container_width=True):
+            router = vfr_router.cached("navlog.ref", refdata.source_key(refdata.DATA_DIR), ref_pts["lat"], ref_pts["lon"], max_leg_nm=float(vfr_max_leg))
+            polys = [poly for _, poly in avoid]
+            fastest = vfr_mode != "Mais curta"
+            found, msg = router.route(
+                int(vfr_from), int(vfr_to),
+                airspaces=vfr_router.AirspaceIndex(polys),
+                airspace_key=tuple(tuple(map(tuple, poly)) for poly in polys),
+                tas_kt=get_cruise_tas() if fastest else None,
+                wind_from=float(st.session_state.wind_from),
+                wind_kt=float(st.session_state.wind_kt),
+            )
+            if found is None:
+                st.error(msg)
+            else:
+                rows = found.rows
+                last = st.session_state.wps[-1] if st.session_state.wps else None
+                first = ref_pts.iloc[rows[0]]
+                if last and abs(last["lat"] - float(first["lat"])) < 1e-6 and abs(last["lon"] - float(first["lon"])) < 1e-6:
+                    rows = rows[1:]
+                for i in rows:
+                    r = ref_pts.iloc[i]
+                    append_wp(r["code"] or r["name"], float(r["lat"]), float(r["lon"]), float(st.session_state.alt_qadd), src=r["src"])
+                eta = f" · {hhmmss(found.time_h * 3600)}" if fastest else ""
+                st.success(f"{len(found.rows)} pontos · {found.dist_nm:.1f} NM{eta}")
+
 st.markdown("<div class='sep'></div>", unsafe_allow_html=True)
 
 # ========= ROTAS PADRÃO UI =========
 with st.expander("📁 Rotas padrão (Gist)", expanded=False):
-    if not st.session_state.saved_routes:
-        st.session_state.saved_routes = load_routes_from_gist()
+    if _route_store() is None or not _route_store().loaded:
+        st.session_state.saved_routes = load_saved_routes()
 
     routes = st.session_state.saved_routes
     existing_names = sorted(routes.keys())
@@ -1033,11 +1007,9 @@ with st.expander("📁 Rotas padrão (Gist)", expanded=False):
                 st.warning("Dá um nome à rota.")
             else:
                 key = new_route_name.strip()
-                routes[key] = [
-                    _serialize_wp_for_route(w) for w in st.session_state.wps
-                ]
-                st.session_state.saved_routes = routes
-                save_routes_to_gist(routes)
+                if commit_route(key, [_serialize_wp_for_route(w) for w in st.session_state.wps]):
+                    st.success("Rotas padrão atualizadas no Gist.")
+                routes = st.session_state.saved_routes
 
     with cR2:
         if existing_names:
@@ -1056,10 +1028,8 @@ with st.expander("📁 Rotas padrão (Gist)", expanded=False):
         st.markdown("---")
         del_name = st.selectbox("Apagar rota", ["(nenhuma)"] + existing_names)
         if del_name != "(nenhuma)" and st.button("🗑 Apagar rota", use_container_width=True):
-            routes.pop(del_name, None)
-            st.session_state.saved_routes = routes
-            save_routes_to_gist(routes)
-            st.success(f"Rota «{del_name}» apagada.")
+            if commit_route(del_name, None):
+                st.success(f"Rota «{del_name}» apagada.")
 
 st.markdown("<div class='sep'></div>", unsafe_allow_html=True)
 
@@ -1776,25 +1746,7 @@ def render_map(nodes, legs, base_choice):
         html_marker(m, g["lat"], g["lon"], wp_label_html_rot(g, s, g["angle"]))
 
     if st.session_state.show_airspaces:
-        combined_asp = []
-        for nm in st.session_state.preset_selected:
-            A = PRESET_AIRSPACES.get(nm)
-            if A:
-                tmp = dict(A)
-                tmp["name"] = nm
-                combined_asp.append(tmp)
-        combined_asp += st.session_state.airspaces
-        for asp in combined_asp:
-            if asp.get("width_nm"):
-                coords = asp.get("coords", [])
-                if len(coords) >= 2:
-                    polycoords = corridor_polygon(coords[0], coords[1], asp["width_nm"])
-                else:
-                    polycoords = []
-            else:
-                polycoords = asp.get("coords", [])
-            if not polycoords:
-                continue
+        for asp, polycoords in selected_airspaces():
             edge_color = CORRIDOR_COLOR if asp.get("width_nm") else ASPACE_COLOR
             folium.Polygon(
                 locations=[(lat,lon) for (lat,lon) in polycoords],
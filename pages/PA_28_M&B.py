@@ -8,34 +8,28 @@
 #   - to_perf.pdf + to_perf.json
 #   - climb_perf.jpg + climb_perf.json
 #   - ldg_perf.pdf + ldg_perf.json
+#   - ourairports_iberia.json (built on first run; refresh: python -m briefings.ourairports)
 #
 # Optional (Fleet via GitHub Gist):
 #   - st.secrets["GITHUB_GIST_TOKEN"]
 #   - st.secrets["GITHUB_GIST_ID_PA28"]
 
-import io
-import csv
 import json
+import time
 import unicodedata
 import datetime as dt
-from math import cos, sin, radians, sqrt, atan2, degrees
+from math import cos, sin, radians
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import pytz
-import requests
 import numpy as np
 import streamlit as st
 
 import fitz  # PyMuPDF
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
 
-from pypdf import PdfReader, PdfWriter
-from pypdf.generic import NameObject, BooleanObject
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.utils import ImageReader
+from briefings import forecast, forecast_store, gist_store, ourairports, pa28_cg, pa28_pdf, pa28_perf, pdf_form
 
 
 # =========================================================
@@ -164,6 +158,14 @@ TAXI_ARM = 95.5
 MTOW_LB = 2550.0
 MLW_LB = 2550.0
 
+# Same constants, handed to the batch W&B (fleet scenarios)
+WB_CONSTS = {
+    "L_TO_USG": L_TO_USG, "FUEL_LB_PER_USG": FUEL_LB_PER_USG,
+    "FUEL_USABLE_USG": FUEL_USABLE_USG, "FUEL_USABLE_L": FUEL_USABLE_L,
+    "ARM_FRONT": ARM_FRONT, "ARM_REAR": ARM_REAR, "ARM_FUEL": ARM_FUEL, "ARM_BAGGAGE": ARM_BAGGAGE,
+    "TAXI_ALLOW_LB": TAXI_ALLOW_LB, "TAXI_ARM": TAXI_ARM,
+}
+
 PDF_TEMPLATE_PATHS = ["RVP.CFI.067.02PiperPA28MBandPerformanceSheet.pdf"]
 
 # Side-by-side fixed settings
@@ -182,9 +184,6 @@ NO_ALT2 = "-"
 # =========================================================
 # OurAirports DB + overrides
 # =========================================================
-OURAIRPORTS_AIRPORTS_CSV = "https://ourairports.com/data/airports.csv"
-OURAIRPORTS_RUNWAYS_CSV = "https://ourairports.com/data/runways.csv"
-
 ICAO_SET = sorted({
     "LEBZ","LPBR","LPBG","LPCB","LPCO","LPEV","LEMG","LPSO","LEZL","LEVX","LPVR","LPVZ","LPCS","LPMT",
     "LPST","LPBJ","LPFR","LPPM","LPPR","LPPT",
@@ -192,12 +191,9 @@ ICAO_SET = sorted({
 
 @st.cache_data(ttl=7*24*3600, show_spinner=False)
 def load_ourairports_csvs():
-    def fetch_csv(url):
-        r = requests.get(url, timeout=40)
-        r.raise_for_status()
-        txt = r.content.decode("utf-8", errors="replace")
-        return list(csv.DictReader(io.StringIO(txt)))
-    return fetch_csv(OURAIRPORTS_AIRPORTS_CSV), fetch_csv(OURAIRPORTS_RUNWAYS_CSV)
+    # Iberia snapshot in the repo root; built from the OurAirports CSVs on
+    # the first run of a fresh checkout (python -m briefings.ourairports to refresh).
+    return ourairports.ensure_snapshot()
 
 
 def build_aerodromes_db(icaos):
@@ -319,92 +315,37 @@ def round_wind_dir_10(d):
 # =========================================================
 # Weather (Open-Meteo)
 # =========================================================
-OPENMETEO_URL = "https://api.open-meteo.com/v1/forecast"
+def om_forecast_many(queries):
+    """queries: (lat, lon, start_iso, end_iso) per leg -> HourlyForecast, same order.
+
+    Served from the shared forecast store; on a miss every aerodrome in
+    AERODROMES_DB goes in the same batched Open-Meteo request.
+    """
+    all_ads = [(ad["lat"], ad["lon"]) for ad in AERODROMES_DB.values() if ad.get("lat") is not None]
+    return [forecast.HourlyForecast.from_openmeteo(r) for r in forecast_store.get_many(queries, prefetch_points=all_ads)]
 
-@st.cache_data(ttl=900, show_spinner=False)
 def om_point_forecast(lat, lon, start_date_iso, end_date_iso):
-    params = {
-        "latitude": round(float(lat), 6),
-        "longitude": round(float(lon), 6),
-        "hourly": ",".join([
-            "temperature_2m",
-            "wind_speed_10m",
-            "wind_direction_10m",
-            "pressure_msl",
-        ]),
-        "timezone": "UTC",
-        "windspeed_unit": "kn",
-        "temperature_unit": "celsius",
-        "pressure_unit": "hPa",
-        "start_date": start_date_iso,
-        "end_date": end_date_iso,
-    }
-    r = requests.get(OPENMETEO_URL, params=params, timeout=20)
-    if r.status_code != 200:
-        return {"error": f"HTTP {r.status_code}", "detail": r.text}
-    data = r.json()
-    h = data.get("hourly", {}) or {}
-    return {
-        "time": h.get("time", []) or [],
-        "wspd": h.get("wind_speed_10m", []) or [],
-        "wdir": h.get("wind_direction_10m", []) or [],
-        "temp": h.get("temperature_2m", []) or [],
-        "qnh":  h.get("pressure_msl", []) or [],
-    }
+    return om_forecast_many([(lat, lon, start_date_iso, end_date_iso)])[0]
 
 def om_hours(resp):
-    out = []
-    for i, t in enumerate(resp.get("time", []) or []):
-        dtu = dt.datetime.fromisoformat(t).replace(tzinfo=dt.timezone.utc)
-        out.append((i, dtu))
-    return out
-
-def _u_v_from_dirspd(dir_deg_from, spd_kt):
-    spd_ms = float(spd_kt) * 0.514444
-    th = radians(float(dir_deg_from))
-    u = -spd_ms * sin(th)
-    v = -spd_ms * cos(th)
-    return u, v
-
-def _dirspd_from_uv(u, v):
-    spd_ms = sqrt(u*u + v*v)
-    dir_deg = (degrees(atan2(u, v)) + 180.0) % 360.0
-    spd_kt = spd_ms * 1.94384
-    return dir_deg, spd_kt
+    return resp.hours()
 
 def om_mean_met_at(resp, idx, window=1):
     if idx is None:
         return None
-    wdir = resp.get("wdir", [])
-    wspd = resp.get("wspd", [])
-    temp = resp.get("temp", [])
-    qnh = resp.get("qnh", [])
-    if not wdir or not wspd:
+    wind = resp.mean_wind(idx, window)
+    if wind is None:
         return None
 
-    u_sum = 0.0
-    v_sum = 0.0
-    n = 0
-    for j in range(idx - window, idx + window + 1):
-        if 0 <= j < len(wdir) and 0 <= j < len(wspd):
-            if wdir[j] is None or wspd[j] is None:
-                continue
-            u, v = _u_v_from_dirspd(wdir[j], wspd[j])
-            u_sum += u
-            v_sum += v
-            n += 1
-    if n == 0:
-        return None
-
-    dir_deg, spd_kt = _dirspd_from_uv(u_sum / n, v_sum / n)
-    t_val = temp[idx] if idx < len(temp) else None
-    q_val = qnh[idx] if idx < len(qnh) else None
+    dir_deg, spd_kt = wind
+    t_val = resp.temp[idx] if idx < len(resp.temp) else np.nan
+    q_val = resp.qnh[idx] if idx < len(resp.qnh) else np.nan
 
     return {
         "wind_dir": round_wind_dir_10(dir_deg),
         "wind_kt": int(round(spd_kt)),
-        "temp_c": int(round(float(t_val))) if t_val is not None else 15,
-        "qnh_hpa": int(round(float(q_val))) if q_val is not None else 1013,
+        "temp_c": int(round(float(t_val))) if np.isfinite(t_val) else 15,
+        "qnh_hpa": int(round(float(q_val))) if np.isfinite(q_val) else 1013,
     }
 
 
@@ -413,23 +354,19 @@ def om_mean_met_at(resp, idx, window=1):
 # =========================================================
 GIST_FILE = "sevenair_pa28_fleet.json"
 
-def gist_headers(token):
-    return {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github+json",
-        "Content-Type": "application/json",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+def gist_load(token, gist_id, force=False):
+    """(fleet, error) via the shared gist mirror; force=True revalidates with GitHub now.
 
-def gist_load(token, gist_id):
-    r = requests.get(f"https://api.github.com/gists/{gist_id}", headers=gist_headers(token), timeout=20)
-    if r.status_code != 200:
-        return None, f"GitHub error {r.status_code}: {r.text}"
-    data = r.json()
-    files = data.get("files", {}) or {}
-    if GIST_FILE not in files or files[GIST_FILE].get("content") is None:
-        return None, f"Gist file '{GIST_FILE}' not found."
-    return json.loads(files[GIST_FILE]["content"]), None
+    When GitHub fails but a local copy exists, the copy is returned with the error.
+    """
+    files, err = gist_store.load_files(
+        token, gist_id, max_age_s=0 if force else gist_store.FRESH_S, background=not force
+    )
+    if files is None:
+        return None, err
+    if files.get(GIST_FILE) is None:
+        return None, err or f"Gist file '{GIST_FILE}' not found."
+    return json.loads(files[GIST_FILE]), err
 
 def parse_ew(reg_entry: dict):
     ew = (
@@ -451,7 +388,7 @@ def parse_ew(reg_entry: dict):
 
 
 # =========================================================
-# PDF utils (fields, fill)
+# PDF utils
 # =========================================================
 def read_pdf_bytes(paths) -> bytes:
     for path_str in paths:
@@ -460,49 +397,6 @@ def read_pdf_bytes(paths) -> bytes:
             return p.read_bytes()
     raise FileNotFoundError(f"Template not found: {paths}")
 
-def get_field_names(template_bytes: bytes) -> set:
-    names = set()
-    reader = PdfReader(io.BytesIO(template_bytes))
-    try:
-        fd = reader.get_fields()
-        if fd:
-            names.update(fd.keys())
-    except Exception:
-        pass
-    try:
-        for page in reader.pages:
-            if "/Annots" in page:
-                for a in page["/Annots"]:
-                    obj = a.get_object()
-                    if obj.get("/T"):
-                        names.add(str(obj["/T"]))
-    except Exception:
-        pass
-    return names
-
-def fill_pdf(template_bytes: bytes, fields: dict) -> bytes:
-    reader = PdfReader(io.BytesIO(template_bytes))
-    writer = PdfWriter()
-    for p in reader.pages:
-        writer.add_page(p)
-
-    root = reader.trailer["/Root"]
-    if "/AcroForm" not in root:
-        raise RuntimeError("Template PDF has no AcroForm.")
-    writer._root_object.update({NameObject("/AcroForm"): root["/AcroForm"]})
-    try:
-        writer._root_object["/AcroForm"].update({NameObject("/NeedAppearances"): BooleanObject(True)})
-    except Exception:
-        pass
-
-    for page in writer.pages:
-        writer.update_page_form_field_values(page, fields)
-
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
-
-
 # =========================================================
 # CG overlay (page 0) — anchors
 # =========================================================
@@ -521,83 +415,7 @@ CG_ANCHORS = {
     93: {"w0": 1200, "x0": 355, "y0": 72, "w1": 2550, "x1": 435, "y1": 344},
 }
 
-def xy_on_cg_line(cg_int: int, weight_lb: float):
-    a = CG_ANCHORS[int(cg_int)]
-    w0, x0, y0 = a["w0"], a["x0"], a["y0"]
-    w1, x1, y1 = a["w1"], a["x1"], a["y1"]
-    w = clamp(weight_lb, min(w0, w1), max(w0, w1))
-    if w1 == w0:
-        return x0, y0
-    t = (w - w0) / (w1 - w0)
-    x = x0 + t * (x1 - x0)
-    y = y0 + t * (y1 - y0)
-    return x, y
-
-def xy_from_cg_weight(cg_in: float, weight_lb: float):
-    cg = float(cg_in)
-    cg = clamp(cg, 82.0, 93.0)
-    lo = int(clamp(int(cg // 1), 82, 93))
-    hi = int(clamp(lo + 1, 82, 93))
-    if hi == lo:
-        return xy_on_cg_line(lo, weight_lb)
-    x0, y0 = xy_on_cg_line(lo, weight_lb)
-    x1, y1 = xy_on_cg_line(hi, weight_lb)
-    frac = (cg - lo) / (hi - lo)
-    return (x0 + frac * (x1 - x0), y0 + frac * (y1 - y0))
-
-
-# =========================================================
-# CG legend — compact, positioned bottom-right of chart
-# =========================================================
-def draw_cg_overlay_on_page0(template_bytes: bytes, points):
-    reader = PdfReader(io.BytesIO(template_bytes))
-    page0 = reader.pages[0]
-    w_pt = float(page0.mediabox.width)
-    h_pt = float(page0.mediabox.height)
-
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=(w_pt, h_pt))
-
-    DOT_R = 5.5
-    for p in points:
-        cg = float(p["cg"])
-        wlb = float(p["w"])
-        r, g, b = p["rgb"]
-
-        x_dot, y_dot = xy_from_cg_weight(cg, wlb)
-        x_base, y_base = xy_from_cg_weight(cg, 1200.0)
-
-        c.setStrokeColorRGB(r, g, b)
-        c.setLineWidth(1.5)
-        c.line(x_base, y_base, x_dot, y_dot)
-
-        c.setFillColorRGB(r, g, b)
-        c.circle(x_dot, y_dot, DOT_R, fill=1, stroke=0)
-
-    c.showPage()
-    c.save()
-    buf.seek(0)
-
-    overlay_pdf = PdfReader(buf)
-    overlay_page = overlay_pdf.pages[0]
-
-    out_writer = PdfWriter()
-    for i, p in enumerate(reader.pages):
-        if i == 0:
-            p.merge_page(overlay_page)
-        out_writer.add_page(p)
-
-    root = reader.trailer["/Root"]
-    if "/AcroForm" in root:
-        out_writer._root_object.update({NameObject("/AcroForm"): root["/AcroForm"]})
-        try:
-            out_writer._root_object["/AcroForm"].update({NameObject("/NeedAppearances"): BooleanObject(True)})
-        except Exception:
-            pass
-
-    out = io.BytesIO()
-    out_writer.write(out)
-    return out.getvalue()
+CG_CHART = pa28_cg.CgChart(CG_ANCHORS)
 
 
 # =========================================================
@@ -931,193 +749,6 @@ def make_perf_image(bg: Image.Image, segs) -> Image.Image:
     return img
 
 
-# =========================================================
-# Performance pages — 2 pages, 2 airfields each
-# =========================================================
-def build_perf_2aerodromes_page(pairs: List[Tuple[str, dict]]) -> bytes:
-    W, H = landscape(A4)
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=(W, H))
-
-    MARGIN   = 22
-    GAP_COL  = 10
-    GAP_ROW  = 18
-    ROW_LBL  = 14
-    N_COLS   = 3
-    COL_KEYS = ["takeoff_img", "climb_img", "landing_img"]
-
-    n_rows = len(pairs)
-    usable_w = W - 2 * MARGIN
-    usable_h = H - 2 * MARGIN
-
-    cell_w = (usable_w - GAP_COL * (N_COLS - 1)) / N_COLS
-    row_h  = (usable_h - GAP_ROW * (n_rows - 1)) / n_rows
-    img_h  = row_h - ROW_LBL
-
-    top_y = H - MARGIN
-
-    for ri, (label, info) in enumerate(pairs):
-        row_top = top_y - ri * (row_h + GAP_ROW)
-        row_bot = row_top - row_h
-
-        c.setFillColorRGB(0.15, 0.15, 0.15)
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(MARGIN, row_top - ROW_LBL + 3, label)
-
-        c.setStrokeColorRGB(0.65, 0.65, 0.65)
-        c.setLineWidth(0.4)
-        c.line(MARGIN, row_top - ROW_LBL, MARGIN + usable_w, row_top - ROW_LBL)
-
-        for ci, col_key in enumerate(COL_KEYS):
-            cx = MARGIN + ci * (cell_w + GAP_COL)
-            cy = row_bot
-
-            c.setStrokeColorRGB(0.80, 0.80, 0.80)
-            c.setLineWidth(0.3)
-            c.rect(cx, cy, cell_w, img_h)
-
-            img = info.get(col_key)
-            if img is not None:
-                iw, ih = img.size
-                scale = min((cell_w - 2) / iw, (img_h - 2) / ih)
-                dw, dh = iw * scale, ih * scale
-                dx = cx + (cell_w - dw) / 2
-                dy = cy + (img_h - dh) / 2
-                c.drawImage(ImageReader(_img_to_jpeg_reader(img, quality=78)),
-                            dx, dy, width=dw, height=dh,
-                            preserveAspectRatio=True, mask="auto")
-
-    c.showPage()
-    c.save()
-    return buf.getvalue()
-
-
-def _img_to_jpeg_reader(img: Image.Image, quality: int = 80) -> io.BytesIO:
-    buf = io.BytesIO()
-    img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
-    buf.seek(0)
-    return buf
-
-
-def append_perf_pages(base_pdf_bytes: bytes, perf_by_role: dict) -> bytes:
-    reader = PdfReader(io.BytesIO(base_pdf_bytes))
-    writer = PdfWriter()
-    for p in reader.pages:
-        writer.add_page(p)
-
-    order = ["DEPARTURE", "ARRIVAL", "ALTERNATE_1", "ALTERNATE_2"]
-    available = [(r, perf_by_role[r]) for r in order if r in perf_by_role]
-
-    for i in range(0, len(available), 2):
-        chunk = available[i:i+2]
-        pairs = [(info.get("label", role.replace("_", " ").title()), info)
-                 for role, info in chunk]
-        page_bytes = build_perf_2aerodromes_page(pairs)
-        writer.add_page(PdfReader(io.BytesIO(page_bytes)).pages[0])
-
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
-
-
-# =========================================================
-# Side-by-side (MB PDF -> image -> single-page PDF)
-# =========================================================
-def _pixmap_to_pil(pix: fitz.Pixmap, bg=(255, 255, 255)) -> Image.Image:
-    if pix.alpha:
-        img = Image.frombytes("RGBA", [pix.width, pix.height], pix.samples)
-        bg_img = Image.new("RGB", img.size, bg)
-        bg_img.paste(img, mask=img.split()[3])
-        return bg_img
-    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-def _preprocess_pdf_for_raster(pdf_bytes: bytes) -> bytes:
-    try:
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as d:
-            changed = False
-            for page in d:
-                try:
-                    widgets = page.widgets()
-                    if widgets:
-                        for w in widgets:
-                            w.update()
-                            changed = True
-                except Exception:
-                    pass
-            if changed:
-                return d.tobytes(deflate=True, garbage=3)
-    except Exception:
-        pass
-    return pdf_bytes
-
-def _render_page_rgb(page: fitz.Page, dpi: int, bg=(255, 255, 255)) -> Image.Image:
-    zoom = dpi / 72.0
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False, annots=True, colorspace=fitz.csRGB)
-    return _pixmap_to_pil(pix, bg=bg)
-
-def _merge_side_by_side(img_left: Image.Image, img_right: Image.Image, align_by="height", gap_px=0, bg=(255,255,255)) -> Image.Image:
-    if align_by == "width":
-        target = max(img_left.width, img_right.width)
-        if img_left.width != target:
-            h = int(round(img_left.height * (target / img_left.width)))
-            img_left = img_left.resize((target, h), Image.LANCZOS)
-        if img_right.width != target:
-            h = int(round(img_right.height * (target / img_right.width)))
-            img_right = img_right.resize((target, h), Image.LANCZOS)
-        H = max(img_left.height, img_right.height)
-        W = target * 2 + gap_px
-        canvas_img = Image.new("RGB", (W, H), bg)
-        canvas_img.paste(img_left, (0, (H - img_left.height) // 2))
-        canvas_img.paste(img_right, (target + gap_px, (H - img_right.height) // 2))
-        return canvas_img
-
-    target = max(img_left.height, img_right.height)
-    if img_left.height != target:
-        w = int(round(img_left.width * (target / img_left.height)))
-        img_left = img_left.resize((w, target), Image.LANCZOS)
-    if img_right.height != target:
-        w = int(round(img_right.width * (target / img_right.height)))
-        img_right = img_right.resize((w, target), Image.LANCZOS)
-
-    W = img_left.width + img_right.width + gap_px
-    H = target
-    canvas_img = Image.new("RGB", (W, H), bg)
-    canvas_img.paste(img_left, (0, 0))
-    canvas_img.paste(img_right, (img_left.width + gap_px, 0))
-    return canvas_img
-
-def mb_pdf_to_side_by_side_image(
-    pdf_bytes: bytes, dpi: int,
-    align_by="height", gap_px=0, bg=(255, 255, 255), sharpen=True,
-) -> Image.Image:
-    pdf_bytes = _preprocess_pdf_for_raster(pdf_bytes)
-    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-        if doc.page_count < 1:
-            raise ValueError("PDF invalid (no pages).")
-        i1 = _render_page_rgb(doc.load_page(0), dpi, bg)
-        i2 = _render_page_rgb(doc.load_page(1), dpi, bg) if doc.page_count >= 2 else Image.new("RGB", i1.size, bg)
-        merged = _merge_side_by_side(i1, i2, align_by=align_by, gap_px=gap_px, bg=bg)
-        if sharpen:
-            merged = merged.filter(ImageFilter.UnsharpMask(radius=0.8, percent=120, threshold=3))
-        return merged
-
-def image_to_single_page_pdf(img: Image.Image, dpi: int, jpeg_quality: int = 82) -> bytes:
-    w_px, h_px = img.size
-    w_pt = (w_px / dpi) * 72.0
-    h_pt = (h_px / dpi) * 72.0
-    jpeg_buf = io.BytesIO()
-    img.convert("RGB").save(jpeg_buf, format="JPEG", quality=jpeg_quality, optimize=True)
-    jpeg_buf.seek(0)
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=(w_pt, h_pt))
-    c.drawImage(ImageReader(jpeg_buf), 0, 0, width=w_pt, height=h_pt,
-                preserveAspectRatio=True, mask="auto")
-    c.showPage()
-    c.save()
-    return buf.getvalue()
-
-
 # =========================================================
 # Session defaults
 # =========================================================
@@ -1211,13 +842,15 @@ with st.sidebar:
         if not token or not gist_id:
             st.error("Missing secrets: GITHUB_GIST_TOKEN and/or GITHUB_GIST_ID_PA28")
         else:
-            data, err = gist_load(token, gist_id)
-            if err:
+            data, err = gist_load(token, gist_id, force=True)
+            if data is None:
                 st.error(err)
             else:
                 st.session_state.fleet = data or {}
                 st.session_state.fleet_loaded = True
                 st.success(f"Loaded {len(st.session_state.fleet)} aircraft.")
+                if err:
+                    st.warning(f"GitHub unavailable, using the local copy: {err}")
 
     if not st.session_state.fleet_loaded and token and gist_id:
         data, err = gist_load(token, gist_id)
@@ -1292,6 +925,7 @@ with tab2:
             targets = [dep_target, arr_target, alt_target, alt_target]
 
             ok, err = 0, 0
+            jobs = []
             for i, leg in enumerate(st.session_state.legs):
                 # Skip legs in manual mode or inactive (ALT2 = "-")
                 if st.session_state.met_manual_mode[i]:
@@ -1304,10 +938,16 @@ with tab2:
                     st.error(f"{leg['role']} {icao}: aerodrome not in DB")
                     err += 1
                     continue
+                jobs.append((i, leg, icao, ad))
 
-                resp = om_point_forecast(ad["lat"], ad["lon"], date_iso, date_iso)
-                if "error" in resp:
-                    st.error(f"{leg['role']} {icao}: weather error: {resp.get('error')} {resp.get('detail','')}")
+            # All aerodromes in one concurrent batch (same coords fetched once)
+            resps = om_forecast_many(tuple((ad["lat"], ad["lon"], date_iso, date_iso) for _, _, _, ad in jobs))
+            if resps:
+                st.caption(forecast_store.summary(resps))
+
+            for (i, leg, icao, ad), resp in zip(jobs, resps):
+                if resp.error:
+                    st.error(f"{leg['role']} {icao}: weather error: {resp.error} {resp.detail}")
                     err += 1
                     continue
 
@@ -1637,6 +1277,51 @@ with tab3:
         "total_min": total_ramp_min, "total_l": total_ramp_l,
     }
 
+    with st.expander("Fleet loading scenarios (all registrations × fuel states)", expanded=False):
+        if not st.session_state.fleet:
+            st.info("Load the fleet from the Gist (sidebar) to compare registrations.")
+        else:
+            st.caption("Same crew/pax/baggage and trip fuel as above; envelope from the CG chart lines.")
+            fuel_states = sorted({float(FUEL_USABLE_L), round(FUEL_USABLE_L * 0.75), round(FUEL_USABLE_L * 0.5), round(FUEL_USABLE_L * 0.25), float(fuel_l)}, reverse=True)
+            fleet_regs = sorted(st.session_state.fleet.keys())
+            ews = [parse_ew(st.session_state.fleet[r]) for r in fleet_regs]
+            sc = pa28_cg.wb_scenarios(
+                [e for e, _ in ews], [m for _, m in ews], fuel_states,
+                front_lb=front_lb, rear_lb=rear_lb, bag_lb=bag_lb, trip_l=trip_l, k=WB_CONSTS,
+            )
+            to_in = CG_CHART.inside(sc["takeoff_cg"], sc["takeoff_w"]) & (sc["takeoff_w"] <= MTOW_LB)
+            ldg_in = CG_CHART.inside(sc["landing_cg"], sc["landing_w"]) & (sc["landing_w"] <= MLW_LB)
+
+            sc_rows = []
+            for a, r in enumerate(fleet_regs):
+                for j, fl in enumerate(fuel_states):
+                    sc_rows.append({
+                        "Reg": r,
+                        "Fuel (L)": int(fl),
+                        "TOW (lb)": round(float(sc["takeoff_w"][a, j])),
+                        "TO CG (in)": round(float(sc["takeoff_cg"][a, j]), 2),
+                        "LW (lb)": round(float(sc["landing_w"][a, j])),
+                        "LDG CG (in)": round(float(sc["landing_cg"][a, j]), 2),
+                        "Status": "OK" if (to_in[a, j] and ldg_in[a, j]) else "OUT",
+                    })
+            n_out = sum(1 for r in sc_rows if r["Status"] == "OUT")
+            st.markdown(f"**{n_out}** of {len(sc_rows)} scenarios outside the envelope / MTOW.")
+            st.dataframe(sc_rows, use_container_width=True, hide_index=True)
+
+            if st.button("Build fleet CG chart PDF"):
+                try:
+                    point_sets = []
+                    for a, r in enumerate(fleet_regs):
+                        pts = [{"cg": sc["ew_cg"][a, 0], "w": sc["ew_lb"][a, 0], "rgb": (0.10, 0.60, 0.15)}]
+                        for j in range(len(fuel_states)):
+                            pts.append({"cg": sc["takeoff_cg"][a, j], "w": sc["takeoff_w"][a, j], "rgb": (0.10, 0.30, 0.85)})
+                            pts.append({"cg": sc["landing_cg"][a, j], "w": sc["landing_w"][a, j], "rgb": (0.85, 0.15, 0.15)})
+                        point_sets.append(pts)
+                    book = pa28_cg.fleet_book(read_pdf_bytes(PDF_TEMPLATE_PATHS), CG_CHART, point_sets, titles=fleet_regs)
+                    st.download_button("⬇️ Download fleet CG charts", data=book, file_name="PA28_fleet_CG.pdf", mime="application/pdf")
+                except Exception as e:
+                    st.error(f"Fleet CG PDF error: {e}")
+
 
 # =========================================================
 # 4) Performance
@@ -1647,6 +1332,15 @@ def pa_da(elev_ft, qnh_hpa, oat_c):
     da_ft = pa_ft + 120.0 * (float(oat_c) - isa)
     return pa_ft, da_ft
 
+@st.cache_data(show_spinner=False)
+def load_perf_charts():
+    # Compiled (vectorized) charts for the dispatch sweep
+    return (
+        pa28_perf.GroundRollChart(load_json_asset("takeoff"), "takeoff", ASSETS["takeoff"]["out_axis_key"]),
+        pa28_perf.GroundRollChart(load_json_asset("landing"), "landing", ASSETS["landing"]["out_axis_key"]),
+        pa28_perf.ClimbChart(load_json_asset("climb")),
+    )
+
 def fmt_m_with_pct(dist_m: float, avail_m: float) -> str:
     dist_m = max(0.0, float(dist_m))
     avail_m = max(0.0, float(avail_m))
@@ -1795,6 +1489,53 @@ with tabP:
     else:
         st.info("Compute performance to populate values and images.")
 
+    st.divider()
+    with st.expander("Dispatch sweep — all aerodromes × runways × forecast hours", expanded=False):
+        st.caption(
+            f"Every runway at every aerodrome against every model hour of the flight date, "
+            f"using the current takeoff/landing weights. MARGINAL ≥ {pa28_perf.MARGINAL_PCT:.0f}% "
+            f"of TODA/LDA, NO-GO ≥ {pa28_perf.NOGO_PCT:.0f}%. Tailwind counted as 0 kt (as above)."
+        )
+        if st.button("Run sweep"):
+            wb = st.session_state.get("_wb", None)
+            if not wb or wb.get("takeoff_w", 0) <= 0:
+                st.error("W&B not ready. Go to tab 'Weight & Fuel' first.")
+            else:
+                try:
+                    date_iso = st.session_state.flight_date.strftime("%Y-%m-%d")
+                    icaos = [i for i in ICAO_OPTIONS if AERODROMES_DB[i].get("runways")]
+                    resps = om_forecast_many([(AERODROMES_DB[i]["lat"], AERODROMES_DB[i]["lon"], date_iso, date_iso) for i in icaos])
+                    conditions = {i: pa28_perf.conditions_from_hourly(r) for i, r in zip(icaos, resps) if not r.error}
+                    missing = [i for i, r in zip(icaos, resps) if r.error]
+
+                    t0 = time.perf_counter()
+                    rows = pa28_perf.sweep(
+                        AERODROMES_DB, conditions, *load_perf_charts(),
+                        takeoff_w=float(wb["takeoff_w"]),
+                        landing_w=float(wb["landing_w"]),
+                        round_to=(ASSETS["takeoff"]["round_to"], ASSETS["climb"]["round_to"], ASSETS["landing"]["round_to"]),
+                    )
+                    st.session_state.perf_sweep = rows
+                    st.caption(f"{len(rows)} runway-hours solved in {(time.perf_counter() - t0) * 1000:.0f} ms.")
+                    if missing:
+                        st.warning(f"No forecast for: {', '.join(missing)}")
+                except Exception as e:
+                    st.error(f"Sweep error: {e}")
+
+        rows = st.session_state.get("perf_sweep") or []
+        if rows:
+            n_marg = sum(1 for r in rows if r["status"] == "MARGINAL")
+            n_nogo = sum(1 for r in rows if r["status"] == "NO-GO")
+            st.markdown(f"**{n_nogo}** NO-GO · **{n_marg}** MARGINAL · {len(rows)} total")
+            only_bad = st.checkbox("Show only MARGINAL / NO-GO", value=False)
+            sel_icaos = st.multiselect("Aerodromes", sorted({r["icao"] for r in rows}))
+            shown = [
+                r for r in rows
+                if (not only_bad or r["status"] in ("MARGINAL", "NO-GO"))
+                and (not sel_icaos or r["icao"] in sel_icaos)
+            ]
+            st.dataframe(shown, use_container_width=True, hide_index=True)
+
 
 # =========================================================
 # 5) PDF
@@ -1812,12 +1553,10 @@ with tab4:
 
     if generate_pdf:
         try:
-            n_perf = len(st.session_state.get("perf", {}) or {})
-            total_pdf_steps = 5 + (2 if include_perf_pages and n_perf else 0)
             pdf_prog = st.progress(0, text="Filling form fields…")
 
             template_bytes = read_pdf_bytes(PDF_TEMPLATE_PATHS)
-            fieldset = get_field_names(template_bytes)
+            form = pdf_form.FieldCollector(template_bytes)  # field index cached per template hash
 
             wb = st.session_state.get("_wb", {})
             fuel = st.session_state.get("_fuel", {})
@@ -1825,20 +1564,14 @@ with tab4:
             date_str = st.session_state.flight_date.strftime("%d/%m/%Y")
             perf = st.session_state.get("perf", {}) or {}
 
-            f = {}
-
-            def put(name, value):
-                if name in fieldset:
-                    f[name] = value
+            f = form.values
+            put = form.put  # name or list of alternative names
 
             put("Date", date_str)
-            for candidate in ["Aircraft_Reg", "Aircraft_Reg.", "Aircraft Reg.", "Aircraft_Reg__", "Aircraft_Reg_"]:
-                put(candidate, reg)
+            put(["Aircraft_Reg", "Aircraft_Reg.", "Aircraft Reg.", "Aircraft_Reg__", "Aircraft_Reg_"], reg)
 
-            for nm in ["MTOW","MTOW_LB","Max_Takeoff_Weight","Maximum_Takeoff_Weight","MaxTakeoffWeight","Max_Takeoff_Wt"]:
-                put(nm, f"{MTOW_LB:.0f}")
-            for nm in ["MLW","MLW_LB","Max_Landing_Weight","Maximum_Landing_Weight","MaxLandingWeight","Max_Landing_Wt"]:
-                put(nm, f"{MLW_LB:.0f}")
+            put(["MTOW","MTOW_LB","Max_Takeoff_Weight","Maximum_Takeoff_Weight","MaxTakeoffWeight","Max_Takeoff_Wt"], f"{MTOW_LB:.0f}")
+            put(["MLW","MLW_LB","Max_Landing_Weight","Maximum_Landing_Weight","MaxLandingWeight","Max_Landing_Wt"], f"{MLW_LB:.0f}")
 
             def w_str(lb):
                 if lb == 0:
@@ -1916,9 +1649,9 @@ with tab4:
                 put(f"LDA_{suf}", f"{rw['lda']:.0f}")
                 pa_ft, da_ft = pa_da_local(ad["elev_ft"], met["qnh_hpa"], met["temp_c"])
                 put(f"Density_Alt_{suf}", f"{da_ft:.0f}")
-                if f"Pressure_Alt_{suf}" in fieldset:
+                if f"Pressure_Alt_{suf}" in form:
                     put(f"Pressure_Alt_{suf}", f"{pa_ft:.0f}")
-                elif suf == "DEPARTURE" and "Pressure_Alt _DEPARTURE" in fieldset:
+                elif suf == "DEPARTURE" and "Pressure_Alt _DEPARTURE" in form:
                     put("Pressure_Alt _DEPARTURE", f"{pa_ft:.0f}")
                 if suf in perf:
                     put(f"TODR_{suf}", perf[suf]["todr_str_m_pct"])
@@ -1953,29 +1686,22 @@ with tab4:
             put("Total_TIME",              fmt_hm(int(fuel.get("total_min", 0))))
             put("Total_FUEL",              fuel_str(float(fuel.get("total_l", 0.0))))
 
-            pdf_prog.progress(1 / total_pdf_steps, text="Filling form fields… done. Applying CG overlay…")
-
-            base_filled = fill_pdf(template_bytes, f)
             chart_points = [
                 {"label": "Empty",   "cg": ew_cg,                   "w": ew_lb,                 "rgb": (0.10, 0.60, 0.15)},
                 {"label": "Takeoff", "cg": wb.get("takeoff_cg", 0), "w": wb.get("takeoff_w",0), "rgb": (0.10, 0.30, 0.85)},
                 {"label": "Landing", "cg": wb.get("landing_cg", 0), "w": wb.get("landing_w",0), "rgb": (0.85, 0.15, 0.15)},
             ]
-            mb_pdf = draw_cg_overlay_on_page0(base_filled, chart_points)
-            pdf_prog.progress(2 / total_pdf_steps, text="CG overlay done. Rendering pages…")
 
-            sbs_img = mb_pdf_to_side_by_side_image(
-                mb_pdf, dpi=SBS_DPI, align_by=SBS_ALIGN,
-                gap_px=SBS_GAP_PX, bg=SBS_BG, sharpen=SBS_SHARPEN,
+            # One PyMuPDF document from template to output, serialised once
+            pdf_timer = pa28_pdf.StageTimer()
+            final_pdf = pa28_pdf.build_mb_pdf(
+                template_bytes, f, CG_CHART, chart_points,
+                perf_by_role=perf if include_perf_pages else None,
+                dpi=SBS_DPI, align_by=SBS_ALIGN, gap_px=SBS_GAP_PX,
+                bg=SBS_BG, sharpen=SBS_SHARPEN,
+                timer=pdf_timer,
+                progress=lambda frac, text: pdf_prog.progress(frac, text=text),
             )
-            pdf_prog.progress(3 / total_pdf_steps, text="Pages rendered. Building PDF…")
-
-            final_pdf = image_to_single_page_pdf(sbs_img, dpi=SBS_DPI)
-            pdf_prog.progress(4 / total_pdf_steps, text="M&B page done. Adding performance pages…")
-
-            if include_perf_pages and perf:
-                final_pdf = append_perf_pages(final_pdf, perf)
-                pdf_prog.progress(5 / total_pdf_steps, text="Performance pages added. Finalising…")
 
             pdf_prog.progress(1.0, text="PDF ready.")
             pdf_prog.empty()
@@ -1997,6 +1723,9 @@ with tab4:
             if include_perf_pages and perf:
                 pages_desc += f" + {(n_perf_pages + 1) // 2} performance page(s)"
             st.caption(f"{pages_desc} · {SBS_DPI} dpi")
+            st.caption(f"Build time: {pdf_timer.summary()}")
+            if form.missing:
+                st.warning("Not on the PDF template (left blank): " + ", ".join(form.missing))
 
         except Exception as e:
             st.error(f"PDF error: {e}")
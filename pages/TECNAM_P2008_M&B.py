@@ -15,16 +15,14 @@
 
 import streamlit as st
 import datetime as dt
-from math import cos, sin, radians, sqrt, atan2, degrees
+from math import cos, sin, radians
 import json
-import requests
 import unicodedata
 from pathlib import Path
 import pytz
-import io
+import time
 
-from pypdf import PdfReader, PdfWriter
-from pypdf.generic import NameObject
+from briefings import forecast, forecast_store, gist_store, pdf_form, tecnam_perf
 
 # -----------------------------
 # App setup & styles
@@ -344,81 +342,25 @@ def clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
 
-def interp1(x, x0, x1, y0, y1):
-    if x1 == x0:
-        return y0
-    t = (x - x0) / (x1 - x0)
-    return y0 + t * (y1 - y0)
+# Tabelas AFM compiladas uma vez (NumPy); aceitam escalares ou arrays
+PERF_TABLES = tecnam_perf.TecnamPerf(TAKEOFF, LANDING, ROC, VY)
+RUNWAY_TABLE = tecnam_perf.RunwayTable(AERODROMES_DB)
 
 
 def bilinear(pa, temp, table, key):
-    pas = sorted(table.keys())
-    pa_c = clamp(pa, pas[0], pas[-1])
-    p0 = max([p for p in pas if p <= pa_c])
-    p1 = min([p for p in pas if p >= pa_c])
-
-    temps = [-25, 0, 25, 50]
-    t = clamp(temp, temps[0], temps[-1])
-
-    if t <= 0:
-        t0, t1 = -25, 0
-    elif t <= 25:
-        t0, t1 = 0, 25
-    else:
-        t0, t1 = 25, 50
-
-    v00 = table[p0][key][t0]
-    v01 = table[p0][key][t1]
-    v10 = table[p1][key][t0]
-    v11 = table[p1][key][t1]
-
-    v0 = interp1(t, t0, t1, v00, v01)
-    v1 = interp1(t, t0, t1, v10, v11)
-    return interp1(pa_c, p0, p1, v0, v1)
+    if table is TAKEOFF:
+        return PERF_TABLES.takeoff_at(pa, temp, key)
+    if table is LANDING:
+        return PERF_TABLES.landing_at(pa, temp, key)
+    return tecnam_perf.PaTempGrid.from_table(table, key).at(pa, temp)
 
 
 def roc_interp(pa, temp, weight):
-    w = clamp(weight, 550.0, 650.0)
-
-    def roc_for_w(w_):
-        tab = ROC[int(w_)]
-        pas = sorted(tab.keys())
-        pa_c = clamp(pa, pas[0], pas[-1])
-        p0 = max([p for p in pas if p <= pa_c])
-        p1 = min([p for p in pas if p >= pa_c])
-
-        temps = [-25, 0, 25, 50]
-        t = clamp(temp, temps[0], temps[-1])
-
-        if t <= 0:
-            t0, t1 = -25, 0
-        elif t <= 25:
-            t0, t1 = 0, 25
-        else:
-            t0, t1 = 25, 50
-
-        v00 = tab[p0][t0]
-        v01 = tab[p0][t1]
-        v10 = tab[p1][t0]
-        v11 = tab[p1][t1]
-
-        v0 = interp1(t, t0, t1, v00, v01)
-        v1 = interp1(t, t0, t1, v10, v11)
-        return interp1(pa_c, p0, p1, v0, v1)
-
-    if w <= 600:
-        return interp1(w, 550, 600, roc_for_w(550), roc_for_w(600))
-    return interp1(w, 600, 650, roc_for_w(600), roc_for_w(650))
+    return PERF_TABLES.roc_at(pa, temp, weight)
 
 
 def vy_interp(pa, weight):
-    w_choice = 550 if weight <= 575 else (600 if weight <= 625 else 650)
-    table = VY[w_choice]
-    pas = sorted(table.keys())
-    pa_c = clamp(pa, pas[0], pas[-1])
-    p0 = max([p for p in pas if p <= pa_c])
-    p1 = min([p for p in pas if p >= pa_c])
-    return interp1(pa_c, p0, p1, table[p0], table[p1])
+    return PERF_TABLES.vy_at(pa, weight)
 
 
 def wind_components(qfu_deg, wind_dir_deg, wind_speed):
@@ -478,118 +420,40 @@ def ldg_corrections(ground_roll, headwind_kt, paved=False, slope_pc=0.0):
 # -----------------------------
 # Forecast provider (Open-Meteo)
 # -----------------------------
-OPENMETEO_URL = "https://api.open-meteo.com/v1/forecast"
+def om_forecast_many(queries):
+    """queries: (lat, lon, start_iso, end_iso) per leg -> HourlyForecast, same order.
+
+    Served from the shared forecast store; on a miss every aerodrome in
+    AERODROMES_DB goes in the same batched Open-Meteo request.
+    """
+    all_ads = [(ad["lat"], ad["lon"]) for ad in AERODROMES_DB.values() if ad.get("lat") is not None]
+    return [forecast.HourlyForecast.from_openmeteo(r) for r in forecast_store.get_many(queries, prefetch_points=all_ads)]
 
 
-@st.cache_data(ttl=900, show_spinner=False)
 def om_point_forecast(lat, lon, start_date_iso, end_date_iso):
-    params = {
-        "latitude": round(float(lat), 4),
-        "longitude": round(float(lon), 4),
-        "hourly": ",".join([
-            "temperature_2m",
-            "wind_speed_10m",
-            "wind_direction_10m",
-            "wind_gusts_10m",
-            "pressure_msl",
-        ]),
-        "timezone": "UTC",
-        "windspeed_unit": "kn",
-        "temperature_unit": "celsius",
-        "pressure_unit": "hPa",
-        "start_date": start_date_iso,
-        "end_date": end_date_iso,
-    }
-    try:
-        r = requests.get(OPENMETEO_URL, params=params, timeout=20)
-        if r.status_code != 200:
-            return {"error": f"HTTP {r.status_code}", "detail": r.text, "params": params}
-
-        data = r.json()
-        h = data.get("hourly", {})
-
-        times = h.get("time", []) or []
-        wspd_kn = h.get("wind_speed_10m", []) or []
-        wdir = h.get("wind_direction_10m", []) or []
-        gust_kn = h.get("wind_gusts_10m", []) or []
-        temp_c = h.get("temperature_2m", []) or []
-        qnh_hpa = h.get("pressure_msl", []) or []
-
-        ts = []
-        u_ms = []
-        v_ms = []
-        gust_ms = []
-        temp = []
-        press_pa = []
-
-        for i, t in enumerate(times):
-            dt_utc = dt.datetime.fromisoformat(t).replace(tzinfo=dt.timezone.utc)
-            ts.append(int(dt_utc.timestamp() * 1000))
-
-            spd_kn = wspd_kn[i] if i < len(wspd_kn) and wspd_kn[i] is not None else 0.0
-            dir_deg = wdir[i] if i < len(wdir) and wdir[i] is not None else 0.0
-            theta = radians(dir_deg)
-            spd_ms = spd_kn * 0.514444
-            u_ms.append(-spd_ms * sin(theta))
-            v_ms.append(-spd_ms * cos(theta))
-
-            gust_val = gust_kn[i] if i < len(gust_kn) and gust_kn[i] is not None else 0.0
-            gust_ms.append(gust_val * 0.514444)
-
-            temp.append(temp_c[i] if i < len(temp_c) else None)
-
-            qnh_val = qnh_hpa[i] if i < len(qnh_hpa) and qnh_hpa[i] is not None else None
-            press_pa.append(qnh_val * 100.0 if qnh_val is not None else None)
-
-        return {
-            "ts": ts,
-            "wind_u-surface": u_ms,
-            "wind_v-surface": v_ms,
-            "gust-surface": gust_ms,
-            "temp-surface": temp,
-            "pressure-surface": press_pa,
-        }
-    except Exception as e:
-        return {"error": str(e), "params": params}
+    return om_forecast_many([(lat, lon, start_date_iso, end_date_iso)])[0]
 
 
 def om_list_hours(resp):
-    if not resp or "ts" not in resp or not resp["ts"]:
+    if not resp or resp.error:
         return []
-    result = []
-    for i, tms in enumerate(resp["ts"]):
-        result.append((i, dt.datetime.utcfromtimestamp(tms / 1000.0).replace(tzinfo=dt.timezone.utc)))
-    return result
+    return resp.hours()
 
 
 def om_unpack_at(resp, idx):
     if idx is None:
         return None
 
-    def getv(key):
-        arr = resp.get(key, [])
-        return arr[idx] if arr and idx < len(arr) else None
-
-    u = getv("wind_u-surface")
-    v = getv("wind_v-surface")
-    gust = getv("gust-surface")
-
-    if u is None or v is None:
+    m = resp.at(idx)
+    if m["wind_dir"] is None or m["wind_kt"] is None:
         return None
 
-    speed_ms = sqrt(u * u + v * v)
-    dir_deg = (degrees(atan2(u, v)) + 180.0) % 360.0
-    speed_kt = speed_ms * 1.94384
-
-    temp_val = getv("temp-surface")
-    pres_pa = getv("pressure-surface")
-
     return {
-        "wind_dir": int(round(dir_deg)),
-        "wind_kt": int(round(speed_kt)),
-        "wind_gust_kt": int(round(gust * 1.94384)) if gust is not None else None,
-        "temp": int(round(float(temp_val))) if temp_val is not None else None,
-        "qnh": int(round((pres_pa / 100.0))) if pres_pa is not None else None,
+        "wind_dir": int(round(m["wind_dir"])),
+        "wind_kt": int(round(m["wind_kt"])),
+        "wind_gust_kt": int(round(m["gust_kt"])) if m["gust_kt"] is not None else None,
+        "temp": int(round(m["temp"])) if m["temp"] is not None else None,
+        "qnh": int(round(m["qnh"])) if m["qnh"] is not None else None,
     }
 
 
@@ -599,47 +463,23 @@ def om_unpack_at(resp, idx):
 GIST_FILE = "fleet_p2008.json"
 
 
-def gist_headers(token):
-    return {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github+json",
-        "Content-Type": "application/json",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
-
-
-def gist_load_fleet(token, gist_id):
+def gist_load_fleet(token, gist_id, force=False):
+    """(fleet, error) via the shared gist mirror; force=True revalidates with GitHub now."""
+    files, err = gist_store.load_files(
+        token, gist_id, max_age_s=0 if force else gist_store.FRESH_S, background=not force
+    )
+    if files is None:
+        return None, err
+    if files.get(GIST_FILE) is None:
+        return None, err or "Gist file not found; will create on first save."
     try:
-        r = requests.get(
-            f"https://api.github.com/gists/{gist_id}",
-            headers=gist_headers(token),
-            timeout=15,
-        )
-        if r.status_code != 200:
-            return None, f"GitHub error {r.status_code}: {r.text}"
-        data = r.json()
-        files = data.get("files", {})
-        if GIST_FILE in files and files[GIST_FILE].get("content") is not None:
-            return json.loads(files[GIST_FILE]["content"]), None
-        return None, "Gist file not found; will create on first save."
+        return json.loads(files[GIST_FILE]), err
     except Exception as e:
         return None, str(e)
 
 
 def gist_save_fleet(token, gist_id, fleet_dict):
-    try:
-        payload = {"files": {GIST_FILE: {"content": json.dumps(fleet_dict, indent=2, sort_keys=True)}}}
-        r = requests.patch(
-            f"https://api.github.com/gists/{gist_id}",
-            headers=gist_headers(token),
-            data=json.dumps(payload),
-            timeout=15,
-        )
-        if r.status_code not in (200, 201):
-            return f"GitHub error {r.status_code}: {r.text}"
-        return None
-    except Exception as e:
-        return str(e)
+    return gist_store.save_json(token, gist_id, GIST_FILE, fleet_dict, indent=2, sort_keys=True)
 
 
 # -----------------------------
@@ -731,10 +571,12 @@ with st.sidebar:
         with cols[0]:
             if st.button("Load from Gist (manual)"):
                 if token and gist_id:
-                    gdata, gerr = gist_load_fleet(token, gist_id)
+                    gdata, gerr = gist_load_fleet(token, gist_id, force=True)
                     if gdata is not None:
                         st.session_state.fleet = gdata
                         st.success(f"Loaded {len(gdata)} registrations.")
+                        if gerr:
+                            st.warning(f"GitHub unavailable, using the local copy: {gerr}")
                     else:
                         st.warning(f"Could not load: {gerr}")
                 else:
@@ -816,61 +658,14 @@ with tab_setup:
 
 # ---- helper: choose best runway ----
 def choose_best_runway(ad, temp_c, qnh, wind_dir, wind_kt, total_weight):
-    pa_ft = ad["elev_ft"] + (1013.0 - qnh) * 30.0
-    isa_temp = 15.0 - 2.0 * (ad["elev_ft"] / 1000.0)
-    da_ft = pa_ft + (120.0 * (temp_c - isa_temp))
-
-    candidates = []
-    for rw in ad["runways"]:
-        qfu = rw["qfu"]
-        paved = rw["paved"]
-        slope_pc = rw["slope_pc"]
-
-        hw, xw_abs, side = wind_components(qfu, wind_dir, wind_kt)
-
-        to_gr = bilinear(pa_ft, temp_c, TAKEOFF, "GR")
-        to_50 = bilinear(pa_ft, temp_c, TAKEOFF, "50ft")
-        ldg_gr = bilinear(pa_ft, temp_c, LANDING, "GR")
-        ldg_50 = bilinear(pa_ft, temp_c, LANDING, "50ft")
-
-        to_gr_corr = to_corrections_takeoff(to_gr, hw, paved=paved, slope_pc=slope_pc)
-        ldg_gr_corr = ldg_corrections(ldg_gr, hw, paved=paved, slope_pc=slope_pc)
-
-        feasible = (to_50 <= rw["toda"]) and (ldg_50 <= rw["lda"])
-        pct_todr = (to_50 / rw["toda"] * 100) if rw["toda"] > 0 else 0.0
-        pct_ldr = (ldg_50 / rw["lda"] * 100) if rw["lda"] > 0 else 0.0
-
-        roc_val = roc_interp(pa_ft, temp_c, total_weight) if total_weight > 0 else 0.0
-        vy_val = vy_interp(pa_ft, total_weight) if total_weight > 0 else 0.0
-
-        candidates.append({
-            "id": rw["id"],
-            "qfu": qfu,
-            "toda_av": rw["toda"],
-            "lda_av": rw["lda"],
-            "paved": paved,
-            "slope_pc": slope_pc,
-            "hw_comp": hw,
-            "xw_abs": xw_abs,
-            "xw_side": side,
-            "to_gr": to_gr_corr,
-            "to_50": to_50,
-            "ldg_gr": ldg_gr_corr,
-            "ldg_50": ldg_50,
-            "feasible": feasible,
-            "pa_ft": pa_ft,
-            "da_ft": da_ft,
-            "pct_todr": pct_todr,
-            "pct_ldr": pct_ldr,
-            "roc": roc_val,
-            "vy": vy_val,
-        })
-
-    best = sorted(
-        candidates,
-        key=lambda c: (c["feasible"], c["hw_comp"], -c["xw_abs"]),
-        reverse=True,
-    )[0]
+    cols = tecnam_perf.evaluate_runways(
+        PERF_TABLES,
+        tecnam_perf.RunwayTable({"": ad}),
+        {"temp": temp_c, "qnh": qnh, "wind_dir": wind_dir, "wind_kt": wind_kt},
+        total_weight,
+    )
+    candidates = tecnam_perf.runway_rows(cols)
+    best = next(c for c in candidates if c["best"])
     return best, candidates
 
 
@@ -931,21 +726,28 @@ with tab_aero:
             ok_count = 0
             err_count = 0
 
+            start_iso = st.session_state.flight_date.strftime("%Y-%m-%d")
+            # Para o alternate o target pode ser no dia seguinte se arr for às 23:00;
+            # o mesmo intervalo para todas as pernas -> um só pedido em lote
+            end_iso = max(t.date().strftime("%Y-%m-%d") for t in forecast_targets)
+            # Garantir que pedimos pelo menos o dia da data de voo
+            if end_iso < start_iso:
+                end_iso = start_iso
+
+            queries = []
+            for leg in st.session_state.legs:
+                ad = AERODROMES_DB[leg["icao"]]
+                queries.append((ad["lat"], ad["lon"], start_iso, end_iso))
+
+            resps = om_forecast_many(queries)
+            st.caption(forecast_store.summary(resps))
+
             for idx, leg in enumerate(st.session_state.legs):
                 icao = leg["icao"]
-                ad = AERODROMES_DB[icao]
-
-                start_iso = st.session_state.flight_date.strftime("%Y-%m-%d")
-                # Para o alternate o target pode ser no dia seguinte se arr for às 23:00
                 target_dt = forecast_targets[idx]
-                end_iso = target_dt.date().strftime("%Y-%m-%d")
-                # Garantir que pedimos pelo menos o dia da data de voo
-                if end_iso < start_iso:
-                    end_iso = start_iso
-
-                resp = om_point_forecast(ad["lat"], ad["lon"], start_iso, end_iso)
-                if "error" in resp:
-                    st.error(f"{icao}: Forecast error: {resp.get('error')} {resp.get('detail','')}")
+                resp = resps[idx]
+                if resp.error:
+                    st.error(f"{icao}: Forecast error: {resp.error} {resp.detail}")
                     err_count += 1
                     continue
 
@@ -959,9 +761,7 @@ with tab_aero:
                 st.session_state.hours[idx] = hours
 
                 # Escolher a hora mais próxima do target desta perna
-                nearest_idx, nearest_time = min(
-                    hours, key=lambda h: abs(h[1] - target_dt)
-                )
+                nearest_idx = resp.nearest(target_dt)
                 st.session_state.hour_idx[idx] = nearest_idx
 
                 met = om_unpack_at(resp, nearest_idx)
@@ -1174,6 +974,141 @@ with tab_aero:
 
     st.session_state["_perf_rows"] = perf_rows
 
+    with st.expander("Runway feasibility — all aerodromes", expanded=False):
+        st.caption(
+            "Every runway of every aerodrome in the database, scored in one pass with the same "
+            "rules as above (best runway per aerodrome, ranked by feasibility and worst % of TODA/LDA)."
+        )
+        met_src = st.radio(
+            "MET",
+            ["Departure MET everywhere", "Forecast at each aerodrome (departure hour)"],
+            horizontal=True,
+            key="feas_met_src",
+        )
+        c_f1, c_f2 = st.columns([0.3, 0.7])
+        with c_f1:
+            run_feas = st.button("Evaluate all aerodromes")
+        with c_f2:
+            feas_all_rwys = st.checkbox("Show every runway", value=False, key="feas_all_rwys")
+
+        if run_feas:
+            try:
+                total_w = st.session_state.get("_wb", {}).get("total_weight", 0.0) or 0.0
+                if met_src.startswith("Departure"):
+                    m0 = st.session_state.met[0]
+                    met_state = {
+                        "temp": st.session_state.get("temp_0", m0["temp"]),
+                        "qnh": st.session_state.get("qnh_0", m0["qnh"]),
+                        "wind_dir": st.session_state.get("wdir_0", m0["wind_dir"]),
+                        "wind_kt": st.session_state.get("wspd_0", m0["wind_kt"]),
+                    }
+                else:
+                    day_iso = st.session_state.forecast_target_utc.date().strftime("%Y-%m-%d")
+                    icaos = list(AERODROMES_DB.keys())
+                    resps = om_forecast_many([(AERODROMES_DB[k]["lat"], AERODROMES_DB[k]["lon"], day_iso, day_iso) for k in icaos])
+                    st.caption(forecast_store.summary(resps))
+                    met_state = {}
+                    for k, resp in zip(icaos, resps):
+                        h_idx = None if resp.error else resp.nearest(st.session_state.forecast_target_utc)
+                        if h_idx is None:
+                            continue
+                        met_state[k] = om_unpack_at(resp, h_idx) or {}
+
+                t0 = time.perf_counter()
+                cols = tecnam_perf.evaluate_runways(PERF_TABLES, RUNWAY_TABLE, met_state, total_w)
+                st.session_state["_feas_cols"] = cols
+                st.caption(f"{len(RUNWAY_TABLE)} runways at {len(RUNWAY_TABLE.icaos)} aerodromes scored in {(time.perf_counter() - t0) * 1000:.1f} ms.")
+            except Exception as e:
+                st.error(f"Feasibility error: {e}")
+
+        feas_cols = st.session_state.get("_feas_cols")
+        if feas_cols is not None:
+            ranked = tecnam_perf.ranked_table(feas_cols, best_only=not feas_all_rwys)
+            n_ok = sum(1 for r in ranked if r["feasible"])
+            st.markdown(f"**{n_ok}** feasible · {len(ranked) - n_ok} not feasible / no MET")
+            st.dataframe(
+                [
+                    {
+                        "#": r["rank"],
+                        "ICAO": r["icao"],
+                        "Name": r["name"],
+                        "RWY": r["id"],
+                        "OK": "✅" if r["feasible"] else "⚠️",
+                        "TODR 50ft (m)": round(r["to_50"]) if r["to_50"] == r["to_50"] else None,
+                        "TODA": round(r["toda_av"]),
+                        "TO %": round(r["pct_todr"]) if r["pct_todr"] == r["pct_todr"] else None,
+                        "LDR 50ft (m)": round(r["ldg_50"]) if r["ldg_50"] == r["ldg_50"] else None,
+                        "LDA": round(r["lda_av"]),
+                        "LD %": round(r["pct_ldr"]) if r["pct_ldr"] == r["pct_ldr"] else None,
+                        "HW (kt)": round(r["hw_comp"]) if r["hw_comp"] == r["hw_comp"] else None,
+                        "XW (kt)": f"{r['xw_side']} {r['xw_abs']:.0f}" if r["xw_abs"] == r["xw_abs"] else None,
+                        "PA/DA ft": f"{r['pa_ft']:.0f}/{r['da_ft']:.0f}" if r["pa_ft"] == r["pa_ft"] else None,
+                    }
+                    for r in ranked
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    with st.expander("Best departure window (forecast hours)", expanded=False):
+        fc = st.session_state.forecast
+        if not all(fc):
+            st.info("Fetch the forecast for all legs first.")
+        else:
+            st.caption(
+                "Every forecast hour as departure time, using the forecast already fetched: "
+                "arrival checked at the same offset as the hours above, alternate one hour later. "
+                "Each leg uses its best runway for that hour."
+            )
+            c_w1, c_w2, c_w3 = st.columns(3)
+            with c_w1:
+                win_xw = st.number_input("Max crosswind (kt)", min_value=0.0, value=float(XW_YELLOW_MAX), step=1.0, key="win_xw")
+            with c_w2:
+                win_tw = st.number_input("Max tailwind (kt)", min_value=0.0, value=0.0, step=1.0, key="win_tw")
+            with c_w3:
+                win_pct = st.number_input("Max % of TODA/LDA", min_value=10.0, max_value=100.0, value=100.0, step=5.0, key="win_pct")
+
+            arr_off_h = (st.session_state.forecast_arrival_utc - st.session_state.forecast_target_utc).total_seconds() / 3600.0
+            win_legs = [
+                (leg.get("role", ["Departure", "Arrival", "Alternate"][k]), AERODROMES_DB[leg["icao"]], fc[k])
+                for k, leg in enumerate(st.session_state.legs)
+            ]
+            win = tecnam_perf.departure_windows(
+                PERF_TABLES, win_legs, [0.0, arr_off_h, arr_off_h + 1.0],
+                st.session_state.get("_wb", {}).get("total_weight", 0.0) or 0.0,
+                limits={"xw_max": win_xw, "tw_max": win_tw, "max_pct": win_pct},
+                xw_bands=(XW_GREEN_MAX, XW_YELLOW_MAX),
+            )
+
+            def _utc(ms):
+                return dt.datetime.fromtimestamp(ms / 1000.0, tz=dt.timezone.utc).strftime("%d/%m %H:00Z")
+
+            if win["windows"]:
+                st.success("Departure windows: " + " · ".join(
+                    f"{_utc(a)}" + (f" → {_utc(b)}" if n > 1 else "") + f" ({n} h)" for a, b, n in win["windows"]
+                ))
+            else:
+                st.warning("No forecast hour passes all limits for every leg.")
+
+            def _leg_cell(r):
+                if r is None:
+                    return "no forecast"
+                return (
+                    f"{'✅' if r['ok'] else '⚠️'} RWY {r['rwy']} · {r['wind']} · "
+                    f"{'HW' if r['hw'] >= 0 else 'TW'} {abs(r['hw']):.0f} / XW {r['xw_side']} {r['xw']:.0f} ({r['xw_band']}) · "
+                    f"TO {r['pct_todr']:.0f}% LD {r['pct_ldr']:.0f}%"
+                )
+
+            st.dataframe(
+                [
+                    {"Departure (UTC)": _utc(r["ts"]), "All legs": "✅" if r["ok"] else "—",
+                     **{lab: _leg_cell(r[lab]) for lab, _, _ in win_legs}}
+                    for r in win["rows"]
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
 
 # ---- 3) Weight & Balance ----
 with tab_wb:
@@ -1408,104 +1343,54 @@ with tab_pdf:
                 return p.read_bytes()
         raise FileNotFoundError(f"Template not found in any known path: {paths}")
 
-    def get_field_names(template_bytes: bytes) -> set:
-        names = set()
-        reader = PdfReader(io.BytesIO(template_bytes))
-        try:
-            fd = reader.get_fields()
-            if fd:
-                names.update(fd.keys())
-        except Exception:
-            pass
-        try:
-            for page in reader.pages:
-                if "/Annots" in page:
-                    for a in page["/Annots"]:
-                        obj = a.get_object()
-                        if obj.get("/T"):
-                            names.add(str(obj["/T"]))
-        except Exception:
-            pass
-        return names
-
-    def put_any(out: dict, fieldset: set, keys, value: str):
-        if isinstance(keys, str):
-            keys = [keys]
-        for k in keys:
-            if k in fieldset:
-                out[k] = value
-
-    def fill_pdf(template_bytes: bytes, fields: dict) -> bytes:
-        reader = PdfReader(io.BytesIO(template_bytes))
-        writer = PdfWriter()
-        for page in reader.pages:
-            writer.add_page(page)
-
-        root = reader.trailer["/Root"]
-        if "/AcroForm" not in root:
-            raise RuntimeError("Template PDF has no AcroForm/fields.")
-
-        writer._root_object.update({NameObject("/AcroForm"): root["/AcroForm"]})
-        try:
-            writer._root_object["/AcroForm"].update({NameObject("/NeedAppearances"): True})
-        except Exception:
-            pass
-
-        for page in writer.pages:
-            writer.update_page_form_field_values(page, fields)
-
-        bio = io.BytesIO()
-        writer.write(bio)
-        return bio.getvalue()
-
     try:
         template_bytes = read_pdf_bytes(PDF_TEMPLATE_PATHS)
-        fieldset = get_field_names(template_bytes)
-        named_map = {}
+        form = pdf_form.FieldCollector(template_bytes)  # field index cached per template hash
+        named_map = form.values
 
         wb = st.session_state.get("_wb", {})
         fuel = st.session_state.get("_fuel", {})
         perf_rows = st.session_state.get("_perf_rows", [])
 
-        put_any(named_map, fieldset, "Aircraf_Reg", reg or "")
-        put_any(named_map, fieldset, "Date", date_str)
+        form.put("Aircraf_Reg", reg or "")
+        form.put("Date", date_str)
 
         ew = wb.get("ew", 0.0)
         ewm = wb.get("ew_moment", 0.0)
         fuel_l = wb.get("fuel_l", 0.0)
         fuel_w = fuel_l * AC["fuel_density"]
 
-        put_any(named_map, fieldset, "EmptyWeight_W", f"{ew:.0f}")
-        put_any(named_map, fieldset, "EmptyWeight_A", f"{(ewm/ew if ew>0 else 0.0):.3f}")
-        put_any(named_map, fieldset, "EmptyWeight_M", f"{ewm:.2f}")
-        put_any(named_map, fieldset, "Fuel_W", f"{fuel_w:.0f}")
-        put_any(named_map, fieldset, "Fuel_M", f"{(fuel_w*AC['fuel_arm']):.2f}")
-        put_any(named_map, fieldset, "Pilot&Passenger_W", f"{wb.get('pilot',0.0):.0f}")
-        put_any(named_map, fieldset, "Pilot&Passenger_M", f"{(wb.get('pilot',0.0)*AC['pilot_arm']):.2f}")
-        put_any(named_map, fieldset, "Baggage_W", f"{wb.get('baggage',0.0):.0f}")
-        put_any(named_map, fieldset, "Baggage_M", f"{(wb.get('baggage',0.0)*AC['baggage_arm']):.2f}")
-        put_any(named_map, fieldset, "TOTAL_W", f"{wb.get('total_weight',0.0):.0f}")
-        put_any(named_map, fieldset, "TOTAL_M", f"{wb.get('total_moment',0.0):.2f}")
-        put_any(named_map, fieldset, "CG", f"{wb.get('cg',0.0):.3f}")
+        form.put("EmptyWeight_W", f"{ew:.0f}")
+        form.put("EmptyWeight_A", f"{(ewm/ew if ew>0 else 0.0):.3f}")
+        form.put("EmptyWeight_M", f"{ewm:.2f}")
+        form.put("Fuel_W", f"{fuel_w:.0f}")
+        form.put("Fuel_M", f"{(fuel_w*AC['fuel_arm']):.2f}")
+        form.put("Pilot&Passenger_W", f"{wb.get('pilot',0.0):.0f}")
+        form.put("Pilot&Passenger_M", f"{(wb.get('pilot',0.0)*AC['pilot_arm']):.2f}")
+        form.put("Baggage_W", f"{wb.get('baggage',0.0):.0f}")
+        form.put("Baggage_M", f"{(wb.get('baggage',0.0)*AC['baggage_arm']):.2f}")
+        form.put("TOTAL_W", f"{wb.get('total_weight',0.0):.0f}")
+        form.put("TOTAL_M", f"{wb.get('total_moment',0.0):.2f}")
+        form.put("CG", f"{wb.get('cg',0.0):.3f}")
 
         by_role = {r["role"]: r for r in perf_rows} if perf_rows else {}
         for role, suf in {"Departure": "Dep", "Arrival": "Arr", "Alternate": "Alt"}.items():
             r = by_role.get(role)
             if not r:
                 continue
-            put_any(named_map, fieldset, f"Airfield_{suf}", r["icao"])
-            put_any(named_map, fieldset, f"QFU_{suf}", f"{int(round(r['qfu'])):03d}")
-            put_any(named_map, fieldset, f"Elev_{suf}", f"{int(round(r['elev_ft']))}")
-            put_any(named_map, fieldset, f"QNH_{suf}", f"{int(round(r['qnh']))}")
-            put_any(named_map, fieldset, f"Temp_{suf}", f"{int(round(r['temp']))}")
-            put_any(named_map, fieldset, f"Wind_{suf}", f"{int(round(r['wind_dir'])):03d}/{int(round(r['wind_kt'])):02d}")
-            put_any(named_map, fieldset, f"PA_{suf}", f"{int(round(r['pa_ft']))}")
-            put_any(named_map, fieldset, f"DA_{suf}", f"{int(round(r['da_ft']))}")
-            put_any(named_map, fieldset, f"TODA_{suf}", f"{int(round(r['toda_av']))}")
-            put_any(named_map, fieldset, f"TODR_{suf}", f"{int(round(r['to_50']))} ({int(round(r['pct_todr']))}%)")
-            put_any(named_map, fieldset, f"LDA_{suf}", f"{int(round(r['lda_av']))}")
-            put_any(named_map, fieldset, f"LDR_{suf}", f"{int(round(r['ldg_50']))} ({int(round(r['pct_ldr']))}%)")
-            put_any(named_map, fieldset, f"ROC_{suf}", f"{int(round(r.get('roc', 0)))}")
+            form.put(f"Airfield_{suf}", r["icao"])
+            form.put(f"QFU_{suf}", f"{int(round(r['qfu'])):03d}")
+            form.put(f"Elev_{suf}", f"{int(round(r['elev_ft']))}")
+            form.put(f"QNH_{suf}", f"{int(round(r['qnh']))}")
+            form.put(f"Temp_{suf}", f"{int(round(r['temp']))}")
+            form.put(f"Wind_{suf}", f"{int(round(r['wind_dir'])):03d}/{int(round(r['wind_kt'])):02d}")
+            form.put(f"PA_{suf}", f"{int(round(r['pa_ft']))}")
+            form.put(f"DA_{suf}", f"{int(round(r['da_ft']))}")
+            form.put(f"TODA_{suf}", f"{int(round(r['toda_av']))}")
+            form.put(f"TODR_{suf}", f"{int(round(r['to_50']))} ({int(round(r['pct_todr']))}%)")
+            form.put(f"LDA_{suf}", f"{int(round(r['lda_av']))}")
+            form.put(f"LDR_{suf}", f"{int(round(r['ldg_50']))} ({int(round(r['pct_ldr']))}%)")
+            form.put(f"ROC_{suf}", f"{int(round(r.get('roc', 0)))}")
 
         rate_pdf = float(fuel.get("rate_lph", 20.0))
 
@@ -1527,37 +1412,39 @@ with tab_pdf:
         req_ramp_min_pdf = int(round(fuel.get("req_ramp_min", 0)))
         total_ramp_min_pdf = int(round(fuel.get("total_ramp_min", req_ramp_min_pdf)))
 
-        put_any(named_map, fieldset, "Taxi_T", fmt_hm(taxi_min_pdf))
-        put_any(named_map, fieldset, "Taxi_F", f"{L_from_min(taxi_min_pdf)} L")
-        put_any(named_map, fieldset, "Climb_T", fmt_hm(climb_min_pdf))
-        put_any(named_map, fieldset, "Climb_F", f"{L_from_min(climb_min_pdf)} L")
-        put_any(named_map, fieldset, "Enroute_T", fmt_hm(enrt_min_pdf))
-        put_any(named_map, fieldset, "Enroute_F", f"{L_from_min(enrt_min_pdf)} L")
-        put_any(named_map, fieldset, "Descent_T", fmt_hm(desc_min_pdf))
-        put_any(named_map, fieldset, "Descent_F", f"{L_from_min(desc_min_pdf)} L")
-        put_any(named_map, fieldset, "Trip_T", fmt_hm(trip_min_pdf))
-        put_any(named_map, fieldset, "Trip_F", f"{int(round(fuel.get('trip_l',0)))} L")
-        put_any(named_map, fieldset, "Contingency_T", fmt_hm(cont_min_pdf))
-        put_any(named_map, fieldset, "Contingency_F", f"{int(round(fuel.get('cont_l',0)))} L")
-        put_any(named_map, fieldset, "Alternate_T", fmt_hm(alt_min_pdf))
-        put_any(named_map, fieldset, "Alternate_F", f"{L_from_min(alt_min_pdf)} L")
-        put_any(named_map, fieldset, "Reserve_T", fmt_hm(reserve_min_pdf))
-        put_any(named_map, fieldset, "Reserve_F", f"{L_from_min(reserve_min_pdf)} L")
-        put_any(named_map, fieldset, "Ramp_T", fmt_hm(req_ramp_min_pdf))
-        put_any(named_map, fieldset, "Ramp_F", f"{req_ramp_pdf} L")
-        put_any(named_map, fieldset, "Extra_T", fmt_hm(int(round((extra_l_pdf / rate_pdf) * 60))))
-        put_any(named_map, fieldset, "Extra_F", f"{extra_l_pdf} L")
-        put_any(named_map, fieldset, "Total_T", fmt_hm(total_ramp_min_pdf))
-        put_any(named_map, fieldset, "Total_F", f"{total_ramp_pdf} L")
+        form.put("Taxi_T", fmt_hm(taxi_min_pdf))
+        form.put("Taxi_F", f"{L_from_min(taxi_min_pdf)} L")
+        form.put("Climb_T", fmt_hm(climb_min_pdf))
+        form.put("Climb_F", f"{L_from_min(climb_min_pdf)} L")
+        form.put("Enroute_T", fmt_hm(enrt_min_pdf))
+        form.put("Enroute_F", f"{L_from_min(enrt_min_pdf)} L")
+        form.put("Descent_T", fmt_hm(desc_min_pdf))
+        form.put("Descent_F", f"{L_from_min(desc_min_pdf)} L")
+        form.put("Trip_T", fmt_hm(trip_min_pdf))
+        form.put("Trip_F", f"{int(round(fuel.get('trip_l',0)))} L")
+        form.put("Contingency_T", fmt_hm(cont_min_pdf))
+        form.put("Contingency_F", f"{int(round(fuel.get('cont_l',0)))} L")
+        form.put("Alternate_T", fmt_hm(alt_min_pdf))
+        form.put("Alternate_F", f"{L_from_min(alt_min_pdf)} L")
+        form.put("Reserve_T", fmt_hm(reserve_min_pdf))
+        form.put("Reserve_F", f"{L_from_min(reserve_min_pdf)} L")
+        form.put("Ramp_T", fmt_hm(req_ramp_min_pdf))
+        form.put("Ramp_F", f"{req_ramp_pdf} L")
+        form.put("Extra_T", fmt_hm(int(round((extra_l_pdf / rate_pdf) * 60))))
+        form.put("Extra_F", f"{extra_l_pdf} L")
+        form.put("Total_T", fmt_hm(total_ramp_min_pdf))
+        form.put("Total_F", f"{total_ramp_pdf} L")
 
         if st.button("Generate filled PDF", type="primary"):
             try:
-                out_bytes = fill_pdf(template_bytes, named_map)
+                out_bytes = pdf_form.fill_pdf(template_bytes, named_map)
                 mission = ascii_safe(st.session_state.get("mission_no", "")).strip().replace(" ", "_")
                 mission_part = f"{mission}_" if mission else ""
                 file_name = f"{mission_part}{reg}_P2008_MB_Perf.pdf"
                 st.download_button("Download PDF", data=out_bytes, file_name=file_name, mime="application/pdf")
                 st.success("PDF generated. Review before flight.")
+                if form.missing:
+                    st.warning("Not on the PDF template (left blank): " + ", ".join(form.missing))
             except Exception as e:
                 st.error(f"Could not generate PDF: {e}")
 
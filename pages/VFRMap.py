@@ -3,7 +3,9 @@ import pandas as pd
 import folium
 from streamlit_folium import st_folium
 from folium.plugins import MarkerCluster
-import re, os
+import os
+
+from briefings import refdata
 
 # ---------- Page config ----------
 st.set_page_config(
@@ -37,123 +39,20 @@ body, .stApp {
 </style>
 """, unsafe_allow_html=True)
 
-# ---------- Helpers ----------
-def dms_to_dd(token: str, is_lon=False):
-    token = str(token).strip()
-    m = re.match(r"^(\d+(?:\.\d+)?)([NSEW])$", token, re.I)
-    if not m:
-        return None
-    value, hemi = m.groups()
-    if "." in value:
-        if is_lon:
-            deg = int(value[0:3]); minutes = int(value[3:5]); seconds = float(value[5:])
-        else:
-            deg = int(value[0:2]); minutes = int(value[2:4]); seconds = float(value[4:])
-    else:
-        if is_lon:
-            deg = int(value[0:3]); minutes = int(value[3:5]); seconds = int(value[5:])
-        else:
-            deg = int(value[0:2]); minutes = int(value[2:4]); seconds = int(value[4:])
-    dd = deg + minutes/60 + seconds/3600
-    if hemi.upper() in ["S","W"]:
-        dd = -dd
-    return dd
-
-def parse_ad(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for line in df.iloc[:,0].dropna().tolist():
-        s = str(line).strip()
-        if not s or s.startswith(("Ident", "DEP/")):
-            continue
-        tokens = s.split()
-        coord_toks = [t for t in tokens if re.match(r"^\d+(?:\.\d+)?[NSEW]$", t)]
-        if len(coord_toks) >= 2:
-            lat_tok = coord_toks[-2]; lon_tok = coord_toks[-1]
-            lat = dms_to_dd(lat_tok, is_lon=False); lon = dms_to_dd(lon_tok, is_lon=True)
-            ident = tokens[0] if re.match(r"^[A-Z0-9]{4,}$", tokens[0]) else None
-            try:
-                name = " ".join(tokens[1:tokens.index(coord_toks[0])]).strip()
-            except ValueError:
-                name = " ".join(tokens[1:]).strip()
-            try:
-                lon_idx = tokens.index(lon_tok); city = " ".join(tokens[lon_idx+1:]) or None
-            except ValueError:
-                city = None
-            rows.append({
-                "source":"AD/HEL/ULM",
-                "ident":ident,
-                "name":name,
-                "city":city,
-                "lat":lat,
-                "lon":lon
-            })
-    return pd.DataFrame(rows).dropna(subset=["lat","lon"])
-
-def parse_localidades(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for line in df.iloc[:,0].dropna().tolist():
-        s = str(line).strip()
-        if not s or "Total de registos" in s:
-            continue
-        tokens = s.split()
-        coord_toks = [t for t in tokens if re.match(r"^\d{6,7}(?:\.\d+)?[NSEW]$", t)]
-        if len(coord_toks) >= 2:
-            lat_tok, lon_tok = coord_toks[0], coord_toks[1]
-            lat = dms_to_dd(lat_tok, is_lon=False); lon = dms_to_dd(lon_tok, is_lon=True)
-            try:
-                lon_idx = tokens.index(lon_tok)
-            except ValueError:
-                continue
-            code = tokens[lon_idx+1] if lon_idx+1 < len(tokens) else None
-            sector = " ".join(tokens[lon_idx+2:]) if lon_idx+2 < len(tokens) else None
-            name = " ".join(tokens[:tokens.index(lat_tok)]).strip()
-            rows.append({
-                "source":"Localidade",
-                "code":code,
-                "name":name,
-                "sector":sector,
-                "lat":lat,
-                "lon":lon
-            })
-    return pd.DataFrame(rows).dropna(subset=["lat","lon"])
-
-# ---------- VOR DB ----------
-VOR_CSV = "NAVAIDS_VOR.csv"
-
-def _load_vor_db(path: str) -> pd.DataFrame:
-    if os.path.exists(path):
-        try:
-            df = pd.read_csv(path)
-            df = df.rename(columns={c: c.lower() for c in df.columns})
-            df["ident"] = df["ident"].astype(str).str.upper().str.strip()
-            df["freq_mhz"] = pd.to_numeric(df["freq_mhz"], errors="coerce")
-            df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-            df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-            df["name"] = df.get("name","")
-            df = df.dropna(subset=["ident","freq_mhz","lat","lon"]).reset_index(drop=True)
-            return df[["ident","name","freq_mhz","lat","lon"]]
-        except Exception:
-            pass
-
-    fallback = [
-        ("CAS", "Cascais DVOR/DME", 114.30, 38.7483, -9.3619),
-        ("ESP", "Espichel DVOR/DME", 112.50, 38.4242, -9.1856),
-        ("VFA", "Faro DVOR/DME",     112.80, 37.0136, -7.9750),
-        ("FTM", "Fátima DVOR/DME",   113.50, 39.6656, -8.4928),
-        ("LIS", "Lisboa DVOR/DME",   114.80, 38.8878, -9.1628),
-        ("NSA", "Nisa DVOR/DME",     115.50, 39.5647, -7.9147),
-        ("PRT", "Porto DVOR/DME",    114.10, 41.2731, -8.6878),
-        ("SGR", "Sagres VOR/DME",    113.90, 37.0839, -8.94639),
-        ("SRA", "Sintra VORTAC",     112.10, 38.829201, -9.34),
-        ("VBZ", "Badajoz VOR/DME",   116.8,  38.889900, -6.815750)
-    ]
-    return pd.DataFrame(fallback, columns=["ident","name","freq_mhz","lat","lon"])
-
-vor_db = _load_vor_db(VOR_CSV)
-
 # ---------- Data ----------
-ad_df = parse_ad(pd.read_csv("AD-HEL-ULM.csv"))
-loc_df = parse_localidades(pd.read_csv("Localidades-Nova-versao-230223.csv"))
+# AD-HEL-ULM / Localidades / VOR parsed once per process (briefings.refdata)
+vor_db = refdata.vor_frame()
+
+_ad = refdata.ad_frame()
+ad_df = pd.DataFrame({
+    "source": "AD/HEL/ULM", "ident": _ad["ident"], "name": _ad["name"],
+    "city": _ad["city"], "lat": _ad["lat"], "lon": _ad["lon"],
+})
+_loc = refdata.loc_frame()
+loc_df = pd.DataFrame({
+    "source": "Localidade", "code": _loc["code"], "name": _loc["name"],
+    "sector": _loc["sector"], "lat": _loc["lat"], "lon": _loc["lon"],
+})
 
 # ---------- Map Center ----------
 if len(ad_df) + len(loc_df) > 0:
@@ -22,7 +22,6 @@
 from __future__ import annotations
 
 import datetime as dt
-import difflib
 import io
 import json
 import math
@@ -38,10 +37,13 @@ import streamlit as st
 from folium.plugins import Fullscreen, MarkerCluster, MeasureControl
 from streamlit_folium import st_folium
 
+from briefings import airways, catalog, geo, point_search, refdata, spatial, whatif
+from briefings.legs import Leg
+
 try:
-    import requests
+    from briefings import route_store
 except Exception:
-    requests = None
+    route_store = None
 
 try:
     from pdfrw import PdfDict, PdfName, PdfReader, PdfWriter
@@ -55,8 +57,6 @@ APP_TITLE = "NAVLOG Portugal — VFR + IFR Low"
 APP_SUBTITLE = "SIDs + STARs only. Aproximações não são carregadas como procedimentos."
 ROOT = Path(__file__).parent
 
-CSV_AD = ROOT / "AD-HEL-ULM.csv"
-CSV_LOC = ROOT / "Localidades-Nova-versao-230223.csv"
 CSV_VOR = ROOT / "NAVAIDS_VOR.csv"
 CSV_IFR_POINTS = ROOT / "IFR_POINTS.csv"
 CSV_IFR_AIRWAYS = ROOT / "IFR_AIRWAYS.csv"
@@ -265,24 +265,6 @@ def angdiff(a: float, b: float) -> float:
     return (float(a) - float(b) + 180.0) % 360.0 - 180.0
 
 
-def dms_token_to_dd(token: str, is_lon: bool = False) -> Optional[float]:
-    token = str(token).strip().upper()
-    match = re.match(r"^(\d+(?:\.\d+)?)([NSEW])$", token)
-    if not match:
-        return None
-    raw, hemi = match.groups()
-    if is_lon:
-        deg = int(raw[0:3])
-        mins = int(raw[3:5])
-        secs = float(raw[5:] or 0)
-    else:
-        deg = int(raw[0:2])
-        mins = int(raw[2:4])
-        secs = float(raw[4:] or 0)
-    value = deg + mins / 60.0 + secs / 3600.0
-    return -value if hemi in {"S", "W"} else value
-
-
 def dd_to_icao(lat: float, lon: float) -> str:
     lat_abs, lon_abs = abs(lat), abs(lon)
     lat_deg, lon_deg = int(lat_abs), int(lon_abs)
@@ -362,85 +344,44 @@ def load_csv_safe(path: Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def parse_ad_df(df: pd.DataFrame) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    if df.empty:
-        return pd.DataFrame(columns=["code", "name", "lat", "lon", "alt", "src", "routes", "remarks"])
-    for line in df.iloc[:, 0].dropna().tolist():
-        text = str(line).strip()
-        if not text or text.startswith(("Ident", "DEP/")):
-            continue
-        tokens = text.split()
-        coords = [t for t in tokens if re.match(r"^\d+(?:\.\d+)?[NSEW]$", t, re.I)]
-        if len(coords) < 2:
-            continue
-        lat = dms_token_to_dd(coords[-2], False)
-        lon = dms_token_to_dd(coords[-1], True)
-        if lat is None or lon is None:
-            continue
-        ident = tokens[0] if re.match(r"^[A-Z0-9]{3,5}$", tokens[0]) else ""
-        try:
-            name = " ".join(tokens[1:tokens.index(coords[0])]).strip()
-        except Exception:
-            name = ident or " ".join(tokens[:3])
-        rows.append({"code": clean_code(ident or name), "name": name or ident, "lat": lat, "lon": lon, "alt": 0.0, "src": "AD", "routes": "", "remarks": ""})
-    return pd.DataFrame(rows)
+def _non_empty(a: pd.Series, b: pd.Series) -> pd.Series:
+    """a or b, row by row ("" / None count as empty)."""
+    a = a.fillna("")
+    return a.where(a != "", b.fillna(""))
 
 
-def parse_loc_df(df: pd.DataFrame) -> pd.DataFrame:
-    rows: List[Dict[str, Any]] = []
-    if df.empty:
-        return pd.DataFrame(columns=["code", "name", "lat", "lon", "alt", "src", "routes", "remarks"])
-    for line in df.iloc[:, 0].dropna().tolist():
-        text = str(line).strip()
-        if not text or "Total de registos" in text:
-            continue
-        tokens = text.split()
-        coords = [t for t in tokens if re.match(r"^\d{6,7}(?:\.\d+)?[NSEW]$", t, re.I)]
-        if len(coords) < 2:
-            continue
-        lat = dms_token_to_dd(coords[0], False)
-        lon = dms_token_to_dd(coords[1], True)
-        if lat is None or lon is None:
-            continue
-        try:
-            lon_idx = tokens.index(coords[1])
-            code = tokens[lon_idx + 1] if lon_idx + 1 < len(tokens) else ""
-            name = " ".join(tokens[:tokens.index(coords[0])]).strip()
-        except Exception:
-            code = ""
-            name = text[:32]
-        rows.append({"code": clean_code(code or name), "name": name or code, "lat": lat, "lon": lon, "alt": 0.0, "src": "VFR", "routes": "", "remarks": ""})
-    return pd.DataFrame(rows)
+def load_ad_points(ref: "refdata.RefData") -> pd.DataFrame:
+    raw = refdata.ad_frame(ident_re=r"^[A-Z0-9]{3,5}$", data=ref)
+    return pd.DataFrame({
+        "code": _non_empty(raw["ident"], raw["name"]).map(clean_code),
+        "name": _non_empty(raw["name"], raw["ident"]),
+        "lat": raw["lat"], "lon": raw["lon"], "alt": 0.0, "src": "AD", "routes": "", "remarks": "",
+    })
 
 
-@st.cache_data(show_spinner=False)
-def load_vor(path_str: str) -> pd.DataFrame:
-    path = Path(path_str)
-    if not path.exists():
-        st.warning(f"CSV em falta: {path.name}")
-        return pd.DataFrame(columns=["ident", "name", "freq_mhz", "lat", "lon"])
-    df = pd.read_csv(path)
-    df = df.rename(columns={c: c.lower().strip() for c in df.columns})
-    df = df.rename(columns={"frequency": "freq_mhz", "freq": "freq_mhz", "latitude": "lat", "longitude": "lon"})
-    required = {"ident", "freq_mhz", "lat", "lon"}
-    if not required.issubset(df.columns):
-        st.error("NAVAIDS_VOR.csv precisa de colunas ident, freq_mhz, lat, lon.")
-        return pd.DataFrame(columns=["ident", "name", "freq_mhz", "lat", "lon"])
-    if "name" not in df.columns:
-        df["name"] = df["ident"]
-    df["ident"] = df["ident"].astype(str).str.upper().str.strip()
-    df["freq_mhz"] = pd.to_numeric(df["freq_mhz"], errors="coerce")
-    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-    return df.dropna(subset=["ident", "freq_mhz", "lat", "lon"])[["ident", "name", "freq_mhz", "lat", "lon"]]
+def load_loc_points(ref: "refdata.RefData") -> pd.DataFrame:
+    raw = refdata.loc_frame(data=ref)
+    return pd.DataFrame({
+        "code": _non_empty(raw["code"], raw["name"]).map(clean_code),
+        "name": _non_empty(raw["name"], raw["code"]),
+        "lat": raw["lat"], "lon": raw["lon"], "alt": 0.0, "src": "VFR", "routes": "", "remarks": "",
+    })
+
+
+def load_vor(ref: "refdata.RefData") -> pd.DataFrame:
+    vor = refdata.vor_frame(fallback=False, data=ref)
+    if vor.empty:
+        st.warning(f"CSV em falta ou inválido: {CSV_VOR.name} (precisa de colunas ident, freq_mhz, lat, lon).")
+    return vor
 
 
 @st.cache_data(show_spinner=False)
 def load_all_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    ad = parse_ad_df(load_csv_safe(CSV_AD))
-    loc = parse_loc_df(load_csv_safe(CSV_LOC))
-    vor = load_vor(str(CSV_VOR)).copy()
+    # AD / Localidades / VOR parsed once per process (briefings.refdata)
+    ref = refdata.load(ROOT)
+    ad = load_ad_points(ref)
+    loc = load_loc_points(ref)
+    vor = load_vor(ref)
 
     vor_points = pd.DataFrame()
     if not vor.empty:
@@ -526,15 +467,20 @@ def get_vor(ident: str) -> Optional[Dict[str, Any]]:
     return {"ident": str(r["ident"]), "name": str(r["name"]), "freq_mhz": float(r["freq_mhz"]), "lat": float(r["lat"]), "lon": float(r["lon"])}
 
 
+def vor_index() -> spatial.SpatialIndex:
+    # KD-tree dos VOR, reconstruído só quando os ficheiros mudam.
+    return spatial.cached("teste.vor", catalog_version(), VOR_DF["lat"], VOR_DF["lon"])
+
+
 def nearest_vor(lat: float, lon: float) -> Optional[Dict[str, Any]]:
-    best: Optional[Dict[str, Any]] = None
-    best_d = 1e9
-    for _, r in VOR_DF.iterrows():
-        d = gc_dist_nm(lat, lon, float(r["lat"]), float(r["lon"]))
-        if d < best_d:
-            best_d = d
-            best = {"ident": str(r["ident"]), "name": str(r["name"]), "freq_mhz": float(r["freq_mhz"]), "lat": float(r["lat"]), "lon": float(r["lon"]), "dist_nm": d}
-    return best
+    if VOR_DF.empty:
+        return None
+    rows, _ = vor_index().nearest(lat, lon, 1)
+    if not len(rows):
+        return None
+    r = VOR_DF.iloc[int(rows[0])]
+    d = gc_dist_nm(lat, lon, float(r["lat"]), float(r["lon"]))
+    return {"ident": str(r["ident"]), "name": str(r["name"]), "freq_mhz": float(r["freq_mhz"]), "lat": float(r["lat"]), "lon": float(r["lon"]), "dist_nm": d}
 
 
 def vor_radial_distance(vor: Dict[str, Any], lat: float, lon: float) -> Tuple[int, float]:
@@ -675,7 +621,7 @@ def dme_arc_polyline(A: Dict[str, Any], B: Dict[str, Any], step_deg: float = 2.0
         return [(A["lat"], A["lon"]), (B["lat"], B["lon"])]
     radials = arc_radials(float(A.get("arc_start_radial") or B.get("arc_start_radial") or 0), float(A.get("arc_end_radial") or B.get("arc_end_radial") or 0), str(A.get("arc_direction") or B.get("arc_direction") or "CW"), step_deg)
     radius = float(A.get("arc_radius_nm") or B.get("arc_radius_nm") or 0)
-    return [dest_point(vor["lat"], vor["lon"], radial, radius) for radial in radials]
+    return [tuple(p) for p in geo.radial_points(vor["lat"], vor["lon"], radials, radius).tolist()]
 
 
 def is_rate_turn_leg(A: Dict[str, Any], B: Dict[str, Any]) -> bool:
@@ -709,7 +655,7 @@ def turn_polyline(A: Dict[str, Any], B: Dict[str, Any], step_deg: float = 3.0) -
     start_radial = wrap360(start_course + 90 if direction == "LEFT" else start_course - 90)
     end_radial = wrap360(end_course + 90 if direction == "LEFT" else end_course - 90)
     arc_dir = "CCW" if direction == "LEFT" else "CW"
-    return [dest_point(center_lat, center_lon, radial, radius) for radial in arc_radials(start_radial, end_radial, arc_dir, step_deg)]
+    return [tuple(p) for p in geo.radial_points(center_lat, center_lon, arc_radials(start_radial, end_radial, arc_dir, step_deg), radius).tolist()]
 
 
 def xy_nm(lat: float, lon: float, lat0: float, lon0: float) -> Tuple[float, float]:
@@ -906,12 +852,41 @@ def load_procedure_point_catalog(path_str: str) -> pd.DataFrame:
     return df.dropna(subset=["code", "lat", "lon"]).drop_duplicates(subset=["code", "lat", "lon"]).reset_index(drop=True)
 
 
-def point_catalog() -> pd.DataFrame:
+def build_point_catalog() -> pd.DataFrame:
     proc_points = load_procedure_point_catalog(str(PROC_FILE))
     if proc_points.empty:
         return POINTS_DF
     return pd.concat([POINTS_DF, proc_points], ignore_index=True).drop_duplicates(subset=["code", "lat", "lon", "src"]).reset_index(drop=True)
 
+
+CATALOG_SOURCES = [ROOT / refdata.AD_CSV, ROOT / refdata.LOC_CSV, CSV_VOR, CSV_IFR_POINTS, PROC_FILE]
+
+
+def catalog_version() -> Tuple:
+    # Muda quando algum ficheiro de origem do catálogo muda (mtime/tamanho).
+    out = []
+    for path in CATALOG_SOURCES:
+        try:
+            stat = path.stat()
+            out.append((path.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            out.append((path.name, None, None))
+    return tuple(out)
+
+
+def get_catalog() -> catalog.PointCatalog:
+    # Catálogo + índices construídos uma vez por versão dos ficheiros (partilhado no processo).
+    return catalog.get(catalog_version(), build_point_catalog)
+
+
+def point_catalog() -> pd.DataFrame:
+    # DataFrame partilhado entre reruns: não alterar in-place.
+    return get_catalog().frame
+
+
+def search_index() -> point_search.SearchIndex:
+    return get_catalog().search_index
+
 # ===============================================================
 # POINT LOOKUP / ROUTE PARSER
 # ===============================================================
@@ -943,43 +918,23 @@ def df_row_to_point(row: pd.Series, alt: float = 0.0) -> Point:
 
 def db_point(code: str, alt: float = 0.0, src_priority: Optional[List[str]] = None) -> Optional[Point]:
     code = clean_code(code)
-    catalog = point_catalog()
-    if not code or catalog.empty or "code" not in catalog.columns:
+    points = get_catalog()
+    if not code or points.empty or "code" not in points.frame.columns:
         return None
-    hit = catalog[catalog["code"].astype(str).str.upper().str.strip() == code].copy()
-    if hit.empty:
+    row = points.first(code, src_priority or None)
+    if row is None:
         return None
-    if src_priority and "src" in hit.columns:
-        order = {str(src): i for i, src in enumerate(src_priority)}
-        hit["__prio"] = hit["src"].astype(str).map(lambda src: order.get(src, 999))
-        hit = hit.sort_values("__prio")
-    return df_row_to_point(hit.iloc[0], alt)
+    return df_row_to_point(points.frame.iloc[row], alt)
 
 
 def search_points(query: str, limit: int = 30, last: Optional[Point] = None) -> pd.DataFrame:
-    q = query.strip().lower()
-    catalog = point_catalog()
-    if not q or catalog.empty:
-        return catalog.head(0)
-    mask = catalog.apply(lambda r: q in " ".join(str(v).lower() for v in r.values), axis=1)
-    df = catalog[mask].copy()
-    if df.empty:
-        return df
-
-    def score(row: pd.Series) -> float:
-        code = str(row.get("code") or "").lower()
-        name = str(row.get("name") or "").lower()
-        sim = difflib.SequenceMatcher(None, q, f"{code} {name}").ratio()
-        starts = 1.5 if code.startswith(q) or name.startswith(q) else 0.0
-        exact = 3.0 if code == q else 0.0
-        src_bonus = {"IFR": 0.35, "VOR": 0.30, "PROC": 0.28, "AD": 0.20, "VFR": 0.0}.get(str(row.get("src")), 0.0)
-        near = 0.0
-        if last:
-            near = 1.0 / (1.0 + gc_dist_nm(last.lat, last.lon, float(row["lat"]), float(row["lon"])))
-        return exact + starts + sim + src_bonus + near * 0.25
-
-    df["_score"] = df.apply(score, axis=1)
-    return df.sort_values("_score", ascending=False).head(limit)
+    index = search_index()
+    if not query.strip() or not len(index):
+        return index.frame.head(0)
+    rows, scores = index.search(query, limit=limit, near=(last.lat, last.lon) if last else None)
+    df = index.frame.iloc[rows].copy()
+    df["_score"] = scores
+    return df
 
 
 def resolve_token(token: str, default_alt: float, last: Optional[Point] = None) -> Tuple[Optional[Point], str]:
@@ -996,42 +951,44 @@ def resolve_token(token: str, default_alt: float, last: Optional[Point] = None)
         lon = float(match.group(2))
         return Point(code="USERCOORD", name=f"{lat:.4f},{lon:.4f}", lat=lat, lon=lon, alt=default_alt, src="USER"), ""
     code = clean_code(raw)
-    catalog = point_catalog()
-    exact = catalog[catalog["code"].astype(str).str.upper() == code]
-    if not exact.empty:
-        priority = {"VOR": 0, "IFR": 1, "PROC": 2, "AD": 3, "VFR": 4}
-        exact = exact.assign(_prio=exact["src"].map(lambda x: priority.get(str(x), 9))).sort_values("_prio")
-        return df_row_to_point(exact.iloc[0], default_alt), ""
+    points = get_catalog()
+    row = points.first(code)  # VOR > IFR > PROC > AD > VFR
+    if row is not None:
+        return df_row_to_point(points.frame.iloc[row], default_alt), ""
     fuzzy = search_points(raw, limit=1, last=last)
     if not fuzzy.empty and float(fuzzy.iloc[0].get("_score", 0)) >= 1.1:
         return df_row_to_point(fuzzy.iloc[0], default_alt), f"'{raw}' resolvido como {fuzzy.iloc[0]['code']}"
     return None, f"Não encontrei ponto: {raw}"
 
 
+def airway_graph() -> airways.AirwayGraph:
+    # Grafo das airways (fixos + segmentos), construído uma vez por versão do CSV.
+    try:
+        stat = CSV_IFR_AIRWAYS.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = None
+    return airways.get(version, AIRWAYS_DF)
+
+
 def list_airways() -> List[str]:
-    if AIRWAYS_DF.empty:
-        return []
-    return sorted(AIRWAYS_DF["airway"].dropna().astype(str).str.upper().unique())
+    return sorted(airway_graph().sequence)
 
 
 def expand_airway(airway: str, start_code: str, end_code: str, default_alt: float) -> Tuple[List[Point], str]:
-    sub = AIRWAYS_DF[AIRWAYS_DF["airway"].astype(str).str.upper() == airway.upper()].sort_values("seq")
-    if sub.empty:
+    graph = airway_graph()
+    if airway.upper() not in graph.sequence:
         return [], f"Airway {airway} não existe no CSV."
-    codes = [clean_code(x) for x in sub["point"].tolist()]
     start_code = clean_code(start_code)
     end_code = clean_code(end_code)
-    if start_code not in codes or end_code not in codes:
+    chunk = graph.segment(airway, start_code, end_code)
+    if chunk is None:
         return [], f"{airway}: endpoints {start_code}/{end_code} não estão ambos na airway."
-    i1 = codes.index(start_code)
-    i2 = codes.index(end_code)
-    chunk = sub.iloc[min(i1, i2): max(i1, i2) + 1]
-    if i2 < i1:
-        chunk = chunk.iloc[::-1]
-    points: List[Point] = []
-    for _, r in chunk.iterrows():
-        points.append(Point(code=clean_code(r["point"]), name=clean_code(r["point"]), lat=float(r["lat"]), lon=float(r["lon"]), alt=default_alt, src="IFR", routes=airway))
-    return points, ""
+    return [Point(code=code, name=code, lat=lat, lon=lon, alt=default_alt, src="IFR", routes=airway) for code, lat, lon in chunk], ""
+
+
+def route_by_airways(start: str, end: str, level_ft: Optional[float] = None, route_types: Optional[List[str]] = None) -> Tuple[Optional[airways.AirwayRoute], str]:
+    return airway_graph().route(clean_code(start), clean_code(end), level_ft=level_ft, route_types=route_types)
 
 
 def parse_route_text(text: str, default_alt: float) -> Tuple[List[Point], List[str]]:
@@ -1064,6 +1021,20 @@ def parse_route_text(text: str, default_alt: float) -> Tuple[List[Point], List[s
                     output.append(p_end)
             i += 3
             continue
+        if tokens[i] in airway_set and output and i + 1 < len(tokens):
+            # Airways encadeadas (A UZ218 B UN870 C): a seguinte começa no último ponto.
+            p_end, msg = resolve_token(tokens[i + 1], default_alt, output[-1])
+            if msg:
+                notes.append(msg)
+            if p_end:
+                expanded, msg = expand_airway(tokens[i], output[-1].code, p_end.code, default_alt)
+                if expanded:
+                    output.extend(expanded[1:])
+                else:
+                    notes.append(msg + " Usei DCT.")
+                    output.append(p_end)
+            i += 2
+            continue
         p, msg = resolve_token(tokens[i], default_alt, output[-1] if output else None)
         if msg:
             notes.append(msg)
@@ -1231,6 +1202,7 @@ def refresh_procedure_waypoints(wps: List[Dict[str, Any]]) -> List[Dict[str, Any
     Também preserva STOP/HOLD, vento local e texto do navlog quando existirem.
     """
     refreshed: List[Dict[str, Any]] = []
+    cache = route_cache()
     i = 0
     while i < len(wps):
         point = wps[i]
@@ -1253,7 +1225,7 @@ def refresh_procedure_waypoints(wps: List[Dict[str, Any]]) -> List[Dict[str, Any
             old_by_order[order] = old
 
         try:
-            new_block = build_procedure_points(str(proc_id), proc_instance_id=str(instance_id))
+            new_block = procedure_block(str(proc_id), str(instance_id), cache)
             for pos, new in enumerate(new_block):
                 order = int(new.get("proc_order", pos))
                 old = old_by_order.get(order)
@@ -1297,69 +1269,70 @@ def wind_for_point(point: Dict[str, Any]) -> Tuple[int, int]:
     return int(point.get("wind_from") or st.session_state.wind_from), int(point.get("wind_kt") or st.session_state.wind_kt)
 
 
+def route_segment(A: Dict[str, Any], B: Dict[str, Any], profile: Dict[str, float], dist: float, tc: float) -> List[Dict[str, Any]]:
+    # Nós da perna A→B da rota do utilizador: cópia de A + TOC/TOD se couber.
+    output: List[Dict[str, Any]] = [A.copy()]
+    if A.get("no_auto_vnav") or B.get("no_auto_vnav") or is_dme_arc_leg(A, B) or is_rate_turn_leg(A, B):
+        return output
+
+    wf, wk = wind_for_point(A)
+    from_label = str(A.get("code") or A.get("name") or "FROM")
+    to_label = str(B.get("code") or B.get("name") or "TO")
+
+    if B["alt"] > A["alt"]:
+        t_min = (B["alt"] - A["alt"]) / max(float(st.session_state.roc_fpm), 1.0)
+        _, _, gs = wind_triangle(tc, profile["climb_tas"], wf, wk)
+        d_need = gs * t_min / 60.0
+        if 0.05 < d_need < dist - 0.05:
+            lat, lon = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], d_need)
+            d_from = rd(d_need)
+            d_to = rd(dist - d_need)
+            p = Point(code="TOC", name="TOC", lat=lat, lon=lon, alt=B["alt"], src="CALC", uid=next_uid()).to_dict()
+            p.update({
+                "navlog_note": chr(10).join(["TOC", f"+{d_from:.1f} {compact_nav_token(from_label)}", f"-{d_to:.1f} {compact_nav_token(to_label)}"]),
+                "calc_detail": f"{d_from:.1f} NM from {from_label} / {d_to:.1f} NM to {to_label}",
+                "calc_from_code": from_label,
+                "calc_to_code": to_label,
+                "calc_dist_from_prev": d_from,
+                "calc_dist_to_next": d_to,
+            })
+            output.append(p)
+
+    elif B["alt"] < A["alt"]:
+        t_min = (A["alt"] - B["alt"]) / max(float(st.session_state.rod_fpm), 1.0)
+        _, _, gs = wind_triangle(tc, profile["descent_tas"], wf, wk)
+        d_need = gs * t_min / 60.0
+        if 0.05 < d_need < dist - 0.05:
+            d_from = rd(max(0.0, dist - d_need))
+            d_to = rd(d_need)
+            lat, lon = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], d_from)
+            p = Point(code="TOD", name="TOD", lat=lat, lon=lon, alt=A["alt"], src="CALC", uid=next_uid()).to_dict()
+            p.update({
+                "navlog_note": chr(10).join(["TOD", f"+{d_from:.1f} {compact_nav_token(from_label)}", f"-{d_to:.1f} {compact_nav_token(to_label)}"]),
+                "calc_detail": f"{d_from:.1f} NM from {from_label} / {d_to:.1f} NM to {to_label}",
+                "calc_from_code": from_label,
+                "calc_to_code": to_label,
+                "calc_dist_from_prev": d_from,
+                "calc_dist_to_next": d_to,
+            })
+            output.append(p)
+    return output
+
+
 def build_route_nodes(user_wps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if len(user_wps) < 2:
         return []
     profile = current_profile()
     output: List[Dict[str, Any]] = []
-
+    # Distância/rumo de todas as pernas de uma vez.
+    leg_dist, leg_tc = geo.leg_geometry([p["lat"] for p in user_wps], [p["lon"] for p in user_wps])
     for i in range(len(user_wps) - 1):
-        A = user_wps[i]
-        B = user_wps[i + 1]
-        output.append(A.copy())
-
-        if A.get("no_auto_vnav") or B.get("no_auto_vnav") or is_dme_arc_leg(A, B) or is_rate_turn_leg(A, B):
-            continue
-
-        dist = gc_dist_nm(A["lat"], A["lon"], B["lat"], B["lon"])
-        tc = gc_course_tc(A["lat"], A["lon"], B["lat"], B["lon"])
-        wf, wk = wind_for_point(A)
-        from_label = str(A.get("code") or A.get("name") or "FROM")
-        to_label = str(B.get("code") or B.get("name") or "TO")
-
-        if B["alt"] > A["alt"]:
-            t_min = (B["alt"] - A["alt"]) / max(float(st.session_state.roc_fpm), 1.0)
-            _, _, gs = wind_triangle(tc, profile["climb_tas"], wf, wk)
-            d_need = gs * t_min / 60.0
-            if 0.05 < d_need < dist - 0.05:
-                lat, lon = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], d_need)
-                d_from = rd(d_need)
-                d_to = rd(dist - d_need)
-                p = Point(code="TOC", name="TOC", lat=lat, lon=lon, alt=B["alt"], src="CALC", uid=next_uid()).to_dict()
-                p.update({
-                    "navlog_note": chr(10).join(["TOC", f"+{d_from:.1f} {compact_nav_token(from_label)}", f"-{d_to:.1f} {compact_nav_token(to_label)}"]),
-                    "calc_detail": f"{d_from:.1f} NM from {from_label} / {d_to:.1f} NM to {to_label}",
-                    "calc_from_code": from_label,
-                    "calc_to_code": to_label,
-                    "calc_dist_from_prev": d_from,
-                    "calc_dist_to_next": d_to,
-                })
-                output.append(p)
-
-        elif B["alt"] < A["alt"]:
-            t_min = (A["alt"] - B["alt"]) / max(float(st.session_state.rod_fpm), 1.0)
-            _, _, gs = wind_triangle(tc, profile["descent_tas"], wf, wk)
-            d_need = gs * t_min / 60.0
-            if 0.05 < d_need < dist - 0.05:
-                d_from = rd(max(0.0, dist - d_need))
-                d_to = rd(d_need)
-                lat, lon = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], d_from)
-                p = Point(code="TOD", name="TOD", lat=lat, lon=lon, alt=A["alt"], src="CALC", uid=next_uid()).to_dict()
-                p.update({
-                    "navlog_note": chr(10).join(["TOD", f"+{d_from:.1f} {compact_nav_token(from_label)}", f"-{d_to:.1f} {compact_nav_token(to_label)}"]),
-                    "calc_detail": f"{d_from:.1f} NM from {from_label} / {d_to:.1f} NM to {to_label}",
-                    "calc_from_code": from_label,
-                    "calc_to_code": to_label,
-                    "calc_dist_from_prev": d_from,
-                    "calc_dist_to_next": d_to,
-                })
-                output.append(p)
-
+        output.extend(route_segment(user_wps[i], user_wps[i + 1], profile, float(leg_dist[i]), float(leg_tc[i])))
     output.append(user_wps[-1].copy())
     return output
 
 
-def tracking_instruction(A: Dict[str, Any], B: Dict[str, Any], preferred_vor: str = "") -> str:
+def tracking_instruction(A: Dict[str, Any], B: Dict[str, Any], preferred_vor: str = "", mid: Optional[Tuple[float, float]] = None) -> str:
     if B.get("leg_instruction"):
         return str(B.get("leg_instruction"))
     if B.get("navlog_note"):
@@ -1371,8 +1344,9 @@ def tracking_instruction(A: Dict[str, Any], B: Dict[str, Any], preferred_vor: st
         return f"RATE 1 {arrow} TRK{int(round(float(B.get('turn_end_course', 0)))):03d}"
     vor = get_vor(preferred_vor) if preferred_vor else None
     if not vor:
-        mid_lat, mid_lon = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], gc_dist_nm(A["lat"], A["lon"], B["lat"], B["lon"]) / 2)
-        vor = nearest_vor(mid_lat, mid_lon)
+        if mid is None:
+            mid = point_along_gc(A["lat"], A["lon"], B["lat"], B["lon"], gc_dist_nm(A["lat"], A["lon"], B["lat"], B["lon"]) / 2)
+        vor = nearest_vor(mid[0], mid[1])
     if not vor:
         return ""
     radial_a, dist_a = vor_radial_distance(vor, A["lat"], A["lon"])
@@ -1384,98 +1358,254 @@ def tracking_instruction(A: Dict[str, Any], B: Dict[str, Any], preferred_vor: st
     return f"X-RAD {vor['ident']} R{radial_a:03d}->R{radial_b:03d}"
 
 
-def build_legs(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    if len(nodes) < 2:
-        return []
-    profile = current_profile()
-    base_dt = None
+def leg_core(A: Dict[str, Any], B: Dict[str, Any], profile: Dict[str, float], dist_gc: float, tc_gc: float, mid: Tuple[float, float]) -> Leg:
+    # Tudo o que só depende de A, B e do setup; posição, EFOB e horas vêm de propagate_legs.
+    if is_dme_arc_leg(A, B):
+        dist_raw = dme_arc_distance_nm(A, B)
+        tc = dme_arc_course(A, B)
+    elif is_rate_turn_leg(A, B):
+        dist_raw = turn_distance_nm(A, B)
+        tc = turn_course(A, B)
+    else:
+        dist_raw = dist_gc
+        tc = tc_gc
+    dist = rd(dist_raw)
+    wf, wk = wind_for_point(A)
+    if B["alt"] > A["alt"] + 1:
+        leg_profile, tas = "CLIMB", profile["climb_tas"]
+    elif B["alt"] < A["alt"] - 1:
+        leg_profile, tas = "DESCENT", profile["descent_tas"]
+    else:
+        leg_profile, tas = "LEVEL", profile["cruise_tas"]
+    _, th, gs = wind_triangle(tc, tas, wf, wk)
+    mh = apply_mag_var(th, float(st.session_state.mag_var), bool(st.session_state.mag_is_east))
+    ete = rt((dist / max(gs, 1e-9)) * 3600.0) if gs > 0 and dist > 0 else 0
+    burn = rf(profile["fuel_flow_lh"] * ete / 3600.0)
+
+    hold_min = float(B.get("stop_min") or 0.0)
+    hold_sec = rt(hold_min * 60.0) if hold_min > 0 else 0
+    hold_dist = rd(gs * hold_sec / 3600.0) if hold_sec > 0 and gs > 0 else 0.0
+    hold_burn = rf(profile["fuel_flow_lh"] * hold_sec / 3600.0) if hold_sec > 0 else 0.0
+    pref_vor = A.get("vor_ident") if A.get("vor_pref") == "FIXED" else ""
+    return Leg(
+        profile=leg_profile,
+        TC=tc,
+        TH=th,
+        MH=mh,
+        TAS=tas,
+        GS=gs,
+        Dist=dist,
+        time_sec=ete,
+        burn=burn,
+        hold_sec=hold_sec,
+        hold_dist=hold_dist,
+        hold_burn=hold_burn,
+        hold_min=hold_min,
+        wind_from=wf,
+        wind_kt=wk,
+        tracking=tracking_instruction(A, B, pref_vor, mid),
+        is_dme_arc=is_dme_arc_leg(A, B),
+        is_turn=is_rate_turn_leg(A, B),
+    )
+
+
+def start_clock_dt() -> Optional[dt.datetime]:
     if str(st.session_state.start_clock).strip():
         try:
             h, m = map(int, str(st.session_state.start_clock).strip().split(":"))
-            base_dt = dt.datetime.combine(dt.date.today(), dt.time(h, m))
+            return dt.datetime.combine(dt.date.today(), dt.time(h, m))
         except Exception:
-            base_dt = None
-    t_cursor = 0
-    efob = max(0.0, float(st.session_state.start_efob) - profile["taxi_fuel_l"])
-    legs: List[Dict[str, Any]] = []
-
-    for i in range(len(nodes) - 1):
-        A = nodes[i]
-        B = nodes[i + 1]
-        if is_dme_arc_leg(A, B):
-            dist_raw = dme_arc_distance_nm(A, B)
-            tc = dme_arc_course(A, B)
-        elif is_rate_turn_leg(A, B):
-            dist_raw = turn_distance_nm(A, B)
-            tc = turn_course(A, B)
-        else:
-            dist_raw = gc_dist_nm(A["lat"], A["lon"], B["lat"], B["lon"])
-            tc = gc_course_tc(A["lat"], A["lon"], B["lat"], B["lon"])
-        dist = rd(dist_raw)
-        wf, wk = wind_for_point(A)
-        if B["alt"] > A["alt"] + 1:
-            leg_profile, tas = "CLIMB", profile["climb_tas"]
-        elif B["alt"] < A["alt"] - 1:
-            leg_profile, tas = "DESCENT", profile["descent_tas"]
-        else:
-            leg_profile, tas = "LEVEL", profile["cruise_tas"]
-        _, th, gs = wind_triangle(tc, tas, wf, wk)
-        mh = apply_mag_var(th, float(st.session_state.mag_var), bool(st.session_state.mag_is_east))
-        ete = rt((dist / max(gs, 1e-9)) * 3600.0) if gs > 0 and dist > 0 else 0
-        burn = rf(profile["fuel_flow_lh"] * ete / 3600.0)
+            return None
+    return None
+
+
+def start_efob_after_taxi() -> float:
+    return max(0.0, float(st.session_state.start_efob) - float(st.session_state.taxi_fuel_l))
 
-        hold_min = float(B.get("stop_min") or 0.0)
-        hold_sec = rt(hold_min * 60.0) if hold_min > 0 else 0
-        hold_dist = rd(gs * hold_sec / 3600.0) if hold_sec > 0 and gs > 0 else 0.0
-        hold_burn = rf(profile["fuel_flow_lh"] * hold_sec / 3600.0) if hold_sec > 0 else 0.0
 
+def propagate_legs(cores: List[Leg], t_cursor: int = 0, efob: Optional[float] = None, first_index: int = 1) -> Tuple[List[Leg], List[int]]:
+    """EFOB e horas acumuladas a partir de (t_cursor, efob); devolve as pernas e o tempo no fim de cada uma.
+
+    A perna n liga os nós first_index - 1 + n e first_index + n de route_nodes.
+    """
+    base_dt = start_clock_dt()
+    if efob is None:
+        efob = start_efob_after_taxi()
+    legs: List[Leg] = []
+    t_ends: List[int] = []
+    for n, core in enumerate(cores):
+        ete, hold_sec = core.time_sec, core.hold_sec
         efob_start = efob
-        efob_after_leg = max(0.0, rf(efob_start - burn))
-        efob_end = max(0.0, rf(efob_after_leg - hold_burn))
+        efob_after_leg = max(0.0, rf(efob_start - core.burn))
+        efob_end = max(0.0, rf(efob_after_leg - core.hold_burn))
         clk_start = (base_dt + dt.timedelta(seconds=t_cursor)).strftime("%H:%M") if base_dt else f"T+{mmss(t_cursor)}"
         clk_arrive = (base_dt + dt.timedelta(seconds=t_cursor + ete)).strftime("%H:%M") if base_dt else f"T+{mmss(t_cursor + ete)}"
         clk_end = (base_dt + dt.timedelta(seconds=t_cursor + ete + hold_sec)).strftime("%H:%M") if base_dt else f"T+{mmss(t_cursor + ete + hold_sec)}"
-        pref_vor = A.get("vor_ident") if A.get("vor_pref") == "FIXED" else ""
-        legs.append({
-            "i": len(legs) + 1,
-            "A": A,
-            "B": B,
-            "profile": leg_profile,
-            "TC": tc,
-            "TH": th,
-            "MH": mh,
-            "TAS": tas,
-            "GS": gs,
-            "Dist": dist,
-            "time_sec": ete,
-            "burn": burn,
-            "hold_sec": hold_sec,
-            "hold_dist": hold_dist,
-            "hold_burn": hold_burn,
-            "hold_min": hold_min,
-            "efob_start": efob_start,
-            "efob_after_leg": efob_after_leg,
-            "efob_end": efob_end,
-            "clock_start": clk_start,
-            "clock_arrive": clk_arrive,
-            "clock_end": clk_end,
-            "wind_from": wf,
-            "wind_kt": wk,
-            "tracking": tracking_instruction(A, B, pref_vor),
-            "is_dme_arc": is_dme_arc_leg(A, B),
-            "is_turn": is_rate_turn_leg(A, B),
-        })
+        i = first_index + n
+        legs.append(core.placed(
+            i, i - 1, i,
+            efob_start=efob_start,
+            efob_after_leg=efob_after_leg,
+            efob_end=efob_end,
+            clock_start=clk_start,
+            clock_arrive=clk_arrive,
+            clock_end=clk_end,
+        ))
         t_cursor += ete + hold_sec
+        t_ends.append(t_cursor)
         efob = efob_end
-    return legs
+    return legs, t_ends
+
+
+def node_geometry(pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Tuple[Any, Any, Any, Any]:
+    # Distância, rumo e ponto médio (p/ VOR) de várias pernas numa só chamada.
+    lat1, lon1 = [A["lat"] for A, _ in pairs], [A["lon"] for A, _ in pairs]
+    lat2, lon2 = [B["lat"] for _, B in pairs], [B["lon"] for _, B in pairs]
+    dist = geo.gc_dist_nm(lat1, lon1, lat2, lon2)
+    tc = geo.gc_course_tc(lat1, lon1, lat2, lon2)
+    mid_lat, mid_lon = geo.point_along_gc(lat1, lon1, lat2, lon2, dist / 2)
+    return dist, tc, mid_lat, mid_lon
+
+
+def build_legs(nodes: List[Dict[str, Any]]) -> List[Leg]:
+    if len(nodes) < 2:
+        return []
+    profile = current_profile()
+    pairs = list(zip(nodes[:-1], nodes[1:]))
+    dist, tc, mid_lat, mid_lon = node_geometry(pairs)
+    cores = [leg_core(A, B, profile, float(dist[i]), float(tc[i]), (float(mid_lat[i]), float(mid_lon[i]))) for i, (A, B) in enumerate(pairs)]
+    return propagate_legs(cores)[0]
+
+
+def route_physics_signature() -> str:
+    # Setup que muda nós/pernas; EFOB, taxi fuel e hora de partida só mexem na propagação.
+    profile = {k: v for k, v in current_profile().items() if k != "taxi_fuel_l"}
+    return json.dumps({
+        "profile": profile,
+        "roc_fpm": int(st.session_state.roc_fpm),
+        "rod_fpm": int(st.session_state.rod_fpm),
+        "wind_from": int(st.session_state.wind_from),
+        "wind_kt": int(st.session_state.wind_kt),
+        "use_global_wind": bool(st.session_state.use_global_wind),
+        "mag_var": float(st.session_state.mag_var),
+        "mag_is_east": bool(st.session_state.mag_is_east),
+        "data": catalog_version(),
+    }, sort_keys=True, default=str)
+
+
+def route_cache() -> Dict[str, Any]:
+    # Segmentos, pernas e SID/STAR já calculados; esvazia quando o setup muda.
+    sig = route_physics_signature()
+    cache = st.session_state.get("_route_cache")
+    if not cache or cache.get("sig") != sig:
+        cache = {"sig": sig, "procs": {}, "procs_alt": None, "segments": {}, "legs": {}, "cores": [], "out": [], "t_ends": [], "prop": None}
+        st.session_state["_route_cache"] = cache
+    return cache
+
+
+def point_fingerprint(point: Dict[str, Any]) -> Any:
+    items = tuple(sorted(point.items()))
+    try:
+        hash(items)
+        return items
+    except TypeError:
+        return repr(items)
+
+
+def procedure_block(proc_id: str, instance_id: str, cache: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    # SID/STAR gerado uma vez por setup (mesmos uids); devolve cópias para o merge.
+    cache = cache if cache is not None else route_cache()
+    if cache["procs_alt"] != proc_default_alt():
+        cache["procs"] = {}
+        cache["procs_alt"] = proc_default_alt()
+    key = (proc_id, instance_id)
+    if key not in cache["procs"]:
+        cache["procs"][key] = build_procedure_points(proc_id, proc_instance_id=instance_id)
+    return [dict(p) for p in cache["procs"][key]]
 
 
 def recalc_route(refresh_procedures: bool = True) -> None:
+    """Recalcula nós e pernas reaproveitando o que não mudou.
+
+    Um waypoint está "sujo" quando o seu conteúdo mudou: cada perna da rota
+    do utilizador (A→B, com TOC/TOD) é guardada pelo conteúdo de A e B, e
+    cada perna do navlog pelos próprios nós. Só se recalculam os segmentos
+    e pernas novos; EFOB/horas propagam a partir da primeira perna que mudou.
+    """
+    cache = route_cache()
     if refresh_procedures and st.session_state.get("wps"):
         st.session_state.wps = refresh_procedure_waypoints(st.session_state.wps)
         ensure_point_ids()
-    st.session_state.route_nodes = build_route_nodes(st.session_state.wps)
-    st.session_state.legs = build_legs(st.session_state.route_nodes)
+    wps = st.session_state.wps
+    if len(wps) < 2:
+        st.session_state.route_nodes = []
+        st.session_state.legs = []
+        return
+    profile = current_profile()
+
+    # Nós: um segmento por perna do utilizador, reaproveitado se A e B não mudaram.
+    fps = [point_fingerprint(p) for p in wps]
+    keys = [(fps[i], fps[i + 1]) for i in range(len(wps) - 1)]
+    old_segments, segments = cache["segments"], {}
+    seg_list: List[Optional[List[Dict[str, Any]]]] = []
+    dirty = []
+    for i, key in enumerate(keys):
+        seg = old_segments.get(key) if key not in segments else None
+        if seg is None:
+            dirty.append(i)
+        else:
+            segments[key] = seg
+        seg_list.append(seg)
+    if dirty:
+        dist, tc, _, _ = node_geometry([(wps[i], wps[i + 1]) for i in dirty])
+        for n, i in enumerate(dirty):
+            seg = route_segment(wps[i], wps[i + 1], profile, float(dist[n]), float(tc[n]))
+            seg_list[i] = seg
+            segments.setdefault(keys[i], seg)
+    last_key = ("last", fps[-1])
+    last = old_segments.get(last_key) or [wps[-1].copy()]
+    segments[last_key] = last
+    cache["segments"] = segments
+    nodes = [node for seg in seg_list for node in seg] + last
+
+    # Pernas: reaproveitadas quando os dois nós são os mesmos objetos.
+    old_legs, legs_cache = cache["legs"], {}
+    pairs = list(zip(nodes[:-1], nodes[1:]))
+    cores: List[Optional[Leg]] = []
+    dirty = []
+    for j, (A, B) in enumerate(pairs):
+        hit = old_legs.get((id(A), id(B)))
+        if hit is not None and hit[0] is A and hit[1] is B:
+            cores.append(hit[2])
+        else:
+            cores.append(None)
+            dirty.append(j)
+    if dirty:
+        dist, tc, mid_lat, mid_lon = node_geometry([pairs[j] for j in dirty])
+        for n, j in enumerate(dirty):
+            A, B = pairs[j]
+            cores[j] = leg_core(A, B, profile, float(dist[n]), float(tc[n]), (float(mid_lat[n]), float(mid_lon[n])))
+    for (A, B), core in zip(pairs, cores):
+        legs_cache[(id(A), id(B))] = (A, B, core)
+    cache["legs"] = legs_cache
+
+    # Propagação de EFOB/horas só a partir da primeira perna diferente da última vez.
+    prop = (float(st.session_state.start_efob), float(st.session_state.taxi_fuel_l), str(st.session_state.start_clock))
+    prev_cores = cache["cores"] if cache["prop"] == prop else []
+    k = 0
+    while k < min(len(prev_cores), len(cores)) and prev_cores[k] is cores[k]:
+        k += 1
+    if k:
+        head, head_t = cache["out"][:k], cache["t_ends"][:k]
+        tail, tail_t = propagate_legs(cores[k:], head_t[-1], head[-1].efob_end, first_index=k + 1)
+    else:
+        head, head_t = [], []
+        tail, tail_t = propagate_legs(cores)
+    legs = head + tail
+    cache.update({"cores": cores, "out": legs, "t_ends": head_t + tail_t, "prop": prop})
+
+    st.session_state.route_nodes = nodes
+    st.session_state.legs = legs
 
 # ===============================================================
 # GIST ROUTES
@@ -1495,29 +1625,58 @@ def serialize_route() -> List[Dict[str, Any]]:
     return [{k: v for k, v in point.items() if k not in {"uid"}} for point in st.session_state.wps]
 
 
-def load_routes_from_gist() -> Dict[str, Any]:
-    token, gist_id = get_gist_credentials()
-    if not token or not gist_id or requests is None:
+def get_route_store():
+    """RouteStore desta sessão: SQLite local se ROUTES_DB estiver definido, senão o Gist."""
+    if "route_store" in st.session_state:
+        return st.session_state.route_store
+    store = None
+    db_path = os.getenv("ROUTES_DB")
+    try:
+        db_path = st.secrets.get("ROUTES_DB", db_path)
+    except Exception:
+        pass
+    if route_store is not None:
+        if db_path:
+            store = route_store.RouteStore(route_store.SQLiteBackend(db_path))
+        else:
+            token, gist_id = get_gist_credentials()
+            if token and gist_id:
+                store = route_store.RouteStore(route_store.GistBackend(token, gist_id))
+    st.session_state.route_store = store
+    return store
+
+
+def load_saved_routes() -> Dict[str, Any]:
+    store = get_route_store()
+    if store is None:
         return {}
     try:
-        response = requests.get(f"https://api.github.com/gists/{gist_id}", headers={"Authorization": f"token {token}"}, timeout=10)
-        if response.status_code != 200:
-            return {}
-        return json.loads(response.json().get("files", {}).get("routes.json", {}).get("content", "{}") or "{}")
+        return store.load()
     except Exception:
         return {}
 
 
-def save_routes_to_gist(routes: Dict[str, Any]) -> Tuple[bool, str]:
-    token, gist_id = get_gist_credentials()
-    if not token or not gist_id or requests is None:
+def commit_route(name: str, points: Optional[List[Dict[str, Any]]]) -> Tuple[bool, str]:
+    """Guarda (points) ou apaga (None) uma rota; só essa rota é fundida com o que está guardado."""
+    store = get_route_store()
+    if store is None:
+        if points is None:
+            st.session_state.saved_routes.pop(name, None)
+        else:
+            st.session_state.saved_routes[name] = points
         return False, "Gist desativado."
-    try:
-        payload = {"files": {"routes.json": {"content": json.dumps(routes, indent=2)}}}
-        response = requests.patch(f"https://api.github.com/gists/{gist_id}", headers={"Authorization": f"token {token}"}, json=payload, timeout=10)
-        return response.status_code in {200, 201}, "Rotas guardadas." if response.status_code in {200, 201} else f"Erro Gist {response.status_code}"
-    except Exception as exc:
-        return False, str(exc)
+    if points is None:
+        store.delete(name)
+    else:
+        store.put(name, points)
+    res = store.flush()
+    st.session_state.saved_routes = store.routes
+    if not res["ok"]:
+        return False, f"Erro ao guardar (fica pendente): {res['error']}"
+    msg = "Rotas guardadas."
+    if res["conflicts"]:
+        msg += " Alterada(s) entretanto por outro utilizador, ficou a tua versão: " + ", ".join(res["conflicts"])
+    return True, msg
 
 # ===============================================================
 # PDF HELPERS
@@ -1789,51 +1948,50 @@ def compact_pdf_waypoint(point: Dict[str, Any]) -> str:
     return pretty_pdf_waypoint_text(value)
 
 
-def leg_hold_sec(leg: Dict[str, Any]) -> int:
-    return int(leg.get("hold_sec") or 0)
+def leg_hold_sec(leg: Leg) -> int:
+    return int(leg.hold_sec or 0)
 
 
-def leg_hold_dist(leg: Dict[str, Any]) -> float:
-    return float(leg.get("hold_dist") or 0.0)
+def leg_hold_dist(leg: Leg) -> float:
+    return float(leg.hold_dist or 0.0)
 
 
-def leg_hold_burn(leg: Dict[str, Any]) -> float:
-    return float(leg.get("hold_burn") or 0.0)
+def leg_hold_burn(leg: Leg) -> float:
+    return float(leg.hold_burn or 0.0)
 
 
-def leg_total_time_sec(leg: Dict[str, Any]) -> int:
-    return int(leg.get("time_sec") or 0) + leg_hold_sec(leg)
+def leg_total_time_sec(leg: Leg) -> int:
+    return int(leg.time_sec or 0) + leg_hold_sec(leg)
 
 
-def leg_total_distance(leg: Dict[str, Any]) -> float:
-    return float(leg.get("Dist") or 0.0) + leg_hold_dist(leg)
+def leg_total_distance(leg: Leg) -> float:
+    return float(leg.Dist or 0.0) + leg_hold_dist(leg)
 
 
-def leg_total_burn(leg: Dict[str, Any]) -> float:
-    return float(leg.get("burn") or 0.0) + leg_hold_burn(leg)
+def leg_total_burn(leg: Leg) -> float:
+    return float(leg.burn or 0.0) + leg_hold_burn(leg)
 
 
 def fmt_with_plus(base: str, plus: str, has_plus: bool) -> str:
     return base + chr(10) + "+" + plus if has_plus else base
 
 
-def fill_leg_payload(data: Dict[str, Any], idx: int, leg: Dict[str, Any], acc_d: float, acc_t: int, prefix: str = "Leg") -> None:
-    point = leg["B"]
+def fill_leg_payload(data: Dict[str, Any], idx: int, leg: Leg, point: Dict[str, Any], acc_d: float, acc_t: int, prefix: str = "Leg") -> None:
     has_hold = leg_hold_sec(leg) > 0
     data[f"{prefix}{idx:02d}_Waypoint"] = compact_pdf_waypoint(point)
     data[f"{prefix}{idx:02d}_Altitude_FL"] = str(int(round(float(point.get("alt", 0)))))
-    data[f"{prefix}{idx:02d}_True_Course"] = f"{int(round(leg['TC'])):03d}"
-    data[f"{prefix}{idx:02d}_True_Heading"] = f"{int(round(leg['TH'])):03d}"
-    data[f"{prefix}{idx:02d}_Magnetic_Heading"] = f"{int(round(leg['MH'])):03d}"
-    data[f"{prefix}{idx:02d}_True_Airspeed"] = str(int(round(leg["TAS"])))
-    data[f"{prefix}{idx:02d}_Ground_Speed"] = str(int(round(leg["GS"])))
-    data[f"{prefix}{idx:02d}_Leg_Distance"] = fmt_with_plus(f"{float(leg['Dist']):.1f}", f"{leg_hold_dist(leg):.1f}", has_hold)
+    data[f"{prefix}{idx:02d}_True_Course"] = f"{int(round(leg.TC)):03d}"
+    data[f"{prefix}{idx:02d}_True_Heading"] = f"{int(round(leg.TH)):03d}"
+    data[f"{prefix}{idx:02d}_Magnetic_Heading"] = f"{int(round(leg.MH)):03d}"
+    data[f"{prefix}{idx:02d}_True_Airspeed"] = str(int(round(leg.TAS)))
+    data[f"{prefix}{idx:02d}_Ground_Speed"] = str(int(round(leg.GS)))
+    data[f"{prefix}{idx:02d}_Leg_Distance"] = fmt_with_plus(f"{float(leg.Dist):.1f}", f"{leg_hold_dist(leg):.1f}", has_hold)
     data[f"{prefix}{idx:02d}_Cumulative_Distance"] = f"{acc_d:.1f}"
-    data[f"{prefix}{idx:02d}_Leg_ETE"] = fmt_with_plus(pdf_time(leg["time_sec"]), pdf_time(leg_hold_sec(leg)), has_hold)
+    data[f"{prefix}{idx:02d}_Leg_ETE"] = fmt_with_plus(pdf_time(leg.time_sec), pdf_time(leg_hold_sec(leg)), has_hold)
     data[f"{prefix}{idx:02d}_Cumulative_ETE"] = pdf_time(acc_t)
     data[f"{prefix}{idx:02d}_ETO"] = ""
-    data[f"{prefix}{idx:02d}_Planned_Burnoff"] = fmt_with_plus(fmt_unit(leg["burn"]), fmt_unit(leg_hold_burn(leg)), has_hold)
-    data[f"{prefix}{idx:02d}_Estimated_FOB"] = fmt_efob_pdf(leg["efob_end"])
+    data[f"{prefix}{idx:02d}_Planned_Burnoff"] = fmt_with_plus(fmt_unit(leg.burn), fmt_unit(leg_hold_burn(leg)), has_hold)
+    data[f"{prefix}{idx:02d}_Estimated_FOB"] = fmt_efob_pdf(leg.efob_end)
     vor = choose_vor_for_point(point)
     data[f"{prefix}{idx:02d}_Navaid_Identifier"] = format_vor_id(vor)
     data[f"{prefix}{idx:02d}_Navaid_Frequency"] = format_radial_dist(vor, float(point["lat"]), float(point["lon"]))
@@ -1855,7 +2013,8 @@ def fill_total_payload(data: Dict[str, Any], idx: int, total_dist: float, total_
 
 
 def build_pdf_payload(
-    legs: List[Dict[str, Any]],
+    legs: List[Leg],
+    nodes: List[Dict[str, Any]],
     header: Dict[str, str],
     start: int = 0,
     count: int = PDF_FULL_TEMPLATE_LEG_ROWS,
@@ -1866,11 +2025,11 @@ def build_pdf_payload(
     total_sec = sum(leg_total_time_sec(leg) for leg in legs)
     total_burn = rf(sum(leg_total_burn(leg) for leg in legs))
     total_dist = rd(sum(leg_total_distance(leg) for leg in legs))
-    climb_sec = sum(leg_total_time_sec(leg) for leg in legs if leg["profile"] == "CLIMB")
-    level_sec = sum(leg_total_time_sec(leg) for leg in legs if leg["profile"] == "LEVEL")
-    desc_sec = sum(leg_total_time_sec(leg) for leg in legs if leg["profile"] == "DESCENT")
-    climb_burn = rf(sum(leg_total_burn(leg) for leg in legs if leg["profile"] == "CLIMB"))
-    final_efob = legs[-1]["efob_end"] if legs else float(st.session_state.start_efob)
+    climb_sec = sum(leg_total_time_sec(leg) for leg in legs if leg.profile == "CLIMB")
+    level_sec = sum(leg_total_time_sec(leg) for leg in legs if leg.profile == "LEVEL")
+    desc_sec = sum(leg_total_time_sec(leg) for leg in legs if leg.profile == "DESCENT")
+    climb_burn = rf(sum(leg_total_burn(leg) for leg in legs if leg.profile == "CLIMB"))
+    final_efob = legs[-1].efob_end if legs else float(st.session_state.start_efob)
     data = {
         "CALLSIGN": header.get("callsign", ""),
         "AIRCRAFT": aircraft_pdf_code(header.get("registration", "")),
@@ -1901,7 +2060,7 @@ def build_pdf_payload(
     for idx, leg in enumerate(chunk, start=start_idx):
         acc_d = rd(acc_d + leg_total_distance(leg))
         acc_t += int(leg_total_time_sec(leg))
-        fill_leg_payload(data, idx, leg, acc_d, acc_t)
+        fill_leg_payload(data, idx, leg, nodes[leg.b], acc_d, acc_t)
     if total_on_next_row and start == 0:
         fill_total_payload(data, start_idx + len(chunk), total_dist, total_sec, total_burn, final_efob)
     if fill_continuation_total:
@@ -1909,42 +2068,42 @@ def build_pdf_payload(
     return data
 
 
-def legs_to_dataframe(legs: List[Dict[str, Any]]) -> pd.DataFrame:
+def legs_to_dataframe(legs: List[Leg], nodes: List[Dict[str, Any]]) -> pd.DataFrame:
     rows: List[Dict[str, Any]] = []
     acc_d = 0.0
     acc_t = 0
     for leg in legs:
         acc_d = rd(acc_d + leg_total_distance(leg))
         acc_t += leg_total_time_sec(leg)
-        point = leg["B"]
+        prev, point = leg.nodes(nodes)
         vor = choose_vor_for_point(point)
         to_label = point.get("navlog_note") or point.get("code") or point.get("name")
         if point.get("calc_detail"):
             to_label = f"{point.get('code')} · {point.get('calc_detail')}"
         rows.append({
-            "Leg": leg["i"],
-            "From": leg["A"].get("code") or leg["A"].get("name"),
+            "Leg": leg.i,
+            "From": prev.get("code") or prev.get("name"),
             "To": to_label,
-            "Profile": leg["profile"],
+            "Profile": leg.profile,
             "Alt": int(round(float(point.get("alt", 0)))),
-            "TC": f"{int(round(leg['TC'])):03d}",
-            "TH": f"{int(round(leg['TH'])):03d}",
-            "MH": f"{int(round(leg['MH'])):03d}",
-            "TAS": int(round(leg["TAS"])),
-            "GS": int(round(leg["GS"])),
-            "Dist": f"{float(leg['Dist']):.1f}",
+            "TC": f"{int(round(leg.TC)):03d}",
+            "TH": f"{int(round(leg.TH)):03d}",
+            "MH": f"{int(round(leg.MH)):03d}",
+            "TAS": int(round(leg.TAS)),
+            "GS": int(round(leg.GS)),
+            "Dist": f"{float(leg.Dist):.1f}",
             "Hold Dist": f"+{leg_hold_dist(leg):.1f}" if leg_hold_sec(leg) else "",
             "CumDist": f"{acc_d:.1f}",
-            "ETE": pdf_time(leg["time_sec"]),
+            "ETE": pdf_time(leg.time_sec),
             "Hold ETE": f"+{pdf_time(leg_hold_sec(leg))}" if leg_hold_sec(leg) else "",
             "CumETE": pdf_time(acc_t),
-            "Fuel": fmt_unit(leg["burn"]),
+            "Fuel": fmt_unit(leg.burn),
             "Hold Fuel": f"+{fmt_unit(leg_hold_burn(leg))}" if leg_hold_sec(leg) else "",
-            "EFOB": fmt_efob_numbers(leg["efob_end"]),
-            "Wind": f"{int(leg['wind_from']):03d}/{int(leg['wind_kt'])}",
+            "EFOB": fmt_efob_numbers(leg.efob_end),
+            "Wind": f"{int(leg.wind_from):03d}/{int(leg.wind_kt)}",
             "VOR": format_vor_id(vor),
             "Radial/Dist": format_radial_dist(vor, float(point["lat"]), float(point["lon"])),
-            "Tracking": leg.get("tracking", ""),
+            "Tracking": leg.tracking,
         })
     return pd.DataFrame(rows)
 
@@ -1981,16 +2140,57 @@ def route_item15(wps: List[Dict[str, Any]]) -> str:
     return "DCT " + " DCT ".join(tokens) if tokens else ""
 
 
-def summary_metrics(legs: List[Dict[str, Any]]) -> Dict[str, float]:
+def summary_metrics(legs: List[Leg]) -> Dict[str, float]:
     return {
         "time": sum(leg_total_time_sec(leg) for leg in legs),
         "dist": rd(sum(leg_total_distance(leg) for leg in legs)),
         "burn": rf(sum(leg_total_burn(leg) for leg in legs)),
-        "efob": legs[-1]["efob_end"] if legs else float(st.session_state.start_efob),
+        "efob": legs[-1].efob_end if legs else float(st.session_state.start_efob),
         "legs": len(legs),
     }
 
 
+def whatif_plan(wps: List[Dict[str, Any]]) -> whatif.RoutePlan:
+    # Pernas do utilizador como route_segment/leg_core as veem (arcos e voltas com a sua distância/rumo).
+    lats, lons = [float(p["lat"]) for p in wps], [float(p["lon"]) for p in wps]
+    dist, tc = (v.tolist() for v in geo.leg_geometry(lats, lons)) if len(wps) > 1 else ([], [])
+    vnav = []
+    for i, (A, B) in enumerate(zip(wps[:-1], wps[1:])):
+        if is_dme_arc_leg(A, B):
+            dist[i], tc[i] = dme_arc_distance_nm(A, B), dme_arc_course(A, B)
+        elif is_rate_turn_leg(A, B):
+            dist[i], tc[i] = turn_distance_nm(A, B), turn_course(A, B)
+        vnav.append(not (A.get("no_auto_vnav") or B.get("no_auto_vnav") or is_dme_arc_leg(A, B) or is_rate_turn_leg(A, B)))
+    return whatif.RoutePlan(
+        lat_a=lats[:-1], lon_a=lons[:-1], lat_b=lats[1:], lon_b=lons[1:],
+        dist_nm=dist, tc=tc,
+        alt_a=[float(p["alt"]) for p in wps[:-1]], alt_b=[float(p["alt"]) for p in wps[1:]],
+        vnav=vnav, hold_min=[float(p.get("stop_min") or 0.0) for p in wps[1:]],
+        roc_fpm=float(st.session_state.roc_fpm), rod_fpm=float(st.session_state.rod_fpm),
+    )
+
+
+def whatif_sweep(max_kt: int, kt_step: int, dir_step: int, tas_delta: int = 0, ff_pct: int = 0) -> Tuple[List[Tuple[int, int, int, float]], whatif.WhatIfResult]:
+    """Rota atual com vento 0..max_kt de todas as direções (e TAS ± tas_delta, FF + ff_pct %), de uma vez."""
+    profile = current_profile()
+    winds = [(0, 0)] + [(d, k) for k in range(kt_step, max_kt + 1, kt_step) for d in range(0, 360, dir_step)]
+    tas = [-tas_delta, 0, tas_delta] if tas_delta else [0]
+    ffs = [profile["fuel_flow_lh"], profile["fuel_flow_lh"] * (1 + ff_pct / 100.0)] if ff_pct else [profile["fuel_flow_lh"]]
+    cases = [(d, k, t, ff) for d, k in winds for t in tas for ff in ffs]
+    dtas = [t for _, _, t, _ in cases]
+    sc = whatif.Scenarios(
+        wind_from=[d for d, _, _, _ in cases],
+        wind_kt=[k for _, k, _, _ in cases],
+        climb_tas=[profile["climb_tas"] + t for t in dtas],
+        cruise_tas=[profile["cruise_tas"] + t for t in dtas],
+        descent_tas=[profile["descent_tas"] + t for t in dtas],
+        fuel_flow_lh=[ff for _, _, _, ff in cases],
+        start_efob=float(st.session_state.start_efob),
+        taxi_fuel_l=float(st.session_state.taxi_fuel_l),
+    )
+    return cases, whatif.evaluate(whatif_plan(st.session_state.wps), sc, (ROUND_DIST_NM, ROUND_TIME_SEC, ROUND_FUEL_L))
+
+
 def html_pills(items: Iterable[Tuple[str, str]]) -> None:
     st.markdown("".join([f"<span class='pill {klass}'>{label}</span>" for label, klass in items]), unsafe_allow_html=True)
 
@@ -1998,10 +2198,11 @@ def html_pills(items: Iterable[Tuple[str, str]]) -> None:
 # MAP
 # ===============================================================
 def map_start_center() -> Tuple[float, float]:
-    catalog = point_catalog()
-    hit = catalog[catalog["code"].astype(str).str.upper() == "LPSO"] if not catalog.empty else pd.DataFrame()
-    if not hit.empty:
-        return float(hit.iloc[0]["lat"]), float(hit.iloc[0]["lon"])
+    points = get_catalog()
+    rows = points.rows("LPSO")
+    if len(rows):
+        hit = points.frame.iloc[int(rows[0])]
+        return float(hit["lat"]), float(hit["lon"])
     return LPSO_FALLBACK_CENTER
 
 
@@ -2034,13 +2235,12 @@ def add_div_marker(m: folium.Map, lat: float, lon: float, html: str) -> None:
     folium.Marker((lat, lon), icon=folium.DivIcon(html=html, icon_size=(0, 0))).add_to(m)
 
 
-def render_route_map(wps: List[Dict[str, Any]], nodes: List[Dict[str, Any]], legs: List[Dict[str, Any]], key: str = "mainmap") -> Dict[str, Any]:
+def render_route_map(wps: List[Dict[str, Any]], nodes: List[Dict[str, Any]], legs: List[Leg], key: str = "mainmap") -> Dict[str, Any]:
     m = make_base_map()
     if bool(st.session_state.show_ref_points):
         cluster = MarkerCluster(name="Pontos IFR/VFR/VOR/PROC", disableClusteringAtZoom=10).add_to(m)
         src_filter = set(st.session_state.ref_layers)
-        ref_all = point_catalog()
-        ref = ref_all[ref_all["src"].isin(src_filter)] if src_filter and not ref_all.empty else ref_all.head(0)
+        ref = get_catalog().src(*src_filter)
         for _, r in ref.iterrows():
             src = str(r.get("src"))
             color = {"IFR": "#2563eb", "VOR": "#dc2626", "AD": "#111827", "VFR": "#16a34a", "PROC": "#9333ea"}.get(src, "#334155")
@@ -2051,17 +2251,18 @@ def render_route_map(wps: List[Dict[str, Any]], nodes: List[Dict[str, Any]], leg
             if len(pts) >= 2:
                 folium.PolyLine(pts, color="#64748b", weight=2, opacity=0.55, tooltip=airway).add_to(m)
     for leg in legs:
-        if leg["profile"] == "STOP":
+        if leg.profile == "STOP":
             continue
-        color = PROFILE_COLORS.get(leg["profile"], "#7c3aed")
-        if leg.get("is_dme_arc"):
-            latlngs = dme_arc_polyline(leg["A"], leg["B"])
-        elif leg.get("is_turn"):
-            latlngs = turn_polyline(leg["A"], leg["B"])
+        color = PROFILE_COLORS.get(leg.profile, "#7c3aed")
+        A, B = leg.nodes(nodes)
+        if leg.is_dme_arc:
+            latlngs = dme_arc_polyline(A, B)
+        elif leg.is_turn:
+            latlngs = turn_polyline(A, B)
         else:
-            latlngs = [(leg["A"]["lat"], leg["A"]["lon"]), (leg["B"]["lat"], leg["B"]["lon"])]
+            latlngs = [(A["lat"], A["lon"]), (B["lat"], B["lon"])]
         folium.PolyLine(latlngs, color="#ffffff", weight=8, opacity=1).add_to(m)
-        folium.PolyLine(latlngs, color=color, weight=4, opacity=1, tooltip=f"L{leg['i']} {leg['profile']} {pdf_time(leg['time_sec'])}").add_to(m)
+        folium.PolyLine(latlngs, color=color, weight=4, opacity=1, tooltip=f"L{leg.i} {leg.profile} {pdf_time(leg.time_sec)}").add_to(m)
     for idx, point in enumerate(wps, start=1):
         lat, lon = float(point["lat"]), float(point["lon"])
         src = point.get("src", "USER")
@@ -2124,13 +2325,13 @@ if st.session_state.legs:
         (f"{sm['legs']} legs", ""),
     ])
 else:
-    catalog = point_catalog()
+    points_catalog = get_catalog()
     procedures_all = available_procedures()
     sid_count = len([p for p in procedures_all if str(p.get("kind", "")).upper() == "SID"])
     star_count = len([p for p in procedures_all if str(p.get("kind", "")).upper() == "STAR"])
     html_pills([
-        (f"{len(catalog[catalog.src == 'IFR']) if 'src' in catalog.columns else 0} IFR pts", ""),
-        (f"{len(catalog[catalog.src == 'PROC']) if 'src' in catalog.columns else 0} PROC pts", ""),
+        (f"{points_catalog.count('IFR')} IFR pts", ""),
+        (f"{points_catalog.count('PROC')} PROC pts", ""),
         (f"{sid_count} SIDs", "pill-good" if sid_count else "pill-warn"),
         (f"{star_count} STARs", "pill-good" if star_count else "pill-warn"),
         (f"{len(AIRWAYS_DF.airway.unique()) if not AIRWAYS_DF.empty else 0} airways", ""),
@@ -2269,6 +2470,32 @@ with tab_route:
                     st.session_state["_last_calc_sig"] = calculation_signature()
                     st.rerun()
 
+        st.markdown("#### Rota por airways")
+        graph = airway_graph()
+        awy_c1, awy_c2, awy_c3, awy_c4 = st.columns([0.8, 0.8, 0.8, 1.2])
+        with awy_c1:
+            awy_from = st.text_input("De", placeholder="BABEX", key="awy_from")
+        with awy_c2:
+            awy_to = st.text_input("Para", placeholder="CANAR", key="awy_to")
+        with awy_c3:
+            awy_level = st.number_input("Nível ft (0 = qualquer)", 0.0, 45000.0, 0.0, step=500.0, key="awy_level")
+        with awy_c4:
+            awy_types = st.multiselect("Tipos", graph.route_types, key="awy_types")
+        if st.button("Acrescentar rota por airways", use_container_width=True):
+            found, msg = route_by_airways(awy_from, awy_to, level_ft=float(awy_level) or None, route_types=awy_types or None)
+            if found is None:
+                st.error(msg)
+            else:
+                pts, notes = parse_route_text(found.tokens(), float(st.session_state.default_alt))
+                if pts and st.session_state.wps and clean_code(st.session_state.wps[-1].get("code")) == clean_code(pts[0].code):
+                    pts = pts[1:]
+                st.session_state.wps.extend([p.to_dict() for p in pts])
+                recalc_route(refresh_procedures=False)
+                st.session_state["_last_calc_sig"] = calculation_signature()
+                st.success(f"{found.tokens()} · {found.dist_nm:.1f} NM")
+                for note in notes:
+                    st.warning(note)
+
         st.markdown("#### Fix VOR / arco DME")
         fix_c1, fix_c2, fix_c3 = st.columns([1.5, 0.8, 0.8])
         with fix_c1:
@@ -2341,8 +2568,9 @@ with tab_route:
                     st.error(f"Erro ao gerar procedimento: {exc}")
 
         st.markdown("#### Rotas padrão")
-        if not st.session_state.saved_routes:
-            st.session_state.saved_routes = load_routes_from_gist()
+        store = get_route_store()
+        if store is not None and not store.loaded:
+            st.session_state.saved_routes = load_saved_routes()
         routes = st.session_state.saved_routes
         rg1, rg2 = st.columns(2)
         with rg1:
@@ -2353,11 +2581,10 @@ with tab_route:
                 elif not st.session_state.wps:
                     st.warning("Não há rota para guardar.")
                 else:
-                    routes[save_name.strip()] = serialize_route()
-                    ok, msg = save_routes_to_gist(routes)
-                    st.session_state.saved_routes = routes
+                    ok, msg = commit_route(save_name.strip(), serialize_route())
                     st.success(msg) if ok else st.warning(msg)
         with rg2:
+            routes = st.session_state.saved_routes
             names = sorted(routes.keys())
             choice = st.selectbox("Carregar rota", [""] + names)
             l1, l2 = st.columns(2)
@@ -2373,9 +2600,7 @@ with tab_route:
                     st.rerun()
             with l2:
                 if choice and st.button("Apagar", use_container_width=True):
-                    routes.pop(choice, None)
-                    ok, msg = save_routes_to_gist(routes)
-                    st.session_state.saved_routes = routes
+                    ok, msg = commit_route(choice, None)
                     st.success(msg) if ok else st.warning(msg)
 
     with right:
@@ -2458,6 +2683,9 @@ with tab_map:
                 alt = st.number_input("Alt", 0.0, 45000.0, float(st.session_state.default_alt), step=100.0)
             with c3:
                 st.caption(f"{clicked['lat']:.5f}, {clicked['lng']:.5f}")
+            near = get_catalog().nearby(float(clicked["lat"]), float(clicked["lng"]), 2.0, limit=3)
+            if not near.empty:
+                st.caption("Perto: " + ", ".join(f"{r['code']} [{r['src']}] {r['dist_nm']:.1f} NM" for _, r in near.iterrows()))
             if st.form_submit_button("Adicionar clique"):
                 p = Point(code=clean_code(name) or "CLICK", name=name, lat=float(clicked["lat"]), lon=float(clicked["lng"]), alt=float(alt), src="USER", uid=next_uid())
                 st.session_state.wps.append(p.to_dict())
@@ -2470,10 +2698,43 @@ with tab_navlog:
     if not st.session_state.legs:
         st.info("Cria uma rota e recalcula para ver o navlog.")
     else:
-        df_legs = legs_to_dataframe(st.session_state.legs)
+        df_legs = legs_to_dataframe(st.session_state.legs, st.session_state.route_nodes)
         st.dataframe(style_navlog_dataframe(df_legs), use_container_width=True, hide_index=True)
         st.download_button("⬇️ Navlog CSV", df_legs.to_csv(index=False).encode("utf-8"), file_name="navlog.csv", mime="text/csv")
 
+        st.markdown("#### What-if · vento / TAS / combustível")
+        wi_c1, wi_c2, wi_c3, wi_c4, wi_c5, wi_c6 = st.columns(6)
+        with wi_c1:
+            wi_kt = st.number_input("Vento máx (kt)", 0, 80, 40, step=5, key="wi_kt")
+        with wi_c2:
+            wi_kt_step = st.number_input("Passo vento (kt)", 1, 40, 10, key="wi_kt_step")
+        with wi_c3:
+            wi_dir_step = st.number_input("Passo direção (°)", 5, 90, 10, step=5, key="wi_dir_step")
+        with wi_c4:
+            wi_tas = st.number_input("TAS ± (kt)", 0, 30, 0, step=5, key="wi_tas")
+        with wi_c5:
+            wi_ff = st.number_input("FF + (%)", 0, 50, 0, step=5, key="wi_ff")
+        with wi_c6:
+            wi_reserve = st.number_input("Reserva (min)", 0, 120, 45, step=5, key="wi_reserve")
+        if st.button("Calcular cenários", use_container_width=True):
+            cases, res = whatif_sweep(int(wi_kt), int(wi_kt_step), int(wi_dir_step), int(wi_tas), int(wi_ff))
+            reserve = [ff * float(wi_reserve) / 60.0 for _, _, _, ff in cases]
+            margin = [float(e) - r for e, r in zip(res.efob_end.tolist(), reserve)]
+            short = sum(m < 0 for m in margin)
+            efob_values = res.efob_end.tolist()
+            st.caption(f"{len(cases)} cenários · EFOB final {fmt_efob_numbers(min(efob_values))} a {fmt_efob_numbers(max(efob_values))} · {short} abaixo da reserva de {int(wi_reserve)} min")
+            worst = sorted(range(len(cases)), key=lambda n: (margin[n], -int(res.ete_sec[n])))[:15]
+            st.dataframe(pd.DataFrame([{
+                "Vento": f"{cases[n][0]:03d}/{cases[n][1]:02d}",
+                "ΔTAS": f"{cases[n][2]:+d}",
+                "FF (L/h)": f"{cases[n][3]:.1f}",
+                "ETE": pdf_time(int(res.ete_sec[n])),
+                "Dist": f"{float(res.dist_nm[n]):.1f}",
+                "Fuel": fmt_unit(float(res.burn_l[n])),
+                "EFOB": fmt_efob_numbers(float(res.efob_end[n])),
+                "Margem reserva (L)": f"{margin[n]:+.0f}",
+            } for n in worst]), use_container_width=True, hide_index=True)
+
         st.markdown("#### Cabeçalho PDF")
         reg_options = REG_OPTIONS_PIPER if "Piper" in st.session_state.aircraft_type else REG_OPTIONS_TECNAM
         c0, c1, c2, c3, c4 = st.columns(5)
@@ -2527,6 +2788,7 @@ with tab_navlog:
                     single_page = len(st.session_state.legs) <= PDF_SINGLE_PAGE_LEG_ROWS
                     payload = build_pdf_payload(
                         st.session_state.legs,
+                        st.session_state.route_nodes,
                         header,
                         0,
                         PDF_SINGLE_PAGE_LEG_ROWS if single_page else PDF_FULL_TEMPLATE_LEG_ROWS,
@@ -2537,7 +2799,7 @@ with tab_navlog:
                     with open(out, "rb") as file:
                         st.download_button("⬇️ NAVLOG principal", file.read(), file_name="NAVLOG_FILLED.pdf", mime="application/pdf", use_container_width=True)
                     if len(st.session_state.legs) > PDF_FULL_TEMPLATE_LEG_ROWS and TEMPLATE_CONT.exists():
-                        payload2 = build_pdf_payload(st.session_state.legs, header, PDF_FULL_TEMPLATE_LEG_ROWS, 11)
+                        payload2 = build_pdf_payload(st.session_state.legs, st.session_state.route_nodes, header, PDF_FULL_TEMPLATE_LEG_ROWS, 11)
                         out2 = fill_pdf(TEMPLATE_CONT, OUTPUT_CONT, payload2)
                         with open(out2, "rb") as file:
                             st.download_button("⬇️ NAVLOG continuação", file.read(), file_name="NAVLOG_FILLED_1.pdf", mime="application/pdf", use_container_width=True)
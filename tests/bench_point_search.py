@@ -0,0 +1,111 @@
+# ---------------------------------------------------------------
+# Benchmark — route builder search: SearchIndex vs the old row scan
+# ---------------------------------------------------------------
+# Not part of the unit tests. Run from the repo root:
+#     python -m tests.bench_point_search [n_synthetic]
+# Real points: AD / Localidades / VOR (briefings.refdata) and
+# pages/IFR_POINTS.csv, the route builder's catalog without the SID/STAR
+# points. Synthetic: n_synthetic (default 200k) random 5-letter codes
+# over Europe. For each query, with and without a last waypoint, the
+# top 30 of both searches must have the same scores; the script prints
+# the mean time per query of each.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import difflib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from briefings import geo, point_search, refdata
+
+QUERIES = ["lis", "porto", "lp", "e", "fa", "evora", "cas", "ns", "sintra", "tires", "ab", "zzz"]
+LIMIT = 30
+
+
+def real_points() -> pd.DataFrame:
+    ref = refdata.load()
+    ad, loc, vor = refdata.ad_frame(data=ref), refdata.loc_frame(data=ref), refdata.vor_frame(data=ref)
+    parts = [
+        pd.DataFrame({"code": ad["ident"].fillna(ad["name"]), "name": ad["name"], "lat": ad["lat"], "lon": ad["lon"], "src": "AD"}),
+        pd.DataFrame({"code": loc["code"].fillna(loc["name"]), "name": loc["name"], "lat": loc["lat"], "lon": loc["lon"], "src": "VFR"}),
+        pd.DataFrame({"code": vor["ident"], "name": vor["name"], "lat": vor["lat"], "lon": vor["lon"], "src": "VOR"}),
+    ]
+    try:
+        ifr = pd.read_csv(refdata.DATA_DIR / "IFR_POINTS.csv")
+        parts.append(ifr[["code", "name", "lat", "lon", "src"]])
+    except OSError:
+        pass
+    return pd.concat(parts, ignore_index=True)
+
+
+def synthetic_points(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    codes = ["".join(c) for c in letters[rng.integers(0, 26, size=(n, 5))]]
+    return pd.DataFrame({
+        "code": codes,
+        "name": [f"{c} POINT" for c in codes],
+        "lat": rng.uniform(35.0, 60.0, n),
+        "lon": rng.uniform(-10.0, 25.0, n),
+        "src": rng.choice(list(point_search.SRC_BONUS), n),
+    })
+
+
+def scan_search(frame: pd.DataFrame, query: str, limit: int, near) -> np.ndarray:
+    """The route builder's search before SearchIndex: filter every row, score every hit."""
+    q = query.strip().lower()
+    mask = frame.apply(lambda r: q in " ".join(str(v).lower() for v in r.values), axis=1)
+    df = frame[mask]
+    if df.empty:
+        return np.zeros(0)
+
+    def score(row: pd.Series) -> float:
+        code = str(row.get("code") or "").lower()
+        name = str(row.get("name") or "").lower()
+        sim = difflib.SequenceMatcher(None, q, f"{code} {name}").ratio()
+        starts = 1.5 if code.startswith(q) or name.startswith(q) else 0.0
+        exact = 3.0 if code == q else 0.0
+        src_bonus = point_search.SRC_BONUS.get(str(row.get("src")), 0.0)
+        close = 0.0
+        if near:
+            close = 1.0 / (1.0 + float(geo.gc_dist_nm(near[0], near[1], float(row["lat"]), float(row["lon"]))))
+        return exact + starts + sim + src_bonus + close * 0.25
+
+    return np.sort(df.apply(score, axis=1).to_numpy())[::-1][:limit]
+
+
+def bench(label: str, frame: pd.DataFrame, queries, scan_queries: int) -> None:
+    t0 = time.perf_counter()
+    index = point_search.SearchIndex(frame)
+    build = time.perf_counter() - t0
+    t_index, t_scan, n_scan, bad = 0.0, 0.0, 0, 0
+    for near in (None, (38.78, -9.13)):
+        for i, q in enumerate(queries):
+            t0 = time.perf_counter()
+            _, scores = index.search(q, limit=LIMIT, near=near)
+            t_index += time.perf_counter() - t0
+            if i < scan_queries:
+                t0 = time.perf_counter()
+                ref = scan_search(frame, q, LIMIT, near)
+                t_scan += time.perf_counter() - t0
+                n_scan += 1
+                bad += len(ref) != len(scores) or not np.allclose(ref, scores, rtol=0, atol=1e-9)
+    n = 2 * len(queries)
+    print(f"{label}: {len(frame)} points, index built in {build * 1000:.0f} ms")
+    print(f"  SearchIndex {t_index / n * 1000:8.2f} ms/query ({n} queries)")
+    print(f"  row scan    {t_scan / max(n_scan, 1) * 1000:8.2f} ms/query ({n_scan} queries), {bad} mismatching top-{LIMIT}")
+
+
+def main() -> None:
+    n_synth = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    bench("real", real_points(), QUERIES, scan_queries=len(QUERIES))
+    # The row scan takes seconds per query at this size: time it on a few.
+    bench("synthetic", synthetic_points(n_synth), ["abc", "q", "zz", "point", "kxq", "lpso"], scan_queries=2)
+
+
+if __name__ == "__main__":
+    main()
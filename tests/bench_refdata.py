@@ -0,0 +1,106 @@
+# ---------------------------------------------------------------
+# Benchmark — AD / Localidades ingestion: column-wise vs line parser
+# ---------------------------------------------------------------
+# Not part of the unit tests. Run from the repo root:
+#     python -m tests.bench_refdata [n_rows]
+# Builds n_rows (default 100k) synthetic AD-HEL-ULM and Localidades
+# lines in the eAIP layout (odd spacing, seconds with decimals, headers
+# and junk lines mixed in), checks that parse_*_vectorized gives the same
+# rows as parse_*_lines, and prints the time of each (best of 3).
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import List
+
+import pandas  # noqa: F401  (already loaded in the pages; keep its import out of the timings)
+
+from briefings import refdata
+
+WORDS = ["AGUIAR", "DA", "BEIRA", "ALENTEJO", "AIR", "PARK", "ULM", "HELIPORT", "SAO", "TEOTONIO", "EVORA", "PONTE", "DE", "SOR"]
+
+
+def _dms(rng: random.Random, deg_digits: int, hemis: str) -> str:
+    deg = rng.randrange(10 ** (deg_digits - 1), 10 ** deg_digits)
+    sec = f"{rng.randrange(60):02d}" + (f".{rng.randrange(100):02d}" if rng.random() < 0.3 else "")
+    return f"{deg:0{deg_digits}d}{rng.randrange(60):02d}{sec}{rng.choice(hemis)}"
+
+
+def _words(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def _pad(rng: random.Random) -> str:
+    return " " * rng.randint(1, 12)
+
+
+def synthetic_ad_lines(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.01:
+            out.append(rng.choice(["Ident        Name for FPL Field 18 DEP/ DEST/   Latitude   Longitude   Served city", "DEP/ DEST/", "Coord for FPL Field 18", "   "]))
+            continue
+        lat, lon = _dms(rng, 2, "NS"), _dms(rng, 3, "EW")
+        short = f"{lat[:4]}{lat[-1]}{lon[:5]}{lon[-1]}"
+        city = _words(rng, 0, 3)
+        if r < 0.02:  # the longitude token repeated before the coordinates
+            out.append(f"LP{i:04d}{_pad(rng)}{_words(rng, 1, 3)} {lon}{_pad(rng)}{short}{_pad(rng)}{lat}{_pad(rng)}{lon}{_pad(rng)}{city}")
+        elif r < 0.03:  # short / malformed DMS
+            out.append(f"LP{i:04d} {_words(rng, 1, 2)} {lat[:3]}{lat[-1]} {lon[:4]}.5{lon[-1]} {city}")
+        else:
+            out.append(f"LP{i:04d}{_pad(rng)}{_words(rng, 1, 4)}{_pad(rng)}{short}{_pad(rng)}{lat}{_pad(rng)}{lon}{_pad(rng)}{city}".rstrip())
+    return out
+
+
+def synthetic_loc_lines(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.01:
+            out.append(rng.choice(["Total de registos - 968", "", "   "]))
+            continue
+        lat, lon = _dms(rng, 2, "NS")[:6] + rng.choice("NS"), _dms(rng, 3, "EW")[:7] + rng.choice("EW")
+        code = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(5))
+        if r < 0.02:  # same text for latitude and longitude
+            lon = lat
+        elif r < 0.03:  # no code / sector
+            out.append(f"{_words(rng, 1, 3)}{_pad(rng)}{lat} {lon}")
+            continue
+        out.append(f"{_words(rng, 1, 3)}{_pad(rng)}{lat} {lon}{_pad(rng)}{code}{_pad(rng)}{_words(rng, 0, 2)}".rstrip())
+    return out
+
+
+def _same(cols, rows) -> bool:
+    return list(zip(*(cols[c].tolist() for c in cols))) == [tuple(r) for r in rows]
+
+
+def best_of(fn, lines, runs: int = 3):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn(lines)
+        times.append(time.perf_counter() - t0)
+    return out, min(times)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for label, lines, by_line, by_column in (
+        ("AD", synthetic_ad_lines(n), refdata.parse_ad_lines, refdata.parse_ad_vectorized),
+        ("Localidades", synthetic_loc_lines(n), refdata.parse_loc_lines, refdata.parse_loc_vectorized),
+    ):
+        rows, t_line = best_of(by_line, lines)
+        cols, t_col = best_of(by_column, lines)
+        print(f"{label}: {n} lines -> {len(rows)} rows, same rows: {_same(cols, rows)}")
+        print(f"  line parser  {t_line * 1000:7.0f} ms")
+        print(f"  column-wise  {t_col * 1000:7.0f} ms ({t_line / t_col:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
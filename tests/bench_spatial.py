@@ -0,0 +1,90 @@
+# ---------------------------------------------------------------
+# Benchmark — SpatialIndex (KD-tree) vs linear scans
+# ---------------------------------------------------------------
+# Not part of the unit tests. Run from the repo root:
+#     python -m tests.bench_spatial [n_queries]
+# For the real VOR list, the real route builder points and synthetic
+# European point sets (1k / 20k / 200k), times per query:
+#   - the old nearest_vor loop (haversine per row in Python),
+#   - a NumPy full scan (geo.gc_dist_nm over every row),
+#   - SpatialIndex.nearest and .within_radius,
+# and checks that the tree returns the same rows as the NumPy scan.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from briefings import geo, refdata, spatial
+from tests.bench_point_search import real_points
+
+RADIUS_NM = 25.0
+K = 8
+
+
+def loop_nearest(lats, lons, lat, lon) -> int:
+    """nearest_vor before the tree: one haversine per row."""
+    best, best_d = -1, float("inf")
+    for i, (plat, plon) in enumerate(zip(lats, lons)):
+        p1, l1, p2, l2 = map(math.radians, (lat, lon, plat, plon))
+        a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin((l2 - l1) / 2) ** 2
+        d = geo.EARTH_NM * 2 * math.atan2(math.sqrt(a), math.sqrt(max(0.0, 1 - a)))
+        if d < best_d:
+            best, best_d = i, d
+    return best
+
+
+def per_query_ms(fn, queries) -> float:
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def bench(label: str, lat: np.ndarray, lon: np.ndarray, queries) -> None:
+    t0 = time.perf_counter()
+    index = spatial.SpatialIndex(lat, lon)
+    build = (time.perf_counter() - t0) * 1000
+    lat_l, lon_l = lat.tolist(), lon.tolist()
+
+    def scan(qlat, qlon):
+        d = geo.gc_dist_nm(qlat, qlon, lat, lon)
+        order = np.lexsort((np.arange(len(d)), d))
+        return order, d[order]
+
+    bad = 0
+    for qlat, qlon in queries:
+        order, d = scan(qlat, qlon)
+        rows, _ = index.nearest(qlat, qlon, k=K)
+        bad += not np.array_equal(rows, order[:K])
+        rows, _ = index.within_radius(qlat, qlon, RADIUS_NM)
+        bad += not np.array_equal(rows, order[d <= RADIUS_NM])
+
+    loop_q = queries[:max(1, min(len(queries), 200_000 // max(len(lat), 1)))]
+    print(f"{label}: {len(lat)} points, tree built in {build:.1f} ms, {bad} mismatches vs full scan")
+    print(f"  Python row loop     {per_query_ms(lambda a, b: loop_nearest(lat_l, lon_l, a, b), loop_q):9.3f} ms/query")
+    print(f"  NumPy full scan     {per_query_ms(scan, queries):9.3f} ms/query")
+    print(f"  tree nearest k={K}    {per_query_ms(lambda a, b: index.nearest(a, b, k=K), queries):9.3f} ms/query")
+    print(f"  tree within {RADIUS_NM:.0f} NM  {per_query_ms(lambda a, b: index.within_radius(a, b, RADIUS_NM), queries):9.3f} ms/query")
+
+
+def main() -> None:
+    n_q = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = np.random.default_rng(0)
+    queries = list(zip(rng.uniform(36.5, 42.5, n_q).tolist(), rng.uniform(-10.0, -6.0, n_q).tolist()))
+
+    vor = refdata.vor_frame()
+    bench("real VORs", vor["lat"].to_numpy(float), vor["lon"].to_numpy(float), queries)
+    pts = real_points()
+    bench("real points", pts["lat"].to_numpy(float), pts["lon"].to_numpy(float), queries)
+    eu_queries = list(zip(rng.uniform(35.0, 60.0, n_q).tolist(), rng.uniform(-10.0, 25.0, n_q).tolist()))
+    for n in (1_000, 20_000, 200_000):
+        bench(f"synthetic {n // 1000}k", rng.uniform(35.0, 60.0, n), rng.uniform(-10.0, 25.0, n), eu_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# ---------------------------------------------------------------
+# Local stub HTTP server for the client tests
+# ---------------------------------------------------------------
+# ThreadingHTTPServer on 127.0.0.1 (random port). Every request is
+# recorded and answered by a handler(method, path, query, headers, body)
+# -> (status, headers, body) supplied by the test; dict / list bodies are
+# sent as JSON.
+# ---------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+Handler = Callable[[str, str, Dict[str, str], Dict[str, str], bytes], Tuple[int, Dict[str, str], Any]]
+
+
+class StubServer:
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class _Request(BaseHTTPRequestHandler):
+            def _serve(self) -> None:
+                parts = urlsplit(self.path)
+                query = dict(parse_qsl(parts.query, keep_blank_values=True))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                with stub._lock:
+                    stub.requests.append({"method": self.command, "path": parts.path, "query": query, "headers": headers, "body": body})
+                status, out_headers, out = stub.handler(self.command, parts.path, query, headers, body)
+                if isinstance(out, (dict, list)):
+                    out = json.dumps(out).encode("utf-8")
+                    out_headers = {"Content-Type": "application/json", **out_headers}
+                elif isinstance(out, str):
+                    out = out.encode("utf-8")
+                out = out or b""
+                self.send_response(status)
+                for k, v in out_headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                if out:
+                    self.wfile.write(out)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Request)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
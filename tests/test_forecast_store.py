@@ -0,0 +1,72 @@
+import functools
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from briefings import forecast, forecast_store, openmeteo
+from tests.stub_server import StubServer
+
+DAY = "2026-10-18"
+
+
+def batch_handler(method, path, query, headers, body):
+    lats = query["latitude"].split(",")
+    hourly = {
+        "time": [f"{DAY}T00:00", f"{DAY}T01:00"],
+        "temperature_2m": [15.0, 14.5],
+        "wind_speed_10m": [8.0, 10.0],
+        "wind_direction_10m": [270.0, 280.0],
+        "wind_gusts_10m": [12.0, 15.0],
+        "pressure_msl": [1015.0, 1015.2],
+    }
+    if "99.0" in lats:
+        return 503, {}, "overloaded"
+    locs = [{"latitude": float(lat), "hourly": hourly} for lat in lats]
+    return 200, {}, locs if len(locs) > 1 else locs[0]
+
+
+class SummaryTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("CACHE_DIR", Path(tmp.name)), ("DB_PATH", Path(tmp.name) / "forecast.sqlite")):
+            p = mock.patch.object(forecast_store, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def fetch(self, stub, points):
+        fetch_many = functools.partial(openmeteo.fetch_many, url=stub.url)
+        with mock.patch.object(forecast_store.openmeteo, "fetch_many", fetch_many):
+            raw = forecast_store.get_hourly(points, DAY, DAY)
+        return [forecast.HourlyForecast.from_openmeteo(r) for r in raw]
+
+    def test_summary_of_hourly_forecasts(self):
+        points = [(38.7, -9.1), (37.0, -8.0), (41.2, -8.7)]
+        with StubServer(batch_handler) as stub:
+            first = self.fetch(stub, points)
+            again = self.fetch(stub, points)
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual([f.source for f in first], ["api"] * 3)
+        self.assertEqual(len(first[0]), 2)
+        self.assertRegex(forecast_store.summary(first), r"^Forecast: 3 point\(s\) in 1 batched request\(s\), slowest \d+ ms; 0 from local store$")
+        self.assertEqual([f.source for f in again], ["store"] * 3)
+        self.assertEqual(forecast_store.summary(again), "Forecast: 3 point(s) from local store (no API call)")
+
+    def test_summary_counts_failed_points(self):
+        with StubServer(batch_handler) as stub:
+            out = self.fetch(stub, [(99.0, 0.0)])
+        self.assertEqual(out[0].error, "HTTP 503")
+        self.assertEqual(out[0].source, "api")
+        self.assertIn("1 point(s) in 1 batched request(s)", forecast_store.summary(out))
+
+    def test_summary_still_reads_store_dicts(self):
+        with StubServer(batch_handler) as stub:
+            fetch_many = functools.partial(openmeteo.fetch_many, url=stub.url)
+            with mock.patch.object(forecast_store.openmeteo, "fetch_many", fetch_many):
+                raw = forecast_store.get_hourly([(38.7, -9.1)], DAY, DAY)
+        self.assertIn("1 point(s) in 1 batched request(s)", forecast_store.summary(raw))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import math
+import unittest
+
+import numpy as np
+
+from briefings import geo
+
+EARTH_NM = geo.EARTH_NM
+
+
+# Scalar route engine helpers as in pages/teste.py (the reference).
+def wrap360(x):
+    return (float(x) % 360.0 + 360.0) % 360.0
+
+
+def angdiff(a, b):
+    return (float(a) - float(b) + 180.0) % 360.0 - 180.0
+
+
+def gc_dist_nm(lat1, lon1, lat2, lon2):
+    phi1, lam1, phi2, lam2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dphi = phi2 - phi1
+    dlam = lam2 - lam1
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return EARTH_NM * 2 * math.atan2(math.sqrt(a), math.sqrt(max(0.0, 1 - a)))
+
+
+def gc_course_tc(lat1, lon1, lat2, lon2):
+    phi1, lam1, phi2, lam2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlam = lam2 - lam1
+    y = math.sin(dlam) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlam)
+    return wrap360(math.degrees(math.atan2(y, x)))
+
+
+def dest_point(lat, lon, bearing_deg, dist_nm):
+    theta = math.radians(bearing_deg)
+    delta = dist_nm / EARTH_NM
+    phi1, lam1 = math.radians(lat), math.radians(lon)
+    sin_phi2 = math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta)
+    phi2 = math.asin(max(-1.0, min(1.0, sin_phi2)))
+    y = math.sin(theta) * math.sin(delta) * math.cos(phi1)
+    x = math.cos(delta) - math.sin(phi1) * sin_phi2
+    lam2 = lam1 + math.atan2(y, x)
+    return math.degrees(phi2), ((math.degrees(lam2) + 540) % 360) - 180
+
+
+def point_along_gc(lat1, lon1, lat2, lon2, dist_from_start_nm):
+    total = gc_dist_nm(lat1, lon1, lat2, lon2)
+    if total <= 0:
+        return lat1, lon1
+    return dest_point(lat1, lon1, gc_course_tc(lat1, lon1, lat2, lon2), min(total, max(0.0, dist_from_start_nm)))
+
+
+def wind_triangle(tc, tas, wind_from, wind_kt):
+    if tas <= 0:
+        return 0.0, wrap360(tc), 0.0
+    d = math.radians(angdiff(wind_from, tc))
+    cross = wind_kt * math.sin(d)
+    s = max(-1.0, min(1.0, cross / max(tas, 1e-9)))
+    wca = math.degrees(math.asin(s))
+    th = wrap360(tc + wca)
+    gs = max(0.0, tas * math.cos(math.radians(wca)) - wind_kt * math.cos(d))
+    return wca, th, gs
+
+
+# (lat1, lon1, lat2, lon2): ordinary legs, antimeridian, poles, zero length
+LEGS = [
+    (38.78, -9.13, 41.24, -8.68),
+    (37.01, -7.97, 38.78, -9.13),
+    (10.0, 179.5, 10.0, -179.5),
+    (-33.9, 151.2, -17.5, -149.6),
+    (51.5, -179.9, 52.0, 179.9),
+    (0.0, 180.0, 0.0, -180.0),
+    (89.9, 0.0, 89.9, 180.0),
+    (90.0, 0.0, 80.0, 45.0),
+    (-90.0, 0.0, -60.0, -120.0),
+    (60.0, 10.0, 90.0, 0.0),
+    (38.78, -9.13, 38.78, -9.13),
+    (90.0, 0.0, 90.0, 0.0),
+    (0.0, 0.0, 0.0, 179.0),
+]
+
+DIST_TOL_NM = 1e-7
+DEG_TOL = 1e-7
+
+
+def random_legs(n=500, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-90, 90, n), rng.uniform(-180, 180, n), rng.uniform(-90, 90, n), rng.uniform(-180, 180, n)
+
+
+class GreatCircleParityTest(unittest.TestCase):
+    def assertAngle(self, a, b, msg=None):
+        self.assertLess(abs(angdiff(a, b)), DEG_TOL, msg)
+
+    def assertPoint(self, got, want, msg=None):
+        self.assertAlmostEqual(float(got[0]), want[0], delta=DEG_TOL, msg=msg)
+        if abs(want[0]) < 90 - 1e-6:  # longitude is meaningless at a pole
+            self.assertAngle(float(got[1]), want[1], msg)
+        self.assertGreaterEqual(float(got[1]), -180.0)
+        self.assertLess(float(got[1]), 180.0)
+
+    def test_distance_and_course_on_edge_legs(self):
+        for leg in LEGS:
+            self.assertAlmostEqual(float(geo.gc_dist_nm(*leg)), gc_dist_nm(*leg), delta=DIST_TOL_NM, msg=leg)
+            self.assertAngle(float(geo.gc_course_tc(*leg)), gc_course_tc(*leg), leg)
+
+    def test_arrays_match_scalar_calls(self):
+        lat1, lon1, lat2, lon2 = random_legs()
+        dist = geo.gc_dist_nm(lat1, lon1, lat2, lon2)
+        tc = geo.gc_course_tc(lat1, lon1, lat2, lon2)
+        for i in range(len(lat1)):
+            leg = (lat1[i], lon1[i], lat2[i], lon2[i])
+            self.assertAlmostEqual(dist[i], gc_dist_nm(*leg), delta=DIST_TOL_NM)
+            self.assertAngle(tc[i], gc_course_tc(*leg))
+
+    def test_zero_length_legs(self):
+        for lat, lon in ((38.78, -9.13), (90.0, 0.0), (-90.0, 45.0), (0.0, 180.0)):
+            self.assertEqual(float(geo.gc_dist_nm(lat, lon, lat, lon)), 0.0)
+            self.assertEqual(float(geo.gc_course_tc(lat, lon, lat, lon)), gc_course_tc(lat, lon, lat, lon))
+            self.assertEqual(tuple(map(float, geo.point_along_gc(lat, lon, lat, lon, 5.0))), (lat, lon))
+            self.assertPoint(geo.dest_point(lat, lon, 123.0, 0.0), dest_point(lat, lon, 123.0, 0.0))
+
+    def test_dest_point_across_antimeridian_and_poles(self):
+        cases = [
+            (10.0, 179.5, 90.0, 60.0),
+            (10.0, -179.5, 270.0, 60.0),
+            (-45.0, 170.0, 100.0, 900.0),
+            (89.5, 20.0, 0.0, 60.0),
+            (-89.5, -20.0, 180.0, 60.0),
+            (90.0, 0.0, 180.0, 600.0),
+            (-90.0, 0.0, 45.0, 600.0),
+            (0.0, 0.0, 90.0, math.pi * EARTH_NM),
+        ]
+        for lat, lon, brg, dist in cases:
+            self.assertPoint(geo.dest_point(lat, lon, brg, dist), dest_point(lat, lon, brg, dist), (lat, lon, brg, dist))
+        lat, lon = geo.dest_point(10.0, 179.5, 90.0, 60.0)
+        self.assertLess(float(lon), -179.0)
+
+    def test_dest_point_broadcasts_radials(self):
+        radials = np.arange(0.0, 360.0, 15.0)
+        pts = geo.radial_points(38.83, -9.34, radials, 12.0)
+        self.assertEqual(pts.shape, (len(radials), 2))
+        for r, (lat, lon) in zip(radials, pts):
+            self.assertPoint((lat, lon), dest_point(38.83, -9.34, r, 12.0))
+
+    def test_point_along_gc(self):
+        for leg in LEGS:
+            total = gc_dist_nm(*leg)
+            for d in (-5.0, 0.0, total / 3, total, total + 10.0):
+                self.assertPoint(geo.point_along_gc(*leg, d), point_along_gc(*leg, d), (leg, d))
+        lat1, lon1, lat2, lon2 = random_legs(200, seed=2)
+        frac = np.linspace(0.0, 1.0, 200)
+        d = frac * geo.gc_dist_nm(lat1, lon1, lat2, lon2)
+        plat, plon = geo.point_along_gc(lat1, lon1, lat2, lon2, d)
+        for i in range(200):
+            self.assertPoint((plat[i], plon[i]), point_along_gc(lat1[i], lon1[i], lat2[i], lon2[i], d[i]))
+
+    def test_leg_geometry_and_matrices(self):
+        lats = np.array([38.78, 41.24, 10.0, 10.0, 90.0, 90.0, -33.9])
+        lons = np.array([-9.13, -8.68, 179.5, -179.5, 0.0, 0.0, 151.2])
+        dist, tc = geo.leg_geometry(lats, lons)
+        for i in range(len(lats) - 1):
+            leg = (lats[i], lons[i], lats[i + 1], lons[i + 1])
+            self.assertAlmostEqual(dist[i], gc_dist_nm(*leg), delta=DIST_TOL_NM)
+            self.assertAngle(tc[i], gc_course_tc(*leg))
+        dm, bm = geo.distance_matrix(lats, lons), geo.bearing_matrix(lats, lons)
+        self.assertEqual(dm.shape, (len(lats), len(lats)))
+        np.testing.assert_allclose(dm, dm.T, atol=DIST_TOL_NM)
+        for i in range(len(lats)):
+            for j in range(len(lats)):
+                self.assertAlmostEqual(dm[i, j], gc_dist_nm(lats[i], lons[i], lats[j], lons[j]), delta=DIST_TOL_NM)
+                self.assertAngle(bm[i, j], gc_course_tc(lats[i], lons[i], lats[j], lons[j]))
+
+    def test_wind_triangle(self):
+        rng = np.random.default_rng(3)
+        tc, tas = rng.uniform(0, 360, 300), rng.uniform(-20, 140, 300)
+        wf, wk = rng.uniform(0, 360, 300), rng.uniform(0, 80, 300)
+        tas[:5] = [0.0, -1.0, 1e-12, 30.0, 30.0]
+        wk[3:5] = [60.0, 0.0]  # crosswind above TAS (clipped), calm
+        wca, th, gs = geo.wind_triangle(tc, tas, wf, wk)
+        for i in range(300):
+            ref = wind_triangle(tc[i], tas[i], wf[i], wk[i])
+            self.assertAlmostEqual(wca[i], ref[0], delta=DEG_TOL)
+            self.assertAngle(th[i], ref[1])
+            self.assertAlmostEqual(gs[i], ref[2], delta=1e-7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from briefings import gist_store
+from tests.stub_server import StubServer
+
+TOKEN = "test-token"
+
+
+class FakeGist:
+    """One gist on the stub server: ETag per version, 304 on If-None-Match."""
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.version = 1
+        self.status = 200        # anything else: every request fails with it
+        self.patch_gate = None   # threading.Event the first PATCH waits on
+        self.patch_started = threading.Event()
+
+    @property
+    def etag(self):
+        return f'W/"v{self.version}"'
+
+    def payload(self):
+        return {"files": {name: {"filename": name, "content": c, "truncated": False} for name, c in self.files.items()}}
+
+    def __call__(self, method, path, query, headers, body):
+        if self.status != 200:
+            return self.status, {}, {"message": "Server Error"}
+        if method == "GET":
+            if headers.get("if-none-match") == self.etag:
+                return 304, {"ETag": self.etag}, b""
+            return 200, {"ETag": self.etag}, self.payload()
+        if method == "PATCH":
+            if self.patch_gate is not None and not self.patch_started.is_set():
+                self.patch_started.set()
+                self.patch_gate.wait(5)
+            for name, f in json.loads(body)["files"].items():
+                self.files[name] = f["content"]
+            self.version += 1
+            return 200, {"ETag": self.etag}, self.payload()
+        return 405, {}, b""
+
+
+class GistStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("CACHE_DIR", Path(tmp.name)), ("DB_PATH", Path(tmp.name) / "gists.sqlite")):
+            p = mock.patch.object(gist_store, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        self.gist_id = f"gist{id(self)}"
+
+    def load(self, stub):
+        return gist_store.load_files(TOKEN, self.gist_id, max_age_s=0, background=False, api_url=stub.url)
+
+    def test_unchanged_gist_is_revalidated_with_304(self):
+        gist = FakeGist({"fleet.json": "{}"})
+        with StubServer(gist) as stub:
+            files, err = self.load(stub)
+            checked = gist_store.mirror_get(self.gist_id)["checked_at"]
+            again, err2 = self.load(stub)
+        self.assertEqual((files, err), ({"fleet.json": "{}"}, None))
+        self.assertEqual((again, err2), (files, None))
+        self.assertNotIn("if-none-match", stub.requests[0]["headers"])
+        self.assertEqual(stub.requests[1]["headers"]["if-none-match"], 'W/"v1"')
+        self.assertGreaterEqual(gist_store.mirror_get(self.gist_id)["checked_at"], checked)
+
+    def test_changed_gist_replaces_the_mirror(self):
+        gist = FakeGist({"fleet.json": "{}"})
+        with StubServer(gist) as stub:
+            self.load(stub)
+            gist.files["fleet.json"] = '{"CS-XXX": 1}'
+            gist.version += 1
+            files, err = self.load(stub)
+        self.assertEqual(files, {"fleet.json": '{"CS-XXX": 1}'})
+        self.assertIsNone(err)
+        self.assertEqual(gist_store.mirror_get(self.gist_id)["etag"], 'W/"v2"')
+
+    def test_fresh_mirror_is_served_without_a_request(self):
+        gist = FakeGist({"fleet.json": "{}"})
+        with StubServer(gist) as stub:
+            self.load(stub)
+            files, err = gist_store.load_files(TOKEN, self.gist_id, max_age_s=60, api_url=stub.url)
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(files, {"fleet.json": "{}"})
+
+    def test_concurrent_saves_are_merged_into_one_patch(self):
+        gist = FakeGist({})
+        gist.patch_gate = threading.Event()
+        errors = {}
+
+        def save(name):
+            errors[name] = gist_store.save_files(TOKEN, self.gist_id, {name: name.upper()}, api_url=stub.url)
+
+        with StubServer(gist) as stub:
+            first = threading.Thread(target=save, args=("a.json",))
+            first.start()
+            self.assertTrue(gist.patch_started.wait(5))
+            # a.json is in flight; b and c queue behind it
+            others = [threading.Thread(target=save, args=(n,)) for n in ("b.json", "c.json")]
+            for t in others:
+                t.start()
+            box = gist_store._outbox(self.gist_id)
+            deadline = time.monotonic() + 5
+            while box.seq < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            gist.patch_gate.set()
+            for t in [first] + others:
+                t.join(5)
+
+        patches = [json.loads(r["body"])["files"] for r in stub.requests if r["method"] == "PATCH"]
+        self.assertEqual([sorted(p) for p in patches], [["a.json"], ["b.json", "c.json"]])
+        self.assertEqual(errors, {"a.json": None, "b.json": None, "c.json": None})
+        self.assertEqual(gist_store.mirror_get(self.gist_id)["files"], {"a.json": "A.JSON", "b.json": "B.JSON", "c.json": "C.JSON"})
+
+    def test_github_error_falls_back_to_the_mirror(self):
+        gist = FakeGist({"routes.json": "[]"})
+        with StubServer(gist) as stub:
+            self.load(stub)
+            gist.status = 502
+            files, err = self.load(stub)
+        self.assertEqual(files, {"routes.json": "[]"})
+        self.assertTrue(err.startswith("GitHub error 502"))
+
+    def test_unreachable_github_falls_back_to_the_mirror(self):
+        gist = FakeGist({"routes.json": "[]"})
+        with StubServer(gist) as stub:
+            self.load(stub)
+        files, err = gist_store.revalidate(TOKEN, self.gist_id, api_url=stub.url, timeout=2)
+        self.assertEqual(files, {"routes.json": "[]"})
+        self.assertTrue(err)
+
+    def test_cold_start_error_has_no_files(self):
+        gist = FakeGist({"routes.json": "[]"})
+        gist.status = 500
+        with StubServer(gist) as stub:
+            files, err = self.load(stub)
+        self.assertIsNone(files)
+        self.assertTrue(err.startswith("GitHub error 500"))
+
+    def test_failed_patch_returns_the_error(self):
+        gist = FakeGist({})
+        gist.status = 422
+        with StubServer(gist) as stub:
+            err = gist_store.save_json(TOKEN, self.gist_id, "fleet.json", {"x": 1}, api_url=stub.url)
+        self.assertTrue(err.startswith("GitHub error 422"))
+        self.assertIsNone(gist_store.mirror_get(self.gist_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
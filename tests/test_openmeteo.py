@@ -0,0 +1,77 @@
+import threading
+import time
+import unittest
+
+from briefings import openmeteo
+from tests.stub_server import StubServer
+
+DELAY_S = 0.3
+
+
+def forecast_handler(method, path, query, headers, body):
+    time.sleep(DELAY_S)
+    if query.get("latitude") == "99.0":
+        return 500, {}, "model unavailable"
+    return 200, {}, {"latitude": float(query["latitude"]), "longitude": float(query["longitude"]), "hourly": {"time": []}}
+
+
+def params(lat, lon):
+    return openmeteo.hourly_params(lat, lon, ["temperature_2m"], "2026-10-18", "2026-10-18")
+
+
+class FetchManyTest(unittest.TestCase):
+    def test_legs_are_fetched_concurrently(self):
+        with StubServer(forecast_handler) as stub:
+            t0 = time.perf_counter()
+            out = openmeteo.fetch_many([params(38.0 + i, -9.0) for i in range(4)], url=stub.url)
+            elapsed = time.perf_counter() - t0
+        self.assertEqual(len(stub.requests), 4)
+        self.assertEqual([r["latitude"] for r in out], [38.0, 39.0, 40.0, 41.0])
+        # four legs cost about one round-trip, not four
+        self.assertLess(elapsed, 2 * DELAY_S)
+        for r in out:
+            self.assertGreaterEqual(r["elapsed_ms"], DELAY_S * 1000 * 0.9)
+
+    def test_identical_points_are_sent_once(self):
+        with StubServer(forecast_handler) as stub:
+            p = params(38.7, -9.1)
+            out = openmeteo.fetch_many([p, dict(p), params(37.0, -8.0), dict(p)], url=stub.url)
+        self.assertEqual(len(stub.requests), 2)
+        self.assertIs(out[0], out[1])
+        self.assertIs(out[0], out[3])
+        self.assertEqual(out[2]["latitude"], 37.0)
+
+    def test_failed_point_gets_an_error_result(self):
+        with StubServer(forecast_handler) as stub:
+            out = openmeteo.fetch_many([params(38.0, -9.0), params(99.0, 0.0), params(40.0, -8.0)], url=stub.url)
+        self.assertNotIn("error", out[0])
+        self.assertEqual(out[1]["error"], "HTTP 500")
+        self.assertEqual(out[1]["detail"], "model unavailable")
+        self.assertIn("elapsed_ms", out[1])
+        self.assertNotIn("error", out[2])
+
+    def test_unreachable_server_is_an_error_result(self):
+        with StubServer(forecast_handler) as stub:
+            url = stub.url
+        out = openmeteo.fetch_many([params(38.0, -9.0)], url=url, timeout=2)
+        self.assertIn("error", out[0])
+        self.assertIn("elapsed_ms", out[0])
+
+    def test_session_is_shared_between_threads(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(openmeteo.get_session())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(s is sessions[0] for s in sessions))
+
+    def test_timing_summary_counts_shared_results_once(self):
+        with StubServer(forecast_handler) as stub:
+            p = params(38.7, -9.1)
+            out = openmeteo.fetch_many([p, dict(p), params(37.0, -8.0)], url=stub.url)
+        self.assertTrue(openmeteo.timing_summary(out).startswith("Open-Meteo: 2 request(s)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from briefings import ourairports
+from tests.stub_server import StubServer
+
+AIRPORTS_CSV = (
+    "id,ident,type,name,latitude_deg,longitude_deg,elevation_ft,iso_country\n"
+    "1,LPPT,large_airport,Humberto Delgado Airport,38.78,-9.13,374,PT\n"
+    "2,LEMG,large_airport,Malaga Airport,36.67,-4.49,53,ES\n"
+    "3,LFPG,large_airport,Charles de Gaulle,49.01,2.55,392,FR\n"
+    "4,PT-0001,heliport,Some Heliport,38.70,-9.10,10,PT\n"
+)
+RUNWAYS_CSV = (
+    "id,airport_ident,length_ft,width_ft,surface,closed,le_ident,le_heading_degT,he_ident,he_heading_degT\n"
+    "10,LPPT,12484,148,ASP,0,03,23,21,203\n"
+    "11,LFPG,13829,148,ASP,0,08L,85,26R,265\n"
+)
+
+
+def csv_handler(method, path, query, headers, body):
+    if path == "/airports.csv":
+        return 200, {"Content-Type": "text/csv"}, AIRPORTS_CSV
+    if path == "/runways.csv":
+        return 200, {"Content-Type": "text/csv"}, RUNWAYS_CSV
+    return 404, {}, ""
+
+
+class EnsureSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "ourairports_iberia.json"
+
+    def ensure(self, stub):
+        with mock.patch.object(ourairports, "AIRPORTS_CSV_URL", stub.url + "/airports.csv"), \
+                mock.patch.object(ourairports, "RUNWAYS_CSV_URL", stub.url + "/runways.csv"):
+            return ourairports.ensure_snapshot(self.path, timeout=5)
+
+    def test_first_run_builds_the_snapshot_once(self):
+        with StubServer(csv_handler) as stub:
+            airports, runways = self.ensure(stub)
+            self.assertEqual(len(stub.requests), 2)
+            self.assertTrue(self.path.exists())
+            self.assertEqual((airports, runways), self.ensure(stub))
+            self.assertEqual(len(stub.requests), 2)  # second run only reads the file
+        self.assertEqual([a["ident"] for a in airports], ["LPPT", "LEMG"])
+        self.assertEqual([r["airport_ident"] for r in runways], ["LPPT"])
+        self.assertEqual(airports[0]["latitude_deg"], "38.78")
+        self.assertEqual(ourairports.snapshot_info(self.path)["airports"], 2)
+
+    def test_stale_snapshot_is_rebuilt(self):
+        self.path.write_text('{"version": 0}', encoding="utf-8")
+        with StubServer(csv_handler) as stub:
+            airports, _ = self.ensure(stub)
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(len(airports), 2)
+        self.assertIsNotNone(ourairports.load_snapshot(self.path))
+
+    def test_unwritable_path_still_returns_rows(self):
+        self.path = self.path.parent / "missing-dir" / "snap.json"
+        with StubServer(csv_handler) as stub:
+            airports, runways = self.ensure(stub)
+        self.assertEqual(len(airports), 2)
+        self.assertFalse(self.path.exists())
+
+    def test_download_failure_raises(self):
+        with StubServer(lambda *a: (503, {}, "down")) as stub:
+            with self.assertRaises(requests.HTTPError):
+                self.ensure(stub)
+        self.assertFalse(self.path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
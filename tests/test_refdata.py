@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+from briefings import refdata
+from tests.bench_refdata import synthetic_ad_lines, synthetic_loc_lines
+
+AD_EDGE_LINES = [
+    "LP0065   AGUIAR DA BEIRA HELIPORT                  4049N00732W           404903N        0073211W        AGUIAR DA BEIRA",
+    "LP0078   ALENTEJO AIR PARK ULM                     3728N00844W           372755.90N     0084414.21W     SAO TEOTONIO",
+    "Ident        Name for FPL Field 18 DEP/ DEST/                               Latitude      Longitude                 Served city",
+    "DEP/ DEST/",
+    "Coord for FPL Field 18",
+    "",
+    "   \x0c  ",
+    "404903N LEADING COORD 385959N 0091010W CITY",  # first token is a coordinate
+    "LPXX NAME 0091010W 385959N 0091010W CITY 0091010W",  # longitude text repeated before and after
+    "LPXY SAME 385959N 385959N TAIL",  # latitude text == longitude text
+    "LPXZ SHORT 404N 0073W CITY",  # one-digit minutes
+    "LPYA DOTS 404.5N 0073211W CITY",  # dot inside the minutes
+    "LPYB DEC 4049.5N 00732.25W CITY",  # seconds start with the dot
+    "LPYC lower 404903n 0073211w city",
+    "LPYD ONLY 404903N",
+    "LPYE\x0bVT 404903N\t0073211W\x0cCITY",
+    "LPYF NBSP\xa0NAME 404903N 0073211W CITY",  # whitespace only Python splits on
+    "LPYG FS\x1cNAME 404903N 0073211W CITY",
+    "LPYH ARABIC ٤٠٤٩٠٣N 0073211W CITY",  # non-ASCII digits
+    "LPYI LONG-S 404903ſ 0073211W CITY",  # matches [NSEW] under re.I
+    "LPYJ ACCENT ÉVORA 384000N 0075400W ÉVORA",
+]
+
+LOC_EDGE_LINES = [
+    "ABRANTES                             392747N 0081159W                          ABRAN          LC",
+    "Total de registos - 968",
+    "Total  de registos - 968 (two spaces: not the footer)  392747N 0081159W X",
+    "",
+    "  ",
+    "NO CODE 392747N 0081159W",
+    "CODE ONLY 392747N 0081159W ABC",
+    "SAME TEXT 392747N 392747N ABC SECTOR ONE",
+    "BETWEEN 392747N WORD 0081159W ABC DEF",
+    "EIGHT DIGITS 39274712N 0081159W ABC",
+    "FIVE DIGITS 39274N 0081159W ABC",
+    "DECIMAL 392747.5N 0081159.25W ABC Z",
+    "SHORT MIN 3927475N 008115W ABC",
+    "392747N 0081159W FIRST TOKEN",
+    "lower 392747n 0081159w abc",
+    "NBSP\xa0NAME 392747N 0081159W ABC",
+    "ARABIC ٣٩٢٧٤٧N 0081159W ABC",
+    "ÉVORA                               383400N 0075400W                          EVORA          ÉV",
+]
+
+
+class VectorizedParserTest(unittest.TestCase):
+    def assertSameRows(self, cols, rows):
+        got = list(zip(*(cols[c].tolist() for c in cols)))
+        self.assertEqual(len(got), len(rows))
+        for i, (a, b) in enumerate(zip(got, rows)):
+            self.assertEqual(a, tuple(b), f"row {i}")
+
+    def test_shipped_csvs(self):
+        ad = refdata._lines(refdata.DATA_DIR / refdata.AD_CSV)
+        loc = refdata._lines(refdata.DATA_DIR / refdata.LOC_CSV)
+        self.assertSameRows(refdata.parse_ad_vectorized(ad), refdata.parse_ad_lines(ad))
+        self.assertSameRows(refdata.parse_loc_vectorized(loc), refdata.parse_loc_lines(loc))
+
+    def test_edge_lines(self):
+        self.assertSameRows(refdata.parse_ad_vectorized(AD_EDGE_LINES), refdata.parse_ad_lines(AD_EDGE_LINES))
+        self.assertSameRows(refdata.parse_loc_vectorized(LOC_EDGE_LINES), refdata.parse_loc_lines(LOC_EDGE_LINES))
+
+    def test_synthetic_lines(self):
+        for seed in (1, 2):
+            ad, loc = synthetic_ad_lines(5000, seed), synthetic_loc_lines(5000, seed)
+            self.assertSameRows(refdata.parse_ad_vectorized(ad), refdata.parse_ad_lines(ad))
+            self.assertSameRows(refdata.parse_loc_vectorized(loc), refdata.parse_loc_lines(loc))
+
+    def test_without_pyarrow(self):
+        with mock.patch.object(refdata, "pa", None), mock.patch.object(refdata, "pc", None):
+            self.assertSameRows(refdata.parse_ad_vectorized(AD_EDGE_LINES), refdata.parse_ad_lines(AD_EDGE_LINES))
+            self.assertSameRows(refdata.parse_loc_vectorized(LOC_EDGE_LINES), refdata.parse_loc_lines(LOC_EDGE_LINES))
+
+    def test_empty_input(self):
+        for fn, cols in ((refdata.parse_ad_vectorized, refdata.AD_COLUMNS), (refdata.parse_loc_vectorized, refdata.LOC_COLUMNS)):
+            out = fn([])
+            self.assertEqual(tuple(out), cols)
+            self.assertTrue(all(len(v) == 0 for v in out.values()))
+
+    def test_dms_columns(self):
+        tokens = ["404903N", "372755.90S", "404N", "404.5N", "4049.5n", "40N", "3927475s"]
+        got = refdata.dms_columns(tokens).tolist()
+        want = [refdata.dms_to_dd(t) for t in tokens]
+        self.assertEqual([None if g != g else g for g in got], want)
+        tokens = ["0073211W", "0084414.21w", "0073W", "00732E"]
+        got = refdata.dms_columns(tokens, is_lon=True).tolist()
+        self.assertEqual([None if g != g else g for g in got], [refdata.dms_to_dd(t, is_lon=True) for t in tokens])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from briefings import gist_store
+from briefings.route_store import GistBackend, RevisionConflict, RouteStore, SQLiteBackend
+from tests.stub_server import StubServer
+from tests.test_gist_store import TOKEN, FakeGist
+
+A = [{"name": "LPSO"}, {"name": "LPEV"}]
+B = [{"name": "LPCS"}, {"name": "LPMT"}]
+
+
+class RacingBackend(SQLiteBackend):
+    """Someone else commits right before each of our commits."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.attempts = 0
+
+    def commit(self, ops, base_rev):
+        self.attempts += 1
+        other = SQLiteBackend(self.path)
+        other.commit({"other": [{"n": self.attempts}]}, other.read()[1])
+        return super().commit(ops, base_rev)
+
+
+class SQLiteRouteStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "routes.sqlite"
+
+    def store(self, **kw):
+        s = RouteStore(SQLiteBackend(self.path), **kw)
+        s.load()
+        return s
+
+    def test_different_routes_both_survive(self):
+        one, two = self.store(), self.store()
+        one.put("A", A)
+        two.put("B", B)
+        self.assertEqual(one.flush(), {"ok": True, "written": ["A"], "conflicts": [], "error": None})
+        self.assertEqual(two.flush(), {"ok": True, "written": ["B"], "conflicts": [], "error": None})
+        self.assertEqual(self.store().routes, {"A": A, "B": B})
+        self.assertEqual(two.routes, {"A": A, "B": B})
+
+    def test_same_route_is_a_conflict_and_the_later_writer_wins(self):
+        seed = self.store()
+        seed.put("A", A)
+        seed.flush()
+        one, two = self.store(), self.store()
+        one.put("A", A + [{"name": "LPFR"}])
+        two.put("A", B)
+        self.assertEqual(one.flush()["conflicts"], [])
+        res = two.flush()
+        self.assertTrue(res["ok"])
+        self.assertEqual(res["conflicts"], ["A"])
+        self.assertEqual(self.store().routes, {"A": B})
+
+    def test_delete_is_merged_with_a_remote_put(self):
+        seed = self.store()
+        seed.put("A", A)
+        seed.flush()
+        one, two = self.store(), self.store()
+        one.put("B", B)
+        two.delete("A")
+        one.flush()
+        res = two.flush()
+        self.assertEqual((res["ok"], res["written"], res["conflicts"]), (True, ["A"], []))
+        self.assertEqual(self.store().routes, {"B": B})
+
+    def test_pending_ops_survive_a_failed_commit(self):
+        s = self.store()
+        s.put("A", A)
+        with mock.patch.object(s.backend, "commit", side_effect=sqlite3.OperationalError("database is locked")):
+            res = s.flush()
+        self.assertEqual(res, {"ok": False, "written": [], "conflicts": [], "error": "database is locked"})
+        self.assertEqual(s.pending, {"A": A})
+        self.assertEqual(self.store().routes, {})
+        self.assertTrue(s.flush()["ok"])
+        self.assertEqual(self.store().routes, {"A": A})
+
+    def test_max_retries_exhausted(self):
+        s = RouteStore(RacingBackend(self.path), max_retries=2)
+        s.load()
+        s.put("A", A)
+        res = s.flush()
+        self.assertFalse(res["ok"])
+        self.assertEqual(res["error"], "Too many concurrent changes, try again.")
+        self.assertEqual(s.backend.attempts, 3)
+        self.assertEqual(s.pending, {"A": A})
+        self.assertNotIn("A", self.store().routes)
+
+
+class GistBackendTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("CACHE_DIR", Path(tmp.name)), ("DB_PATH", Path(tmp.name) / "gists.sqlite")):
+            p = mock.patch.object(gist_store, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        self.gist_id = f"routes{id(self)}"
+
+    def test_revision_is_rechecked_before_writing(self):
+        gist = FakeGist({"routes.json": json.dumps({"A": A})})
+        with StubServer(gist) as stub, mock.patch.object(gist_store, "API_URL", stub.url):
+            backend = GistBackend(TOKEN, self.gist_id)
+            s = RouteStore(backend)
+            s.load(fresh=True)
+            # someone else saves B after we read
+            gist.files["routes.json"] = json.dumps({"A": A, "B": B})
+            gist.version += 1
+
+            with self.assertRaises(RevisionConflict):
+                backend.commit({"C": A}, s.base_rev)
+            self.assertEqual([r["method"] for r in stub.requests], ["GET", "GET"])
+
+            s.put("C", A)
+            res = s.flush()
+
+        self.assertEqual(res, {"ok": True, "written": ["C"], "conflicts": [], "error": None})
+        methods = [r["method"] for r in stub.requests]
+        self.assertEqual(methods.count("PATCH"), 1)
+        self.assertEqual(methods[methods.index("PATCH") - 1], "GET")
+        self.assertEqual(json.loads(gist.files["routes.json"]), {"A": A, "B": B, "C": A})
+        self.assertEqual(s.base_rev, hashlib.sha1(gist.files["routes.json"].encode("utf-8")).hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()